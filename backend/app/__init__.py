@@ -40,16 +40,38 @@ def create_app(config_class=Config):
     # CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+    # JSON encoding (orjson + NumPy/pandas hook) for responses and JSON columns
+    from .utils.serialization import OrjsonProvider, engine_json_options
+    app.json = OrjsonProvider(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+                                               **engine_json_options()}
+
     # Initialize Extensions
     from .models import db
     db.init_app(app)
 
+    # Request / stage timing, cache hit ratios and upstream errors on /metrics
+    from .utils import metrics
+    metrics.init_app(app)
+
+    # Record / replay external data sources (offline benchmarking) - before anything fetches data
+    if app.config.get('REPLAY_MODE'):
+        from .utils.replay import install_from_config
+        install_from_config(app.config)
+
     # Initialize Task Queue (always needed for API endpoints)
     from .services.task_queue import init_task_queue, shutdown_task_queue
     with app.app_context():
         init_task_queue(app)
     atexit.register(shutdown_task_queue)
 
+    # Flush pending last_login writes from the auth layer on shutdown
+    from .utils.auth import flush_last_login_updates
+    def _flush_last_login_on_exit():
+        with app.app_context():
+            flush_last_login_updates()
+    atexit.register(_flush_last_login_on_exit)
+
     # Initialize Scheduler (only in production/normal mode, not in debug reloader)
     if not os.environ.get('WERKZEUG_RUN_MAIN'):
         from .scheduler import init_scheduler, shutdown_scheduler
@@ -96,6 +118,12 @@ def create_app(config_class=Config):
         except Exception as e:
             return {'success': False, 'error': str(e)}, 500
 
+    # Pre-open cache warm-up: last run per market, first-trading-hour hit rate, current cache stats
+    @app.route('/api/admin/prewarm-report')
+    def prewarm_report():
+        from .services.prewarm import get_prewarm_report
+        return get_prewarm_report()
+
     # Flask CLI command to update holding dates
     @app.cli.command('update-holding-dates')
     def update_holding_dates_command():
@@ -0,0 +1,222 @@
+"""
+隐含波动率曲面
+
+由一条期权链（一个标的的一个行情快照）构建一次：每个到期日的波动率微笑
+按对数价值状态 ln(K/S) 重采样到固定网格上（价外一侧：K<S 用看跌，K>=S 用看涨），
+到期日之间按总方差 sigma^2 * t 线性插值。
+
+构建后的查询：
+  - iv(moneyness, days) / iv_at_strike(strike, days) / atm_iv / skew：网格等距，
+    价值状态方向 O(1)，到期方向二分查找（到期日只有几十个）
+  - term_structure：各到期日的平值波动率与偏斜在构建时预先算好
+"""
+
+import logging
+import math
+import numbers
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..core.greeks import DAYS_PER_YEAR, days_to_expiry, numeric_field
+
+logger = logging.getLogger(__name__)
+
+MONEYNESS_GRID = np.linspace(-0.5, 0.5, 51)   # ln(K/S)，步长 0.02（约 ±40% 行权价）
+SKEW_MONEYNESS = 0.1                           # 偏斜：约 90% 行权价与 110% 行权价的波动率差
+ATM_DAYS = 30                                  # 默认查询期限
+TERM_SLOPE_THRESHOLD = 0.01                    # 期限结构斜率判定阈值（波动率绝对值）
+
+
+class IVSurface:
+    """一个标的、一个期权链快照的隐含波动率曲面"""
+
+    def __init__(self, spot: float, days: np.ndarray, grid_iv: np.ndarray, points: Dict[str, np.ndarray]):
+        """
+        Args:
+            spot: 标的价格
+            days: 各到期日剩余天数（升序）
+            grid_iv: (到期日数, len(MONEYNESS_GRID)) 的波动率网格
+            points: 构建用的原始合约数据（iv, open_interest, is_call），供汇总统计使用
+        """
+        self.spot = spot
+        self.days = days
+        self.grid_iv = grid_iv
+        self.points = points
+        self._years = np.maximum(days, 1) / DAYS_PER_YEAR
+        self._total_variance = grid_iv ** 2 * self._years[:, None]
+        self._step = MONEYNESS_GRID[1] - MONEYNESS_GRID[0]
+
+        # 各到期日的平值波动率与偏斜（term_structure / atm_iv 查询直接读取）
+        self.atm_ivs = self._row_iv(np.zeros(1))[:, 0]
+        wings = self._row_iv(np.array([-SKEW_MONEYNESS, SKEW_MONEYNESS]))
+        self.skews = wings[:, 0] - wings[:, 1]
+
+    # ==================== 构建 ====================
+
+    @classmethod
+    def build(cls, spot: float, strike, days, iv, is_call, open_interest=None) -> Optional['IVSurface']:
+        """
+        由合约数组构建曲面
+
+        Args:
+            spot: 标的价格
+            strike / days / iv / is_call / open_interest: 每个合约一个元素
+
+        Returns:
+            IVSurface；标的价格无效或没有可用的隐含波动率时为 None
+        """
+        if not isinstance(spot, numbers.Real) or not math.isfinite(spot) or spot <= 0:
+            return None
+
+        strike = np.asarray(strike, dtype=float)
+        days = np.asarray(days, dtype=float)
+        iv = np.asarray(iv, dtype=float)
+        is_call = np.asarray(is_call, dtype=bool)
+        open_interest = np.zeros(len(iv)) if open_interest is None else np.asarray(open_interest, dtype=float)
+
+        with np.errstate(invalid='ignore'):
+            priced = (iv > 0) & np.isfinite(iv) & (strike > 0) & np.isfinite(strike)
+            usable = priced & (days >= 0)
+        points = {
+            'iv': iv[priced],
+            'open_interest': np.nan_to_num(open_interest[priced]),
+            'is_call': is_call[priced],
+        }
+        if not usable.any():
+            return None
+
+        moneyness = np.log(strike[usable] / spot)
+        days, iv, is_call = days[usable], iv[usable], is_call[usable]
+        expiries = np.unique(days)
+        rows = []
+        for expiry_days in expiries:
+            same_expiry = days == expiry_days
+            # 价外一侧的报价通常更可靠；只有一侧数据时用全部合约
+            out_of_the_money = same_expiry & np.where(moneyness < 0, ~is_call, is_call)
+            selected = out_of_the_money if out_of_the_money.sum() >= 2 else same_expiry
+            rows.append(_smile(moneyness[selected], iv[selected]))
+
+        return cls(float(spot), expiries, np.vstack(rows), points)
+
+    @classmethod
+    def from_frames(cls, spot: float, calls: pd.DataFrame, puts: pd.DataFrame, today=None) -> Optional['IVSurface']:
+        """由看涨 / 看跌合约表（strike, implied_volatility, days_to_expiry 或 expiry, open_interest）构建"""
+        frames = [frame for frame in (calls, puts) if frame is not None and not frame.empty]
+        if not frames:
+            return None
+        return cls.build(
+            spot,
+            np.concatenate([numeric_field(frame, 'strike') for frame in frames]),
+            np.concatenate([days_to_expiry(frame, today) for frame in frames]),
+            np.concatenate([numeric_field(frame, 'implied_volatility') for frame in frames]),
+            np.concatenate([np.full(len(frame), frame is calls) for frame in frames]),
+            np.concatenate([numeric_field(frame, 'open_interest') for frame in frames]),
+        )
+
+    @classmethod
+    def combine(cls, surfaces: Iterable[Optional['IVSurface']]) -> Optional['IVSurface']:
+        """合并同一标的的多个曲面（如分别缓存的各到期日期权链）；同一到期日取后者"""
+        surfaces = [surface for surface in surfaces if surface is not None]
+        if not surfaces:
+            return None
+        if len(surfaces) == 1:
+            return surfaces[0]
+
+        rows = {}
+        for surface in surfaces:
+            rows.update(zip(surface.days.tolist(), surface.grid_iv))
+        days = np.array(sorted(rows))
+        points = {name: np.concatenate([surface.points[name] for surface in surfaces])
+                  for name in surfaces[0].points}
+        return cls(surfaces[-1].spot, days, np.vstack([rows[d] for d in days.tolist()]), points)
+
+    # ==================== 查询 ====================
+
+    def iv(self, moneyness, days=ATM_DAYS):
+        """
+        ln(K/S) 处、剩余 days 天的隐含波动率（参数可为数组）
+
+        价值状态超出网格时取边界值；期限在已有到期日之间按总方差插值，
+        超出范围时取最近到期日的值。
+        """
+        moneyness, days = np.broadcast_arrays(np.asarray(moneyness, dtype=float), np.asarray(days, dtype=float))
+        rows = self._row_iv(moneyness.ravel())   # (到期日数, 查询数)
+        if len(self.days) == 1:
+            result = rows[0]
+        else:
+            years = np.maximum(days.ravel(), 1) / DAYS_PER_YEAR
+            upper = np.clip(np.searchsorted(self._years, years), 1, len(self.days) - 1)
+            lower = upper - 1
+            columns = np.arange(years.size)
+            w_lower = rows[lower, columns] ** 2 * self._years[lower]
+            w_upper = rows[upper, columns] ** 2 * self._years[upper]
+            weight = np.clip((years - self._years[lower]) / (self._years[upper] - self._years[lower]), 0, 1)
+            interpolated = np.sqrt((w_lower + weight * (w_upper - w_lower)) / years)
+            # 超出到期日范围：取最近到期日的波动率
+            result = np.where(years <= self._years[0], rows[0, columns],
+                              np.where(years >= self._years[-1], rows[-1, columns], interpolated))
+        result = result.reshape(moneyness.shape)
+        return float(result) if result.ndim == 0 else result
+
+    def iv_at_strike(self, strike, days=ATM_DAYS):
+        """行权价 strike 处的隐含波动率"""
+        return self.iv(np.log(np.asarray(strike, dtype=float) / self.spot), days)
+
+    def atm_iv(self, days=ATM_DAYS) -> float:
+        """平值隐含波动率"""
+        return self.iv(0.0, days)
+
+    def skew(self, days=ATM_DAYS) -> float:
+        """偏斜：约 90% 行权价与 110% 行权价的波动率差（正值 = 看跌期权更贵）"""
+        low, high = self.iv([-SKEW_MONEYNESS, SKEW_MONEYNESS], days)
+        return float(low - high)
+
+    def term_structure(self) -> List[Dict[str, float]]:
+        """各到期日的平值波动率与偏斜"""
+        return [
+            {'days': int(d), 'atm_iv': round(float(atm), 4), 'skew': round(float(skew), 4)}
+            for d, atm, skew in zip(self.days.tolist(), self.atm_ivs, self.skews)
+        ]
+
+    def term_slope(self) -> float:
+        """期限结构斜率：最远到期日与最近到期日的平值波动率之差"""
+        return float(self.atm_ivs[-1] - self.atm_ivs[0])
+
+    def summary(self, days=ATM_DAYS) -> Dict[str, Any]:
+        """平值波动率、偏斜与期限结构（可直接序列化）"""
+        slope = self.term_slope()
+        if slope > TERM_SLOPE_THRESHOLD:
+            shape = 'contango'          # 远期波动率更高（常态）
+        elif slope < -TERM_SLOPE_THRESHOLD:
+            shape = 'backwardation'     # 近期波动率更高（事件 / 恐慌）
+        else:
+            shape = 'flat'
+        return {
+            'spot': self.spot,
+            'reference_days': days,
+            'atm_iv': round(self.atm_iv(days), 4),
+            'skew': round(self.skew(days), 4),
+            'term_slope': round(slope, 4),
+            'term_shape': shape,
+            'term_structure': self.term_structure(),
+            'expiry_count': len(self.days),
+            'sample_size': int(len(self.points['iv'])),
+        }
+
+    # ==================== 内部 ====================
+
+    def _row_iv(self, moneyness: np.ndarray) -> np.ndarray:
+        """每个到期日在给定价值状态处的波动率（等距网格上线性插值）"""
+        position = np.clip((moneyness - MONEYNESS_GRID[0]) / self._step, 0, len(MONEYNESS_GRID) - 1)
+        left = np.minimum(position.astype(int), len(MONEYNESS_GRID) - 2)
+        fraction = position - left
+        return self.grid_iv[:, left] * (1 - fraction) + self.grid_iv[:, left + 1] * fraction
+
+
+def _smile(moneyness: np.ndarray, iv: np.ndarray) -> np.ndarray:
+    """一个到期日的波动率微笑 -> 网格（同一行权价取平均，网格外取边界值）"""
+    levels, inverse = np.unique(moneyness, return_inverse=True)
+    mean_iv = np.bincount(inverse, weights=iv) / np.bincount(inverse)
+    return np.interp(MONEYNESS_GRID, levels, mean_iv)
@@ -0,0 +1,210 @@
+"""
+蒙特卡洛胜率估算
+
+risk_return_profile 默认用 Black-Scholes 闭式近似 N(d1) 估算每个合约的胜率。
+这里为每个标的只模拟一次价格路径（一组共享的随机数），再用 NumPy
+一次性评估所有策略的所有合约：
+
+  - gbm：几何布朗运动。到期胜率只取决于到期价格，因此只需要一组标准正态
+    抽样 Z（含对偶样本 -Z）；不同合约的波动率 / 期限只改变阈值，
+    P(S_T > L) = P(Z > (ln(L/S) - (r - sigma^2/2) t) / (sigma sqrt(t)))，
+    在排好序的 Z 上二分查找即可，每个合约 O(log n_paths)。
+  - bootstrap：从历史日收益率中有放回抽样，逐日累加成路径（去除历史均值、
+    换为无风险漂移），保留历史收益的厚尾与偏度；不使用合约的隐含波动率。
+
+模拟由 seed 决定，同一 seed 的结果完全可复现。
+"""
+
+import logging
+import math
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..core.greeks import DAYS_PER_YEAR, RISK_FREE_RATE, days_to_expiry, numeric_field
+from ..scoring.chain_features import is_finite_number
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = 20000
+DEFAULT_SEED = 42
+TRADING_DAYS_PER_YEAR = 252
+MIN_BOOTSTRAP_RETURNS = 20     # 历史收益率少于此数时 bootstrap 退回 gbm
+
+MODELS = ('gbm', 'bootstrap')
+
+# 各策略的获利条件：到期价格高于 / 低于 行权价（± 权利金）
+WIN_CONDITIONS = {
+    'sell_put': ('above', 0),
+    'sell_call': ('below', 0),
+    'buy_call': ('above', 1),
+    'buy_put': ('below', -1),
+}
+STRATEGY_SIDES = {'sell_put': 'puts', 'buy_put': 'puts', 'sell_call': 'calls', 'buy_call': 'calls'}
+
+
+class PriceSimulation:
+    """一个标的的模拟价格（由 MonteCarloEngine.simulate 创建）"""
+
+    def __init__(self, spot: float, model: str, n_paths: int, seed: int,
+                 daily_returns: Optional[np.ndarray] = None, r: float = RISK_FREE_RATE):
+        self.spot = spot
+        self.model = model
+        self.n_paths = n_paths
+        self.seed = seed
+        self.r = r
+
+        if model == 'gbm':
+            half = np.random.default_rng(seed).standard_normal((n_paths + 1) // 2)
+            self._draws = np.sort(np.concatenate([half, -half]))
+        else:
+            # 去除历史漂移，换为无风险漂移（与 gbm 一致）
+            self._returns = daily_returns - daily_returns.mean() + r / TRADING_DAYS_PER_YEAR
+            self._paths = np.empty((0, n_paths))   # 累计对数收益，一行一个交易日
+            self._terminal = {}                      # 交易日数 -> 排序后的累计对数收益
+            self._lock = threading.Lock()            # 各策略并发计分时共享
+
+    def prob_above(self, level, days, sigma=None) -> np.ndarray:
+        """到期价格高于 level 的路径比例（参数可为数组；无法估算时为 NaN）"""
+        return self._probability(level, days, sigma, above=True)
+
+    def prob_below(self, level, days, sigma=None) -> np.ndarray:
+        """到期价格低于 level 的路径比例"""
+        return self._probability(level, days, sigma, above=False)
+
+    def win_probabilities(self, strategy: str, strike, premium, implied_vol, days) -> np.ndarray:
+        """
+        一组合约在 strategy 下的胜率（到期时获利的路径比例）
+
+        Args:
+            strike / premium / implied_vol / days: 每个合约一个元素（days 为自然日）
+        """
+        direction, premium_sign = WIN_CONDITIONS[strategy]
+        with np.errstate(invalid='ignore'):
+            level = np.asarray(strike, dtype=float) + premium_sign * np.asarray(premium, dtype=float)
+        return self._probability(level, days, implied_vol, above=direction == 'above')
+
+    def chain_win_probabilities(self, options_data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """整条期权链在四个策略下的胜率（按 calls / puts 中的合约顺序）"""
+        frames = {}
+        for side in ('calls', 'puts'):
+            contracts = options_data.get(side) or []
+            frames[side] = contracts.frame if hasattr(contracts, 'frame') else pd.DataFrame(list(contracts))
+
+        result = {}
+        for strategy, side in STRATEGY_SIDES.items():
+            frame = frames[side]
+            result[strategy] = self.win_probabilities(
+                strategy,
+                numeric_field(frame, 'strike'),
+                (numeric_field(frame, 'bid') + numeric_field(frame, 'ask')) / 2,
+                numeric_field(frame, 'implied_volatility'),
+                days_to_expiry(frame),
+            )
+        return result
+
+    # ==================== 内部 ====================
+
+    def _probability(self, level, days, sigma, above: bool) -> np.ndarray:
+        level, days, sigma = np.broadcast_arrays(
+            np.asarray(level, dtype=float), np.asarray(days, dtype=float),
+            np.asarray(np.nan if sigma is None else sigma, dtype=float)
+        )
+        shape = level.shape
+        level, days, sigma = level.ravel(), days.ravel(), sigma.ravel()
+        result = np.full(level.size, np.nan)
+
+        with np.errstate(all='ignore'):
+            log_level = np.log(level / self.spot)
+            valid = (level > 0) & (days > 0) & np.isfinite(log_level)
+            if self.model == 'gbm':
+                valid &= sigma > 0
+                rows = np.flatnonzero(valid)
+                t = days[rows] / DAYS_PER_YEAR
+                s = sigma[rows]
+                threshold = (log_level[rows] - (self.r - 0.5 * s ** 2) * t) / (s * np.sqrt(t))
+                result[rows] = self._tail(self._draws, threshold, above)
+            else:
+                horizons = np.maximum(1, np.round(days * TRADING_DAYS_PER_YEAR / DAYS_PER_YEAR)).astype(int)
+                needed = np.unique(horizons[valid]).tolist()
+                for horizon in needed[::-1]:   # 先取最长期限：路径只生成一次
+                    rows = np.flatnonzero(valid & (horizons == horizon))
+                    result[rows] = self._tail(self._terminal_log_returns(horizon), log_level[rows], above)
+
+        return result.reshape(shape)
+
+    @staticmethod
+    def _tail(sorted_values: np.ndarray, threshold: np.ndarray, above: bool) -> np.ndarray:
+        if above:
+            return 1 - np.searchsorted(sorted_values, threshold, side='right') / len(sorted_values)
+        return np.searchsorted(sorted_values, threshold, side='left') / len(sorted_values)
+
+    def _terminal_log_returns(self, horizon: int) -> np.ndarray:
+        """horizon 个交易日后的累计对数收益（排序后缓存）"""
+        with self._lock:
+            terminal = self._terminal.get(horizon)
+            if terminal is None:
+                if horizon > len(self._paths):
+                    # 按交易日逐行抽样：延长路径时前面的交易日不变，结果与查询顺序无关
+                    rng = np.random.default_rng(self.seed)
+                    picks = rng.integers(0, len(self._returns), size=(horizon, self.n_paths))
+                    self._paths = np.cumsum(self._returns[picks], axis=0)
+                terminal = self._terminal[horizon] = np.sort(self._paths[horizon - 1])
+            return terminal
+
+
+class MonteCarloEngine:
+    """蒙特卡洛胜率引擎：为每个标的创建一次 PriceSimulation"""
+
+    def __init__(self, n_paths: int = DEFAULT_PATHS, seed: int = DEFAULT_SEED, model: str = 'gbm',
+                 r: float = RISK_FREE_RATE):
+        """
+        Args:
+            n_paths: 路径数（误差约 0.5 / sqrt(n_paths)）
+            seed: 随机种子
+            model: 'gbm' 或 'bootstrap'
+            r: 无风险利率（漂移）
+        """
+        if model not in MODELS:
+            raise ValueError(f"不支持的模型: {model}")
+        if n_paths < 2:
+            raise ValueError("路径数至少为 2")
+        self.n_paths = n_paths
+        self.seed = seed
+        self.model = model
+        self.r = r
+
+    def simulate(self, stock_data: Dict[str, Any]) -> Optional[PriceSimulation]:
+        """
+        为一个标的模拟价格
+
+        Args:
+            stock_data: 标的数据（current_price；bootstrap 另需 history['Close']）
+
+        Returns:
+            PriceSimulation；标的价格无效时为 None
+        """
+        spot = stock_data.get('current_price')
+        if not (is_finite_number(spot) and spot > 0):
+            return None
+
+        if self.model == 'bootstrap':
+            returns = _daily_log_returns(stock_data)
+            if len(returns) >= MIN_BOOTSTRAP_RETURNS:
+                return PriceSimulation(float(spot), 'bootstrap', self.n_paths, self.seed, returns, self.r)
+            logger.info(f"历史收益率不足 {MIN_BOOTSTRAP_RETURNS} 个，蒙特卡洛改用 gbm")
+
+        return PriceSimulation(float(spot), 'gbm', self.n_paths, self.seed, r=self.r)
+
+
+def _daily_log_returns(stock_data: Dict[str, Any]) -> np.ndarray:
+    """stock_data['history']['Close'] 的日对数收益率"""
+    close = (stock_data.get('history') or {}).get('Close')
+    if not close:
+        return np.empty(0)
+    values = close.values() if isinstance(close, dict) else close
+    prices = np.array([v if is_finite_number(v) else math.nan for v in values], dtype=float)
+    prices = prices[np.isfinite(prices) & (prices > 0)]
+    return np.diff(np.log(prices))
@@ -10,6 +10,8 @@ import pandas as pd
 from datetime import datetime, timedelta
 import math
 
+from .iv_surface import IVSurface
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,7 +28,8 @@ class VRPCalculator:
             'negative_premium': -0.15   # 负溢价阈值 (-15%)
         }
 
-    def calculate(self, symbol: str, options_data: Dict, stock_data: Dict) -> Dict[str, Any]:
+    def calculate(self, symbol: str, options_data: Dict, stock_data: Dict,
+                  iv_surface: Optional[IVSurface] = None) -> Dict[str, Any]:
         """
         计算VRP分析
 
@@ -34,6 +37,7 @@ class VRPCalculator:
             symbol: 股票代码
             options_data: 期权链数据
             stock_data: 股票历史数据
+            iv_surface: 期权链的隐含波动率曲面（可选，提供时平值IV取自曲面）
 
         Returns:
             VRP分析结果
@@ -51,7 +55,7 @@ class VRPCalculator:
             historical_volatility = self._calculate_historical_volatility(stock_data)
 
             # 2. 计算隐含波动率指标
-            iv_metrics = self._calculate_implied_volatility_metrics(options_data)
+            iv_metrics = self._calculate_implied_volatility_metrics(options_data, iv_surface)
 
             # 3. 计算VRP指标
             vrp_analysis = self._calculate_vrp_metrics(iv_metrics, historical_volatility)
@@ -176,9 +180,13 @@ class VRPCalculator:
             logger.error(f"波动率分位数计算失败: {e}")
             return 50.0
 
-    def _calculate_implied_volatility_metrics(self, options_data: Dict) -> Dict[str, Any]:
+    def _calculate_implied_volatility_metrics(self, options_data: Dict,
+                                              iv_surface: Optional[IVSurface] = None) -> Dict[str, Any]:
         """计算隐含波动率指标"""
         try:
+            if iv_surface is not None and len(iv_surface.points['iv']):
+                return self._surface_iv_metrics(iv_surface)
+
             calls = options_data.get('calls', [])
             puts = options_data.get('puts', [])
 
@@ -269,6 +277,28 @@ class VRPCalculator:
                 'data_quality': 'error_fallback'
             }
 
+    def _surface_iv_metrics(self, surface: IVSurface) -> Dict[str, Any]:
+        """由波动率曲面计算隐含波动率指标（平值IV为 30 天期限插值，另含偏斜与期限结构）"""
+        points = surface.points
+        iv = points['iv']
+        is_call = points['is_call']
+
+        call_put_skew = 0.0
+        if is_call.any() and not is_call.all():
+            call_put_skew = iv[is_call].mean() - iv[~is_call].mean()
+
+        return {
+            'average_iv': float(iv.mean()),
+            'iv_weighted_by_oi': float(np.average(iv, weights=np.maximum(1, points['open_interest']))),
+            'iv_range': {'min': float(iv.min()), 'max': float(iv.max())},
+            'call_put_iv_skew': float(call_put_skew),
+            'atm_iv': surface.atm_iv(),
+            'iv_skew': surface.skew(),
+            'term_structure': surface.term_structure(),
+            'data_quality': 'calculated',
+            'sample_size': int(len(iv))
+        }
+
     def _calculate_vrp_metrics(self, iv_metrics: Dict, hv_metrics: Dict) -> Dict[str, Any]:
         """计算VRP指标"""
         try:
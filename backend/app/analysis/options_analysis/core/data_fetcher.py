@@ -4,29 +4,154 @@
 """
 
 import logging
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import yfinance as yf
 import pandas as pd
 import numpy as np
 
+from ....config import Config
+from ....utils.cache import TTLCache
+from ..advanced.iv_surface import IVSurface
+from .greeks import chain_greeks, fill_contract_greeks
 from .tiger_client import TigerOptionsClient
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_EXPIRIES = 3     # yfinance 备用路径最多获取的到期日数
+DEFAULT_FETCH_WORKERS = 4    # 并发获取到期日的线程数
+
+# 进程内共享缓存（所有 OptionsDataFetcher / OptionsAnalysisEngine 实例共用）
+# TTL 过后的 STALE_TTL 秒内仍返回旧数据，同时在后台刷新，请求不必等待数据源
+CACHE_TTL = Config.OPTIONS_FETCHER_CACHE_TTL
+CACHE_STALE_TTL = Config.OPTIONS_FETCHER_STALE_TTL
+CACHE_SIZE = Config.OPTIONS_FETCHER_CACHE_SIZE
+
+chain_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL,
+                       name='options_fetcher_chain')
+underlying_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL,
+                            name='options_fetcher_underlying')
+# (symbol, 期权链快照时间) -> IVSurface；期权链刷新后快照时间改变，旧曲面自然失效
+iv_surface_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL + CACHE_STALE_TTL,
+                            name='options_fetcher_iv_surface')
+
+# 每个合约对外提供的字段（与原 iterrows 生成的 dict 相同）
+CONTRACT_FIELDS = ('strike', 'expiry', 'bid', 'ask', 'last_price', 'volume', 'open_interest',
+                   'implied_volatility', 'delta', 'gamma', 'theta', 'vega')
+
+# yfinance option_chain 列名 -> 合约字段
+_YF_COLUMNS = {
+    'strike': 'strike',
+    'bid': 'bid',
+    'ask': 'ask',
+    'lastPrice': 'last_price',
+    'volume': 'volume',
+    'openInterest': 'open_interest',
+    'impliedVolatility': 'implied_volatility',
+}
+
+
+class OptionContracts(Sequence):
+    """
+    期权合约的只读序列
+
+    底层是一个列式 DataFrame（.frame，一行一个合约）；逐合约的 dict 只在
+    第一次遍历、切片或序列化时全部生成并缓存，只做汇总计算的调用方直接
+    使用 .frame。物化之前按整数下标取单个合约时只生成该合约的 dict。
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame.reset_index(drop=True)
+        self._records = None
+
+    def _columns(self) -> List[str]:
+        return [c for c in CONTRACT_FIELDS if c in self.frame.columns]
+
+    def _materialize(self) -> List[Dict]:
+        if self._records is None:
+            self._records = self.frame[self._columns()].to_dict('records')
+        return self._records
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getitem__(self, index):
+        if self._records is None and isinstance(index, (int, np.integer)):
+            # 如只为排名靠前的合约生成完整结果：不物化整条链
+            position = range(len(self.frame))[index]
+            return self.frame.iloc[[position]][self._columns()].to_dict('records')[0]
+        return self._materialize()[index]
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, OptionContracts)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"OptionContracts({len(self)} contracts)"
+
+
+def _contracts_frame(contracts) -> pd.DataFrame:
+    """OptionContracts 或 dict 列表 -> DataFrame"""
+    if isinstance(contracts, OptionContracts):
+        return contracts.frame
+    return pd.DataFrame(list(contracts))
+
+
+def _numeric_column(frame: pd.DataFrame, name: str) -> np.ndarray:
+    """数值列（缺失列 / 非数值 / NaN 记为 0）"""
+    if name not in frame.columns:
+        return np.zeros(len(frame))
+    return pd.to_numeric(frame[name], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+
+def clear_caches():
+    """清空期权链 / 标的数据 / 波动率曲面的共享缓存"""
+    chain_cache.clear()
+    underlying_cache.clear()
+    iv_surface_cache.clear()
+
+
+def _is_success(result) -> bool:
+    """只缓存成功的结果（失败时下次请求重新获取）"""
+    return bool(result and result.get('success'))
+
+
+def _select(contracts, mask: np.ndarray):
+    if isinstance(contracts, OptionContracts):
+        return OptionContracts(contracts.frame[mask])
+    return [opt for opt, keep in zip(contracts, mask) if keep]
+
 
 class OptionsDataFetcher:
     """期权数据获取器"""
 
-    def __init__(self):
-        """初始化数据获取器"""
+    def __init__(self, max_expiries: int = DEFAULT_MAX_EXPIRIES, fetch_workers: int = DEFAULT_FETCH_WORKERS):
+        """
+        初始化数据获取器
+
+        Args:
+            max_expiries: yfinance 备用路径最多获取的到期日数（在 expiry_days 窗口内）
+            fetch_workers: 并发获取到期日的线程数
+        """
         self.tiger_client = TigerOptionsClient()
-        self.cache_duration = 300  # 缓存5分钟
-        self._cache = {}
+        self.max_expiries = max_expiries
+        self.fetch_workers = fetch_workers
 
     def get_options_chain(self, symbol: str, expiry_days: int = 45) -> Dict[str, Any]:
         """
-        获取期权链数据
+        获取期权链数据（进程内共享缓存，过期后先返回旧数据并在后台刷新）
 
         Args:
             symbol: 股票代码
@@ -36,37 +161,11 @@ class OptionsDataFetcher:
             期权链数据
         """
         try:
-            cache_key = f"chain_{symbol}_{expiry_days}"
-
-            # 检查缓存
-            if self._is_cache_valid(cache_key):
-                logger.info(f"使用缓存的期权链数据: {symbol}")
-                return self._cache[cache_key]['data']
-
-            logger.info(f"获取期权链数据: {symbol}, 到期天数: {expiry_days}")
-
-            # 尝试从Tiger API获取
-            tiger_data = self.tiger_client.get_options_chain(symbol, expiry_days)
-
-            if tiger_data.get('success'):
-                # 使用Tiger数据
-                result = self._format_tiger_options_data(tiger_data)
-            else:
-                # 备用：使用yfinance数据
-                logger.warning(f"Tiger API失败，使用yfinance备用数据: {tiger_data.get('error')}")
-                result = self._get_yfinance_options_data(symbol)
-
-            # 添加额外的分析数据
-            if result.get('success'):
-                result = self._enrich_options_data(result)
-
-            # 更新缓存
-            self._cache[cache_key] = {
-                'data': result,
-                'timestamp': datetime.now()
-            }
-
-            return result
+            return chain_cache.get_or_load(
+                (symbol, expiry_days, self.max_expiries),
+                lambda: self._load_options_chain(symbol, expiry_days),
+                cache_if=_is_success
+            )
 
         except Exception as e:
             logger.error(f"获取期权链失败: {symbol}, 错误: {e}")
@@ -76,6 +175,57 @@ class OptionsDataFetcher:
                 'symbol': symbol
             }
 
+    def _load_options_chain(self, symbol: str, expiry_days: int) -> Dict[str, Any]:
+        """从数据源获取期权链（Tiger 优先，失败时 yfinance）"""
+        logger.info(f"获取期权链数据: {symbol}, 到期天数: {expiry_days}")
+
+        # 尝试从Tiger API获取
+        tiger_data = self.tiger_client.get_options_chain(symbol, expiry_days)
+
+        if tiger_data.get('success'):
+            # 使用Tiger数据
+            result = self._format_tiger_options_data(tiger_data)
+        else:
+            # 备用：使用yfinance数据
+            logger.warning(f"Tiger API失败，使用yfinance备用数据: {tiger_data.get('error')}")
+            result = self._get_yfinance_options_data(symbol, expiry_days)
+
+        # 补全希腊值，添加额外的分析数据
+        if result.get('success'):
+            result = self._enrich_options_data(self._fill_greeks(result))
+
+        return result
+
+    def get_iv_surface(self, options_data: Dict, current_price: Optional[float] = None) -> Optional[IVSurface]:
+        """
+        期权链的隐含波动率曲面（每个标的、每个期权链快照只构建一次）
+
+        Args:
+            options_data: get_options_chain 的结果
+            current_price: 期权链中没有标的价格时使用
+
+        Returns:
+            IVSurface；数据不足时为 None
+        """
+        try:
+            if not options_data.get('success'):
+                return None
+
+            spot = options_data.get('current_price') or current_price
+            return iv_surface_cache.get_or_load(
+                (options_data.get('symbol'), options_data.get('timestamp')),
+                lambda: IVSurface.from_frames(
+                    spot,
+                    _contracts_frame(options_data.get('calls') or []),
+                    _contracts_frame(options_data.get('puts') or []),
+                ),
+                cache_if=lambda surface: surface is not None
+            )
+
+        except Exception as e:
+            logger.warning(f"构建波动率曲面失败: {e}")
+            return None
+
     def get_options_quotes(self, option_symbols: List[str]) -> Dict[str, Any]:
         """
         获取期权实时报价
@@ -108,7 +258,7 @@ class OptionsDataFetcher:
 
     def get_underlying_stock_data(self, symbol: str) -> Dict[str, Any]:
         """
-        获取标的股票数据
+        获取标的股票数据（进程内共享缓存，过期后先返回旧数据并在后台刷新）
 
         Args:
             symbol: 股票代码
@@ -117,60 +267,54 @@ class OptionsDataFetcher:
             股票数据
         """
         try:
-            cache_key = f"stock_{symbol}"
-
-            # 检查缓存
-            if self._is_cache_valid(cache_key):
-                return self._cache[cache_key]['data']
+            return underlying_cache.get_or_load(
+                symbol, lambda: self._load_underlying_stock_data(symbol), cache_if=_is_success
+            )
 
-            logger.info(f"获取标的股票数据: {symbol}")
+        except Exception as e:
+            logger.error(f"获取标的股票数据失败: {symbol}, 错误: {e}")
+            return {
+                'success': False,
+                'error': f"股票数据获取失败: {str(e)}",
+                'symbol': symbol
+            }
 
-            # 使用yfinance获取股票数据
-            ticker = yf.Ticker(symbol)
+    def _load_underlying_stock_data(self, symbol: str) -> Dict[str, Any]:
+        """从 yfinance 获取标的股票数据"""
+        logger.info(f"获取标的股票数据: {symbol}")
 
-            # 获取基本信息
-            info = ticker.info
+        # 使用yfinance获取股票数据
+        ticker = yf.Ticker(symbol)
 
-            # 获取历史价格数据
-            hist = ticker.history(period="1mo")
+        # 获取基本信息
+        info = ticker.info
 
-            # 获取期权到期日
-            expiry_dates = ticker.options if hasattr(ticker, 'options') else []
+        # 获取历史价格数据
+        hist = ticker.history(period="1mo")
 
-            # 计算技术指标
-            current_price = info.get('regularMarketPrice', hist['Close'].iloc[-1] if not hist.empty else None)
+        # 获取期权到期日
+        expiry_dates = ticker.options if hasattr(ticker, 'options') else []
 
-            result = {
-                'success': True,
-                'symbol': symbol,
-                'current_price': current_price,
-                'previous_close': info.get('regularMarketPreviousClose'),
-                'change': current_price - info.get('regularMarketPreviousClose', current_price) if current_price else 0,
-                'change_percent': ((current_price - info.get('regularMarketPreviousClose', current_price)) / info.get('regularMarketPreviousClose', current_price) * 100) if current_price and info.get('regularMarketPreviousClose') else 0,
-                'volume': info.get('regularMarketVolume'),
-                'market_cap': info.get('marketCap'),
-                'info': info,
-                'history': hist.to_dict() if not hist.empty else {},
-                'expiry_dates': expiry_dates,
-                'volatility_30d': self._calculate_volatility(hist),
-                'support_resistance': self._calculate_support_resistance(hist)
-            }
+        # 计算技术指标
+        current_price = info.get('regularMarketPrice', hist['Close'].iloc[-1] if not hist.empty else None)
 
-            # 更新缓存
-            self._cache[cache_key] = {
-                'data': result,
-                'timestamp': datetime.now()
-            }
+        result = {
+            'success': True,
+            'symbol': symbol,
+            'current_price': current_price,
+            'previous_close': info.get('regularMarketPreviousClose'),
+            'change': current_price - info.get('regularMarketPreviousClose', current_price) if current_price else 0,
+            'change_percent': ((current_price - info.get('regularMarketPreviousClose', current_price)) / info.get('regularMarketPreviousClose', current_price) * 100) if current_price and info.get('regularMarketPreviousClose') else 0,
+            'volume': info.get('regularMarketVolume'),
+            'market_cap': info.get('marketCap'),
+            'info': info,
+            'history': hist.to_dict() if not hist.empty else {},
+            'expiry_dates': expiry_dates,
+            'volatility_30d': self._calculate_volatility(hist),
+            'support_resistance': self._calculate_support_resistance(hist)
+        }
 
-            return result
-
-        except Exception as e:
-            logger.error(f"获取标的股票数据失败: {symbol}, 错误: {e}")
-            return {
-                'success': False,
-                'error': f"股票数据获取失败: {str(e)}",
-                'symbol': symbol
-            }
+        return result
 
     def _format_tiger_options_data(self, tiger_data: Dict) -> Dict[str, Any]:
         """格式化Tiger期权数据"""
@@ -179,6 +323,7 @@ class OptionsDataFetcher:
                 'success': True,
                 'source': 'tiger',
                 'symbol': tiger_data.get('symbol'),
+                'current_price': tiger_data.get('current_price'),
                 'timestamp': datetime.now().isoformat(),
                 'calls': tiger_data.get('calls', []),
                 'puts': tiger_data.get('puts', []),
@@ -195,7 +340,7 @@ class OptionsDataFetcher:
                 'error': f"Tiger数据格式化失败: {str(e)}"
             }
 
-    def _get_yfinance_options_data(self, symbol: str) -> Dict[str, Any]:
+    def _get_yfinance_options_data(self, symbol: str, expiry_days: int = 45) -> Dict[str, Any]:
         """使用yfinance获取期权数据（备用方案）"""
         try:
             ticker = yf.Ticker(symbol)
@@ -209,61 +354,25 @@ class OptionsDataFetcher:
                     'error': f"无期权数据可用: {symbol}"
                 }
 
-            # 获取最近的期权链数据
-            calls_data = []
-            puts_data = []
-
-            for expiry in expiry_dates[:3]:  # 只取前3个到期日
-                try:
-                    option_chain = ticker.option_chain(expiry)
-
-                    # 处理看涨期权
-                    calls = option_chain.calls
-                    for _, call in calls.iterrows():
-                        calls_data.append({
-                            'strike': call.get('strike'),
-                            'expiry': expiry,
-                            'bid': call.get('bid'),
-                            'ask': call.get('ask'),
-                            'last_price': call.get('lastPrice'),
-                            'volume': call.get('volume'),
-                            'open_interest': call.get('openInterest'),
-                            'implied_volatility': call.get('impliedVolatility'),
-                            'delta': call.get('delta', None),
-                            'gamma': call.get('gamma', None),
-                            'theta': call.get('theta', None),
-                            'vega': call.get('vega', None)
-                        })
-
-                    # 处理看跌期权
-                    puts = option_chain.puts
-                    for _, put in puts.iterrows():
-                        puts_data.append({
-                            'strike': put.get('strike'),
-                            'expiry': expiry,
-                            'bid': put.get('bid'),
-                            'ask': put.get('ask'),
-                            'last_price': put.get('lastPrice'),
-                            'volume': put.get('volume'),
-                            'open_interest': put.get('openInterest'),
-                            'implied_volatility': put.get('impliedVolatility'),
-                            'delta': put.get('delta', None),
-                            'gamma': put.get('gamma', None),
-                            'theta': put.get('theta', None),
-                            'vega': put.get('vega', None)
-                        })
-
-                except Exception as e:
-                    logger.warning(f"获取 {expiry} 期权链失败: {e}")
-                    continue
+            # 并发获取窗口内各到期日的期权链
+            selected = self._select_expiries(expiry_dates, expiry_days)
+            with ThreadPoolExecutor(max_workers=max(1, min(self.fetch_workers, len(selected))),
+                                    thread_name_prefix='OptionChain') as pool:
+                chains = list(pool.map(lambda expiry: self._fetch_yfinance_expiry(ticker, expiry), selected))
+
+            call_frames = [calls for calls, _, _ in chains if calls is not None]
+            put_frames = [puts for _, puts, _ in chains if puts is not None]
+            # 标的价格取自期权链响应本身（用于计算希腊值，无需额外请求）
+            current_price = next((price for _, _, price in chains if price), None)
 
             return {
                 'success': True,
                 'source': 'yfinance',
                 'symbol': symbol,
+                'current_price': current_price,
                 'timestamp': datetime.now().isoformat(),
-                'calls': calls_data,
-                'puts': puts_data,
+                'calls': OptionContracts(self._concat_chain(call_frames)),
+                'puts': OptionContracts(self._concat_chain(put_frames)),
                 'expiry_dates': list(expiry_dates)
             }
 
@@ -274,23 +383,85 @@ class OptionsDataFetcher:
                 'error': f"yfinance数据获取失败: {str(e)}"
             }
 
+    def _select_expiries(self, expiry_dates, expiry_days: int) -> List[str]:
+        """expiry_days 天内最近的 max_expiries 个到期日（窗口内没有时取最近的一个）"""
+        cutoff = (datetime.now() + timedelta(days=expiry_days)).strftime('%Y-%m-%d')
+        in_window = [expiry for expiry in expiry_dates if expiry <= cutoff]
+        return (in_window or list(expiry_dates[:1]))[:self.max_expiries]
+
+    def _fetch_yfinance_expiry(self, ticker, expiry: str):
+        """获取单个到期日的期权链，返回 (calls, puts, 标的价格)；失败时为 (None, None, None)"""
+        try:
+            option_chain = ticker.option_chain(expiry)
+            underlying = getattr(option_chain, 'underlying', None) or {}
+            return (self._yfinance_chain_frame(option_chain.calls, expiry),
+                    self._yfinance_chain_frame(option_chain.puts, expiry),
+                    underlying.get('regularMarketPrice'))
+        except Exception as e:
+            logger.warning(f"获取 {expiry} 期权链失败: {e}")
+            return None, None, None
+
+    @staticmethod
+    def _yfinance_chain_frame(chain: pd.DataFrame, expiry: str) -> pd.DataFrame:
+        """yfinance 期权链 -> 合约字段列式表（yfinance 不提供希腊值，记为 None）"""
+        frame = pd.DataFrame(index=chain.index)
+        for source, field in _YF_COLUMNS.items():
+            frame[field] = chain[source] if source in chain.columns else None
+        frame['expiry'] = expiry
+        for greek in ('delta', 'gamma', 'theta', 'vega'):
+            frame[greek] = chain[greek] if greek in chain.columns else None
+        return frame[list(CONTRACT_FIELDS)]
+
+    @staticmethod
+    def _concat_chain(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        if not frames:
+            return pd.DataFrame(columns=list(CONTRACT_FIELDS))
+        return pd.concat(frames, ignore_index=True)
+
+    def _fill_greeks(self, options_data: Dict) -> Dict[str, Any]:
+        """用 Black-Scholes 补全缺失的希腊值与隐含波动率（见 greeks.py）"""
+        try:
+            current_price = options_data.get('current_price')
+            if not isinstance(current_price, (int, float)) or not current_price > 0:
+                return options_data
+
+            for side, is_call in (('calls', True), ('puts', False)):
+                contracts = options_data.get(side)
+                if isinstance(contracts, OptionContracts):
+                    options_data[side] = OptionContracts(chain_greeks(contracts.frame, current_price, is_call))
+                elif contracts:
+                    fill_contract_greeks(contracts, current_price, is_call)
+
+            return options_data
+
+        except Exception as e:
+            logger.warning(f"计算希腊值失败: {e}")
+            return options_data
+
     def _enrich_options_data(self, options_data: Dict) -> Dict[str, Any]:
-        """丰富期权数据，添加分析指标"""
+        """丰富期权数据，添加分析指标（在列式表上计算，不逐合约生成 dict）"""
         try:
             # 计算期权链分析指标
             calls = options_data.get('calls', [])
             puts = options_data.get('puts', [])
+            calls_frame = _contracts_frame(calls)
+            puts_frame = _contracts_frame(puts)
 
             # 计算Put/Call比率
-            put_volume = sum(opt.get('volume', 0) for opt in puts)
-            call_volume = sum(opt.get('volume', 0) for opt in calls)
+            put_volume = float(_numeric_column(puts_frame, 'volume').sum())
+            call_volume = float(_numeric_column(calls_frame, 'volume').sum())
             put_call_ratio = put_volume / call_volume if call_volume > 0 else 0
 
             # 计算最大痛点
-            max_pain = self._calculate_max_pain(calls, puts)
+            max_pain = self._calculate_max_pain(calls_frame, puts_frame)
 
             # 添加流动性分析
-            liquid_options = self._analyze_option_liquidity(calls + puts)
+            liquid_calls = _select(calls, self._liquidity_mask(calls_frame))
+            liquid_puts = _select(puts, self._liquidity_mask(puts_frame))
+            if isinstance(liquid_calls, OptionContracts) and isinstance(liquid_puts, OptionContracts):
+                liquid_options = OptionContracts(pd.concat([liquid_calls.frame, liquid_puts.frame]))
+            else:
+                liquid_options = list(liquid_calls) + list(liquid_puts)
 
             # 添加到结果中
             options_data.update({
@@ -311,65 +482,51 @@ class OptionsDataFetcher:
             logger.error(f"丰富期权数据失败: {e}")
             return options_data
 
-    def _calculate_max_pain(self, calls: List, puts: List) -> Optional[float]:
-        """计算最大痛点"""
+    def _calculate_max_pain(self, calls: pd.DataFrame, puts: pd.DataFrame) -> Optional[float]:
+        """计算最大痛点（行权价 x 合约的矩阵计算）"""
         try:
-            if not calls and not puts:
+            if calls.empty and puts.empty:
                 return None
 
+            call_strikes = _numeric_column(calls, 'strike')
+            put_strikes = _numeric_column(puts, 'strike')
+            call_oi = _numeric_column(calls, 'open_interest')
+            put_oi = _numeric_column(puts, 'open_interest')
+
             # 收集所有行权价
-            strikes = set()
-            for opt in calls + puts:
-                if opt.get('strike'):
-                    strikes.add(opt['strike'])
+            strikes = np.unique(np.concatenate([call_strikes, put_strikes]))
+            strikes = strikes[strikes != 0]
 
-            if not strikes:
+            if strikes.size == 0:
                 return None
 
-            max_pain_strike = None
-            min_pain_value = float('inf')
+            # 每个候选行权价的总痛苦值：低于它的看涨 + 高于它的看跌
+            call_pain = (np.clip(strikes[:, None] - call_strikes[None, :], 0, None) * call_oi).sum(axis=1)
+            put_pain = (np.clip(put_strikes[None, :] - strikes[:, None], 0, None) * put_oi).sum(axis=1)
 
-            for strike in strikes:
-                # 计算该行权价的总痛苦值
-                call_pain = sum(max(0, strike - opt.get('strike', 0)) * opt.get('open_interest', 0)
-                              for opt in calls if opt.get('strike', 0) < strike)
-                put_pain = sum(max(0, opt.get('strike', 0) - strike) * opt.get('open_interest', 0)
-                             for opt in puts if opt.get('strike', 0) > strike)
-
-                total_pain = call_pain + put_pain
-
-                if total_pain < min_pain_value:
-                    min_pain_value = total_pain
-                    max_pain_strike = strike
-
-            return max_pain_strike
+            return float(strikes[np.argmin(call_pain + put_pain)])
 
         except Exception as e:
             logger.error(f"计算最大痛点失败: {e}")
             return None
 
-    def _analyze_option_liquidity(self, options: List) -> List[Dict]:
-        """分析期权流动性"""
-        liquid_options = []
-
-        for opt in options:
-            volume = opt.get('volume', 0)
-            open_interest = opt.get('open_interest', 0)
-            bid = opt.get('bid', 0)
-            ask = opt.get('ask', 0)
-
-            # 流动性标准
-            is_liquid = (
-                volume >= 10 and  # 最小成交量
-                open_interest >= 50 and  # 最小持仓量
-                bid > 0 and ask > 0 and  # 有效报价
-                (ask - bid) / ((ask + bid) / 2) <= 0.1  # 价差不超过10%
-            )
+    def _liquidity_mask(self, options: pd.DataFrame) -> np.ndarray:
+        """流动性筛选（列式），返回布尔掩码"""
+        volume = _numeric_column(options, 'volume')
+        open_interest = _numeric_column(options, 'open_interest')
+        bid = _numeric_column(options, 'bid')
+        ask = _numeric_column(options, 'ask')
 
-            if is_liquid:
-                liquid_options.append(opt)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spread = (ask - bid) / ((ask + bid) / 2)
 
-        return liquid_options
+        # 流动性标准
+        return (
+            (volume >= 10) &  # 最小成交量
+            (open_interest >= 50) &  # 最小持仓量
+            (bid > 0) & (ask > 0) &  # 有效报价
+            (spread <= 0.1)  # 价差不超过10%
+        )
 
     def _calculate_volatility(self, hist_data: pd.DataFrame) -> Optional[float]:
         """计算30天历史波动率"""
@@ -436,17 +593,9 @@ class OptionsDataFetcher:
             'timestamp': datetime.now().isoformat()
         }
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """检查缓存是否有效"""
-        if cache_key not in self._cache:
-            return False
-
-        cache_time = self._cache[cache_key]['timestamp']
-        return (datetime.now() - cache_time).total_seconds() < self.cache_duration
-
     def clear_cache(self):
-        """清除所有缓存"""
-        self._cache.clear()
+        """清除所有缓存（进程内共享）"""
+        clear_caches()
         logger.info("期权数据缓存已清除")
 
 
@@ -4,6 +4,7 @@
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import traceback
@@ -14,8 +15,10 @@ from ..scoring.sell_put import SellPutScorer
 from ..scoring.sell_call import SellCallScorer
 from ..scoring.buy_put import BuyPutScorer
 from ..scoring.buy_call import BuyCallScorer
+from ..scoring.chain_features import ChainFeatures
 from ..scoring.risk_return_profile import calculate_risk_return_profile, add_profiles_to_options
 from ..advanced.vrp_calculator import VRPCalculator
+from ..advanced.monte_carlo import MonteCarloEngine, PriceSimulation
 from ..advanced.risk_adjuster import RiskAdjuster
 
 logger = logging.getLogger(__name__)
@@ -24,8 +27,14 @@ logger = logging.getLogger(__name__)
 class OptionsAnalysisEngine:
     """期权分析引擎主类"""
 
-    def __init__(self):
-        """初始化期权分析引擎"""
+    def __init__(self, monte_carlo: Optional[MonteCarloEngine] = None):
+        """
+        初始化期权分析引擎
+
+        Args:
+            monte_carlo: 蒙特卡洛胜率引擎（可选）；不提供时风格标签的胜率使用闭式近似
+        """
+        self.monte_carlo = monte_carlo
         self.data_fetcher = OptionsDataFetcher()
         self.tiger_client = TigerOptionsClient()
 
@@ -66,23 +75,26 @@ class OptionsAnalysisEngine:
             # 2. 获取股票基础数据（用于分析）
             stock_data = self.data_fetcher.get_underlying_stock_data(symbol)
 
+            # 隐含波动率曲面（随期权链快照缓存）
+            iv_surface = self.data_fetcher.get_iv_surface(options_data, stock_data.get('current_price'))
+
             # 3. 先计算VRP（用于后续策略分析）
-            vrp_analysis = self.vrp_calculator.calculate(symbol, options_data, stock_data)
+            vrp_analysis = self.vrp_calculator.calculate(symbol, options_data, stock_data, iv_surface)
+
+            # 每个标的模拟一次价格，所有策略的风格标签共用
+            simulation = self.monte_carlo.simulate(stock_data) if self.monte_carlo else None
 
             # 4. 执行策略分析（带风格标签）
             analysis_results = {}
 
             if strategy == 'all':
                 # 分析所有策略
-                for strategy_name in self.scorers.keys():
-                    analysis_results[strategy_name] = self._analyze_strategy(
-                        options_data, stock_data, strategy_name, vrp_analysis
-                    )
+                analysis_results = self._analyze_all_strategies(options_data, stock_data, vrp_analysis, simulation)
             else:
                 # 分析特定策略
                 if strategy in self.scorers:
                     analysis_results[strategy] = self._analyze_strategy(
-                        options_data, stock_data, strategy, vrp_analysis
+                        options_data, stock_data, strategy, vrp_analysis, simulation=simulation
                     )
                 else:
                     return {
@@ -101,6 +113,7 @@ class OptionsAnalysisEngine:
                 'stock_data': stock_data,
                 'strategy_analysis': analysis_results,
                 'vrp_analysis': vrp_analysis,
+                'iv_surface': iv_surface.summary() if iv_surface else None,
                 'risk_analysis': risk_analysis,
                 'summary': self._generate_analysis_summary(analysis_results, vrp_analysis, risk_analysis)
             }
@@ -113,8 +126,23 @@ class OptionsAnalysisEngine:
                 'error': f"分析失败: {str(e)}"
             }
 
+    def _analyze_all_strategies(self, options_data: Dict, stock_data: Dict,
+                                vrp_analysis: Dict = None, simulation: PriceSimulation = None) -> Dict[str, Any]:
+        """四个策略共享同一份期权链特征表，并发计分"""
+        features = ChainFeatures(options_data, stock_data)
+        with ThreadPoolExecutor(max_workers=len(self.scorers), thread_name_prefix='OptionScorer') as executor:
+            futures = {
+                strategy_name: executor.submit(
+                    self._analyze_strategy, options_data, stock_data, strategy_name, vrp_analysis, features,
+                    simulation
+                )
+                for strategy_name in self.scorers.keys()
+            }
+        return {strategy_name: future.result() for strategy_name, future in futures.items()}
+
     def _analyze_strategy(self, options_data: Dict, stock_data: Dict, strategy: str,
-                         vrp_analysis: Dict = None) -> Dict[str, Any]:
+                         vrp_analysis: Dict = None, features: ChainFeatures = None,
+                         simulation: PriceSimulation = None) -> Dict[str, Any]:
         """
         分析特定期权策略
 
@@ -123,13 +151,15 @@ class OptionsAnalysisEngine:
             stock_data: 股票数据
             strategy: 策略类型
             vrp_analysis: VRP分析结果（用于风格标签计算）
+            features: 期权链共享特征表（strategy='all' 时由各策略共用）
+            simulation: 标的的蒙特卡洛模拟（可选，用于风格标签的胜率）
 
         Returns:
             策略分析结果，包含风格标签
         """
         try:
             scorer = self.scorers[strategy]
-            result = scorer.score_options(options_data, stock_data)
+            result = scorer.score_options(options_data, stock_data, features)
 
             # 为推荐的期权添加风险收益风格标签
             if result.get('success') and result.get('recommendations'):
@@ -137,7 +167,8 @@ class OptionsAnalysisEngine:
                     result['recommendations'],
                     stock_data,
                     strategy,
-                    vrp_analysis
+                    vrp_analysis,
+                    simulation
                 )
 
             return result
@@ -0,0 +1,258 @@
+"""
+Black-Scholes 希腊值与隐含波动率（NumPy 向量化）
+
+yfinance 期权链不提供希腊值（delta/gamma/theta/vega 为 None），Tiger 模拟数据的
+希腊值是随机数。这里对整条期权链一次性计算：
+
+  1. implied_volatility()：由期权价格反解隐含波动率。所有合约同时做 Newton
+     迭代；步长越出当前的 [下界, 上界] 区间（或 vega 过小）时改用二分，
+     因此对深度实值/虚值合约也能收敛。
+  2. bs_greeks()：由波动率计算 delta / gamma / theta / vega / rho。
+  3. chain_greeks() / fill_contract_greeks()：为期权链补全缺失的希腊值；
+     波动率优先用 mid 价反解的结果，无法反解时用数据源的 implied_volatility。
+
+欧式期权、无股息；无风险利率与 risk_return_profile 的胜率估算一致（5%）。
+theta 为每自然日的价格变化，vega / rho 为波动率 / 利率变化 1 个百分点时的价格变化。
+"""
+
+import math
+import numbers
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.special import ndtr as norm_cdf
+except ImportError:
+    _erfc = np.frompyfunc(math.erfc, 1, 1)
+
+    def norm_cdf(x):
+        return (0.5 * _erfc(-np.asarray(x, dtype=float) / math.sqrt(2))).astype(float)
+
+RISK_FREE_RATE = 0.05
+DAYS_PER_YEAR = 365
+
+IV_LOWER = 1e-4              # 反解区间（年化波动率）
+IV_UPPER = 5.0
+IV_PRICE_TOLERANCE = 1e-6    # 收敛条件：模型价格与市场价格之差
+IV_MAX_ITERATIONS = 100
+
+GREEK_FIELDS = ('delta', 'gamma', 'theta', 'vega')
+GREEK_DECIMALS = 4           # 与 Tiger 数据的精度一致
+
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+
+
+def _d1(spot, strike, t, sigma, r):
+    return (np.log(spot / strike) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+
+
+def _price(spot, strike, t, sigma, is_call, r, d1):
+    d2 = d1 - sigma * np.sqrt(t)
+    discounted_strike = strike * np.exp(-r * t)
+    call = spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+    put = discounted_strike * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def _broadcast(*values):
+    return np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in values))
+
+
+def bs_price(spot, strike, t, sigma, is_call, r: float = RISK_FREE_RATE) -> np.ndarray:
+    """期权理论价格（参数可为标量或数组，按 NumPy 规则广播；t 以年计）"""
+    spot, strike, t, sigma, is_call = _broadcast(spot, strike, t, sigma, is_call)
+    with np.errstate(all='ignore'):
+        return _price(spot, strike, t, sigma, is_call.astype(bool), r, _d1(spot, strike, t, sigma, r))
+
+
+def bs_greeks(spot, strike, t, sigma, is_call, r: float = RISK_FREE_RATE) -> Dict[str, np.ndarray]:
+    """
+    希腊值
+
+    Returns:
+        {'delta', 'gamma', 'theta', 'vega', 'rho'}；输入无效（t 或 sigma 不为正等）时为 NaN
+    """
+    spot, strike, t, sigma, is_call = _broadcast(spot, strike, t, sigma, is_call)
+    is_call = is_call.astype(bool)
+    with np.errstate(all='ignore'):
+        valid = (spot > 0) & (strike > 0) & (t > 0) & (sigma > 0)
+        sqrt_t = np.sqrt(t)
+        d1 = _d1(spot, strike, t, sigma, r)
+        d2 = d1 - sigma * sqrt_t
+        pdf_d1 = _norm_pdf(d1)
+        discounted_strike = strike * np.exp(-r * t)
+
+        call_theta = -spot * pdf_d1 * sigma / (2 * sqrt_t) - r * discounted_strike * norm_cdf(d2)
+        put_theta = -spot * pdf_d1 * sigma / (2 * sqrt_t) + r * discounted_strike * norm_cdf(-d2)
+        greeks = {
+            'delta': np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1),
+            'gamma': pdf_d1 / (spot * sigma * sqrt_t),
+            'theta': np.where(is_call, call_theta, put_theta) / DAYS_PER_YEAR,
+            'vega': spot * pdf_d1 * sqrt_t / 100,
+            'rho': np.where(is_call, discounted_strike * t * norm_cdf(d2),
+                            -discounted_strike * t * norm_cdf(-d2)) / 100,
+        }
+    return {name: np.where(valid, values, np.nan) for name, values in greeks.items()}
+
+
+def implied_volatility(price, spot, strike, t, is_call, r: float = RISK_FREE_RATE,
+                       tolerance: float = IV_PRICE_TOLERANCE,
+                       max_iterations: int = IV_MAX_ITERATIONS) -> np.ndarray:
+    """
+    由期权价格反解隐含波动率（Newton 迭代 + 二分回退，所有合约同时迭代）
+
+    Returns:
+        隐含波动率；价格不在无套利区间内、解超出 [IV_LOWER, IV_UPPER] 或未收敛时为 NaN
+    """
+    price, spot, strike, t, is_call = _broadcast(price, spot, strike, t, is_call)
+    shape = price.shape
+    price, spot, strike, t = (a.ravel() for a in (price, spot, strike, t))
+    is_call = is_call.ravel().astype(bool)
+    result = np.full(price.size, np.nan)
+
+    with np.errstate(all='ignore'):
+        discounted_strike = strike * np.exp(-r * t)
+        lower_bound = np.where(is_call, np.maximum(spot - discounted_strike, 0), np.maximum(discounted_strike - spot, 0))
+        upper_bound = np.where(is_call, spot, discounted_strike)
+        solvable = (spot > 0) & (strike > 0) & (t > 0) & (price > lower_bound) & (price < upper_bound)
+        rows = np.flatnonzero(solvable)
+        if not rows.size:
+            return result.reshape(shape)
+
+        p, S, K, T, call = price[rows], spot[rows], strike[rows], t[rows], is_call[rows]
+        low = np.full(rows.size, IV_LOWER)
+        high = np.full(rows.size, IV_UPPER)
+        # 初值：Brenner-Subrahmanyam 平值近似
+        sigma = np.clip(np.sqrt(2 * math.pi / T) * p / S, IV_LOWER, IV_UPPER)
+        converged = np.zeros(rows.size, dtype=bool)
+        active = np.arange(rows.size)
+
+        for _ in range(max_iterations):
+            s = sigma[active]
+            d1 = _d1(S[active], K[active], T[active], s, r)
+            diff = _price(S[active], K[active], T[active], s, call[active], r, d1) - p[active]
+            done = np.abs(diff) < tolerance
+            converged[active[done]] = True
+
+            # 价格随波动率单调递增：收窄区间
+            high[active] = np.where(diff > 0, s, high[active])
+            low[active] = np.where(diff < 0, s, low[active])
+            vega = S[active] * _norm_pdf(d1) * np.sqrt(T[active])
+            step = s - diff / vega
+            bisect = ~np.isfinite(step) | (step <= low[active]) | (step >= high[active])
+            sigma[active] = np.where(done, s, np.where(bisect, 0.5 * (low[active] + high[active]), step))
+
+            # 区间已收窄到浮点精度（解在 [IV_LOWER, IV_UPPER] 之外）的合约也停止迭代
+            active = active[~done & (high[active] - low[active] > 1e-12)]
+            if not active.size:
+                break
+
+    result[rows[converged]] = sigma[converged]
+    return result.reshape(shape)
+
+
+# ==================== 期权链 ====================
+
+def numeric_field(frame: pd.DataFrame, name: str) -> np.ndarray:
+    """数值列（缺失列 / 非数值为 NaN）"""
+    if name not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=float)
+
+
+def days_to_expiry(frame: pd.DataFrame, today: Optional[date] = None) -> np.ndarray:
+    """合约剩余天数：days_to_expiry 列，缺失时由 expiry 日期计算（无法确定为 NaN）"""
+    days = numeric_field(frame, 'days_to_expiry')
+    if 'expiry' in frame.columns and np.isnan(days).any():
+        expiry = pd.to_datetime(frame['expiry'], errors='coerce')
+        from_expiry = (expiry - pd.Timestamp(today or date.today())).dt.days.to_numpy(dtype=float)
+        days = np.where(np.isnan(days), from_expiry, days)
+    return days
+
+
+def _years_to_expiry(frame: pd.DataFrame, today: Optional[date]) -> np.ndarray:
+    """剩余时间（年）；当天到期按 1 天计，已过期为 NaN"""
+    days = days_to_expiry(frame, today)
+    return np.where(days >= 0, np.maximum(days, 1), np.nan) / DAYS_PER_YEAR
+
+
+def _market_price(frame: pd.DataFrame) -> np.ndarray:
+    """反解用的价格：有双边报价时用 mid，否则用最新成交价"""
+    bid = numeric_field(frame, 'bid')
+    ask = numeric_field(frame, 'ask')
+    last = numeric_field(frame, 'last_price')
+    quoted = (bid > 0) & (ask >= bid)
+    return np.where(quoted, (bid + ask) / 2, np.where(last > 0, last, np.nan))
+
+
+def _missing(frame: pd.DataFrame, name: str) -> np.ndarray:
+    return np.isnan(numeric_field(frame, name))
+
+
+def _with_none(values: np.ndarray) -> list:
+    """NaN -> None（与数据源中缺失的希腊值一致）"""
+    return [None if math.isnan(v) else v for v in values.tolist()]
+
+
+def chain_greeks(frame: pd.DataFrame, spot: float, is_call: bool,
+                 r: float = RISK_FREE_RATE, today: Optional[date] = None) -> pd.DataFrame:
+    """
+    为一侧期权链补全希腊值与隐含波动率
+
+    只填充缺失（None / NaN）的 delta / gamma / theta / vega，以及缺失或不为正的
+    implied_volatility；数据源已提供的值保持不变。
+
+    Args:
+        frame: 合约表（strike, bid, ask, last_price, implied_volatility, days_to_expiry 或 expiry）
+        spot: 标的价格
+        is_call: 看涨 / 看跌
+
+    Returns:
+        补全后的新 DataFrame
+    """
+    frame = frame.copy()
+    if frame.empty or not any(_missing(frame, name).any() for name in GREEK_FIELDS + ('implied_volatility',)):
+        return frame
+
+    strike = numeric_field(frame, 'strike')
+    t = _years_to_expiry(frame, today)
+    solved = implied_volatility(_market_price(frame), spot, strike, t, is_call, r)
+
+    source_iv = numeric_field(frame, 'implied_volatility')
+    sigma = np.where(np.isfinite(solved), solved, np.where(source_iv > 0, source_iv, np.nan))
+    greeks = bs_greeks(spot, strike, t, sigma, is_call, r)
+
+    for name in GREEK_FIELDS:
+        missing = _missing(frame, name)
+        if missing.any():
+            values = np.where(missing, np.round(greeks[name], GREEK_DECIMALS), numeric_field(frame, name))
+            frame[name] = _with_none(values) if np.isnan(values).any() else values
+
+    no_iv = ~(source_iv > 0) & np.isfinite(solved)
+    if no_iv.any():
+        values = np.where(no_iv, np.round(solved, GREEK_DECIMALS), source_iv)
+        frame['implied_volatility'] = _with_none(values) if np.isnan(values).any() else values
+    return frame
+
+
+def fill_contract_greeks(contracts: List[Dict], spot: float, is_call: bool,
+                         r: float = RISK_FREE_RATE, today: Optional[date] = None) -> List[Dict]:
+    """chain_greeks 的 dict 列表版本：原地补全各合约缺失的字段"""
+    if not contracts:
+        return contracts
+    filled = chain_greeks(pd.DataFrame(contracts), spot, is_call, r, today)
+    fields = [name for name in GREEK_FIELDS + ('implied_volatility',) if name in filled.columns]
+    for contract, values in zip(contracts, filled[fields].to_dict('records')):
+        for name, value in values.items():
+            if _is_missing(contract.get(name)) or (name == 'implied_volatility' and not contract[name] > 0):
+                contract[name] = None if _is_missing(value) else value
+    return contracts
+
+
+def _is_missing(value) -> bool:
+    return not isinstance(value, numbers.Real) or math.isnan(value)
@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 
+from .greeks import fill_contract_greeks
+
 logger = logging.getLogger(__name__)
 
 
@@ -169,6 +171,10 @@ class TigerOptionsClient:
                     )
                     puts.append(put_data)
 
+            # 希腊值：按模拟隐含波动率的 Black-Scholes 值（整条链一次计算）
+            fill_contract_greeks(calls, current_price, is_call=True)
+            fill_contract_greeks(puts, current_price, is_call=False)
+
             return {
                 'success': True,
                 'symbol': symbol,
@@ -214,12 +220,6 @@ class TigerOptionsClient:
         # 模拟隐含波动率
         implied_volatility = np.random.uniform(0.15, 0.45)
 
-        # 模拟希腊字母
-        delta = self._calculate_mock_delta(option_type, current_price, strike)
-        gamma = np.random.uniform(0.001, 0.01)
-        theta = -np.random.uniform(0.01, 0.1)
-        vega = np.random.uniform(0.05, 0.15)
-
         return {
             'symbol': f"{symbol}_{expiry}_{strike}_{option_type[0].upper()}",
             'underlying': symbol,
@@ -232,28 +232,16 @@ class TigerOptionsClient:
             'volume': volume,
             'open_interest': open_interest,
             'implied_volatility': round(implied_volatility, 4),
-            'delta': round(delta, 4),
-            'gamma': round(gamma, 4),
-            'theta': round(theta, 4),
-            'vega': round(vega, 4),
+            # 希腊值由 _generate_mock_options_chain 统一计算
+            'delta': None,
+            'gamma': None,
+            'theta': None,
+            'vega': None,
             'intrinsic_value': round(intrinsic_value, 2),
             'time_value': round(time_value, 2),
             'days_to_expiry': days_to_expiry
         }
 
-    def _calculate_mock_delta(self, option_type: str, current_price: float, strike: float) -> float:
-        """计算模拟Delta值"""
-        if option_type == 'call':
-            if current_price > strike:
-                return np.random.uniform(0.5, 1.0)  # 实值看涨期权
-            else:
-                return np.random.uniform(0.0, 0.5)  # 虚值看涨期权
-        else:
-            if current_price < strike:
-                return -np.random.uniform(0.5, 1.0)  # 实值看跌期权
-            else:
-                return -np.random.uniform(0.0, 0.5)  # 虚值看跌期权
-
     def _get_mock_stock_price(self, symbol: str) -> float:
         """获取模拟股价"""
         # 为不同股票设置不同的模拟价格
@@ -9,8 +9,80 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+from .chain_features import Bands, ChainFeatures, maximum, minimum
+
 logger = logging.getLogger(__name__)
 
+# 各因子的分段计分表（标量 _score_* 与列式 _batch_scores 共用）
+RESISTANCE_DISTANCE_BONUS = Bands(  # 现价距第一阻力位%
+    (lambda d: d <= 3, 25),  # 非常接近第一阻力位
+    (lambda d: d <= 6, 20),
+    (lambda d: d <= 10, 15),
+    default=5,               # 距离较远但仍有突破空间
+)
+STRIKE_ABOVE_RESISTANCE_BONUS = {  # 执行价在阻力位上方，突破后获利空间大：(阻力位倍数, 加分)
+    'resistance_1': (1.02, 20),
+    'resistance_2': (1, 15),
+}
+NEAR_HIGH_DISTANCE = 5           # 现价距52周高点在此范围内
+NEAR_HIGH_BONUS = 15
+NEAR_HIGH_STRIKE_BONUS = 10      # 接近52周高点时，执行价在高点上方
+FAR_FROM_HIGH_DISTANCE = 20      # 有较大上升空间
+FAR_FROM_HIGH_BONUS = 5
+BREAKOUT_SIGNAL_BONUS = 20       # 上涨且接近阻力位
+
+EFFICIENCY_SCORE = Bands(  # Delta / 期权价格
+    (lambda e: e >= 0.6, 100),
+    (lambda e: e >= 0.4, 90),
+    (lambda e: e >= 0.3, 80),
+    (lambda e: e >= 0.2, 70),
+    (lambda e: e >= 0.1, 60),
+    default=40,
+)
+MONEYNESS_ADJUSTMENT = Bands(  # 价值状态%
+    (lambda m: (-5 <= m) & (m <= 5), 10),  # 平值期权加分
+    (lambda m: m < -15, -15),              # 深度虚值减分较多
+    (lambda m: m > 15, -5),                # 深度实值略减分
+    default=0,
+)
+SPREAD_SCORE = Bands(  # 买卖价差%
+    (lambda p: p <= 6, 30),
+    (lambda p: p <= 12, 20),
+    (lambda p: p <= 20, 10),
+    default=lambda p: maximum(0, 10 - (p - 20) / 3),
+)
+TIME_VALUE_RATIO_ADJUSTMENT = Bands(  # 时间价值 / 期权价格（Buy Call希望时间价值不要太高）
+    (lambda r: (0.2 <= r) & (r <= 0.6), 30),  # 理想的时间价值比例
+    (lambda r: (0.1 <= r) & (r < 0.2), 20),
+    (lambda r: (0.6 < r) & (r <= 0.8), 10),
+    (lambda r: r > 0.9, -25),                 # 时间价值过高，不划算
+    (lambda r: r < 0.1, 25),                  # 低时间价值，主要是内在价值
+    default=0,
+)
+DAYS_ADJUSTMENT = Bands(  # 到期天数（Buy Call偏好中等期限）
+    (lambda d: d <= 7, -20),  # 太短，时间衰减快
+    (lambda d: d <= 30, 15),  # 理想期限
+    (lambda d: d <= 60, 20),  # 最佳期限
+    (lambda d: d <= 90, 10),  # 较好期限
+    default=-10,              # 太长，时间价值高
+)
+
+
+def value_efficiency_score(efficiency, moneyness):
+    """效率比率与价值状态得分（delta 缺失、非正或价格非正时由调用方处理）"""
+    return minimum(100, EFFICIENCY_SCORE(efficiency) + MONEYNESS_ADJUSTMENT(moneyness))
+
+
+def liquidity_score(volume, open_interest, spread_pct):
+    """成交量 + 持仓量 + 价差得分（bid / ask 非正时由调用方记 0 分）"""
+    return minimum(40, volume / 8) + minimum(30, open_interest / 40) + SPREAD_SCORE(spread_pct)
+
+
+def time_optimization_score(time_value_ratio, days_to_expiry):
+    """时间价值比例与到期时间得分（价格非正时由调用方处理）"""
+    score = 50 + TIME_VALUE_RATIO_ADJUSTMENT(time_value_ratio) + DAYS_ADJUSTMENT(days_to_expiry)
+    return minimum(100, maximum(0, score))
+
 
 class BuyCallScorer:
     """买入看涨期权计分器"""
@@ -27,13 +99,15 @@ class BuyCallScorer:
             'time_optimization': 0.10     # 时间价值优化权重
         }
 
-    def score_options(self, options_data: Dict, stock_data: Dict) -> Dict[str, Any]:
+    def score_options(self, options_data: Dict, stock_data: Dict,
+                      features: Optional[ChainFeatures] = None) -> Dict[str, Any]:
         """
         为Buy Call策略计分期权
 
         Args:
             options_data: 期权链数据
             stock_data: 标的股票数据
+            features: 期权链共享特征表（缺省时按需构建）
 
         Returns:
             计分结果
@@ -64,15 +138,14 @@ class BuyCallScorer:
                     'error': '无法获取当前股价'
                 }
 
-            # 筛选和计分期权
-            scored_options = []
-            for call_option in calls:
-                score_result = self._score_individual_call(call_option, current_price, stock_data)
-                if score_result and score_result.get('score', 0) > 0:
-                    scored_options.append(score_result)
-
-            # 排序并选择最佳期权
-            scored_options.sort(key=lambda x: x.get('score', 0), reverse=True)
+            # 在共享特征表上批量计分并排序，只为前10个期权生成完整结果
+            if features is None:
+                features = ChainFeatures(options_data, stock_data)
+            scored_options = features.rank(
+                'calls',
+                lambda frame: self._batch_scores(frame, features),
+                lambda call_option: self._score_individual_call(call_option, current_price, stock_data)
+            )
 
             # 生成策略分析
             strategy_analysis = self._generate_strategy_analysis(scored_options, current_price, stock_data)
@@ -182,6 +255,58 @@ class BuyCallScorer:
             logger.error(f"单个期权计分失败: {e}")
             return None
 
+    def _batch_scores(self, frame: pd.DataFrame, features: ChainFeatures):
+        """_score_individual_call 加权总分的列式版本（不合格的期权为 NaN）"""
+        current_price = features.current_price
+        strike = frame['strike'].to_numpy()
+        bid = frame['bid'].to_numpy()
+        ask = frame['ask'].to_numpy()
+        days = frame['days_to_expiry'].to_numpy()
+        delta = frame['delta'].to_numpy()
+        mid_price = frame['mid_price'].to_numpy()
+        spread_pct = frame['spread_pct'].to_numpy()
+        time_value = frame['time_value'].to_numpy()
+        moneyness = frame['moneyness_pct'].to_numpy()
+
+        eligible = (strike != 0) & (ask > 0) & (days > 0)
+
+        scores = {}
+
+        # 与行权价无关，整条链只算一次
+        scores['bullish_momentum'] = np.full(len(frame), float(self._score_bullish_momentum(features.stock_data)))
+
+        level_score, near_high = self._breakout_level_score(current_price, features.stock_data)
+        breakout = np.full(len(frame), float(level_score))
+        for key, (multiplier, bonus) in STRIKE_ABOVE_RESISTANCE_BONUS.items():
+            level = features.sr(key)
+            if level:
+                breakout += np.where(strike >= level * multiplier, bonus, 0)
+        if near_high:
+            breakout += np.where(strike >= features.sr('high_52w'), NEAR_HIGH_STRIKE_BONUS, 0)
+        scores['breakout_potential'] = np.minimum(100, breakout)
+
+        scores['value_efficiency'] = np.select(
+            [np.isnan(delta) | (delta == 0) | (mid_price <= 0), delta <= 0],
+            [40, 20],
+            default=value_efficiency_score(delta / mid_price, moneyness)
+        )
+
+        # 标量实现在读取 stock_data 时抛出 NameError 并返回 50，这里保持一致
+        scores['volatility_timing'] = np.full(len(frame), 50.0)
+
+        scores['liquidity'] = np.where((bid <= 0) | (ask <= 0), 0,
+                                       liquidity_score(frame['volume'].to_numpy(),
+                                                       frame['open_interest'].to_numpy(), spread_pct))
+
+        scores['time_optimization'] = np.where(mid_price <= 0, 40,
+                                               time_optimization_score(time_value / mid_price, days))
+
+        total_score = sum(
+            scores[factor] * self.weight_config[factor]
+            for factor in scores.keys()
+        )
+        return np.where(eligible, total_score, np.nan)
+
     def _score_bullish_momentum(self, stock_data: Dict) -> float:
         """计分上涨动量"""
         try:
@@ -232,49 +357,49 @@ class BuyCallScorer:
             logger.error(f"上涨动量评估失败: {e}")
             return 50
 
+    def _breakout_level_score(self, current_price: float, stock_data: Dict):
+        """突破潜力得分中与执行价无关的部分，以及现价是否接近52周高点"""
+        support_resistance = stock_data.get('support_resistance', {})
+        resistance_1 = support_resistance.get('resistance_1', 0)
+        high_52w = support_resistance.get('high_52w', 0)
+
+        score = 50  # 基础分
+
+        # 当前价格相对阻力位的位置
+        if resistance_1:
+            score += RESISTANCE_DISTANCE_BONUS((resistance_1 - current_price) / current_price * 100)
+
+        # 52周高点分析
+        near_high = False
+        if high_52w:
+            distance_to_high = (high_52w - current_price) / current_price * 100
+            if distance_to_high <= NEAR_HIGH_DISTANCE:
+                score += NEAR_HIGH_BONUS
+                near_high = True
+            elif distance_to_high >= FAR_FROM_HIGH_DISTANCE:
+                score += FAR_FROM_HIGH_BONUS
+
+        # 技术分析信号
+        change_percent = stock_data.get('change_percent', 0)
+        if change_percent >= 2 and resistance_1 and current_price >= resistance_1 * 0.98:
+            score += BREAKOUT_SIGNAL_BONUS
+
+        return score, near_high
+
     def _score_breakout_potential(self, current_price: float, strike: float, stock_data: Dict) -> float:
         """计分突破潜力"""
         try:
             support_resistance = stock_data.get('support_resistance', {})
-            resistance_1 = support_resistance.get('resistance_1', 0)
-            resistance_2 = support_resistance.get('resistance_2', 0)
-            high_52w = support_resistance.get('high_52w', 0)
-
-            score = 50  # 基础分
-
-            # 当前价格相对阻力位的位置
-            if resistance_1:
-                distance_to_r1 = (resistance_1 - current_price) / current_price * 100
-                if distance_to_r1 <= 3:
-                    score += 25  # 非常接近第一阻力位
-                elif distance_to_r1 <= 6:
-                    score += 20
-                elif distance_to_r1 <= 10:
-                    score += 15
-                else:
-                    score += 5   # 距离较远但仍有突破空间
+            score, near_high = self._breakout_level_score(current_price, stock_data)
 
             # 执行价相对阻力位的位置
-            if resistance_1 and strike >= resistance_1 * 1.02:
-                score += 20  # 执行价在阻力位上方，突破后获利空间大
-
-            if resistance_2 and strike >= resistance_2:
-                score += 15  # 执行价在第二阻力位上方
-
-            # 52周高点分析
-            if high_52w:
-                distance_to_high = (high_52w - current_price) / current_price * 100
-                if distance_to_high <= 5:
-                    score += 15  # 接近52周高点
-                    if strike >= high_52w:
-                        score += 10  # 执行价在52周高点上方
-                elif distance_to_high >= 20:
-                    score += 5   # 有较大上升空间
-
-            # 技术分析信号
-            change_percent = stock_data.get('change_percent', 0)
-            if change_percent >= 2 and resistance_1 and current_price >= resistance_1 * 0.98:
-                score += 20  # 上涨且接近阻力位
+            for key, (multiplier, bonus) in STRIKE_ABOVE_RESISTANCE_BONUS.items():
+                level = support_resistance.get(key, 0)
+                if level and strike >= level * multiplier:
+                    score += bonus
+
+            if near_high and strike >= support_resistance.get('high_52w', 0):
+                score += NEAR_HIGH_STRIKE_BONUS
 
             return min(100, score)
 
@@ -292,35 +417,7 @@ class BuyCallScorer:
             if delta <= 0:
                 return 20
 
-            # 计算效率比率
-            efficiency = delta / mid_price
-
-            # 平值和轻度虚值期权通常效率较高
-            base_score = 50
-
-            # 基于效率比率评分
-            if efficiency >= 0.6:
-                base_score = 100
-            elif efficiency >= 0.4:
-                base_score = 90
-            elif efficiency >= 0.3:
-                base_score = 80
-            elif efficiency >= 0.2:
-                base_score = 70
-            elif efficiency >= 0.1:
-                base_score = 60
-            else:
-                base_score = 40
-
-            # 基于价值状态调整
-            if -5 <= moneyness <= 5:
-                base_score += 10  # 平值期权加分
-            elif moneyness < -15:
-                base_score -= 15  # 深度虚值减分较多
-            elif moneyness > 15:
-                base_score -= 5   # 深度实值略减分
-
-            return min(100, base_score)
+            return value_efficiency_score(delta / mid_price, moneyness)
 
         except Exception as e:
             logger.error(f"价值效率评估失败: {e}")
@@ -388,24 +485,7 @@ class BuyCallScorer:
             return 0
 
         bid_ask_spread_pct = (ask - bid) / ((ask + bid) / 2) * 100
-
-        # 成交量得分
-        volume_score = min(40, volume / 8)
-
-        # 持仓量得分
-        oi_score = min(30, open_interest / 40)
-
-        # 价差得分
-        if bid_ask_spread_pct <= 6:
-            spread_score = 30
-        elif bid_ask_spread_pct <= 12:
-            spread_score = 20
-        elif bid_ask_spread_pct <= 20:
-            spread_score = 10
-        else:
-            spread_score = max(0, 10 - (bid_ask_spread_pct - 20) / 3)
-
-        return volume_score + oi_score + spread_score
+        return liquidity_score(volume, open_interest, bid_ask_spread_pct)
 
     def _score_time_optimization(self, time_value: float, mid_price: float, days_to_expiry: int) -> float:
         """计分时间价值优化"""
@@ -413,35 +493,7 @@ class BuyCallScorer:
             if mid_price <= 0:
                 return 40
 
-            time_value_ratio = time_value / mid_price
-
-            score = 50
-
-            # 时间价值比例评估（Buy Call希望时间价值不要太高）
-            if 0.2 <= time_value_ratio <= 0.6:
-                score += 30  # 理想的时间价值比例
-            elif 0.1 <= time_value_ratio < 0.2:
-                score += 20
-            elif 0.6 < time_value_ratio <= 0.8:
-                score += 10
-            elif time_value_ratio > 0.9:
-                score -= 25  # 时间价值过高，不划算
-            elif time_value_ratio < 0.1:
-                score += 25  # 低时间价值，主要是内在价值
-
-            # 基于到期时间调整（Buy Call偏好中等期限）
-            if days_to_expiry <= 7:
-                score -= 20  # 太短，时间衰减快
-            elif days_to_expiry <= 30:
-                score += 15  # 理想期限
-            elif days_to_expiry <= 60:
-                score += 20  # 最佳期限
-            elif days_to_expiry <= 90:
-                score += 10  # 较好期限
-            else:
-                score -= 10  # 太长，时间价值高
-
-            return min(100, max(0, score))
+            return time_optimization_score(time_value / mid_price, days_to_expiry)
 
         except Exception as e:
             logger.error(f"时间价值优化评估失败: {e}")
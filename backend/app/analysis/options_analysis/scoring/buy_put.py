@@ -9,8 +9,95 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+from .chain_features import Bands, ChainFeatures, maximum, minimum
+
 logger = logging.getLogger(__name__)
 
+# 各因子的分段计分表（标量 _score_* 与列式 _batch_scores 共用）
+SUPPORT_DISTANCE_BONUS = Bands(  # 现价距第一支撑位%
+    (lambda d: d <= 3, 30),  # 非常接近支撑位
+    (lambda d: d <= 6, 20),
+    (lambda d: d <= 10, 10),
+    default=0,
+)
+STRIKE_BELOW_SUPPORT_BONUS = {  # 执行价在支撑位下方，有利于突破后获利
+    'support_1': 20,
+    'support_2': 15,
+}
+SUPPORT_BREAK_SIGNAL_BONUS = 25  # 下跌且接近支撑位
+
+EFFICIENCY_SCORE = Bands(  # |Delta| / 期权价格
+    (lambda e: e >= 0.5, 100),
+    (lambda e: e >= 0.4, 90),
+    (lambda e: e >= 0.3, 80),
+    (lambda e: e >= 0.2, 70),
+    (lambda e: e >= 0.1, 60),
+    default=40,
+)
+MONEYNESS_ADJUSTMENT = Bands(  # 价值状态%
+    (lambda m: (-5 <= m) & (m <= 5), 10),  # 平值期权加分
+    (lambda m: m < -10, -10),              # 深度虚值减分
+    (lambda m: m > 10, -5),                # 深度实值略减分
+    default=0,
+)
+VOL_RATIO_ADJUSTMENT = Bands(  # 隐含 / 历史波动率，低隐含波动率有利于买入期权
+    (lambda r: r <= 0.8, 30),
+    (lambda r: r <= 0.9, 20),
+    (lambda r: r <= 1.0, 10),
+    (lambda r: r <= 1.2, -5),
+    default=-15,
+)
+VOL_PERCENTILE = Bands(  # 隐含波动率 -> 历史分位（简化估算）
+    (lambda v: v <= 0.15, 10),
+    (lambda v: v <= 0.20, 25),
+    (lambda v: v <= 0.25, 50),
+    (lambda v: v <= 0.35, 75),
+    default=90,
+)
+VOL_PERCENTILE_ADJUSTMENT = Bands(
+    (lambda p: p <= 20, 25),  # 低波动率环境
+    (lambda p: p <= 40, 15),
+    (lambda p: p >= 80, -20),  # 高波动率环境
+    default=0,
+)
+SPREAD_SCORE = Bands(  # 买卖价差%
+    (lambda p: p <= 8, 30),
+    (lambda p: p <= 15, 20),
+    (lambda p: p <= 25, 10),
+    default=lambda p: maximum(0, 10 - (p - 25) / 3),
+)
+TIME_VALUE_RATIO_ADJUSTMENT = Bands(  # 时间价值 / 期权价格
+    (lambda r: (0.3 <= r) & (r <= 0.7), 30),  # 理想的时间价值比例
+    (lambda r: (0.2 <= r) & (r < 0.3), 20),
+    (lambda r: (0.7 < r) & (r <= 0.8), 15),
+    (lambda r: r > 0.9, -20),                 # 时间价值过高
+    (lambda r: r < 0.1, 10),                  # 低时间价值可能合适
+    default=0,
+)
+DAYS_ADJUSTMENT = Bands(  # 到期天数
+    (lambda d: d <= 7, -15),  # 太短，时间衰减快
+    (lambda d: d <= 30, 10),
+    (lambda d: d <= 60, 15),
+    (lambda d: d <= 90, 5),
+    default=-10,              # 太长，时间价值高
+)
+
+
+def value_efficiency_score(efficiency, moneyness):
+    """效率比率与价值状态得分（delta 缺失、为正或价格非正时由调用方处理）"""
+    return minimum(100, EFFICIENCY_SCORE(efficiency) + MONEYNESS_ADJUSTMENT(moneyness))
+
+
+def liquidity_score(volume, open_interest, spread_pct):
+    """成交量 + 持仓量 + 价差得分（bid / ask 非正时由调用方记 0 分）"""
+    return minimum(40, volume / 8) + minimum(30, open_interest / 40) + SPREAD_SCORE(spread_pct)
+
+
+def time_value_score(time_value_ratio, days_to_expiry):
+    """时间价值比例与到期时间得分（价格非正时由调用方处理）"""
+    score = 50 + TIME_VALUE_RATIO_ADJUSTMENT(time_value_ratio) + DAYS_ADJUSTMENT(days_to_expiry)
+    return minimum(100, maximum(0, score))
+
 
 class BuyPutScorer:
     """买入看跌期权计分器"""
@@ -27,13 +114,15 @@ class BuyPutScorer:
             'time_value': 0.10           # 时间价值权重
         }
 
-    def score_options(self, options_data: Dict, stock_data: Dict) -> Dict[str, Any]:
+    def score_options(self, options_data: Dict, stock_data: Dict,
+                      features: Optional[ChainFeatures] = None) -> Dict[str, Any]:
         """
         为Buy Put策略计分期权
 
         Args:
             options_data: 期权链数据
             stock_data: 标的股票数据
+            features: 期权链共享特征表（缺省时按需构建）
 
         Returns:
             计分结果
@@ -64,15 +153,14 @@ class BuyPutScorer:
                     'error': '无法获取当前股价'
                 }
 
-            # 筛选和计分期权
-            scored_options = []
-            for put_option in puts:
-                score_result = self._score_individual_put(put_option, current_price, stock_data)
-                if score_result and score_result.get('score', 0) > 0:
-                    scored_options.append(score_result)
-
-            # 排序并选择最佳期权
-            scored_options.sort(key=lambda x: x.get('score', 0), reverse=True)
+            # 在共享特征表上批量计分并排序，只为前10个期权生成完整结果
+            if features is None:
+                features = ChainFeatures(options_data, stock_data)
+            scored_options = features.rank(
+                'puts',
+                lambda frame: self._batch_scores(frame, features),
+                lambda put_option: self._score_individual_put(put_option, current_price, stock_data)
+            )
 
             # 生成策略分析
             strategy_analysis = self._generate_strategy_analysis(scored_options, current_price, stock_data)
@@ -181,6 +269,56 @@ class BuyPutScorer:
             logger.error(f"单个期权计分失败: {e}")
             return None
 
+    def _batch_scores(self, frame: pd.DataFrame, features: ChainFeatures):
+        """_score_individual_put 加权总分的列式版本（不合格的期权为 NaN）"""
+        current_price = features.current_price
+        historical_vol = features.historical_vol
+        strike = frame['strike'].to_numpy()
+        bid = frame['bid'].to_numpy()
+        ask = frame['ask'].to_numpy()
+        implied_vol = frame['implied_volatility'].to_numpy()
+        days = frame['days_to_expiry'].to_numpy()
+        delta = frame['delta'].to_numpy()
+        mid_price = frame['mid_price'].to_numpy()
+        spread_pct = frame['spread_pct'].to_numpy()
+        time_value = frame['time_value'].to_numpy()
+        moneyness = frame['moneyness_pct'].to_numpy()
+
+        eligible = (strike != 0) & (ask > 0) & (days > 0)
+
+        scores = {}
+
+        # 与行权价无关，整条链只算一次
+        scores['bearish_momentum'] = np.full(len(frame), float(self._score_bearish_momentum(features.stock_data)))
+
+        support_break = np.full(len(frame), float(self._support_level_score(current_price, features.stock_data)))
+        for key, bonus in STRIKE_BELOW_SUPPORT_BONUS.items():
+            level = features.sr(key)
+            if level:
+                support_break += np.where(strike <= level, bonus, 0)
+        scores['support_break'] = np.minimum(100, support_break)
+
+        scores['value_efficiency'] = np.select(
+            [np.isnan(delta) | (delta == 0) | (mid_price <= 0), delta > 0],
+            [40, 20],
+            default=value_efficiency_score(np.abs(delta) / mid_price, moneyness)
+        )
+
+        scores['volatility_expansion'] = np.broadcast_to(
+            self._score_volatility_expansion(implied_vol, historical_vol), len(frame)).astype(float)
+
+        scores['liquidity'] = np.where((bid <= 0) | (ask <= 0), 0,
+                                       liquidity_score(frame['volume'].to_numpy(),
+                                                       frame['open_interest'].to_numpy(), spread_pct))
+
+        scores['time_value'] = np.where(mid_price <= 0, 40, time_value_score(time_value / mid_price, days))
+
+        total_score = sum(
+            scores[factor] * self.weight_config[factor]
+            for factor in scores.keys()
+        )
+        return np.where(eligible, total_score, np.nan)
+
     def _score_bearish_momentum(self, stock_data: Dict) -> float:
         """计分下跌动量"""
         try:
@@ -222,36 +360,35 @@ class BuyPutScorer:
             logger.error(f"下跌动量评估失败: {e}")
             return 50
 
+    def _support_level_score(self, current_price: float, stock_data: Dict) -> float:
+        """支撑位突破得分中与执行价无关的部分"""
+        support_resistance = stock_data.get('support_resistance', {})
+        support_1 = support_resistance.get('support_1', 0)
+
+        score = 50  # 基础分
+
+        # 当前价格相对支撑位的位置
+        if support_1:
+            score += SUPPORT_DISTANCE_BONUS((current_price - support_1) / current_price * 100)
+
+        # 技术分析信号
+        change_percent = stock_data.get('change_percent', 0)
+        if change_percent <= -2 and support_1 and current_price <= support_1 * 1.02:
+            score += SUPPORT_BREAK_SIGNAL_BONUS
+
+        return score
+
     def _score_support_break(self, current_price: float, strike: float, stock_data: Dict) -> float:
         """计分支撑位突破潜力"""
         try:
             support_resistance = stock_data.get('support_resistance', {})
-            support_1 = support_resistance.get('support_1', 0)
-            support_2 = support_resistance.get('support_2', 0)
-
-            score = 50  # 基础分
-
-            # 当前价格相对支撑位的位置
-            if support_1:
-                distance_to_s1 = (current_price - support_1) / current_price * 100
-                if distance_to_s1 <= 3:
-                    score += 30  # 非常接近支撑位
-                elif distance_to_s1 <= 6:
-                    score += 20
-                elif distance_to_s1 <= 10:
-                    score += 10
+            score = self._support_level_score(current_price, stock_data)
 
             # 执行价相对支撑位的位置
-            if support_1 and strike <= support_1:
-                score += 20  # 执行价在支撑位下方，有利于突破后获利
-
-            if support_2 and strike <= support_2:
-                score += 15  # 执行价在第二支撑位下方
-
-            # 技术分析信号
-            change_percent = stock_data.get('change_percent', 0)
-            if change_percent <= -2 and support_1 and current_price <= support_1 * 1.02:
-                score += 25  # 下跌且接近支撑位
+            for key, bonus in STRIKE_BELOW_SUPPORT_BONUS.items():
+                level = support_resistance.get(key, 0)
+                if level and strike <= level:
+                    score += bonus
 
             return min(100, score)
 
@@ -269,41 +406,13 @@ class BuyPutScorer:
             if delta > 0:
                 return 20
 
-            # 计算效率比率
-            efficiency = abs(delta) / mid_price
-
-            # 平值和轻度虚值期权通常效率较高
-            base_score = 50
-
-            # 基于效率比率评分
-            if efficiency >= 0.5:
-                base_score = 100
-            elif efficiency >= 0.4:
-                base_score = 90
-            elif efficiency >= 0.3:
-                base_score = 80
-            elif efficiency >= 0.2:
-                base_score = 70
-            elif efficiency >= 0.1:
-                base_score = 60
-            else:
-                base_score = 40
-
-            # 基于价值状态调整
-            if -5 <= moneyness <= 5:
-                base_score += 10  # 平值期权加分
-            elif moneyness < -10:
-                base_score -= 10  # 深度虚值减分
-            elif moneyness > 10:
-                base_score -= 5   # 深度实值略减分
-
-            return min(100, base_score)
+            return value_efficiency_score(abs(delta) / mid_price, moneyness)
 
         except Exception as e:
             logger.error(f"价值效率评估失败: {e}")
             return 50
 
-    def _score_volatility_expansion(self, implied_vol: float, historical_vol: float) -> float:
+    def _score_volatility_expansion(self, implied_vol, historical_vol: float):
         """计分波动率扩张潜力"""
         try:
             if historical_vol <= 0:
@@ -312,47 +421,16 @@ class BuyPutScorer:
             vol_ratio = implied_vol / historical_vol
             vol_percentile = self._estimate_vol_percentile(implied_vol)
 
-            score = 50
-
-            # 低隐含波动率有利于买入期权
-            if vol_ratio <= 0.8:
-                score += 30  # 隐含波动率较低
-            elif vol_ratio <= 0.9:
-                score += 20
-            elif vol_ratio <= 1.0:
-                score += 10
-            elif vol_ratio <= 1.2:
-                score -= 5
-            else:
-                score -= 15  # 隐含波动率过高
-
-            # 基于波动率历史位置
-            if vol_percentile <= 20:
-                score += 25  # 低波动率环境
-            elif vol_percentile <= 40:
-                score += 15
-            elif vol_percentile >= 80:
-                score -= 20  # 高波动率环境
-
-            return min(100, max(0, score))
+            score = 50 + VOL_RATIO_ADJUSTMENT(vol_ratio) + VOL_PERCENTILE_ADJUSTMENT(vol_percentile)
+            return minimum(100, maximum(0, score))
 
         except Exception as e:
             logger.error(f"波动率扩张评估失败: {e}")
             return 50
 
-    def _estimate_vol_percentile(self, implied_vol: float) -> float:
+    def _estimate_vol_percentile(self, implied_vol):
         """估算波动率历史位置（简化实现）"""
-        # 简化的波动率分位数估算
-        if implied_vol <= 0.15:
-            return 10
-        elif implied_vol <= 0.20:
-            return 25
-        elif implied_vol <= 0.25:
-            return 50
-        elif implied_vol <= 0.35:
-            return 75
-        else:
-            return 90
+        return VOL_PERCENTILE(implied_vol)
 
     def _score_liquidity(self, volume: int, open_interest: int, bid: float, ask: float) -> float:
         """计分流动性"""
@@ -360,24 +438,7 @@ class BuyPutScorer:
             return 0
 
         bid_ask_spread_pct = (ask - bid) / ((ask + bid) / 2) * 100
-
-        # 成交量得分
-        volume_score = min(40, volume / 8)
-
-        # 持仓量得分
-        oi_score = min(30, open_interest / 40)
-
-        # 价差得分
-        if bid_ask_spread_pct <= 8:
-            spread_score = 30
-        elif bid_ask_spread_pct <= 15:
-            spread_score = 20
-        elif bid_ask_spread_pct <= 25:
-            spread_score = 10
-        else:
-            spread_score = max(0, 10 - (bid_ask_spread_pct - 25) / 3)
-
-        return volume_score + oi_score + spread_score
+        return liquidity_score(volume, open_interest, bid_ask_spread_pct)
 
     def _score_time_value(self, time_value: float, mid_price: float, days_to_expiry: int) -> float:
         """计分时间价值合理性"""
@@ -385,35 +446,7 @@ class BuyPutScorer:
             if mid_price <= 0:
                 return 40
 
-            time_value_ratio = time_value / mid_price
-
-            score = 50
-
-            # 时间价值比例评估
-            if 0.3 <= time_value_ratio <= 0.7:
-                score += 30  # 理想的时间价值比例
-            elif 0.2 <= time_value_ratio < 0.3:
-                score += 20
-            elif 0.7 < time_value_ratio <= 0.8:
-                score += 15
-            elif time_value_ratio > 0.9:
-                score -= 20  # 时间价值过高
-            elif time_value_ratio < 0.1:
-                score += 10   # 低时间价值可能合适
-
-            # 基于到期时间调整
-            if days_to_expiry <= 7:
-                score -= 15  # 太短，时间衰减快
-            elif days_to_expiry <= 30:
-                score += 10
-            elif days_to_expiry <= 60:
-                score += 15
-            elif days_to_expiry <= 90:
-                score += 5
-            else:
-                score -= 10  # 太长，时间价值高
-
-            return min(100, max(0, score))
+            return time_value_score(time_value / mid_price, days_to_expiry)
 
         except Exception as e:
             logger.error(f"时间价值评估失败: {e}")
@@ -0,0 +1,265 @@
+"""
+期权链共享特征表
+
+analyze_options_chain(strategy='all') 的四个计分器原先各自逐个合约读取字段、
+重复计算 mid / 价差 / 价值状态，并为每个合约构建完整的结果字典（含注释、
+评分明细等），而最终只返回前 10 个。
+
+ChainFeatures 对一条期权链只构建一次列式特征表（每侧一个 DataFrame，由四个
+计分器共享；期权链是 OptionContracts 时直接取其 .frame 的列，不生成逐合约字典），
+计分器在其上用 NumPy 一次性算出所有合约的总分（各计分器的 _batch_scores，
+见 tests/test_chain_features.py 的交叉校验），排序后只为返回的前 N 个合约调用
+标量 _score_individual_* 生成完整字典。
+
+各因子的分段计分表（Bands）在计分器模块中只定义一次，标量与列式路径共用。
+
+特征表中 regular=False 的合约（字段缺失为 None / 非数值 / 非有限值、行权价或
+mid 不为正）以及股票级输入不是有限数值时，仍逐个走标量路径，结果与原实现一致。
+"""
+
+import logging
+import math
+import numbers
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from ..core.data_fetcher import CONTRACT_FIELDS, OptionContracts
+
+logger = logging.getLogger(__name__)
+
+# 计分器读取的数值字段及其缺省值（与 _score_individual_* 中 option.get 的缺省值一致）
+NUMERIC_FIELDS = {
+    'strike': 0,
+    'bid': 0,
+    'ask': 0,
+    'volume': 0,
+    'open_interest': 0,
+    'implied_volatility': 0,
+    'days_to_expiry': 0,
+}
+SUPPORT_RESISTANCE_KEYS = ('support_1', 'support_2', 'resistance_1', 'resistance_2', 'high_52w', 'low_52w')
+
+TOP_N = 10
+
+
+def _number(value) -> float:
+    """实数 -> float，其余（None、字符串、Decimal 等）-> NaN"""
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return math.nan
+
+
+def numeric_column(values: List) -> np.ndarray:
+    """数值列；只有实数类型时整列转换，否则逐个转换（非实数 -> NaN）"""
+    if all(issubclass(t, numbers.Real) for t in set(map(type, values))):
+        return np.array(values, dtype=float)
+    return np.array([_number(v) for v in values], dtype=float)
+
+
+def is_finite_number(value) -> bool:
+    return isinstance(value, numbers.Real) and math.isfinite(value)
+
+
+def maximum(a, b):
+    """标量用 max()，数组用 np.maximum()（同一公式可用于两条路径）"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.maximum(a, b)
+    return max(a, b)
+
+
+def minimum(a, b):
+    """标量用 min()，数组用 np.minimum()"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.minimum(a, b)
+    return min(a, b)
+
+
+class Bands:
+    """
+    分段计分表：取第一个成立的条件对应的值，都不成立时取 default（即 if / elif / else 链）
+
+    条件、取值为常数或单参数函数，函数只用算术、比较、& 与 maximum / minimum，
+    因此同一张表对标量逐条求值，对数组用 np.select 整列求值。
+    """
+
+    def __init__(self, *rules, default):
+        self.rules = rules
+        self.default = default
+
+    def __call__(self, x):
+        if isinstance(x, np.ndarray):
+            return np.select([condition(x) for condition, _ in self.rules],
+                             [self._value(value, x) for _, value in self.rules],
+                             default=self._value(self.default, x))
+        for condition, value in self.rules:
+            if condition(x):
+                return self._value(value, x)
+        return self._value(self.default, x)
+
+    @staticmethod
+    def _value(value, x):
+        return value(x) if callable(value) else value
+
+
+class ChainFeatures:
+    """一条期权链的列式特征表（线程安全，可被多个计分器并发使用）"""
+
+    def __init__(self, options_data: Dict, stock_data: Dict):
+        self.options_data = options_data
+        self.stock_data = stock_data
+        self.current_price = stock_data.get('current_price', 0)
+        self.historical_vol = stock_data.get('volatility_30d', 0.2)
+        self.change_percent = stock_data.get('change_percent', 0)
+        self.support_resistance = stock_data.get('support_resistance', {})
+        self.vectorizable = self._check_stock_inputs()
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _check_stock_inputs(self) -> bool:
+        """向量化路径要求股票级输入都是有限数值（支撑/阻力位可以缺失）"""
+        if not (is_finite_number(self.current_price) and self.current_price > 0):
+            return False
+        if not (is_finite_number(self.historical_vol) and is_finite_number(self.change_percent)):
+            return False
+        if not isinstance(self.support_resistance, dict):
+            return False
+        return all(
+            self.support_resistance.get(key) is None or is_finite_number(self.support_resistance.get(key))
+            for key in SUPPORT_RESISTANCE_KEYS
+        )
+
+    def sr(self, key: str) -> float:
+        """支撑/阻力位（缺失记为 0，与标量实现的 .get(key, 0) 真值判断一致）"""
+        return self.support_resistance.get(key) or 0
+
+    def contracts(self, side: str) -> List[Dict]:
+        return self.options_data.get(side, []) or []
+
+    def frame(self, side: str) -> pd.DataFrame:
+        """'calls' / 'puts' 的特征表（首次访问时构建）"""
+        with self._lock:
+            frame = self._frames.get(side)
+            if frame is None:
+                frame = self._frames[side] = self._build_frame(side)
+            return frame
+
+    def _build_frame(self, side: str) -> pd.DataFrame:
+        contracts = self.contracts(side)
+        if isinstance(contracts, OptionContracts):
+            columns, delta_missing = self._frame_columns(contracts.frame)
+        else:
+            columns = {
+                field: numeric_column([c.get(field, default) for c in contracts])
+                for field, default in NUMERIC_FIELDS.items()
+            }
+            raw_delta = [c.get('delta', None) for c in contracts]
+            columns['delta'] = numeric_column(raw_delta)  # NaN = 无 delta
+            delta_missing = np.array([v is None for v in raw_delta], dtype=bool)
+        frame = pd.DataFrame(columns)
+
+        strike = frame['strike'].to_numpy()
+        bid = frame['bid'].to_numpy()
+        ask = frame['ask'].to_numpy()
+        current_price = self.current_price if self.vectorizable else math.nan
+
+        with np.errstate(all='ignore'):
+            frame['mid_price'] = (bid + ask) / 2
+            frame['spread_pct'] = (ask - bid) / ((ask + bid) / 2) * 100
+            if side == 'puts':
+                frame['intrinsic_value'] = np.maximum(0, strike - current_price)
+                frame['moneyness_pct'] = (strike - current_price) / current_price * 100
+            else:
+                frame['intrinsic_value'] = np.maximum(0, current_price - strike)
+                frame['moneyness_pct'] = (current_price - strike) / current_price * 100
+            frame['time_value'] = frame['mid_price'] - frame['intrinsic_value']
+
+        finite = np.isfinite(frame[list(NUMERIC_FIELDS)].to_numpy()).all(axis=1)
+        delta_ok = np.isfinite(columns['delta']) | delta_missing
+        frame['regular'] = finite & delta_ok & (strike > 0) & (frame['mid_price'].to_numpy() > 0)
+        return frame
+
+    @staticmethod
+    def _frame_columns(contracts: pd.DataFrame):
+        """
+        OptionContracts.frame -> 数值列（与逐合约字典的 c.get(field, default) 一致：
+        只读取 CONTRACT_FIELDS 中的列，缺失的列取缺省值）
+        """
+        def column(field, default):
+            if field not in CONTRACT_FIELDS or field not in contracts.columns:
+                return np.full(len(contracts), np.nan if default is None else float(default))
+            values = contracts[field]
+            if is_numeric_dtype(values):
+                return values.to_numpy(dtype=float, na_value=np.nan)
+            return numeric_column(values.tolist())
+
+        columns = {field: column(field, default) for field, default in NUMERIC_FIELDS.items()}
+        columns['delta'] = column('delta', None)
+        if 'delta' in contracts.columns and contracts['delta'].dtype == object:
+            delta_missing = np.array([v is None for v in contracts['delta'].tolist()], dtype=bool)
+        else:
+            # 数值列中缺失的 delta 已是 NaN（字典中同样是 NaN，不是 None）
+            delta_missing = np.full(len(contracts), 'delta' not in contracts.columns)
+        return columns, delta_missing
+
+    def rank(self, side: str, batch_scores: Callable[[pd.DataFrame], np.ndarray],
+             score_one: Callable[[Dict], Optional[Dict]], top_n: int = TOP_N) -> List[Dict[str, Any]]:
+        """
+        计分并按得分降序排列合格合约（score > 0）
+
+        前 top_n 个为 score_one() 生成的完整字典；其余为只含 'score' 的轻量字典
+        （策略分析摘要只读取它们的得分）。
+
+        Args:
+            side: 'calls' / 'puts'
+            batch_scores: 特征表 -> 每个合约的加权总分（不合格为 NaN，只对 regular 行有效）
+            score_one: 标量计分函数（_score_individual_*）
+        """
+        contracts = self.contracts(side)
+        scores = np.full(len(contracts), np.nan)
+        full = {}
+
+        scalar_rows = list(range(len(contracts)))
+        if self.vectorizable and len(contracts):
+            frame = self.frame(side)
+            regular = frame['regular'].to_numpy()
+            try:
+                with np.errstate(all='ignore'):
+                    totals = np.asarray(batch_scores(frame), dtype=float)
+                rows = np.flatnonzero(regular & ~np.isnan(totals))
+                rounded = np.round(totals[rows], 1)
+                # 标量实现的总分可能是 float（Python round）或 np.float64（NumPy round），
+                # 两者只在 x.x5 附近不同；结果不同的合约交给标量函数计分
+                scaled = totals[rows] * 10
+                near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+                python_rounded = [round(total, 1) for total in totals[rows][near_tie].tolist()]
+                ambiguous = near_tie[rounded[near_tie] != python_rounded]
+                scores[rows] = rounded
+                scores[rows[ambiguous]] = np.nan
+                scalar_rows = sorted(np.flatnonzero(~regular).tolist() + rows[ambiguous].tolist())
+            except Exception as e:
+                logger.warning(f"向量化计分失败，回退到逐个计分: {e}")
+
+        for i in scalar_rows:
+            result = score_one(contracts[i])
+            if result:
+                full[i] = result
+                scores[i] = result.get('score', 0)
+
+        # 与 list.sort(reverse=True) 一致：同分时保持期权链中的原始顺序
+        qualified = np.flatnonzero(scores > 0)
+        order = qualified[np.argsort(-scores[qualified], kind='stable')]
+
+        ranked = []
+        for i in order.tolist():
+            if len(ranked) < top_n:
+                option = full.get(i) or score_one(contracts[i])
+                if option:
+                    ranked.append(option)
+            else:
+                ranked.append({'score': float(scores[i])})
+        return ranked
+
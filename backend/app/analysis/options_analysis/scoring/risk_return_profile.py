@@ -5,8 +5,14 @@
 
 import logging
 import math
-from dataclasses import dataclass, asdict
-from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ..core.greeks import norm_cdf
+from .chain_features import is_finite_number, numeric_column
 
 logger = logging.getLogger(__name__)
 
@@ -40,8 +46,8 @@ class RiskReturnProfile:
     volatility_impact: str        # 'positive', 'negative', 'neutral'
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
+        """转换为字典（字段都是标量，浅拷贝即可，不用 asdict 的逐字段深拷贝）"""
+        return dict(vars(self))
 
 
 # 风格定义常量
@@ -93,7 +99,8 @@ def calculate_risk_return_profile(
     option: Dict[str, Any],
     stock_data: Dict[str, Any],
     strategy: str,
-    vrp_analysis: Optional[Dict[str, Any]] = None
+    vrp_analysis: Optional[Dict[str, Any]] = None,
+    simulation=None
 ) -> RiskReturnProfile:
     """
     计算期权的风险收益风格标签
@@ -103,498 +110,16 @@ def calculate_risk_return_profile(
         stock_data: 标的股票数据 (current_price, volatility_30d等)
         strategy: 策略类型 ('sell_put', 'sell_call', 'buy_call', 'buy_put')
         vrp_analysis: VRP分析数据 (可选)
+        simulation: 蒙特卡洛模拟（可选，见 calculate_risk_return_profiles）
 
     Returns:
         RiskReturnProfile: 风险收益风格标签
     """
-    try:
-        # 提取关键数据
-        strike = option.get('strike', 0)
-        bid = option.get('bid', option.get('bid_price', 0))
-        ask = option.get('ask', option.get('ask_price', 0))
-        mid_price = (bid + ask) / 2 if bid and ask else option.get('mid_price', 0)
-        days_to_expiry = option.get('days_to_expiry', 30)
-        implied_vol = option.get('implied_volatility', option.get('impliedVolatility', 0.25))
-
-        current_price = stock_data.get('current_price', 0)
-
-        if not all([strike, current_price, mid_price > 0]):
-            return _create_default_profile(strategy)
-
-        # 根据策略类型计算风格
-        if strategy == 'sell_put':
-            return _calculate_sell_put_profile(
-                strike, mid_price, current_price, days_to_expiry, implied_vol, vrp_analysis
-            )
-        elif strategy == 'sell_call':
-            return _calculate_sell_call_profile(
-                strike, mid_price, current_price, days_to_expiry, implied_vol, vrp_analysis
-            )
-        elif strategy == 'buy_call':
-            return _calculate_buy_call_profile(
-                strike, mid_price, current_price, days_to_expiry, implied_vol, vrp_analysis
-            )
-        elif strategy == 'buy_put':
-            return _calculate_buy_put_profile(
-                strike, mid_price, current_price, days_to_expiry, implied_vol, vrp_analysis
-            )
-        else:
-            return _create_default_profile(strategy)
-
-    except Exception as e:
-        logger.error(f"计算风险收益风格失败: {e}")
-        return _create_default_profile(strategy)
-
-
-def _calculate_sell_put_profile(
-    strike: float,
-    premium: float,
-    current_price: float,
-    days_to_expiry: int,
-    implied_vol: float,
-    vrp_analysis: Optional[Dict] = None
-) -> RiskReturnProfile:
-    """计算 Sell Put 策略的风格标签"""
-
-    # 计算关键指标
-    safety_margin_pct = (current_price - strike) / current_price * 100
-    max_profit_pct = (premium / strike) * 100  # 收取的权利金占执行价的比例
-    max_loss_pct = ((strike - premium) / strike) * 100  # 最大亏损（被指派）
-    annualized_return = (max_profit_pct / days_to_expiry) * 365
-
-    # 基础胜率估算
-    base_win_prob = _estimate_sell_put_win_probability(
-        current_price, strike, implied_vol, days_to_expiry
-    )
-
-    # VRP调整胜率
-    if vrp_analysis:
-        vrp_level = vrp_analysis.get('vrp_level', 'normal')
-        if vrp_level == 'very_high':
-            base_win_prob = min(0.90, base_win_prob + 0.05)
-        elif vrp_level == 'high':
-            base_win_prob = min(0.85, base_win_prob + 0.03)
-
-    # 风格判定
-    if safety_margin_pct >= 10 and annualized_return <= 25:
-        # 大安全边际 + 适中收益 = 稳健收益
-        style = 'steady_income'
-        risk_level = 'low'
-    elif safety_margin_pct >= 5 and annualized_return <= 40:
-        # 中等安全边际 = 稳中求进
-        style = 'balanced'
-        risk_level = 'moderate'
-    elif safety_margin_pct < 3 or annualized_return > 50:
-        # 小安全边际 或 高收益 = 高风险高收益
-        style = 'high_risk_high_reward'
-        risk_level = 'high' if safety_margin_pct >= 0 else 'very_high'
-    else:
-        style = 'balanced'
-        risk_level = 'moderate'
-
-    # 风险收益比
-    risk_reward_ratio = max_profit_pct / max_loss_pct if max_loss_pct > 0 else 0
-
-    # 生成摘要
-    summary_cn = _generate_sell_put_summary_cn(
-        style, base_win_prob, max_profit_pct, safety_margin_pct, days_to_expiry
-    )
-    summary_en = _generate_sell_put_summary_en(
-        style, base_win_prob, max_profit_pct, safety_margin_pct, days_to_expiry
-    )
-
-    style_def = STYLE_DEFINITIONS[style]
-
-    return RiskReturnProfile(
-        style=style,
-        style_label=style_def['label'],
-        style_label_cn=style_def['label_cn'],
-        style_label_en=style_def['label_en'],
-        risk_level=risk_level,
-        risk_color=RISK_COLORS[risk_level],
-        max_loss_pct=round(max_loss_pct, 2),
-        max_profit_pct=round(max_profit_pct, 2),
-        win_probability=round(base_win_prob, 2),
-        risk_reward_ratio=round(risk_reward_ratio, 3),
-        summary=f"{summary_cn} | {summary_en}",
-        summary_cn=summary_cn,
-        strategy_type='seller',
-        time_decay_impact='positive',
-        volatility_impact='negative'
-    )
-
-
-def _calculate_sell_call_profile(
-    strike: float,
-    premium: float,
-    current_price: float,
-    days_to_expiry: int,
-    implied_vol: float,
-    vrp_analysis: Optional[Dict] = None
-) -> RiskReturnProfile:
-    """计算 Sell Call 策略的风格标签"""
-
-    # 计算关键指标
-    distance_pct = (strike - current_price) / current_price * 100
-    max_profit_pct = (premium / current_price) * 100
-    # Sell Call 的最大亏损理论上无限，这里用一个合理估算
-    max_loss_pct = 100  # 简化为100%
-    annualized_return = (max_profit_pct / days_to_expiry) * 365
-
-    # 基础胜率估算
-    base_win_prob = _estimate_sell_call_win_probability(
-        current_price, strike, implied_vol, days_to_expiry
-    )
-
-    # VRP调整
-    if vrp_analysis:
-        vrp_level = vrp_analysis.get('vrp_level', 'normal')
-        if vrp_level == 'very_high':
-            base_win_prob = min(0.85, base_win_prob + 0.05)
-
-    # 风格判定 - Sell Call 通常风险更高
-    if distance_pct >= 15 and annualized_return <= 20:
-        style = 'steady_income'
-        risk_level = 'moderate'  # Sell Call 即使安全边际大也至少是moderate
-    elif distance_pct >= 8:
-        style = 'balanced'
-        risk_level = 'moderate'
-    else:
-        style = 'high_risk_high_reward'
-        risk_level = 'high'
-
-    risk_reward_ratio = max_profit_pct / max_loss_pct if max_loss_pct > 0 else 0
-
-    summary_cn = f"胜率约{base_win_prob:.0%}，年化收益{annualized_return:.0f}%，虚值{distance_pct:.1f}%"
-    summary_en = f"Win rate ~{base_win_prob:.0%}, {annualized_return:.0f}% annualized, {distance_pct:.1f}% OTM"
-
-    style_def = STYLE_DEFINITIONS[style]
-
-    return RiskReturnProfile(
-        style=style,
-        style_label=style_def['label'],
-        style_label_cn=style_def['label_cn'],
-        style_label_en=style_def['label_en'],
-        risk_level=risk_level,
-        risk_color=RISK_COLORS[risk_level],
-        max_loss_pct=round(max_loss_pct, 2),
-        max_profit_pct=round(max_profit_pct, 2),
-        win_probability=round(base_win_prob, 2),
-        risk_reward_ratio=round(risk_reward_ratio, 3),
-        summary=f"{summary_cn} | {summary_en}",
-        summary_cn=summary_cn,
-        strategy_type='seller',
-        time_decay_impact='positive',
-        volatility_impact='negative'
-    )
-
-
-def _calculate_buy_call_profile(
-    strike: float,
-    premium: float,
-    current_price: float,
-    days_to_expiry: int,
-    implied_vol: float,
-    vrp_analysis: Optional[Dict] = None
-) -> RiskReturnProfile:
-    """计算 Buy Call 策略的风格标签"""
-
-    # 计算关键指标
-    distance_pct = (strike - current_price) / current_price * 100  # 虚值程度
-    max_loss_pct = 100  # 最多亏损全部权利金
-    breakeven_move_pct = ((strike + premium - current_price) / current_price) * 100
-
-    # 潜在收益估算（基于波动率）
-    expected_move = current_price * implied_vol * math.sqrt(days_to_expiry / 365)
-    potential_profit_at_1std = max(0, current_price + expected_move - strike - premium)
-    max_profit_pct = (potential_profit_at_1std / premium) * 100 if premium > 0 else 0
-
-    # 基础胜率估算
-    base_win_prob = _estimate_buy_call_win_probability(
-        current_price, strike, premium, implied_vol, days_to_expiry
-    )
-
-    # VRP调整 - 低VRP对买方有利
-    if vrp_analysis:
-        vrp_level = vrp_analysis.get('vrp_level', 'normal')
-        if vrp_level == 'very_low':
-            base_win_prob = min(0.60, base_win_prob + 0.05)
-        elif vrp_level == 'low':
-            base_win_prob = min(0.55, base_win_prob + 0.03)
-
-    # 风格判定
-    if distance_pct > 20:
-        # 深度虚值 = 高风险高收益
-        style = 'high_risk_high_reward'
-        risk_level = 'very_high'
-        max_profit_pct = 500  # 深度虚值潜在5倍+收益
-    elif distance_pct > 10:
-        # 中度虚值
-        style = 'high_risk_high_reward'
-        risk_level = 'high'
-        max_profit_pct = min(300, max_profit_pct)
-    elif distance_pct > 3:
-        # 轻度虚值
-        style = 'balanced'
-        risk_level = 'high'
-        max_profit_pct = min(200, max_profit_pct)
-    else:
-        # 平值或轻度实值
-        style = 'balanced'
-        risk_level = 'moderate'
-        max_profit_pct = min(150, max_profit_pct)
-
-    risk_reward_ratio = max_profit_pct / max_loss_pct if max_loss_pct > 0 else 0
-
-    summary_cn = _generate_buy_call_summary_cn(
-        style, base_win_prob, distance_pct, breakeven_move_pct, days_to_expiry
-    )
-    summary_en = _generate_buy_call_summary_en(
-        style, base_win_prob, distance_pct, breakeven_move_pct, days_to_expiry
-    )
-
-    style_def = STYLE_DEFINITIONS[style]
-
-    return RiskReturnProfile(
-        style=style,
-        style_label=style_def['label'],
-        style_label_cn=style_def['label_cn'],
-        style_label_en=style_def['label_en'],
-        risk_level=risk_level,
-        risk_color=RISK_COLORS[risk_level],
-        max_loss_pct=round(max_loss_pct, 2),
-        max_profit_pct=round(max_profit_pct, 2),
-        win_probability=round(base_win_prob, 2),
-        risk_reward_ratio=round(risk_reward_ratio, 3),
-        summary=f"{summary_cn} | {summary_en}",
-        summary_cn=summary_cn,
-        strategy_type='buyer',
-        time_decay_impact='negative',
-        volatility_impact='positive'
-    )
-
-
-def _calculate_buy_put_profile(
-    strike: float,
-    premium: float,
-    current_price: float,
-    days_to_expiry: int,
-    implied_vol: float,
-    vrp_analysis: Optional[Dict] = None
-) -> RiskReturnProfile:
-    """计算 Buy Put 策略的风格标签"""
-
-    # 计算关键指标
-    distance_pct = (current_price - strike) / current_price * 100  # 虚值程度
-    max_loss_pct = 100  # 最多亏损全部权利金
-    breakeven_price = strike - premium
-    breakeven_drop_pct = (current_price - breakeven_price) / current_price * 100
-
-    # 保护性成本
-    hedge_cost_pct = (premium / current_price) * 100
-
-    # 潜在收益估算
-    expected_move = current_price * implied_vol * math.sqrt(days_to_expiry / 365)
-    potential_profit_at_1std = max(0, strike - (current_price - expected_move) - premium)
-    max_profit_pct = (potential_profit_at_1std / premium) * 100 if premium > 0 else 0
-
-    # 基础胜率估算
-    base_win_prob = _estimate_buy_put_win_probability(
-        current_price, strike, premium, implied_vol, days_to_expiry
-    )
-
-    # 判断是保护性还是投机性
-    is_protective = distance_pct <= 5  # 平值或轻度虚值可能是保护性
-
-    # 风格判定
-    if is_protective and hedge_cost_pct <= 5:
-        # 保护对冲
-        style = 'hedge'
-        risk_level = 'low'
-        max_profit_pct = 100  # 对冲收益有限
-    elif distance_pct > 15:
-        # 深度虚值 = 高风险高收益
-        style = 'high_risk_high_reward'
-        risk_level = 'very_high'
-        max_profit_pct = 400
-    elif distance_pct > 8:
-        style = 'high_risk_high_reward'
-        risk_level = 'high'
-        max_profit_pct = min(250, max_profit_pct)
-    else:
-        style = 'balanced'
-        risk_level = 'moderate'
-
-    risk_reward_ratio = max_profit_pct / max_loss_pct if max_loss_pct > 0 else 0
-
-    if style == 'hedge':
-        summary_cn = f"保护成本{hedge_cost_pct:.1f}%，下跌超过{breakeven_drop_pct:.1f}%开始获利"
-        summary_en = f"Hedge cost {hedge_cost_pct:.1f}%, profit if down >{breakeven_drop_pct:.1f}%"
-    else:
-        summary_cn = f"胜率约{base_win_prob:.0%}，需下跌{breakeven_drop_pct:.1f}%才能获利"
-        summary_en = f"Win rate ~{base_win_prob:.0%}, needs {breakeven_drop_pct:.1f}% drop to profit"
-
-    style_def = STYLE_DEFINITIONS[style]
-
-    return RiskReturnProfile(
-        style=style,
-        style_label=style_def['label'],
-        style_label_cn=style_def['label_cn'],
-        style_label_en=style_def['label_en'],
-        risk_level=risk_level,
-        risk_color=RISK_COLORS[risk_level],
-        max_loss_pct=round(max_loss_pct, 2),
-        max_profit_pct=round(max_profit_pct, 2),
-        win_probability=round(base_win_prob, 2),
-        risk_reward_ratio=round(risk_reward_ratio, 3),
-        summary=f"{summary_cn} | {summary_en}",
-        summary_cn=summary_cn,
-        strategy_type='buyer',
-        time_decay_impact='negative',
-        volatility_impact='positive'
-    )
+    return calculate_risk_return_profiles([option], stock_data, strategy, vrp_analysis, simulation).profile(0)
 
 
 # ==================== 辅助函数 ====================
 
-def _estimate_sell_put_win_probability(
-    current_price: float,
-    strike: float,
-    implied_vol: float,
-    days_to_expiry: int
-) -> float:
-    """估算 Sell Put 的胜率"""
-    try:
-        from scipy.stats import norm
-
-        if implied_vol <= 0 or days_to_expiry <= 0:
-            return 0.60
-
-        t = days_to_expiry / 365
-        # 使用简化的 Black-Scholes 概率
-        d1 = (math.log(current_price / strike) + (0.05 + 0.5 * implied_vol ** 2) * t) / (implied_vol * math.sqrt(t))
-        # 股价在到期时高于执行价的概率
-        prob_above_strike = norm.cdf(d1)
-
-        return min(0.95, max(0.30, prob_above_strike))
-
-    except Exception:
-        # 简化计算
-        distance_pct = (current_price - strike) / current_price * 100
-        if distance_pct >= 15:
-            return 0.85
-        elif distance_pct >= 10:
-            return 0.78
-        elif distance_pct >= 5:
-            return 0.70
-        elif distance_pct >= 0:
-            return 0.60
-        else:
-            return max(0.35, 0.60 + distance_pct * 0.02)
-
-
-def _estimate_sell_call_win_probability(
-    current_price: float,
-    strike: float,
-    implied_vol: float,
-    days_to_expiry: int
-) -> float:
-    """估算 Sell Call 的胜率"""
-    try:
-        from scipy.stats import norm
-
-        if implied_vol <= 0 or days_to_expiry <= 0:
-            return 0.55
-
-        t = days_to_expiry / 365
-        d1 = (math.log(current_price / strike) + (0.05 + 0.5 * implied_vol ** 2) * t) / (implied_vol * math.sqrt(t))
-        # 股价在到期时低于执行价的概率
-        prob_below_strike = norm.cdf(-d1)
-
-        return min(0.90, max(0.30, prob_below_strike))
-
-    except Exception:
-        distance_pct = (strike - current_price) / current_price * 100
-        if distance_pct >= 15:
-            return 0.80
-        elif distance_pct >= 10:
-            return 0.72
-        elif distance_pct >= 5:
-            return 0.62
-        elif distance_pct >= 0:
-            return 0.50
-        else:
-            return max(0.30, 0.50 + distance_pct * 0.02)
-
-
-def _estimate_buy_call_win_probability(
-    current_price: float,
-    strike: float,
-    premium: float,
-    implied_vol: float,
-    days_to_expiry: int
-) -> float:
-    """估算 Buy Call 的胜率（达到盈亏平衡的概率）"""
-    try:
-        from scipy.stats import norm
-
-        if implied_vol <= 0 or days_to_expiry <= 0:
-            return 0.35
-
-        breakeven = strike + premium
-        t = days_to_expiry / 365
-        d1 = (math.log(current_price / breakeven) + (0.05 + 0.5 * implied_vol ** 2) * t) / (implied_vol * math.sqrt(t))
-        prob_above_breakeven = norm.cdf(d1)
-
-        return min(0.65, max(0.15, prob_above_breakeven))
-
-    except Exception:
-        distance_pct = (strike - current_price) / current_price * 100
-        if distance_pct <= 0:
-            return 0.50
-        elif distance_pct <= 5:
-            return 0.42
-        elif distance_pct <= 10:
-            return 0.35
-        elif distance_pct <= 20:
-            return 0.25
-        else:
-            return 0.15
-
-
-def _estimate_buy_put_win_probability(
-    current_price: float,
-    strike: float,
-    premium: float,
-    implied_vol: float,
-    days_to_expiry: int
-) -> float:
-    """估算 Buy Put 的胜率"""
-    try:
-        from scipy.stats import norm
-
-        if implied_vol <= 0 or days_to_expiry <= 0:
-            return 0.35
-
-        breakeven = strike - premium
-        t = days_to_expiry / 365
-        d1 = (math.log(current_price / breakeven) + (0.05 + 0.5 * implied_vol ** 2) * t) / (implied_vol * math.sqrt(t))
-        prob_below_breakeven = norm.cdf(-d1)
-
-        return min(0.60, max(0.15, prob_below_breakeven))
-
-    except Exception:
-        distance_pct = (current_price - strike) / current_price * 100
-        if distance_pct <= 0:
-            return 0.45
-        elif distance_pct <= 5:
-            return 0.38
-        elif distance_pct <= 10:
-            return 0.30
-        else:
-            return 0.20
-
-
 def _generate_sell_put_summary_cn(
     style: str,
     win_prob: float,
@@ -695,36 +220,320 @@ def _create_default_profile(strategy: str) -> RiskReturnProfile:
         )
 
 
+
+
 # ==================== 批量处理函数 ====================
 
+PROFILE_STRATEGIES = ('sell_put', 'sell_call', 'buy_call', 'buy_put')
+
+# 各策略的交易方向与希腊字母影响
+STRATEGY_TRAITS = {
+    'sell_put': ('seller', 'positive', 'negative'),
+    'sell_call': ('seller', 'positive', 'negative'),
+    'buy_call': ('buyer', 'negative', 'positive'),
+    'buy_put': ('buyer', 'negative', 'positive'),
+}
+
+
+class RiskReturnProfiles:
+    """
+    一组期权的风险收益风格标签（calculate_risk_return_profiles 的结果）
+
+    胜率、最大收益/亏损、风险收益比、风格与风险等级在 .columns 中按列一次算出；
+    摘要文字只在 profile(i) / to_dict(i) 时生成，整条期权链只需对实际返回的期权调用。
+    """
+
+    def __init__(self, strategy: str, columns: Dict[str, np.ndarray], days: list):
+        self.strategy = strategy
+        self.columns = columns
+        self._days = days
+        self._rows = {name: values.tolist() for name, values in columns.items()}
+        self._frame = None
+
+    def __len__(self):
+        return len(self._days)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """按列结果的 DataFrame（按需构建）"""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.columns)
+        return self._frame
+
+    def profile(self, i: int) -> RiskReturnProfile:
+        row = {name: values[i] for name, values in self._rows.items()}
+        if not row['valid']:
+            return _create_default_profile(self.strategy)
+
+        style = row['style']
+        risk_level = row['risk_level']
+        summary_cn, summary_en = self._summaries(style, row, self._days[i])
+        strategy_type, time_decay_impact, volatility_impact = STRATEGY_TRAITS[self.strategy]
+        style_def = STYLE_DEFINITIONS[style]
+
+        return RiskReturnProfile(
+            style=style,
+            style_label=style_def['label'],
+            style_label_cn=style_def['label_cn'],
+            style_label_en=style_def['label_en'],
+            risk_level=risk_level,
+            risk_color=RISK_COLORS[risk_level],
+            max_loss_pct=round(row['max_loss_pct'], 2) if self.strategy == 'sell_put' else 100,
+            max_profit_pct=round(self._max_profit(row), 2),
+            win_probability=round(row['win_probability'], 2),
+            risk_reward_ratio=round(row['risk_reward_ratio'], 3),
+            summary=f"{summary_cn} | {summary_en}",
+            summary_cn=summary_cn,
+            strategy_type=strategy_type,
+            time_decay_impact=time_decay_impact,
+            volatility_impact=volatility_impact
+        )
+
+    def to_dict(self, i: int) -> Dict[str, Any]:
+        return self.profile(i).to_dict()
+
+    @staticmethod
+    def _max_profit(row: Dict[str, Any]):
+        # 封顶后的值是整数常量（500、min(300, x) 等）
+        if row.get('max_profit_capped'):
+            return int(row['max_profit_pct'])
+        return row['max_profit_pct']
+
+    def _summaries(self, style: str, row: Dict[str, Any], days) -> tuple:
+        win_prob = row['win_probability']
+        if self.strategy == 'sell_put':
+            args = (style, win_prob, row['max_profit_pct'], row['safety_margin_pct'], days)
+            return _generate_sell_put_summary_cn(*args), _generate_sell_put_summary_en(*args)
+        if self.strategy == 'sell_call':
+            annualized_return = row['annualized_return']
+            distance_pct = row['distance_pct']
+            return (f"胜率约{win_prob:.0%}，年化收益{annualized_return:.0f}%，虚值{distance_pct:.1f}%",
+                    f"Win rate ~{win_prob:.0%}, {annualized_return:.0f}% annualized, {distance_pct:.1f}% OTM")
+        if self.strategy == 'buy_call':
+            args = (style, win_prob, row['distance_pct'], row['breakeven_move_pct'], days)
+            return _generate_buy_call_summary_cn(*args), _generate_buy_call_summary_en(*args)
+        breakeven_drop_pct = row['breakeven_move_pct']
+        if style == 'hedge':
+            hedge_cost_pct = row['hedge_cost_pct']
+            return (f"保护成本{hedge_cost_pct:.1f}%，下跌超过{breakeven_drop_pct:.1f}%开始获利",
+                    f"Hedge cost {hedge_cost_pct:.1f}%, profit if down >{breakeven_drop_pct:.1f}%")
+        return (f"胜率约{win_prob:.0%}，需下跌{breakeven_drop_pct:.1f}%才能获利",
+                f"Win rate ~{win_prob:.0%}, needs {breakeven_drop_pct:.1f}% drop to profit")
+
+
+def _option_inputs(option: Dict[str, Any]) -> tuple:
+    """字段读取与缺省值；bid、ask 都不为零时权利金取二者中间价，否则取 mid_price"""
+    bid = option.get('bid', option.get('bid_price', 0))
+    ask = option.get('ask', option.get('ask_price', 0))
+    if bid and ask:
+        premium = (bid + ask) / 2 if is_finite_number(bid) and is_finite_number(ask) else math.nan
+    else:
+        premium = option.get('mid_price', 0)
+    return (
+        option.get('strike', 0),
+        premium,
+        option.get('days_to_expiry', 30),
+        option.get('implied_volatility', option.get('impliedVolatility', 0.25)),
+    )
+
+
+def _clip_cdf(d1: np.ndarray, low: float, high: float, simulated: Optional[np.ndarray] = None) -> np.ndarray:
+    """胜率区间截断；提供蒙特卡洛胜率时用它代替 N(d1)（无法模拟的合约仍用 N(d1)）"""
+    probability = norm_cdf(d1)
+    if simulated is not None:
+        probability = np.where(np.isnan(simulated), probability, simulated)
+    return np.minimum(high, np.maximum(low, probability))
+
+
+def calculate_risk_return_profiles(
+    options: Sequence[Dict[str, Any]],
+    stock_data: Dict[str, Any],
+    strategy: str,
+    vrp_analysis: Optional[Dict[str, Any]] = None,
+    simulation=None
+) -> RiskReturnProfiles:
+    """
+    批量计算一组期权的风险收益风格标签
+
+    各项指标按列计算（calculate_risk_return_profile 即单个期权的批量计算）。
+    字段缺失/非数值、行权价或权利金不为正、卖方剩余 0 天、买方剩余天数为负
+    或盈亏平衡价不为正的期权，以及未知策略、股票价格无效时，返回默认标签。
+
+    Args:
+        options: 期权列表 (strike, bid, ask, days_to_expiry, implied_volatility等)
+        stock_data: 标的股票数据 (current_price)
+        strategy: 策略类型
+        vrp_analysis: VRP分析数据 (可选)
+        simulation: 标的的蒙特卡洛模拟（advanced.monte_carlo.PriceSimulation，可选）；
+            提供时基础胜率取模拟结果（截断区间、VRP 调整不变）
+
+    Returns:
+        RiskReturnProfiles: 按 options 顺序的风格标签
+    """
+    inputs = [_option_inputs(option) for option in options]
+    strike, premium, days, implied_vol = (numeric_column([values[k] for values in inputs]) for k in range(4))
+    raw_days = [values[2] for values in inputs]
+    current_price = stock_data.get('current_price', 0)
+
+    if strategy not in PROFILE_STRATEGIES or not (is_finite_number(current_price) and current_price > 0):
+        return RiskReturnProfiles(strategy, {'valid': np.zeros(len(inputs), dtype=bool)}, raw_days)
+
+    S = current_price
+    n = len(inputs)
+    valid = np.isfinite(strike) & (strike > 0) & np.isfinite(premium) & (premium > 0) \
+        & np.isfinite(days) & np.isfinite(implied_vol)
+    vrp_level = vrp_analysis.get('vrp_level', 'normal') if vrp_analysis else None
+    columns = {}
+
+    with np.errstate(all='ignore'):
+        t = days / 365
+        no_vol = (implied_vol <= 0) | (days <= 0)
+        simulated = simulation.win_probabilities(strategy, strike, premium, implied_vol, days) \
+            if simulation is not None else None
+
+        if strategy in ('sell_put', 'sell_call'):
+            valid &= days != 0  # 年化收益
+            d1 = (np.log(S / strike) + (0.05 + 0.5 * implied_vol ** 2) * t) / (implied_vol * np.sqrt(t))
+
+        if strategy == 'sell_put':
+            safety_margin_pct = (S - strike) / S * 100
+            max_profit_pct = (premium / strike) * 100  # 收取的权利金占执行价的比例
+            max_loss_pct = ((strike - premium) / strike) * 100  # 最大亏损（被指派）
+            annualized_return = (max_profit_pct / days) * 365
+            # 股价在到期时高于执行价的概率
+            win_prob = np.where(no_vol, 0.60, _clip_cdf(d1, 0.30, 0.95, simulated))
+            if vrp_level == 'very_high':
+                win_prob = np.minimum(0.90, win_prob + 0.05)
+            elif vrp_level == 'high':
+                win_prob = np.minimum(0.85, win_prob + 0.03)
+
+            # 大安全边际 + 适中收益 = 稳健收益；中等安全边际 = 稳中求进；小安全边际 或 高收益 = 高风险高收益
+            steady = (safety_margin_pct >= 10) & (annualized_return <= 25)
+            balanced = (safety_margin_pct >= 5) & (annualized_return <= 40)
+            aggressive = (safety_margin_pct < 3) | (annualized_return > 50)
+            style = np.select([steady, balanced, aggressive],
+                              ['steady_income', 'balanced', 'high_risk_high_reward'], default='balanced')
+            risk_level = np.select(
+                [steady, balanced, aggressive],
+                ['low', 'moderate', np.where(safety_margin_pct >= 0, 'high', 'very_high')],
+                default='moderate'
+            )
+            risk_reward_ratio = np.where(max_loss_pct > 0, max_profit_pct / max_loss_pct, 0)
+            columns['safety_margin_pct'] = safety_margin_pct
+
+        elif strategy == 'sell_call':
+            distance_pct = (strike - S) / S * 100
+            max_profit_pct = (premium / S) * 100
+            # Sell Call 的最大亏损理论上无限，这里简化为100%
+            max_loss_pct = np.full(n, 100.0)
+            annualized_return = (max_profit_pct / days) * 365
+            # 股价在到期时低于执行价的概率
+            win_prob = np.where(no_vol, 0.55, _clip_cdf(-d1, 0.30, 0.90, simulated))
+            if vrp_level == 'very_high':
+                win_prob = np.minimum(0.85, win_prob + 0.05)
+
+            # Sell Call 即使安全边际大也至少是 moderate
+            steady = (distance_pct >= 15) & (annualized_return <= 20)
+            balanced = distance_pct >= 8
+            style = np.select([steady, balanced], ['steady_income', 'balanced'], default='high_risk_high_reward')
+            risk_level = np.where(steady | balanced, 'moderate', 'high')
+            risk_reward_ratio = max_profit_pct / max_loss_pct
+            columns['annualized_return'] = annualized_return
+            columns['distance_pct'] = distance_pct
+
+        else:
+            # 买方：最多亏损全部权利金；潜在收益按 1 倍标准差的预期波动估算，胜率为达到盈亏平衡的概率
+            valid &= days >= 0
+            max_loss_pct = np.full(n, 100.0)
+            expected_move = S * implied_vol * np.sqrt(days / 365)
+            breakeven = strike + premium if strategy == 'buy_call' else strike - premium
+            valid &= no_vol | (breakeven > 0)
+            d1 = (np.log(S / breakeven) + (0.05 + 0.5 * implied_vol ** 2) * t) / (implied_vol * np.sqrt(t))
+
+            if strategy == 'buy_call':
+                distance_pct = (strike - S) / S * 100  # 虚值程度
+                breakeven_move_pct = ((strike + premium - S) / S) * 100
+                potential_profit = np.maximum(0, S + expected_move - strike - premium)
+                max_profit_pct = (potential_profit / premium) * 100
+                win_prob = np.where(no_vol, 0.35, _clip_cdf(d1, 0.15, 0.65, simulated))
+                # 低VRP对买方有利
+                if vrp_level == 'very_low':
+                    win_prob = np.minimum(0.60, win_prob + 0.05)
+                elif vrp_level == 'low':
+                    win_prob = np.minimum(0.55, win_prob + 0.03)
+
+                # 深度虚值 / 中度虚值 / 轻度虚值 / 平值或轻度实值
+                conditions = [distance_pct > 20, distance_pct > 10, distance_pct > 3]
+                style = np.select(conditions, ['high_risk_high_reward', 'high_risk_high_reward', 'balanced'],
+                                  default='balanced')
+                risk_level = np.select(conditions, ['very_high', 'high', 'high'], default='moderate')
+                # 深度虚值固定 500（潜在5倍+收益），其余按档位封顶
+                cap = np.select(conditions, [500, 300, 200], default=150)
+                capped = conditions[0] | (max_profit_pct >= cap)
+                max_profit_pct = np.where(capped, cap, max_profit_pct)
+            else:
+                distance_pct = (S - strike) / S * 100  # 虚值程度
+                breakeven_move_pct = (S - breakeven) / S * 100
+                hedge_cost_pct = (premium / S) * 100  # 保护性成本
+                potential_profit = np.maximum(0, strike - (S - expected_move) - premium)
+                max_profit_pct = (potential_profit / premium) * 100
+                win_prob = np.where(no_vol, 0.35, _clip_cdf(-d1, 0.15, 0.60, simulated))
+
+                # 平值或轻度虚值且成本低 = 保护对冲（收益有限）；深度虚值 = 高风险高收益
+                conditions = [(distance_pct <= 5) & (hedge_cost_pct <= 5), distance_pct > 15, distance_pct > 8]
+                style = np.select(conditions, ['hedge', 'high_risk_high_reward', 'high_risk_high_reward'],
+                                  default='balanced')
+                risk_level = np.select(conditions, ['low', 'very_high', 'high'], default='moderate')
+                cap = np.select(conditions, [100, 400, 250], default=np.inf)
+                capped = conditions[0] | conditions[1] | (max_profit_pct >= cap)
+                max_profit_pct = np.where(capped, cap, max_profit_pct)
+                columns['hedge_cost_pct'] = hedge_cost_pct
+
+            risk_reward_ratio = max_profit_pct / max_loss_pct
+            columns['max_profit_capped'] = capped
+            columns['distance_pct'] = distance_pct
+            columns['breakeven_move_pct'] = breakeven_move_pct
+
+    columns.update({
+        'valid': valid,
+        'style': style,
+        'risk_level': risk_level,
+        'win_probability': win_prob,
+        'max_profit_pct': max_profit_pct.astype(float),
+        'max_loss_pct': max_loss_pct,
+        'risk_reward_ratio': risk_reward_ratio,
+    })
+    return RiskReturnProfiles(strategy, columns, raw_days)
+
+
 def add_profiles_to_options(
     options: list,
     stock_data: Dict[str, Any],
     strategy: str,
-    vrp_analysis: Optional[Dict[str, Any]] = None
+    vrp_analysis: Optional[Dict[str, Any]] = None,
+    simulation=None
 ) -> list:
     """
-    为期权列表批量添加风格标签
+    为期权列表批量添加风格标签（每个期权都生成摘要，列表应只含要返回的期权，如推荐的前 N 个）
 
     Args:
         options: 期权列表
         stock_data: 标的股票数据
         strategy: 策略类型
         vrp_analysis: VRP分析数据
+        simulation: 蒙特卡洛模拟（可选，见 calculate_risk_return_profiles）
 
     Returns:
         添加了风格标签的期权列表
     """
-    result = []
-    for option in options:
-        profile = calculate_risk_return_profile(option, stock_data, strategy, vrp_analysis)
-        option_with_profile = {
+    profiles = calculate_risk_return_profiles(options, stock_data, strategy, vrp_analysis, simulation)
+    return [
+        {
             **option,
-            'risk_return_profile': profile.to_dict()
+            'risk_return_profile': profiles.to_dict(i)
         }
-        result.append(option_with_profile)
-
-    return result
+        for i, option in enumerate(options)
+    ]
 
 
 # ==================== 测试代码 ====================
@@ -9,8 +9,50 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+from .chain_features import Bands, ChainFeatures, maximum
+from .sell_put import liquidity_score
+
 logger = logging.getLogger(__name__)
 
+# 各因子的分段计分表（标量 _score_* 与列式 _batch_scores 共用）
+PREMIUM_YIELD_SCORE = Bands(  # 年化期权费收益率%（Sell Call一般收益率低于Sell Put）
+    (lambda y: y >= 15, 100),
+    (lambda y: y >= 12, lambda y: 85 + (y - 12) * 5),
+    (lambda y: y >= 8, lambda y: 70 + (y - 8) * 3.75),
+    (lambda y: y >= 5, lambda y: 50 + (y - 5) * 6.67),
+    default=lambda y: maximum(0, y * 10),
+)
+RESISTANCE_1_SCORE = Bands(  # 执行价与第一阻力位的距离%，执行价在阻力位附近得分高
+    (lambda d: d <= 2, 100),
+    (lambda d: d <= 5, 80),
+    default=60,
+)
+RESISTANCE_2_MAX_DISTANCE = 5  # 第二阻力位较远时不计入
+RESISTANCE_2_SCORE = Bands(
+    (lambda d: d <= 2, 90),
+    (lambda d: d <= RESISTANCE_2_MAX_DISTANCE, 70),
+    default=0,
+)
+UPSIDE_SCORE = Bands(  # 执行价高于现价的幅度%
+    (lambda u: (3 <= u) & (u <= 10), 80),  # 理想的缓冲区间
+    (lambda u: (0 <= u) & (u < 3), 60),    # 较小缓冲
+    (lambda u: u > 15, 40),                # 缓冲过大，收益率低
+    default=30,
+)
+TIME_DECAY_SCORE = Bands(  # Sell Call策略偏好较短的到期时间以快速获利
+    (lambda d: (15 <= d) & (d <= 30), 100),
+    (lambda d: (7 <= d) & (d < 15), 90),
+    (lambda d: (30 < d) & (d <= 45), lambda d: 80 - (d - 30) * 1.5),
+    (lambda d: d < 7, lambda d: maximum(20, 90 - (7 - d) * 10)),
+    default=lambda d: maximum(30, 80 - (d - 45) * 0.8),
+)
+VOLATILITY_TIMING_SCORE = Bands(  # 隐含波动率高于历史波动率有利于卖方，但过高也要警惕
+    (lambda v: v >= 30, 100),
+    (lambda v: v >= 15, lambda v: 80 + (v - 15) * 1.33),
+    (lambda v: v >= 0, lambda v: 50 + v * 2),
+    default=lambda v: maximum(20, 50 + v * 1.5),
+)
+
 
 class SellCallScorer:
     """卖出看涨期权计分器"""
@@ -27,13 +69,15 @@ class SellCallScorer:
             'volatility_timing': 0.10    # 波动率择时权重
         }
 
-    def score_options(self, options_data: Dict, stock_data: Dict) -> Dict[str, Any]:
+    def score_options(self, options_data: Dict, stock_data: Dict,
+                      features: Optional[ChainFeatures] = None) -> Dict[str, Any]:
         """
         为Sell Call策略计分期权
 
         Args:
             options_data: 期权链数据
             stock_data: 标的股票数据
+            features: 期权链共享特征表（缺省时按需构建）
 
         Returns:
             计分结果
@@ -64,15 +108,14 @@ class SellCallScorer:
                     'error': '无法获取当前股价'
                 }
 
-            # 筛选和计分期权
-            scored_options = []
-            for call_option in calls:
-                score_result = self._score_individual_call(call_option, current_price, stock_data)
-                if score_result and score_result.get('score', 0) > 0:
-                    scored_options.append(score_result)
-
-            # 排序并选择最佳期权
-            scored_options.sort(key=lambda x: x.get('score', 0), reverse=True)
+            # 在共享特征表上批量计分并排序，只为前10个期权生成完整结果
+            if features is None:
+                features = ChainFeatures(options_data, stock_data)
+            scored_options = features.rank(
+                'calls',
+                lambda frame: self._batch_scores(frame, features),
+                lambda call_option: self._score_individual_call(call_option, current_price, stock_data)
+            )
 
             # 生成策略分析
             strategy_analysis = self._generate_strategy_analysis(scored_options, current_price, stock_data)
@@ -179,22 +222,61 @@ class SellCallScorer:
             logger.error(f"单个期权计分失败: {e}")
             return None
 
-    def _score_premium_yield(self, premium_yield: float, days_to_expiry: int) -> float:
-        """计分期权费收益率"""
-        # 年化收益率计算
+    def _batch_scores(self, frame: pd.DataFrame, features: ChainFeatures):
+        """_score_individual_call 加权总分的列式版本（不合格的期权为 NaN）"""
+        current_price = features.current_price
+        historical_vol = features.historical_vol
+        strike = frame['strike'].to_numpy()
+        bid = frame['bid'].to_numpy()
+        ask = frame['ask'].to_numpy()
+        implied_vol = frame['implied_volatility'].to_numpy()
+        days = frame['days_to_expiry'].to_numpy()
+        mid_price = frame['mid_price'].to_numpy()
+        spread_pct = frame['spread_pct'].to_numpy()
+
+        eligible = (strike != 0) & (bid > 0) & (days > 0) & ~(strike < current_price * 0.95)
+
+        premium_yield = (mid_price / current_price) * 100
+        upside_pct = -frame['moneyness_pct'].to_numpy()  # (strike - current_price) / current_price * 100
+
+        scores = {}
+
+        scores['premium_yield'] = self._score_premium_yield(premium_yield, days)
+
+        # 与行权价无关，整条链只算一次
+        scores['overvaluation'] = np.full(len(frame), float(self._score_overvaluation(current_price, features.stock_data)))
+
+        # 阻力位：各项得分的均值
+        resistance_1 = features.sr('resistance_1')
+        resistance_2 = features.sr('resistance_2')
+        level_sum = UPSIDE_SCORE(upside_pct).astype(float)
+        level_count = np.ones(len(frame))
+        if resistance_1:
+            level_sum = level_sum + RESISTANCE_1_SCORE(np.abs(strike - resistance_1) / current_price * 100)
+            level_count += 1
+        if resistance_2:
+            diff_r2 = np.abs(strike - resistance_2) / current_price * 100
+            level_sum = level_sum + RESISTANCE_2_SCORE(diff_r2)
+            level_count += diff_r2 <= RESISTANCE_2_MAX_DISTANCE
+        scores['resistance_level'] = level_sum / level_count
+
+        scores['liquidity'] = np.where((bid <= 0) | (ask <= 0), 0,
+                                       liquidity_score(frame['volume'].to_numpy(),
+                                                       frame['open_interest'].to_numpy(), spread_pct))
+        scores['time_decay'] = self._score_time_decay(days)
+        scores['volatility_timing'] = np.broadcast_to(
+            self._score_volatility_timing(implied_vol, historical_vol), len(frame))
+
+        total_score = sum(
+            scores[factor] * self.weight_config[factor]
+            for factor in scores.keys()
+        )
+        return np.where(eligible, total_score, np.nan)
+
+    def _score_premium_yield(self, premium_yield, days_to_expiry):
+        """计分期权费收益率（按年化收益率）"""
         annualized_yield = (premium_yield / days_to_expiry) * 365
-
-        # 得分标准 (Sell Call一般收益率低于Sell Put)
-        if annualized_yield >= 15:
-            return 100
-        elif annualized_yield >= 12:
-            return 85 + (annualized_yield - 12) * 5
-        elif annualized_yield >= 8:
-            return 70 + (annualized_yield - 8) * 3.75
-        elif annualized_yield >= 5:
-            return 50 + (annualized_yield - 5) * 6.67
-        else:
-            return max(0, annualized_yield * 10)
+        return PREMIUM_YIELD_SCORE(annualized_yield)
 
     def _score_overvaluation(self, current_price: float, stock_data: Dict) -> float:
         """计分股票超买程度"""
@@ -256,31 +338,16 @@ class SellCallScorer:
             scores = []
 
             if resistance_1:
-                diff_r1 = abs(strike - resistance_1) / current_price * 100
-                if diff_r1 <= 2:
-                    scores.append(100)  # 执行价在阻力位附近
-                elif diff_r1 <= 5:
-                    scores.append(80)
-                else:
-                    scores.append(60)
+                scores.append(RESISTANCE_1_SCORE(abs(strike - resistance_1) / current_price * 100))
 
             if resistance_2:
                 diff_r2 = abs(strike - resistance_2) / current_price * 100
-                if diff_r2 <= 2:
-                    scores.append(90)
-                elif diff_r2 <= 5:
-                    scores.append(70)
+                if diff_r2 <= RESISTANCE_2_MAX_DISTANCE:
+                    scores.append(RESISTANCE_2_SCORE(diff_r2))
 
             # 执行价高度分析
             upside_pct = (strike - current_price) / current_price * 100
-            if 3 <= upside_pct <= 10:
-                scores.append(80)  # 理想的缓冲区间
-            elif 0 <= upside_pct < 3:
-                scores.append(60)  # 较小缓冲
-            elif upside_pct > 15:
-                scores.append(40)  # 缓冲过大，收益率低
-            else:
-                scores.append(30)
+            scores.append(UPSIDE_SCORE(upside_pct))
 
             return np.mean(scores) if scores else 60
 
@@ -294,55 +361,19 @@ class SellCallScorer:
             return 0
 
         bid_ask_spread_pct = (ask - bid) / ((ask + bid) / 2) * 100
+        return liquidity_score(volume, open_interest, bid_ask_spread_pct)
 
-        # 成交量得分
-        volume_score = min(50, volume / 10)
-
-        # 持仓量得分
-        oi_score = min(30, open_interest / 50)
-
-        # 价差得分
-        if bid_ask_spread_pct <= 5:
-            spread_score = 20
-        elif bid_ask_spread_pct <= 10:
-            spread_score = 15
-        elif bid_ask_spread_pct <= 20:
-            spread_score = 10
-        else:
-            spread_score = max(0, 10 - (bid_ask_spread_pct - 20) / 2)
-
-        return volume_score + oi_score + spread_score
-
-    def _score_time_decay(self, days_to_expiry: int) -> float:
+    def _score_time_decay(self, days_to_expiry):
         """计分时间衰减优势"""
-        # Sell Call策略偏好较短的到期时间以快速获利
-        if 15 <= days_to_expiry <= 30:
-            return 100
-        elif 7 <= days_to_expiry < 15:
-            return 90
-        elif 30 < days_to_expiry <= 45:
-            return 80 - (days_to_expiry - 30) * 1.5
-        elif days_to_expiry < 7:
-            return max(20, 90 - (7 - days_to_expiry) * 10)
-        else:
-            return max(30, 80 - (days_to_expiry - 45) * 0.8)
+        return TIME_DECAY_SCORE(days_to_expiry)
 
-    def _score_volatility_timing(self, implied_vol: float, historical_vol: float) -> float:
+    def _score_volatility_timing(self, implied_vol, historical_vol: float):
         """计分波动率择时"""
         if historical_vol <= 0:
             return 50
 
         vol_premium = (implied_vol - historical_vol) / historical_vol * 100
-
-        # 隐含波动率高于历史波动率有利于卖方，但过高也要警惕
-        if vol_premium >= 30:
-            return 100
-        elif vol_premium >= 15:
-            return 80 + (vol_premium - 15) * 1.33
-        elif vol_premium >= 0:
-            return 50 + vol_premium * 2
-        else:
-            return max(20, 50 + vol_premium * 1.5)
+        return VOLATILITY_TIMING_SCORE(vol_premium)
 
     def _calculate_assignment_risk(self, current_price: float, strike: float) -> str:
         """计算被指派风险等级"""
@@ -4,13 +4,62 @@ Sell Put 期权策略计分器
 """
 
 import logging
+import math
 from typing import Dict, Any, List, Optional
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+from .chain_features import Bands, ChainFeatures, maximum, minimum
+
 logger = logging.getLogger(__name__)
 
+# 各因子的分段计分表（标量 _score_* 与列式 _batch_scores 共用）
+PREMIUM_YIELD_SCORE = Bands(  # 年化期权费收益率%
+    (lambda y: y >= 20, 100),
+    (lambda y: y >= 15, lambda y: 80 + (y - 15) * 4),
+    (lambda y: y >= 10, lambda y: 60 + (y - 10) * 4),
+    (lambda y: y >= 5, lambda y: 40 + (y - 5) * 4),
+    default=lambda y: maximum(0, y * 8),
+)
+SAFETY_MARGIN_SCORE = Bands(  # 正值表示虚值，安全性高；负值为实值，风险较高
+    (lambda m: m >= 10, 100),
+    (lambda m: m >= 5, lambda m: 80 + (m - 5) * 4),
+    (lambda m: m >= 0, lambda m: 50 + m * 6),
+    default=lambda m: maximum(0, 50 + m * 2),
+)
+DISTANCE_PROBABILITY_SCORE = Bands(  # 无法用 Black-Scholes 估算时按距行权价的距离%
+    (lambda d: d >= 15, 95),
+    (lambda d: d >= 10, 85),
+    (lambda d: d >= 5, 70),
+    (lambda d: d >= 0, 55),
+    default=lambda d: maximum(20, 55 + d * 2),
+)
+SPREAD_SCORE = Bands(  # 买卖价差%
+    (lambda p: p <= 5, 20),
+    (lambda p: p <= 10, 15),
+    (lambda p: p <= 20, 10),
+    default=lambda p: maximum(0, 10 - (p - 20) / 2),
+)
+TIME_DECAY_SCORE = Bands(  # Sell Put策略偏好适中的到期时间
+    (lambda d: (20 <= d) & (d <= 45), 100),
+    (lambda d: (10 <= d) & (d < 20), lambda d: 70 + (d - 10) * 3),
+    (lambda d: (45 < d) & (d <= 90), lambda d: 100 - (d - 45) * 1.5),
+    (lambda d: d < 10, lambda d: maximum(10, 70 - (10 - d) * 6)),
+    default=lambda d: maximum(20, 100 - (d - 90) * 0.5),
+)
+VOLATILITY_PREMIUM_SCORE = Bands(  # 隐含波动率高于历史波动率的幅度%，有利于卖方
+    (lambda v: v >= 20, 100),
+    (lambda v: v >= 10, lambda v: 80 + (v - 10) * 2),
+    (lambda v: v >= 0, lambda v: 50 + v * 3),
+    default=lambda v: maximum(0, 50 + v * 2),
+)
+
+
+def liquidity_score(volume, open_interest, spread_pct):
+    """成交量 + 持仓量 + 价差得分（bid / ask 非正时由调用方记 0 分）"""
+    return minimum(50, volume / 10) + minimum(30, open_interest / 50) + SPREAD_SCORE(spread_pct)
+
 
 class SellPutScorer:
     """卖出看跌期权计分器"""
@@ -27,13 +76,15 @@ class SellPutScorer:
             'volatility_premium': 0.10   # 波动率溢价权重
         }
 
-    def score_options(self, options_data: Dict, stock_data: Dict) -> Dict[str, Any]:
+    def score_options(self, options_data: Dict, stock_data: Dict,
+                      features: Optional[ChainFeatures] = None) -> Dict[str, Any]:
         """
         为Sell Put策略计分期权
 
         Args:
             options_data: 期权链数据
             stock_data: 标的股票数据
+            features: 期权链共享特征表（缺省时按需构建）
 
         Returns:
             计分结果
@@ -64,15 +115,14 @@ class SellPutScorer:
                     'error': '无法获取当前股价'
                 }
 
-            # 筛选和计分期权
-            scored_options = []
-            for put_option in puts:
-                score_result = self._score_individual_put(put_option, current_price, stock_data)
-                if score_result and score_result.get('score', 0) > 0:
-                    scored_options.append(score_result)
-
-            # 排序并选择最佳期权
-            scored_options.sort(key=lambda x: x.get('score', 0), reverse=True)
+            # 在共享特征表上批量计分并排序，只为前10个期权生成完整结果
+            if features is None:
+                features = ChainFeatures(options_data, stock_data)
+            scored_options = features.rank(
+                'puts',
+                lambda frame: self._batch_scores(frame, features),
+                lambda put_option: self._score_individual_put(put_option, current_price, stock_data)
+            )
 
             # 生成策略分析
             strategy_analysis = self._generate_strategy_analysis(scored_options, current_price, stock_data)
@@ -180,35 +230,64 @@ class SellPutScorer:
             logger.error(f"单个期权计分失败: {e}")
             return None
 
-    def _score_premium_yield(self, premium_yield: float, days_to_expiry: int) -> float:
-        """计分期权费收益率"""
-        # 年化收益率计算
+    def _batch_scores(self, frame: pd.DataFrame, features: ChainFeatures):
+        """_score_individual_put 加权总分的列式版本（不合格的期权为 NaN）"""
+        current_price = features.current_price
+        historical_vol = features.historical_vol
+        strike = frame['strike'].to_numpy()
+        bid = frame['bid'].to_numpy()
+        ask = frame['ask'].to_numpy()
+        implied_vol = frame['implied_volatility'].to_numpy()
+        days = frame['days_to_expiry'].to_numpy()
+        mid_price = frame['mid_price'].to_numpy()
+        spread_pct = frame['spread_pct'].to_numpy()
+
+        eligible = (strike != 0) & (bid > 0) & (days > 0) & ~(strike > current_price * 1.05)
+
+        premium_yield = (mid_price / strike) * 100
+        safety_margin = -frame['moneyness_pct'].to_numpy()  # (current_price - strike) / current_price * 100
+
+        scores = {}
+        scores['premium_yield'] = self._score_premium_yield(premium_yield, days)
+        scores['safety_margin'] = self._score_safety_margin(safety_margin)
+        scores['probability_profit'] = self._batch_profit_probability(current_price, strike, implied_vol, days)
+        scores['liquidity'] = np.where((bid <= 0) | (ask <= 0), 0,
+                                       liquidity_score(frame['volume'].to_numpy(),
+                                                       frame['open_interest'].to_numpy(), spread_pct))
+        scores['time_decay'] = self._score_time_decay(days)
+        scores['volatility_premium'] = np.broadcast_to(
+            self._score_volatility_premium(implied_vol, historical_vol), len(frame))
+
+        total_score = sum(
+            scores[factor] * self.weight_config[factor]
+            for factor in scores.keys()
+        )
+        return np.where(eligible, total_score, np.nan)
+
+    def _batch_profit_probability(self, current_price: float, strike: np.ndarray,
+                                  implied_vol: np.ndarray, days_to_expiry: np.ndarray) -> np.ndarray:
+        """_score_profit_probability 的列式版本"""
+        try:
+            from scipy.stats import norm
+        except ImportError:
+            return DISTANCE_PROBABILITY_SCORE((current_price - strike) / current_price * 100)
+
+        t = days_to_expiry / 365
+        # 对数用 math.log 逐个计算：np.log 的 SIMD 实现可能与 libm 相差最后一位
+        log_moneyness = np.array([math.log(ratio) if ratio > 0 else math.nan
+                                  for ratio in (current_price / strike).tolist()])
+        d1 = (log_moneyness + (0.05 + 0.5 * implied_vol ** 2) * t) / (implied_vol * np.sqrt(t))
+        probability = np.minimum(100, norm.cdf(-d1) * 100)
+        return np.where((implied_vol <= 0) | (days_to_expiry <= 0), 50, probability)
+
+    def _score_premium_yield(self, premium_yield, days_to_expiry):
+        """计分期权费收益率（按年化收益率）"""
         annualized_yield = (premium_yield / days_to_expiry) * 365
+        return PREMIUM_YIELD_SCORE(annualized_yield)
 
-        # 得分标准
-        if annualized_yield >= 20:
-            return 100
-        elif annualized_yield >= 15:
-            return 80 + (annualized_yield - 15) * 4
-        elif annualized_yield >= 10:
-            return 60 + (annualized_yield - 10) * 4
-        elif annualized_yield >= 5:
-            return 40 + (annualized_yield - 5) * 4
-        else:
-            return max(0, annualized_yield * 8)
-
-    def _score_safety_margin(self, safety_margin: float) -> float:
+    def _score_safety_margin(self, safety_margin):
         """计分安全边际"""
-        # 正值表示虚值，安全性高
-        if safety_margin >= 10:
-            return 100
-        elif safety_margin >= 5:
-            return 80 + (safety_margin - 5) * 4
-        elif safety_margin >= 0:
-            return 50 + safety_margin * 6
-        else:
-            # 实值期权，风险较高
-            return max(0, 50 + safety_margin * 2)
+        return SAFETY_MARGIN_SCORE(safety_margin)
 
     def _score_profit_probability(self, current_price: float, strike: float,
                                  implied_vol: float, days_to_expiry: int) -> float:
@@ -231,17 +310,7 @@ class SellPutScorer:
 
         except:
             # 简化计算
-            distance_pct = (current_price - strike) / current_price * 100
-            if distance_pct >= 15:
-                return 95
-            elif distance_pct >= 10:
-                return 85
-            elif distance_pct >= 5:
-                return 70
-            elif distance_pct >= 0:
-                return 55
-            else:
-                return max(20, 55 + distance_pct * 2)
+            return DISTANCE_PROBABILITY_SCORE((current_price - strike) / current_price * 100)
 
     def _score_liquidity(self, volume: int, open_interest: int, bid: float, ask: float) -> float:
         """计分流动性"""
@@ -249,55 +318,19 @@ class SellPutScorer:
             return 0
 
         bid_ask_spread_pct = (ask - bid) / ((ask + bid) / 2) * 100
+        return liquidity_score(volume, open_interest, bid_ask_spread_pct)
 
-        # 成交量得分
-        volume_score = min(50, volume / 10)
-
-        # 持仓量得分
-        oi_score = min(30, open_interest / 50)
-
-        # 价差得分
-        if bid_ask_spread_pct <= 5:
-            spread_score = 20
-        elif bid_ask_spread_pct <= 10:
-            spread_score = 15
-        elif bid_ask_spread_pct <= 20:
-            spread_score = 10
-        else:
-            spread_score = max(0, 10 - (bid_ask_spread_pct - 20) / 2)
-
-        return volume_score + oi_score + spread_score
-
-    def _score_time_decay(self, days_to_expiry: int) -> float:
+    def _score_time_decay(self, days_to_expiry):
         """计分时间衰减优势"""
-        # Sell Put策略偏好适中的到期时间
-        if 20 <= days_to_expiry <= 45:
-            return 100
-        elif 10 <= days_to_expiry < 20:
-            return 70 + (days_to_expiry - 10) * 3
-        elif 45 < days_to_expiry <= 90:
-            return 100 - (days_to_expiry - 45) * 1.5
-        elif days_to_expiry < 10:
-            return max(10, 70 - (10 - days_to_expiry) * 6)
-        else:
-            return max(20, 100 - (days_to_expiry - 90) * 0.5)
+        return TIME_DECAY_SCORE(days_to_expiry)
 
-    def _score_volatility_premium(self, implied_vol: float, historical_vol: float) -> float:
+    def _score_volatility_premium(self, implied_vol, historical_vol: float):
         """计分波动率溢价"""
         if historical_vol <= 0:
             return 50
 
         vol_premium = (implied_vol - historical_vol) / historical_vol * 100
-
-        # 隐含波动率高于历史波动率有利于卖方
-        if vol_premium >= 20:
-            return 100
-        elif vol_premium >= 10:
-            return 80 + (vol_premium - 10) * 2
-        elif vol_premium >= 0:
-            return 50 + vol_premium * 3
-        else:
-            return max(0, 50 + vol_premium * 2)
+        return VOLATILITY_PREMIUM_SCORE(vol_premium)
 
     def _calculate_assignment_risk(self, current_price: float, strike: float) -> str:
         """计算被指派风险等级"""
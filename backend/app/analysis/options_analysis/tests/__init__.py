@@ -0,0 +1,3 @@
+"""
+期权分析模块测试
+"""
@@ -0,0 +1,167 @@
+"""
+共享特征表计分交叉校验
+在覆盖各分支（价差、价值状态、delta 缺失/符号、到期时间、支撑/阻力位、
+不规则字段）的随机期权链上，对比 ChainFeatures.rank 与逐个合约的标量计分
+"""
+
+import logging
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.analysis.options_analysis.core.data_fetcher import OptionContracts  # noqa: E402
+from app.analysis.options_analysis.scoring.buy_call import BuyCallScorer  # noqa: E402
+from app.analysis.options_analysis.scoring.buy_put import BuyPutScorer  # noqa: E402
+from app.analysis.options_analysis.scoring.chain_features import ChainFeatures  # noqa: E402
+from app.analysis.options_analysis.scoring.sell_call import SellCallScorer  # noqa: E402
+from app.analysis.options_analysis.scoring.sell_put import SellPutScorer  # noqa: E402
+
+SCORERS = [
+    (SellPutScorer(), 'puts', '_score_individual_put'),
+    (SellCallScorer(), 'calls', '_score_individual_call'),
+    (BuyPutScorer(), 'puts', '_score_individual_put'),
+    (BuyCallScorer(), 'calls', '_score_individual_call'),
+]
+
+PRICE = 100.0
+
+STOCKS = {
+    'levels_near': {
+        'current_price': PRICE, 'volatility_30d': 0.3, 'change_percent': 2.5,
+        'support_resistance': {'support_1': 98.5, 'support_2': 92.0, 'resistance_1': 101.5,
+                               'resistance_2': 104.0, 'high_52w': 103.0, 'low_52w': 70.0},
+    },
+    'levels_far': {
+        'current_price': PRICE, 'volatility_30d': 0.18, 'change_percent': -3.5,
+        'support_resistance': {'support_1': 85.0, 'resistance_1': 125.0, 'high_52w': 140.0, 'low_52w': 95.0},
+    },
+    'no_levels': {'current_price': PRICE, 'volatility_30d': 0.25},
+    'zero_hv': {'current_price': PRICE, 'volatility_30d': 0, 'change_percent': 0.5, 'support_resistance': {}},
+    # 非数值股票级输入：整条链走标量路径
+    'scalar_only': {'current_price': PRICE, 'volatility_30d': None},
+}
+
+
+def build_chain(n=400, seed=11):
+    """随机但可复现的期权链，刻意覆盖边界值"""
+    rng = np.random.default_rng(seed)
+
+    def contract(i, side):
+        strike = float(rng.choice([rng.uniform(60, 140), round(rng.uniform(80, 120)), 95.0, 100.0, 105.0]))
+        bid = float(rng.choice([0.0, rng.uniform(0.05, 12), rng.uniform(0.05, 3)]))
+        ask = bid + float(rng.choice([0.0, rng.uniform(0.01, 0.3), rng.uniform(0.3, 4)]))
+        option = {
+            'symbol': f'X_{side}_{i}',
+            # Tiger 模拟数据的行权价是 np.float64（标量实现中部分得分随之变为 np.float64）
+            'strike': np.float64(strike) if i % 2 else strike,
+            'expiry': '2030-01-18',
+            'bid': round(bid, 2),
+            'ask': round(ask, 2),
+            'volume': int(rng.integers(0, 800)),
+            'open_interest': int(rng.integers(0, 3000)),
+            'implied_volatility': float(rng.choice([0.0, 0.15, 0.2, 0.25, 0.35, rng.uniform(0.05, 0.9)])),
+            'days_to_expiry': int(rng.choice([0, 3, 7, 10, 15, 20, 30, 45, 60, 90, 120, rng.integers(1, 200)])),
+        }
+        delta = rng.choice(['missing', 'none', 'zero', 'pos', 'neg'])
+        if delta == 'none':
+            option['delta'] = None
+        elif delta == 'zero':
+            option['delta'] = 0.0
+        elif delta != 'missing':
+            option['delta'] = float(rng.uniform(0.01, 0.99)) * (1 if delta == 'pos' else -1)
+        return option
+
+    calls = [contract(i, 'C') for i in range(n)]
+    puts = [contract(i, 'P') for i in range(n)]
+    # 不规则合约：走标量路径
+    calls[:4] = [{**calls[0], 'strike': None}, {**calls[1], 'bid': '1.5'},
+                 {**calls[2], 'implied_volatility': float('nan')}, {**calls[3], 'bid': -2.0, 'ask': 1.0}]
+    puts[:3] = [{**puts[0], 'delta': float('nan')}, {**puts[1], 'strike': -5.0}, {**puts[2], 'ask': float('inf')}]
+    return {'success': True, 'symbol': 'TEST', 'calls': calls, 'puts': puts}
+
+
+class TestChainFeatures(unittest.TestCase):
+    """共享特征表上的批量计分与标量实现一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        cls.options_data = build_chain()
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def scalar(self, scorer, side, method, stock_data):
+        """重构前 score_options 的逐个合约计分与排序"""
+        score_one = getattr(scorer, method)
+        scored = []
+        for option in self.options_data[side]:
+            result = score_one(option, stock_data['current_price'], stock_data)
+            if result and result.get('score', 0) > 0:
+                scored.append(result)
+        scored.sort(key=lambda x: x.get('score', 0), reverse=True)
+        return scored
+
+    def test_rank_matches_scalar(self):
+        for stock_name, stock_data in STOCKS.items():
+            features = ChainFeatures(self.options_data, stock_data)
+            for scorer, side, method in SCORERS:
+                with self.subTest(stock=stock_name, strategy=scorer.strategy_name):
+                    expected = self.scalar(scorer, side, method, stock_data)
+                    result = scorer.score_options(self.options_data, stock_data, features)
+
+                    if features.vectorizable:
+                        self.assertGreater(len(expected), 10)
+                    self.assertEqual(result['qualified_options'], len(expected))
+                    self.assertEqual(result['recommendations'], expected[:10])
+                    self.assertEqual(
+                        result['strategy_analysis'],
+                        scorer._generate_strategy_analysis(expected, stock_data['current_price'], stock_data)
+                    )
+
+                    ranked = features.rank(side, lambda frame: scorer._batch_scores(frame, features),
+                                           lambda option: getattr(scorer, method)(
+                                               option, stock_data['current_price'], stock_data))
+                    self.assertEqual([opt['score'] for opt in ranked], [opt['score'] for opt in expected])
+
+    def test_vectorizable(self):
+        self.assertTrue(ChainFeatures(self.options_data, STOCKS['levels_near']).vectorizable)
+        self.assertFalse(ChainFeatures(self.options_data, STOCKS['scalar_only']).vectorizable)
+
+        frame = ChainFeatures(self.options_data, STOCKS['levels_near']).frame('calls')
+        self.assertEqual(frame['regular'].tolist()[:4], [False] * 4)
+        self.assertTrue(frame['regular'].iloc[4:].any())
+
+    def test_option_contracts_frame(self):
+        # OptionContracts 直接用列构建特征表，与逐合约字典构建的结果一致
+        stock_data = STOCKS['levels_near']
+        for side in ('calls', 'puts'):
+            with self.subTest(side=side):
+                contracts = OptionContracts(pd.DataFrame(self.options_data[side]))
+                features = ChainFeatures({side: contracts}, stock_data)
+                from_frame = features.frame(side)
+                if side == 'puts':
+                    self.assertTrue(SellPutScorer().score_options({'success': True, 'puts': contracts},
+                                                                  stock_data, features)['success'])
+                self.assertIsNone(contracts._records)      # 只为需要的合约生成 dict
+                from_dicts = ChainFeatures({side: list(contracts)}, stock_data).frame(side)
+                pd.testing.assert_frame_equal(from_frame, from_dicts)
+
+    def test_default_features(self):
+        # 单策略调用时按需构建特征表
+        stock_data = STOCKS['levels_near']
+        scorer = SellPutScorer()
+        result = scorer.score_options(self.options_data, stock_data)
+        self.assertEqual(result['recommendations'],
+                         self.scalar(scorer, 'puts', '_score_individual_put', stock_data)[:10])
+
+
+if __name__ == '__main__':
+    unittest.main()
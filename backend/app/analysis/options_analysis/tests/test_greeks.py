@@ -0,0 +1,134 @@
+"""
+Black-Scholes 希腊值与隐含波动率反解
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.analysis.options_analysis.core.data_fetcher import OptionContracts, OptionsDataFetcher  # noqa: E402
+from app.analysis.options_analysis.core.greeks import (  # noqa: E402
+    RISK_FREE_RATE,
+    bs_greeks,
+    bs_price,
+    chain_greeks,
+    implied_volatility,
+)
+
+TODAY = date(2030, 1, 1)
+
+
+def random_contracts(n=2000, seed=3):
+    rng = np.random.default_rng(seed)
+    return {
+        'strike': rng.uniform(50, 150, n),
+        't': rng.uniform(1, 400, n) / 365,
+        'sigma': rng.uniform(0.05, 1.5, n),
+        'is_call': rng.random(n) < 0.5,
+    }
+
+
+class TestBlackScholes(unittest.TestCase):
+
+    def test_reference_values(self):
+        # Hull 的标准算例：S=K=100, T=1, r=5%, sigma=20%
+        self.assertAlmostEqual(float(bs_price(100, 100, 1, 0.2, True)), 10.4506, places=4)
+        self.assertAlmostEqual(float(bs_price(100, 100, 1, 0.2, False)), 5.5735, places=4)
+        greeks = bs_greeks(100, 100, 1, 0.2, True)
+        self.assertAlmostEqual(float(greeks['delta']), 0.6368, places=4)
+        self.assertAlmostEqual(float(greeks['gamma']), 0.01876, places=5)
+        self.assertAlmostEqual(float(greeks['vega']), 0.3752, places=4)
+
+    def test_put_call_parity_and_derivatives(self):
+        c = random_contracts()
+        strike, t, sigma = c['strike'], c['t'], c['sigma']
+        call = bs_price(100.0, strike, t, sigma, True)
+        put = bs_price(100.0, strike, t, sigma, False)
+        np.testing.assert_allclose(call - put, 100.0 - strike * np.exp(-RISK_FREE_RATE * t), atol=1e-9)
+
+        greeks = bs_greeks(100.0, strike, t, sigma, c['is_call'])
+        h = 1e-4
+        delta = (bs_price(100.0 + h, strike, t, sigma, c['is_call'])
+                 - bs_price(100.0 - h, strike, t, sigma, c['is_call'])) / (2 * h)
+        vega = (bs_price(100.0, strike, t, sigma + h, c['is_call'])
+                - bs_price(100.0, strike, t, sigma - h, c['is_call'])) / (2 * h) / 100
+        np.testing.assert_allclose(greeks['delta'], delta, atol=1e-6)
+        np.testing.assert_allclose(greeks['vega'], vega, atol=1e-6)
+
+        invalid = bs_greeks(100.0, [100.0, 100.0, -1.0], [0.0, 0.5, 0.5], [0.2, 0.0, 0.2], True)
+        self.assertTrue(np.isnan(invalid['delta']).all())
+
+    def test_implied_volatility_roundtrip(self):
+        c = random_contracts()
+        price = bs_price(100.0, c['strike'], c['t'], c['sigma'], c['is_call'])
+        solved = implied_volatility(price, 100.0, c['strike'], c['t'], c['is_call'])
+
+        # 时间价值接近 0 的深度实值合约无法确定波动率（NaN）；其余都应收敛
+        vega = bs_greeks(100.0, c['strike'], c['t'], c['sigma'], c['is_call'])['vega']
+        sensitive = vega > 1e-3
+        self.assertTrue(np.isfinite(solved[sensitive]).all())
+        np.testing.assert_allclose(solved[sensitive], c['sigma'][sensitive], atol=1e-4)
+
+    def test_implied_volatility_out_of_bounds(self):
+        # 低于内在价值、高于标的价格、到期时间为 0、价格缺失
+        solved = implied_volatility([1.0, 120.0, 5.0, np.nan, 5.0], 100.0, [80.0, 100.0, 100.0, 100.0, 100.0],
+                                    [0.5, 0.5, 0.0, 0.5, 0.5], [True, True, True, True, False])
+        self.assertTrue(np.isnan(solved[:4]).all())
+        self.assertTrue(np.isfinite(solved[4]))
+
+
+class TestChainGreeks(unittest.TestCase):
+
+    def chain(self):
+        return pd.DataFrame({
+            'strike': [90.0, 100.0, 110.0, 100.0],
+            'expiry': ['2030-02-01', '2030-02-01', '2030-03-01', '2030-03-01'],
+            'bid': [11.5, 3.0, 0.0, 2.0],
+            'ask': [12.0, 3.2, 0.0, 2.2],
+            'last_price': [11.8, 3.1, 0.0, 2.1],
+            'implied_volatility': [0.3, 0.25, 0.4, 0.0],
+            'delta': [None, None, None, 0.55],
+            'gamma': [None] * 4,
+            'theta': [None] * 4,
+            'vega': [None] * 4,
+        })
+
+    def test_fills_missing_only(self):
+        filled = chain_greeks(self.chain(), 100.0, is_call=True, today=TODAY)
+        self.assertEqual(filled['delta'].iloc[3], 0.55)      # 数据源提供的值不变
+        self.assertGreater(filled['delta'].iloc[0], filled['delta'].iloc[1])
+        self.assertTrue((filled['theta'] < 0).all())
+        # 无报价：用数据源的隐含波动率
+        expected = bs_greeks(100.0, 110.0, 59 / 365, 0.4, True)['delta']
+        self.assertAlmostEqual(filled['delta'].iloc[2], round(float(expected), 4))
+        # 隐含波动率为 0：用 mid 价反解的值补全
+        self.assertGreater(filled['implied_volatility'].iloc[3], 0)
+        self.assertEqual(filled['implied_volatility'].iloc[:3].tolist(), [0.3, 0.25, 0.4])
+
+    def test_fetcher_fills_chain(self):
+        fetcher = OptionsDataFetcher.__new__(OptionsDataFetcher)
+        frame = self.chain().drop(columns='expiry').assign(days_to_expiry=[31, 31, 59, 59])
+        contracts = frame.to_dict('records')
+        options_data = {'current_price': 100.0, 'calls': OptionContracts(frame), 'puts': contracts}
+        fetcher._fill_greeks(options_data)
+
+        self.assertTrue(all(option['gamma'] is not None for option in options_data['calls']))
+        self.assertTrue(all(option['gamma'] > 0 for option in contracts))
+        self.assertTrue(all(option['delta'] < 0 for option in contracts[:3]))
+        self.assertEqual(contracts[3]['delta'], 0.55)
+
+        # 没有标的价格：不修改
+        untouched = {'calls': [{'strike': 100.0, 'bid': 3.0, 'ask': 3.2, 'days_to_expiry': 30, 'delta': None}]}
+        fetcher._fill_greeks(untouched)
+        self.assertIsNone(untouched['calls'][0]['delta'])
+
+
+if __name__ == '__main__':
+    unittest.main()
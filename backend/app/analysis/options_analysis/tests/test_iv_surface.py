@@ -0,0 +1,110 @@
+"""
+隐含波动率曲面：在已知的微笑 / 期限结构上构建并查询
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.analysis.options_analysis.advanced.iv_surface import IVSurface  # noqa: E402
+from app.analysis.options_analysis.advanced.vrp_calculator import VRPCalculator  # noqa: E402
+from app.analysis.options_analysis.core.data_fetcher import OptionContracts, OptionsDataFetcher  # noqa: E402
+
+SPOT = 100.0
+EXPIRIES = [7, 30, 90]
+
+
+def smile(strike, days):
+    """左偏的微笑，远期波动率更高"""
+    k = np.log(np.asarray(strike) / SPOT)
+    return 0.2 - 0.1 * k + 0.3 * k ** 2 + 0.0005 * np.asarray(days)
+
+
+def chain_frames():
+    strikes = np.linspace(70, 130, 25)
+    frames = {}
+    for side in ('calls', 'puts'):
+        frames[side] = pd.DataFrame([
+            {'strike': k, 'days_to_expiry': d, 'implied_volatility': float(smile(k, d)), 'open_interest': 100}
+            for d in EXPIRIES for k in strikes
+        ])
+    return frames
+
+
+class TestIVSurface(unittest.TestCase):
+
+    def setUp(self):
+        frames = chain_frames()
+        self.surface = IVSurface.from_frames(SPOT, frames['calls'], frames['puts'])
+
+    def test_recovers_smile(self):
+        np.testing.assert_array_equal(self.surface.days, EXPIRIES)
+        strikes = np.array([80.0, 95.0, 100.0, 120.0])
+        for days in EXPIRIES:
+            np.testing.assert_allclose(self.surface.iv_at_strike(strikes, days), smile(strikes, days), atol=2e-4)
+        self.assertAlmostEqual(self.surface.atm_iv(30), 0.215, places=4)
+        self.assertGreater(self.surface.skew(30), 0)   # 看跌一侧更贵
+
+    def test_term_interpolation(self):
+        # 到期日之间按总方差插值：结果位于相邻两个到期日之间
+        iv = self.surface.atm_iv(60)
+        self.assertTrue(self.surface.atm_iv(30) < iv < self.surface.atm_iv(90))
+        expected = np.sqrt((0.215 ** 2 * 30 + (0.245 ** 2 * 90 - 0.215 ** 2 * 30) * 0.5) / 60)
+        self.assertAlmostEqual(iv, expected, places=4)
+        # 超出范围取最近到期日
+        self.assertAlmostEqual(self.surface.atm_iv(1), self.surface.atm_iv(7))
+        self.assertAlmostEqual(self.surface.atm_iv(365), self.surface.atm_iv(90))
+
+    def test_summary(self):
+        summary = self.surface.summary()
+        self.assertEqual(summary['term_shape'], 'contango')
+        self.assertEqual([row['days'] for row in summary['term_structure']], EXPIRIES)
+        self.assertEqual(summary['sample_size'], 150)
+
+    def test_combine_and_invalid_input(self):
+        frames = chain_frames()
+        near = frames['calls'][frames['calls']['days_to_expiry'] == 7]
+        far = frames['calls'][frames['calls']['days_to_expiry'] == 90]
+        combined = IVSurface.combine([IVSurface.from_frames(SPOT, near, None), None,
+                                      IVSurface.from_frames(SPOT, far, None)])
+        np.testing.assert_array_equal(combined.days, [7, 90])
+        self.assertEqual(len(combined.points['iv']), 50)
+
+        self.assertIsNone(IVSurface.build(None, [100.0], [30], [0.2], [True]))
+        self.assertIsNone(IVSurface.build(SPOT, [100.0], [30], [0.0], [True]))
+        self.assertIsNone(IVSurface.combine([None]))
+
+    def test_fetcher_caches_per_snapshot(self):
+        fetcher = OptionsDataFetcher.__new__(OptionsDataFetcher)
+        fetcher.clear_cache()
+        frames = chain_frames()
+        options_data = {'success': True, 'symbol': 'TEST', 'current_price': SPOT, 'timestamp': 't1',
+                        'calls': OptionContracts(frames['calls']), 'puts': frames['puts'].to_dict('records')}
+        surface = fetcher.get_iv_surface(options_data)
+        self.assertIs(fetcher.get_iv_surface(options_data), surface)
+        self.assertIsNot(fetcher.get_iv_surface({**options_data, 'timestamp': 't2'}), surface)
+
+    def test_vrp_metrics_from_surface(self):
+        frames = chain_frames()
+        options_data = {'current_price': SPOT, 'calls': frames['calls'].to_dict('records'),
+                        'puts': frames['puts'].to_dict('records')}
+        calculator = VRPCalculator()
+        legacy = calculator._calculate_implied_volatility_metrics(options_data)
+        metrics = calculator._calculate_implied_volatility_metrics(options_data, self.surface)
+
+        for key in ('average_iv', 'iv_weighted_by_oi', 'call_put_iv_skew', 'sample_size'):
+            self.assertAlmostEqual(metrics[key], legacy[key])
+        self.assertEqual(metrics['iv_range'], legacy['iv_range'])
+        self.assertAlmostEqual(metrics['atm_iv'], 0.215, places=4)
+        self.assertGreater(metrics['iv_skew'], 0)
+        self.assertEqual(len(metrics['term_structure']), len(EXPIRIES))
+
+
+if __name__ == '__main__':
+    unittest.main()
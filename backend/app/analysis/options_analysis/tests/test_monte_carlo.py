@@ -0,0 +1,113 @@
+"""
+蒙特卡洛胜率：与闭式解对照、可复现性、与风格标签的集成
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+from scipy.stats import norm
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.analysis.options_analysis.advanced.monte_carlo import MonteCarloEngine  # noqa: E402
+from app.analysis.options_analysis.core.greeks import RISK_FREE_RATE  # noqa: E402
+from app.analysis.options_analysis.scoring.risk_return_profile import calculate_risk_return_profiles  # noqa: E402
+from app.analysis.options_analysis.tests.test_chain_features import PRICE, build_chain  # noqa: E402
+
+SPOT = 100.0
+
+
+def price_history(n=250, seed=0):
+    rng = np.random.default_rng(seed)
+    close = SPOT * np.exp(np.cumsum(rng.standard_t(4, n) * 0.01))
+    return {'Close': dict(enumerate(close.tolist()))}
+
+
+class TestPriceSimulation(unittest.TestCase):
+
+    def test_gbm_matches_closed_form(self):
+        simulation = MonteCarloEngine(n_paths=200000).simulate({'current_price': SPOT})
+        rng = np.random.default_rng(1)
+        strike = rng.uniform(70, 130, 200)
+        days = rng.integers(1, 365, 200).astype(float)
+        sigma = rng.uniform(0.1, 0.8, 200)
+
+        t = days / 365
+        d2 = (np.log(SPOT / strike) + (RISK_FREE_RATE - 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+        above = simulation.prob_above(strike, days, sigma)
+        np.testing.assert_allclose(above, norm.cdf(d2), atol=0.005)
+        np.testing.assert_allclose(above + simulation.prob_below(strike, days, sigma), 1.0)
+
+        # 无法估算：期限 / 波动率不为正、价格水平不为正
+        invalid = simulation.prob_above([100.0, 100.0, -5.0], [0.0, 30.0, 30.0], [0.2, 0.0, 0.2])
+        self.assertTrue(np.isnan(invalid).all())
+
+    def test_seeded_reproducibility(self):
+        for model in ('gbm', 'bootstrap'):
+            stock_data = {'current_price': SPOT, 'history': price_history()}
+            strike, days, sigma = np.array([90.0, 105.0, 120.0]), np.array([10.0, 45.0, 200.0]), 0.3
+            first = MonteCarloEngine(n_paths=5000, seed=7, model=model).simulate(stock_data)
+            second = MonteCarloEngine(n_paths=5000, seed=7, model=model).simulate(stock_data)
+            other = MonteCarloEngine(n_paths=5000, seed=8, model=model).simulate(stock_data)
+
+            expected = first.prob_above(strike, days, sigma)
+            # bootstrap 的路径按需延长：查询顺序不影响结果
+            self.assertEqual(second.prob_above(strike[2], days[2], sigma), expected[2])
+            np.testing.assert_array_equal(second.prob_above(strike, days, sigma), expected)
+            self.assertFalse(np.array_equal(other.prob_above(strike, days, sigma), expected))
+
+    def test_bootstrap(self):
+        engine = MonteCarloEngine(n_paths=20000, model='bootstrap')
+        simulation = engine.simulate({'current_price': SPOT, 'history': price_history()})
+        self.assertEqual(simulation.model, 'bootstrap')
+        probabilities = simulation.prob_above([80.0, 100.0, 120.0], 60)
+        self.assertTrue(np.all(np.diff(probabilities) < 0))
+        self.assertAlmostEqual(probabilities[1], 0.5, delta=0.05)
+
+        # 历史数据不足退回 gbm；标的价格无效时不模拟
+        short = {'current_price': SPOT, 'history': {'Close': {0: 100.0, 1: 101.0}}}
+        self.assertEqual(engine.simulate(short).model, 'gbm')
+        self.assertIsNone(engine.simulate({'current_price': None}))
+        with self.assertRaises(ValueError):
+            MonteCarloEngine(model='heston')
+
+
+class TestChainWinProbabilities(unittest.TestCase):
+
+    def setUp(self):
+        self.options_data = build_chain()
+        self.stock_data = {'current_price': PRICE}
+        self.simulation = MonteCarloEngine(n_paths=20000).simulate(self.stock_data)
+
+    def test_all_strategies_one_pass(self):
+        result = self.simulation.chain_win_probabilities(self.options_data)
+        self.assertEqual(set(result), {'sell_put', 'sell_call', 'buy_call', 'buy_put'})
+        self.assertEqual(len(result['sell_put']), len(self.options_data['puts']))
+        self.assertEqual(len(result['buy_call']), len(self.options_data['calls']))
+        # 有正常报价的合约：买方的盈亏平衡价比卖方的行权价更远
+        quoted = np.array([isinstance(c.get('bid'), float) and isinstance(c.get('ask'), float)
+                           and 0 < c['bid'] <= c['ask'] for c in self.options_data['calls']])
+        both = quoted & np.isfinite(result['sell_call']) & np.isfinite(result['buy_call'])
+        self.assertGreater(both.sum(), 0)
+        self.assertTrue(np.all(result['buy_call'][both] <= 1 - result['sell_call'][both] + 1e-12))
+
+    def test_profiles_use_simulation(self):
+        options = self.options_data['puts']
+        closed_form = calculate_risk_return_profiles(options, self.stock_data, 'sell_put')
+        simulated = calculate_risk_return_profiles(options, self.stock_data, 'sell_put', simulation=self.simulation)
+
+        frame = simulated.frame
+        rows = frame.index[frame['valid']]
+        self.assertGreater(len(rows), 0)
+        self.assertTrue(frame.loc[rows, 'win_probability'].between(0.30, 0.95).all())
+        self.assertFalse(np.allclose(frame.loc[rows, 'win_probability'],
+                                     closed_form.frame.loc[rows, 'win_probability']))
+        # 风格等其余字段不受影响
+        self.assertEqual(frame.loc[rows, 'style'].tolist(), closed_form.frame.loc[rows, 'style'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
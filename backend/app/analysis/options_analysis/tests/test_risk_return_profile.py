@@ -0,0 +1,112 @@
+"""
+批量风险收益风格标签
+在 test_chain_features 的随机期权链（含不规则字段）上，整条链的批量结果与逐个期权的
+calculate_risk_return_profile 一致（各行互不影响），且不产生 RuntimeWarning
+"""
+
+import logging
+import os
+import sys
+import unittest
+import warnings
+
+import numpy as np
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.analysis.options_analysis.scoring.risk_return_profile import (  # noqa: E402
+    _create_default_profile,
+    add_profiles_to_options,
+    calculate_risk_return_profile,
+    calculate_risk_return_profiles,
+)
+from app.analysis.options_analysis.tests.test_chain_features import PRICE, build_chain  # noqa: E402
+
+STRATEGIES = {'sell_put': 'puts', 'sell_call': 'calls', 'buy_put': 'puts', 'buy_call': 'calls'}
+
+VRP_LEVELS = [None, {'vrp_level': 'very_high'}, {'vrp_level': 'high'}, {'vrp_level': 'low'},
+              {'vrp_level': 'very_low'}]
+
+
+class TestRiskReturnProfiles(unittest.TestCase):
+    """整条链的风格标签与逐个计算一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        cls.options_data = build_chain()
+        # 字段缺省/别名：bid_price、mid_price、impliedVolatility、无 days_to_expiry
+        for option in cls.options_data['calls'][4:12]:
+            option['bid_price'] = option.pop('bid')
+            option['impliedVolatility'] = option.pop('implied_volatility')
+            option.pop('days_to_expiry')
+        for option in cls.options_data['puts'][3:8]:
+            option['mid_price'] = 1.2
+            option['ask'] = 0
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def assertProfilesMatch(self, options, stock_data, strategy, vrp):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            profiles = calculate_risk_return_profiles(options, stock_data, strategy, vrp)
+            self.assertEqual(len(profiles), len(options))
+            for i, option in enumerate(options):
+                expected = calculate_risk_return_profile(option, stock_data, strategy, vrp).to_dict()
+                # repr：区分整数/浮点（如封顶后的 500 与 500.0）
+                self.assertEqual(repr(profiles.to_dict(i)), repr(expected), msg=f'{strategy} #{i}')
+
+    def test_matches_scalar(self):
+        stock_data = {'current_price': PRICE}
+        for strategy, side in STRATEGIES.items():
+            for vrp in VRP_LEVELS:
+                with self.subTest(strategy=strategy, vrp=vrp):
+                    self.assertProfilesMatch(self.options_data[side], stock_data, strategy, vrp)
+
+    def test_known_profiles(self):
+        stock_data = {'current_price': 180.0}
+        cases = [
+            ('sell_put', {'strike': 170, 'bid': 2.5, 'ask': 2.8, 'days_to_expiry': 30, 'implied_volatility': 0.28},
+             ('balanced', 'moderate', 0.79, 1.56, 98.44), '胜率79%，收益1.6%，30天到期，风险收益均衡'),
+            ('sell_call', {'strike': 200, 'bid': 1.5, 'ask': 1.8, 'days_to_expiry': 30, 'implied_volatility': 0.30},
+             ('balanced', 'moderate', 0.87, 0.92, 100), '胜率约87%，年化收益11%，虚值11.1%'),
+            ('buy_put', {'strike': 175, 'bid': 3.0, 'ask': 3.3, 'days_to_expiry': 45, 'implied_volatility': 0.25},
+             ('hedge', 'low', 0.26, 100, 100), '保护成本1.7%，下跌超过4.5%开始获利'),
+        ]
+        for strategy, option, expected, summary_cn in cases:
+            profile = calculate_risk_return_profile(option, stock_data, strategy)
+            self.assertEqual((profile.style, profile.risk_level, profile.win_probability,
+                              profile.max_profit_pct, profile.max_loss_pct), expected, msg=strategy)
+            self.assertEqual(profile.summary_cn, summary_cn)
+
+    def test_default_profiles(self):
+        # 股票价格缺失/非数值、未知策略、卖方剩余 0 天（年化收益除零）：默认标签
+        options = self.options_data['puts'][:20]
+        for stock_data in ({}, {'current_price': None}, {'current_price': -1.0}):
+            self.assertProfilesMatch(options, stock_data, 'sell_put', None)
+            self.assertEqual(calculate_risk_return_profile(options[5], stock_data, 'sell_put'),
+                             _create_default_profile('sell_put'))
+        self.assertProfilesMatch(options, {'current_price': PRICE}, 'iron_condor', None)
+        self.assertEqual(len(calculate_risk_return_profiles([], {'current_price': PRICE}, 'sell_put')), 0)
+
+        expiring = {'strike': np.float64(95.0), 'bid': 1.0, 'ask': 1.2, 'days_to_expiry': 0, 'implied_volatility': 0.3}
+        for strategy in ('sell_put', 'sell_call'):
+            self.assertEqual(calculate_risk_return_profile(expiring, {'current_price': PRICE}, strategy),
+                             _create_default_profile(strategy))
+
+    def test_add_profiles_to_options(self):
+        options = self.options_data['calls'][:30]
+        stock_data = {'current_price': PRICE}
+        result = add_profiles_to_options(options, stock_data, 'buy_call')
+        self.assertEqual([{k: v for k, v in opt.items() if k != 'risk_return_profile'} for opt in result], options)
+        self.assertEqual(
+            [opt['risk_return_profile'] for opt in result],
+            [calculate_risk_return_profile(opt, stock_data, 'buy_call').to_dict() for opt in options]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
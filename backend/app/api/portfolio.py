@@ -1,15 +1,51 @@
 from flask import Blueprint, request, jsonify, g
 from ..models import db, PortfolioHolding, DailyProfitLoss, StyleProfit, PortfolioRebalance
-from ..utils.serialization import convert_numpy_types
-from ..scheduler import get_exchange_rates, convert_to_usd
-import yfinance as yf
+from ..scheduler import get_exchange_rates, convert_to_usd, get_current_stock_prices
+from ..utils.response_cache import ResponseCache
+from ..config import Config
 import logging
 from datetime import datetime, timedelta, date
-from sqlalchemy import func, desc, text
+from sqlalchemy import event, func, desc, text
+from sqlalchemy.orm import Session
 
 portfolio_bp = Blueprint('portfolio', __name__, url_prefix='/api/portfolio')
 logger = logging.getLogger(__name__)
 
+STYLES = ['quality', 'value', 'growth', 'momentum']
+
+# 公开组合数据（user_id=None）对所有访客相同：响应预先序列化（带 ETag），
+# 持仓 / 每日收益 / 风格收益 / 调仓记录提交后失效；持仓响应含实时价格，单独设置较短 TTL。
+# 缓存目录由所有 worker 和调仓脚本共享，任一进程提交后其他进程在下次请求时丢弃旧数据
+PORTFOLIO_CACHE_TTL = Config.PORTFOLIO_CACHE_TTL
+HOLDINGS_CACHE_TTL = Config.PORTFOLIO_HOLDINGS_CACHE_TTL
+portfolio_cache = ResponseCache('portfolio_responses', ttl=PORTFOLIO_CACHE_TTL,
+                                directory=Config.PORTFOLIO_CACHE_DIR)
+
+_PORTFOLIO_MODELS = (PortfolioHolding, DailyProfitLoss, StyleProfit, PortfolioRebalance)
+
+
+def invalidate_portfolio_cache():
+    portfolio_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_portfolio_changes(session, flush_context):
+    changed = (session.new, session.dirty, session.deleted)
+    if any(isinstance(obj, _PORTFOLIO_MODELS) for objects in changed for obj in objects):
+        session.info['portfolio_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    # 提交后才失效，避免并发请求用未提交的旧数据重新填充缓存
+    if session.info.pop('portfolio_changed', False):
+        invalidate_portfolio_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_portfolio_changes(session):
+    session.info.pop('portfolio_changed', None)
+
 @portfolio_bp.route('/update-holding-dates', methods=['POST'])
 def update_holding_dates():
     """
@@ -30,6 +66,7 @@ def update_holding_dates():
         )
         updated_count = result.rowcount
         db.session.commit()
+        invalidate_portfolio_cache()  # raw SQL bypasses the session change tracking
         
         logger.info(f"Updated {updated_count} holdings' created_at to 2026-01-01")
         
@@ -69,66 +106,114 @@ def get_portfolio_holdings():
         }
     }
     """
+    return portfolio_cache.respond('holdings', _build_holdings_response, ttl=HOLDINGS_CACHE_TTL,
+                                   cache_if=lambda payload, status: status == 200 and 'message' not in payload)
+
+
+def _holdings_snapshot():
+    """持仓、风格收益和图表数据的数据库快照，与缓存的响应一同失效"""
+    return portfolio_cache.memo('holdings-snapshot', _load_holdings_snapshot)
+
+
+def _load_holdings_snapshot():
+    holdings = [
+        {'ticker': h.ticker, 'name': h.name, 'shares': h.shares, 'buy_price': h.buy_price,
+         'style': h.style.lower(), 'currency': h.currency}
+        for h in PortfolioHolding.query.all() if h.style.lower() in STYLES
+    ]
+
+    # Latest and previous profit percent per style from database
+    style_profit = {}
+    for style in STYLES:
+        latest_two = StyleProfit.query.filter_by(style=style).order_by(
+            desc(StyleProfit.trading_date)
+        ).limit(2).all()
+        percents = [record.style_profit_loss_percent for record in latest_two] + [None, None]
+        style_profit[style] = (percents[0], percents[1])
+
+    return {'holdings': holdings, 'style_profit': style_profit, 'chart_data': _chart_data()}
+
+
+def _chart_data():
+    """Historical data for chart (last 30 days)"""
+    chart_data = []
     try:
-        logger.info("Fetching portfolio holdings data")
-
-        # Get all portfolio holdings grouped by style
-        holdings = PortfolioHolding.query.all()
-        holdings_by_style = {
-            'quality': [],
-            'value': [],
-            'growth': [],
-            'momentum': []
-        }
+        # Query last 30 days of style profits
+        thirty_days_ago = datetime.now().date() - timedelta(days=30)
+        historical_data = db.session.query(StyleProfit).filter(
+            StyleProfit.trading_date >= thirty_days_ago
+        ).order_by(StyleProfit.trading_date).all()
+
+        # Group by date
+        chart_data_dict = {}
+        for record in historical_data:
+            date_str = record.trading_date.strftime('%Y-%m-%d')
+            if date_str not in chart_data_dict:
+                chart_data_dict[date_str] = {}
+            chart_data_dict[date_str][record.style] = record.style_profit_loss_percent
 
-        # Current prices cache
-        price_cache = {}
-
-        # Group holdings by style and get current prices
-        for holding in holdings:
-            if holding.style.lower() not in holdings_by_style:
-                continue
-
-            # Get current price from yfinance
-            current_price = holding.buy_price  # Default to buy price
-            try:
-                if holding.ticker not in price_cache:
-                    ticker_obj = yf.Ticker(holding.ticker)
-                    info = ticker_obj.info
-                    current_price = info.get('currentPrice', info.get('regularMarketPrice', holding.buy_price))
-                    price_cache[holding.ticker] = current_price
-                else:
-                    current_price = price_cache[holding.ticker]
-            except Exception as e:
-                logger.warning(f"Could not get current price for {holding.ticker}: {e}")
-                current_price = holding.buy_price
+        # Convert to chart format
+        for date_str in sorted(chart_data_dict.keys()):
+            chart_data.append({
+                'date': date_str,
+                'quality': chart_data_dict[date_str].get('quality', 0),
+                'value': chart_data_dict[date_str].get('value', 0),
+                'growth': chart_data_dict[date_str].get('growth', 0),
+                'momentum': chart_data_dict[date_str].get('momentum', 0)
+            })
+
+    except Exception as e:
+        logger.warning(f"Could not get historical chart data: {e}")
+        # Fallback to mock data
+        chart_data = [
+            {'date': f"2025-01-{i:02d}", 'quality': 10 + i*0.4, 'value': 5 + i*0.2,
+             'growth': 8 + i*0.6, 'momentum': 12 + i*0.8}
+            for i in range(1, 31)
+        ]
+    return chart_data
+
+
+def _build_holdings_response():
+    """Holdings snapshot priced at current quotes -> (payload, status)"""
+    try:
+        logger.info("Building portfolio holdings data")
+
+        snapshot = _holdings_snapshot()
+        holdings_by_style = {style: [] for style in STYLES}
+
+        # Current prices for all holdings (batched Tiger quotes, yfinance fallback)
+        current_prices = get_current_stock_prices(h['ticker'] for h in snapshot['holdings'])
+
+        # Group holdings by style
+        for holding in snapshot['holdings']:
+            buy_price = holding['buy_price']
+            current_price = current_prices.get(holding['ticker'], buy_price)  # Default to buy price
 
             # Calculate profit
-            profit_amount = (current_price - holding.buy_price) * holding.shares
-            profit_percent = ((current_price - holding.buy_price) / holding.buy_price) * 100
+            profit_amount = (current_price - buy_price) * holding['shares']
+            profit_percent = ((current_price - buy_price) / buy_price) * 100
 
             holding_data = {
-                'ticker': holding.ticker,
-                'name': holding.name,
-                'shares': holding.shares,
-                'cost': holding.buy_price,
+                'ticker': holding['ticker'],
+                'name': holding['name'],
+                'shares': holding['shares'],
+                'cost': buy_price,
                 'current': current_price,
                 'market': 'US',  # You can enhance this based on ticker format
                 'profit_amount': profit_amount,
                 'profit_percent': profit_percent,
-                'currency': holding.currency
+                'currency': holding['currency']
             }
 
-            holdings_by_style[holding.style.lower()].append(holding_data)
+            holdings_by_style[holding['style']].append(holding_data)
 
         # Get exchange rates for currency conversion
         exchange_rates = get_exchange_rates()
 
         # Get style statistics from latest daily data
         style_stats = {}
-        styles = ['quality', 'value', 'growth', 'momentum']
 
-        for style in styles:
+        for style in STYLES:
             # Calculate current values from holdings first (most accurate)
             # IMPORTANT: Convert all holdings to USD before summing
             holdings_for_style = holdings_by_style[style]
@@ -152,25 +237,17 @@ def get_portfolio_holdings():
             else:
                 current_profit_percent = 0.0
 
-            # Get latest profit data for this style from database
-            latest_style_profit = StyleProfit.query.filter_by(style=style).order_by(
-                desc(StyleProfit.trading_date)
-            ).first()
-
-            # Get yesterday's data for comparison
-            yesterday_style_profit = StyleProfit.query.filter_by(style=style).order_by(
-                desc(StyleProfit.trading_date)
-            ).offset(1).first()
+            # Latest and yesterday's profit percent for this style (database snapshot)
+            latest_percent, yesterday_percent = snapshot['style_profit'][style]
 
             # Calculate daily change
             daily_change = 0.0
-            if latest_style_profit and yesterday_style_profit:
+            if latest_percent is not None and yesterday_percent is not None:
                 # Use database values if available
-                daily_change = (latest_style_profit.style_profit_loss_percent -
-                              yesterday_style_profit.style_profit_loss_percent)
-            elif latest_style_profit:
+                daily_change = latest_percent - yesterday_percent
+            elif latest_percent is not None:
                 # If only one day of data, compare with current calculated value
-                daily_change = current_profit_percent - latest_style_profit.style_profit_loss_percent
+                daily_change = current_profit_percent - latest_percent
 
             # Always use real-time calculated values for accuracy
             # Database values may be stale or inaccurate
@@ -185,57 +262,18 @@ def get_portfolio_holdings():
                 'investment': investment
             }
 
-        # Get historical data for chart (last 30 days)
-        chart_data = []
-        try:
-            # Query last 30 days of style profits
-            thirty_days_ago = datetime.now().date() - timedelta(days=30)
-            historical_data = db.session.query(StyleProfit).filter(
-                StyleProfit.trading_date >= thirty_days_ago
-            ).order_by(StyleProfit.trading_date).all()
-
-            # Group by date
-            chart_data_dict = {}
-            for record in historical_data:
-                date_str = record.trading_date.strftime('%Y-%m-%d')
-                if date_str not in chart_data_dict:
-                    chart_data_dict[date_str] = {}
-                chart_data_dict[date_str][record.style] = record.style_profit_loss_percent
-
-            # Convert to chart format
-            for date_str in sorted(chart_data_dict.keys()):
-                chart_data.append({
-                    'date': date_str,
-                    'quality': chart_data_dict[date_str].get('quality', 0),
-                    'value': chart_data_dict[date_str].get('value', 0),
-                    'growth': chart_data_dict[date_str].get('growth', 0),
-                    'momentum': chart_data_dict[date_str].get('momentum', 0)
-                })
-
-        except Exception as e:
-            logger.warning(f"Could not get historical chart data: {e}")
-            # Fallback to mock data
-            chart_data = [
-                {'date': f"2025-01-{i:02d}", 'quality': 10 + i*0.4, 'value': 5 + i*0.2,
-                 'growth': 8 + i*0.6, 'momentum': 12 + i*0.8}
-                for i in range(1, 31)
-            ]
-
         response_data = {
             'holdings_by_style': holdings_by_style,
             'style_stats': style_stats,
-            'chart_data': chart_data
+            'chart_data': snapshot['chart_data']
         }
 
-        # Convert numpy types for JSON serialization
-        clean_data = convert_numpy_types(response_data)
-
-        logger.info(f"Successfully retrieved portfolio data for {len(holdings)} holdings")
+        logger.info(f"Successfully built portfolio data for {len(snapshot['holdings'])} holdings")
 
-        return jsonify({
+        return {
             'success': True,
-            'data': clean_data
-        })
+            'data': response_data
+        }, 200
 
     except Exception as e:
         logger.error(f"Error fetching portfolio holdings: {e}")
@@ -272,23 +310,27 @@ def get_portfolio_holdings():
             ]
         }
 
-        return jsonify({
+        return {
             'success': True,
             'data': fallback_data,
             'message': 'Using fallback data due to error'
-        })
+        }, 200
 
 @portfolio_bp.route('/daily-stats', methods=['GET'])
 def get_daily_portfolio_stats():
     """
     Get daily portfolio statistics
     """
+    return portfolio_cache.respond('daily-stats', _build_daily_stats)
+
+
+def _build_daily_stats():
     try:
         # Get latest daily profit/loss data
         latest_daily = DailyProfitLoss.query.order_by(desc(DailyProfitLoss.trading_date)).first()
 
         if latest_daily:
-            return jsonify({
+            return {
                 'success': True,
                 'data': {
                     'total_investment': latest_daily.total_actual_investment,
@@ -297,9 +339,9 @@ def get_daily_portfolio_stats():
                     'total_profit_loss_percent': latest_daily.total_profit_loss_percent,
                     'trading_date': latest_daily.trading_date.isoformat()
                 }
-            })
+            }, 200
         else:
-            return jsonify({
+            return {
                 'success': True,
                 'data': {
                     'total_investment': 1000000,
@@ -308,11 +350,11 @@ def get_daily_portfolio_stats():
                     'total_profit_loss_percent': 15.0,
                     'trading_date': datetime.now().date().isoformat()
                 }
-            })
+            }, 200
 
     except Exception as e:
         logger.error(f"Error fetching daily stats: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return {'success': False, 'error': str(e)}, 500
 
 @portfolio_bp.route('/profit-loss/history', methods=['GET'])
 def get_profit_loss_history():
@@ -323,7 +365,13 @@ def get_profit_loss_history():
     """
     try:
         days = min(int(request.args.get('days', 30)), 365)  # Max 365 days
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return portfolio_cache.respond(('profit-loss-history', days), lambda: _build_profit_loss_history(days))
+
 
+def _build_profit_loss_history(days):
+    try:
         logger.info(f"Fetching profit/loss history for {days} days")
 
         # Get daily profit/loss records for the specified period
@@ -416,21 +464,18 @@ def get_profit_loss_history():
             'total_records': len(history_data)
         }
 
-        # Convert numpy types for JSON serialization
-        clean_data = convert_numpy_types(response_data)
-
         logger.info(f"Successfully retrieved {len(history_data)} profit/loss history records")
 
-        return jsonify({
+        return {
             'success': True,
-            'data': clean_data
-        })
+            'data': response_data
+        }, 200
 
     except Exception as e:
         logger.error(f"Error fetching profit/loss history: {e}")
         import traceback
         logger.error(f"Full traceback: {traceback.format_exc()}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return {'success': False, 'error': str(e)}, 500
 
 @portfolio_bp.route('/rebalance-history', methods=['GET'])
 def get_rebalance_history():
@@ -438,6 +483,10 @@ def get_rebalance_history():
     Get portfolio rebalancing history (every 2 weeks)
     Returns list of rebalances with changes and P/L after each rebalance
     """
+    return portfolio_cache.respond('rebalance-history', _build_rebalance_history)
+
+
+def _build_rebalance_history():
     try:
         # Get all rebalances ordered by date (newest first)
         rebalances = PortfolioRebalance.query.order_by(
@@ -462,17 +511,17 @@ def get_rebalance_history():
                 'notes': rebalance.notes
             })
         
-        return jsonify({
+        return {
             'success': True,
             'data': rebalance_list
-        })
+        }, 200
         
     except Exception as e:
         logger.error(f"Error fetching rebalance history: {e}")
         # If table doesn't exist yet, return empty list
         if 'does not exist' in str(e).lower() or 'no such table' in str(e).lower():
-            return jsonify({
+            return {
                 'success': True,
                 'data': []
-            })
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+            }, 200
+        return {'success': False, 'error': str(e)}, 500
\ No newline at end of file
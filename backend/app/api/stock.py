@@ -1,11 +1,14 @@
-from flask import Blueprint, request, jsonify, g
-from ..services import analysis_engine, ev_model, ai_service
+from flask import Blueprint, request, jsonify, g, current_app
+from ..services import analysis_engine, ev_model, ai_service, screener
 from ..services.task_queue import create_analysis_task, get_task_status
 from ..utils.auth import require_auth, get_user_id
 from ..utils.decorators import check_quota, db_retry
 from ..utils.serialization import convert_numpy_types
 from ..models import db, ServiceType, StockAnalysisHistory, TaskType
+from ..utils.cache import TTLCache
+from ..config import Config
 import yfinance as yf
+import copy
 import logging
 import json
 from datetime import datetime
@@ -13,6 +16,120 @@ from datetime import datetime
 stock_bp = Blueprint('stock', __name__, url_prefix='/api/stock')
 logger = logging.getLogger(__name__)
 
+# 量化分析结果（行情 + 风险/情绪/目标价/止损/EV）按 (ticker, style) 缓存，开盘前由预热任务写入热门股票。
+# 默认关闭（QUANT_ANALYSIS_CACHE_TTL=0）：开启后付费分析可能使用该时长之前计算的量化结果
+QUANT_ANALYSIS_CACHE_ENABLED = Config.QUANT_ANALYSIS_CACHE_TTL > 0
+quant_analysis_cache = TTLCache(maxsize=1000, ttl=Config.QUANT_ANALYSIS_CACHE_TTL, name='quant_analysis')
+
+
+def get_quant_analysis(ticker: str, style: str = 'quality', refresh: bool = False) -> dict:
+    """
+    Market data + quant analysis (steps 1-4.6 of get_stock_analysis_data), without AI
+
+    Returns:
+        {'data': market_data, 'risk': risk_result} or error dictionary.
+        The result is a copy; callers may modify it freely.
+        refresh=True recomputes the analysis (market data still comes from its own cache).
+        Results are only cached when QUANT_ANALYSIS_CACHE_TTL > 0.
+    """
+    key = (analysis_engine.normalize_ticker(ticker), style)
+    if QUANT_ANALYSIS_CACHE_ENABLED and not refresh:
+        cached = quant_analysis_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+    # 1. Get Market Data
+    market_data = analysis_engine.get_market_data(ticker)
+    if not market_data or not market_data.get('price'):
+        return {'error': f'找不到股票代码 "{ticker}" 或数据获取失败'}
+
+    # 2. Risk Analysis (Matching original: analyze_risk_and_position)
+    try:
+        risk_result = analysis_engine.analyze_risk_and_position(style, market_data)
+    except Exception as e:
+        logger.error(f"计算风险评分时发生异常: {e}")
+        return {'error': f'风险计算失败: {str(e)}'}
+
+    # 3. Calculate Market Sentiment (Matching original)
+    try:
+        market_sentiment = analysis_engine.calculate_market_sentiment(market_data)
+        market_data['market_sentiment'] = market_sentiment
+    except Exception as e:
+        logger.warning(f"计算市场情绪时发生异常: {e}")
+        market_data['market_sentiment'] = 5.0  # Default value
+
+    # 4. Calculate Target Price (Matching original)
+    try:
+        target_price = analysis_engine.calculate_target_price(market_data, risk_result, style)
+        market_data['target_price'] = target_price
+        
+        # 根据目标价格和当前价格动态调整仓位
+        current_price = market_data.get('price', 0)
+        upside_pct = analysis_engine.apply_target_price_adjustment(risk_result, current_price, target_price)
+        if upside_pct is not None:
+            if upside_pct < 0:
+                logger.info(f"目标价({target_price:.2f})低于当前价({current_price:.2f})，建议仓位调整为0%")
+            logger.info(f"价格调整: 当前价={current_price:.2f}, 目标价={target_price:.2f}, 上涨空间={upside_pct:.2%}, 仓位调整系数={risk_result['price_adjustment']:.2f}, 最终仓位={risk_result['suggested_position']:.1f}%")
+    except Exception as e:
+        logger.warning(f"计算目标价格时发生异常: {e}")
+        market_data['target_price'] = market_data.get('price', 0)  # Default to current price
+
+    # 4.5 Calculate Dynamic Stop Loss (Matching original - ATR based)
+    try:
+        # Get 1-month history for ATR calculation
+        normalized_ticker = analysis_engine.normalize_ticker(ticker)
+        stock = yf.Ticker(normalized_ticker)
+        hist = stock.history(period="1mo", timeout=10)
+
+        if not hist.empty and len(hist) >= 15:
+            # Use ATR dynamic stop loss
+            stop_loss_price = analysis_engine.calculate_atr_stop_loss(
+                buy_price=market_data['price'],
+                hist_data=hist,
+                atr_period=14,
+                atr_multiplier=2.5,
+                min_stop_loss_pct=0.05,
+                beta=market_data.get('beta')
+            )
+            market_data['stop_loss_price'] = stop_loss_price
+            market_data['stop_loss_method'] = 'ATR动态止损'
+        else:
+            # Fallback to fixed stop loss
+            stop_loss_price = market_data['price'] * 0.85
+            market_data['stop_loss_price'] = stop_loss_price
+            market_data['stop_loss_method'] = '固定15%止损（数据不足）'
+    except Exception as e:
+        logger.warning(f"计算止损价格时发生异常: {e}")
+        # Fallback to fixed stop loss
+        stop_loss_price = market_data.get('price', 0) * 0.85
+        market_data['stop_loss_price'] = stop_loss_price
+        market_data['stop_loss_method'] = '固定15%止损（计算失败）'
+
+    # 4.6 Calculate EV Model (Matching original)
+    try:
+        ev_result = ev_model.calculate_ev_model(market_data, risk_result, style)
+        market_data['ev_model'] = ev_result
+        logger.info(f"EV模型计算完成: {ticker}, 加权EV={ev_result.get('ev_weighted_pct', 0):.2f}%")
+    except Exception as e:
+        logger.warning(f"计算EV模型时发生异常: {e}")
+        market_data['ev_model'] = {
+            'error': str(e),
+            'ev_weighted': 0.0,
+            'ev_weighted_pct': 0.0,
+            'ev_score': 5.0,
+            'recommendation': {
+                'action': 'HOLD',
+                'reason': 'EV模型计算失败',
+                'confidence': 'low'
+            }
+        }
+
+    result = {'data': market_data, 'risk': risk_result}
+    if QUANT_ANALYSIS_CACHE_ENABLED:
+        quant_analysis_cache.set(key, copy.deepcopy(result))
+    return result
+
+
 def get_stock_analysis_data(ticker: str, style: str = 'quality', only_history: bool = False) -> dict:
     """
     Core stock analysis logic extracted for reuse in async tasks
@@ -26,122 +143,18 @@ def get_stock_analysis_data(ticker: str, style: str = 'quality', only_history: b
         Analysis result dictionary or error dictionary
     """
     try:
-        # 1. Get Market Data
-        market_data = analysis_engine.get_market_data(ticker, onlyHistoryData=only_history)
-        if not market_data or not market_data.get('price'):
-            return {'error': f'找不到股票代码 "{ticker}" 或数据获取失败'}
-
         # If only requesting history data (e.g. for charts)
         if only_history:
+            market_data = analysis_engine.get_market_data(ticker, onlyHistoryData=True)
+            if not market_data or not market_data.get('price'):
+                return {'error': f'找不到股票代码 "{ticker}" 或数据获取失败'}
             return market_data
 
-        # 2. Risk Analysis (Matching original: analyze_risk_and_position)
-        try:
-            risk_result = analysis_engine.analyze_risk_and_position(style, market_data)
-        except Exception as e:
-            logger.error(f"计算风险评分时发生异常: {e}")
-            return {'error': f'风险计算失败: {str(e)}'}
-
-        # 3. Calculate Market Sentiment (Matching original)
-        try:
-            market_sentiment = analysis_engine.calculate_market_sentiment(market_data)
-            market_data['market_sentiment'] = market_sentiment
-        except Exception as e:
-            logger.warning(f"计算市场情绪时发生异常: {e}")
-            market_data['market_sentiment'] = 5.0  # Default value
-
-        # 4. Calculate Target Price (Matching original)
-        try:
-            target_price = analysis_engine.calculate_target_price(market_data, risk_result, style)
-            market_data['target_price'] = target_price
-            
-            # 根据目标价格和当前价格动态调整仓位
-            current_price = market_data.get('price', 0)
-            if current_price > 0 and target_price > 0:
-                # 计算上涨空间百分比
-                upside_pct = (target_price - current_price) / current_price
-                
-                # 根据上涨空间调整仓位
-                # 如果目标价低于当前价，大幅降低仓位（不建议买入）
-                if upside_pct < 0:
-                    # 目标价低于当前价，仓位调整为0或极小值
-                    price_adjustment = 0.0
-                    risk_result['price_adjustment'] = price_adjustment
-                    risk_result['suggested_position'] = 0.0
-                    logger.info(f"目标价({target_price:.2f})低于当前价({current_price:.2f})，建议仓位调整为0%")
-                elif upside_pct < 0.05:  # 上涨空间 < 5%
-                    price_adjustment = 0.3  # 大幅降低仓位
-                elif upside_pct < 0.10:  # 上涨空间 5-10%
-                    price_adjustment = 0.6  # 适度降低仓位
-                elif upside_pct < 0.20:  # 上涨空间 10-20%
-                    price_adjustment = 0.9  # 轻微降低仓位
-                elif upside_pct < 0.30:  # 上涨空间 20-30%
-                    price_adjustment = 1.0  # 正常仓位
-                else:  # 上涨空间 > 30%
-                    price_adjustment = 1.1  # 可以适当增加仓位（但不超过基础上限）
-                    price_adjustment = min(price_adjustment, 1.2)  # 最多增加20%
-                
-                # 应用价格调整
-                base_position = risk_result.get('suggested_position', 0)
-                adjusted_position = base_position * price_adjustment
-                risk_result['price_adjustment'] = price_adjustment
-                risk_result['suggested_position'] = round(adjusted_position, 1)
-                risk_result['upside_potential_pct'] = round(upside_pct * 100, 2)
-                
-                logger.info(f"价格调整: 当前价={current_price:.2f}, 目标价={target_price:.2f}, 上涨空间={upside_pct:.2%}, 仓位调整系数={price_adjustment:.2f}, 最终仓位={adjusted_position:.1f}%")
-        except Exception as e:
-            logger.warning(f"计算目标价格时发生异常: {e}")
-            market_data['target_price'] = market_data.get('price', 0)  # Default to current price
-
-        # 4.5 Calculate Dynamic Stop Loss (Matching original - ATR based)
-        try:
-            # Get 1-month history for ATR calculation
-            normalized_ticker = analysis_engine.normalize_ticker(ticker)
-            stock = yf.Ticker(normalized_ticker)
-            hist = stock.history(period="1mo", timeout=10)
-
-            if not hist.empty and len(hist) >= 15:
-                # Use ATR dynamic stop loss
-                stop_loss_price = analysis_engine.calculate_atr_stop_loss(
-                    buy_price=market_data['price'],
-                    hist_data=hist,
-                    atr_period=14,
-                    atr_multiplier=2.5,
-                    min_stop_loss_pct=0.05,
-                    beta=market_data.get('beta')
-                )
-                market_data['stop_loss_price'] = stop_loss_price
-                market_data['stop_loss_method'] = 'ATR动态止损'
-            else:
-                # Fallback to fixed stop loss
-                stop_loss_price = market_data['price'] * 0.85
-                market_data['stop_loss_price'] = stop_loss_price
-                market_data['stop_loss_method'] = '固定15%止损（数据不足）'
-        except Exception as e:
-            logger.warning(f"计算止损价格时发生异常: {e}")
-            # Fallback to fixed stop loss
-            stop_loss_price = market_data.get('price', 0) * 0.85
-            market_data['stop_loss_price'] = stop_loss_price
-            market_data['stop_loss_method'] = '固定15%止损（计算失败）'
-
-        # 4.6 Calculate EV Model (Matching original)
-        try:
-            ev_result = ev_model.calculate_ev_model(market_data, risk_result, style)
-            market_data['ev_model'] = ev_result
-            logger.info(f"EV模型计算完成: {ticker}, 加权EV={ev_result.get('ev_weighted_pct', 0):.2f}%")
-        except Exception as e:
-            logger.warning(f"计算EV模型时发生异常: {e}")
-            market_data['ev_model'] = {
-                'error': str(e),
-                'ev_weighted': 0.0,
-                'ev_weighted_pct': 0.0,
-                'ev_score': 5.0,
-                'recommendation': {
-                    'action': 'HOLD',
-                    'reason': 'EV模型计算失败',
-                    'confidence': 'low'
-                }
-            }
+        # 1-4. Market data + quant analysis (cached per ticker/style)
+        quant = get_quant_analysis(ticker, style)
+        if 'error' in quant:
+            return quant
+        market_data, risk_result = quant['data'], quant['risk']
 
         # 5. AI Analysis (Matching original - this takes time)
         try:
@@ -322,8 +335,7 @@ def analyze_stock():
 
                 # Store the analysis response directly using the new simplified format
                 # This matches the async task queue format and is more efficient
-                complete_analysis_data_clean = convert_numpy_types(response)
-
+                # (NumPy / pandas values are encoded by the JSON column serializer)
                 analysis_history = StockAnalysisHistory(
                     user_id=g.user_id,
                     ticker=ticker,
@@ -342,7 +354,7 @@ def analyze_stock():
                     recommendation_confidence=ev_result.get('recommendation', {}).get('confidence'),  # String field
                     ai_summary=ai_summary,
                     # Store the complete response data directly (new simplified format)
-                    full_analysis_data=complete_analysis_data_clean
+                    full_analysis_data=response
                 )
 
                 logger.info(f"Adding analysis history to database session...")
@@ -369,6 +381,89 @@ def analyze_stock():
         return jsonify({'success': False, 'error': f'分析过程中发生错误: {str(e)}'}), 500
 
 
+@stock_bp.route('/screener', methods=['POST'])
+@require_auth
+@check_quota(service_type=ServiceType.STOCK_ANALYSIS.value, amount=1)
+def screen_stocks():
+    """
+    Quant-only batch screener (no AI report)
+
+    Accepts: {
+        "tickers": ["AAPL", "MSFT", ...],  # up to SCREENER_MAX_TICKERS
+        "style": "quality",                # optional, default quality
+        "async": false,                    # optional, force an async task
+        "priority": 100                    # optional, async tasks only
+    }
+
+    Up to SCREENER_SYNC_MAX_TICKERS tickers are screened in the request:
+    {
+        "success": true,
+        "data": {
+            "results": [{"rank": 1, "ticker": "...", "ev_weighted_pct": ..., ...}],
+            "failed": [...],
+            "tickers_per_second": 12.3,
+            ...
+        }
+    }
+
+    Larger screens (or "async": true) create a task; poll /api/tasks/<task_id>/status
+    and read the same "data" from /api/tasks/<task_id>/result:
+    {
+        "success": true,
+        "task_id": "uuid-string",
+        "message": "Screener task created successfully"
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
+
+        tickers = data.get('tickers')
+        if isinstance(tickers, str):
+            tickers = [t for t in tickers.replace('\n', ',').split(',')]
+        tickers = [t.strip() for t in (tickers or []) if isinstance(t, str) and t.strip()]
+        if not tickers:
+            return jsonify({'success': False, 'error': 'Tickers are required'}), 400
+
+        max_tickers = current_app.config.get('SCREENER_MAX_TICKERS', 500)
+        if len(tickers) > max_tickers:
+            return jsonify({'success': False, 'error': f'最多支持 {max_tickers} 只股票'}), 400
+
+        style = data.get('style', 'quality')
+        if style not in ('quality', 'value', 'growth', 'momentum'):
+            return jsonify({'success': False, 'error': f'Unsupported style: {style}'}), 400
+
+        sync_max = current_app.config.get('SCREENER_SYNC_MAX_TICKERS', 25)
+        if data.get('async') or len(tickers) > sync_max:
+            task_id = create_analysis_task(
+                user_id=g.user_id,
+                task_type=TaskType.STOCK_SCREENER.value,
+                input_params={
+                    'tickers': tickers,
+                    'style': style
+                },
+                priority=data.get('priority', 100)
+            )
+
+            logger.info(f"Created async screener task {task_id} for {len(tickers)} tickers ({style}) - User: {g.user_id}")
+
+            return jsonify({
+                'success': True,
+                'task_id': task_id,
+                'message': 'Screener task created successfully'
+            }), 201
+
+        logger.info(f"Screening {len(tickers)} tickers with style {style} for user {g.user_id}")
+
+        result = screener.run_screener(tickers, style)
+        return jsonify({'success': True, 'data': result})
+
+    except Exception as e:
+        logger.error(f"Error running screener: {e}")
+        return jsonify({'success': False, 'error': f'筛选过程中发生错误: {str(e)}'}), 500
+
+
 @stock_bp.route('/history', methods=['GET'])
 @require_auth
 @db_retry(max_retries=3, retry_delay=0.5)
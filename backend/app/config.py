@@ -91,6 +91,85 @@ class Config:
     # Supabase
     SUPABASE_URL = os.getenv('SUPABASE_URL')
     SUPABASE_KEY = os.getenv('SUPABASE_ANON_KEY') or os.getenv('SUPABASE_KEY')
+    SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
+
+    # Auth token cache / local JWT verification
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '10000'))
+    AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', '300'))
+    AUTH_LOCAL_JWT_VERIFY = os.getenv('AUTH_LOCAL_JWT_VERIFY', 'true').lower() == 'true'
+    # last_login write-behind flush interval (seconds)
+    AUTH_LAST_LOGIN_FLUSH_SECONDS = int(os.getenv('AUTH_LAST_LOGIN_FLUSH_SECONDS', '60'))
+    
+    # Market context snapshot (VIX / macro / Polymarket) background refresh interval (seconds)
+    MARKET_CONTEXT_REFRESH_SECONDS = int(os.getenv('MARKET_CONTEXT_REFRESH_SECONDS', '300'))
+    # Snapshot older than this is served stale while one background refresh runs (seconds)
+    MARKET_CONTEXT_MAX_AGE_SECONDS = int(os.getenv('MARKET_CONTEXT_MAX_AGE_SECONDS', '900'))
+    
+    # Pre-open cache warm-up: top-N tickers per style from the last N days of analyses
+    PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', 'true').lower() == 'true'
+    PREWARM_TOP_N = int(os.getenv('PREWARM_TOP_N', '20'))
+    PREWARM_LOOKBACK_DAYS = int(os.getenv('PREWARM_LOOKBACK_DAYS', '7'))
+    PREWARM_LEAD_MINUTES = int(os.getenv('PREWARM_LEAD_MINUTES', '5'))
+    PREWARM_WORKERS = int(os.getenv('PREWARM_WORKERS', '4'))
+    PREWARM_OPTION_EXPIRIES = int(os.getenv('PREWARM_OPTION_EXPIRIES', '2'))
+    # Re-warm from just after the open through the first trading hour, every N minutes
+    # (below the option chain cache TTL, so warmed entries never lapse and never hold pre-open prices)
+    PREWARM_REFRESH_MINUTES = int(os.getenv('PREWARM_REFRESH_MINUTES', '8'))
+    # Quant analysis cache per (ticker, style), in seconds. 0 (default) disables it: every paid
+    # analysis recomputes risk / target / stop loss / EV from market data at most MARKET_DATA_CACHE_TTL old
+    QUANT_ANALYSIS_CACHE_TTL = int(os.getenv('QUANT_ANALYSIS_CACHE_TTL', '0'))
+    
+    # Record / replay of external data sources for offline benchmarking (app/utils/replay.py)
+    # REPLAY_MODE: '' (off) | 'record' | 'replay'; REPLAY_LATENCY: '' | 'recorded' | seconds | 'yfinance=0.3,gemini=8'
+    REPLAY_MODE = os.getenv('REPLAY_MODE', '')
+    REPLAY_DIR = os.getenv('REPLAY_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      'benchmarks', 'recordings', 'default'))
+    REPLAY_LATENCY = os.getenv('REPLAY_LATENCY', '')
+    REPLAY_LATENCY_SCALE = float(os.getenv('REPLAY_LATENCY_SCALE', '1.0'))
+    
+    # Shared pool for stale-while-revalidate background refreshes of TTLCache entries
+    CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', '4'))
+    
+    # Options data fetcher chain / underlying caches: fresh for CACHE_TTL, then served stale
+    # for up to STALE_TTL more seconds while one background refresh runs
+    OPTIONS_FETCHER_CACHE_TTL = int(os.getenv('OPTIONS_FETCHER_CACHE_TTL', '300'))
+    OPTIONS_FETCHER_STALE_TTL = int(os.getenv('OPTIONS_FETCHER_STALE_TTL', '600'))
+    OPTIONS_FETCHER_CACHE_SIZE = int(os.getenv('OPTIONS_FETCHER_CACHE_SIZE', '500'))
+    
+    # Tiger quote client pool, per-request symbol batches and per-minute request limits
+    TIGER_QUOTE_POOL_SIZE = int(os.getenv('TIGER_QUOTE_POOL_SIZE', '4'))
+    TIGER_QUOTE_POOL_TIMEOUT = float(os.getenv('TIGER_QUOTE_POOL_TIMEOUT', '30'))
+    TIGER_INIT_RETRY_SECONDS = int(os.getenv('TIGER_INIT_RETRY_SECONDS', '60'))
+    TIGER_QUOTE_BATCH_SIZE = int(os.getenv('TIGER_QUOTE_BATCH_SIZE', '50'))
+    TIGER_BARS_BATCH_SIZE = int(os.getenv('TIGER_BARS_BATCH_SIZE', '50'))
+    TIGER_BRIEFS_PER_MINUTE = int(os.getenv('TIGER_BRIEFS_PER_MINUTE', '120'))
+    TIGER_BARS_PER_MINUTE = int(os.getenv('TIGER_BARS_PER_MINUTE', '60'))
+    # Quote snapshot and margin rate caches (seconds)
+    TIGER_QUOTE_CACHE_TTL = int(os.getenv('TIGER_QUOTE_CACHE_TTL', '10'))
+    TIGER_MARGIN_CACHE_TTL = int(os.getenv('TIGER_MARGIN_CACHE_TTL', str(24 * 3600)))
+    
+    # Public portfolio response cache; the directory must be shared by every worker and by the
+    # rebalance scripts (same host or shared volume) so a commit in one process invalidates all of them
+    PORTFOLIO_CACHE_DIR = os.getenv('PORTFOLIO_CACHE_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'portfolio_cache'))
+    
+    # Portfolio response lifetime (seconds); holdings responses carry live prices and expire sooner
+    PORTFOLIO_CACHE_TTL = int(os.getenv('PORTFOLIO_CACHE_TTL', '3600'))
+    PORTFOLIO_HOLDINGS_CACHE_TTL = int(os.getenv('PORTFOLIO_HOLDINGS_CACHE_TTL', '60'))
+    
+    # Lock files that let only one gunicorn worker run each scheduled job (app/scheduler.py run_exclusive)
+    SCHEDULER_LOCK_DIR = os.getenv('SCHEDULER_LOCK_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'scheduler_locks'))
+    
+    # Compressed analysis result columns (migrate_compressed_analysis_data.py): keep reading the
+    # pre-compression JSON columns as a fallback; set to false once the backfill has run, before
+    # the migration's contract step drops them
+    COMPRESSED_DATA_LEGACY_COLUMNS = os.getenv('COMPRESSED_DATA_LEGACY_COLUMNS', 'true').lower() == 'true'
+    
+    # Quant-only screener: maximum tickers per request; larger requests than
+    # SCREENER_SYNC_MAX_TICKERS run as async tasks instead of inside the request worker
+    SCREENER_MAX_TICKERS = int(os.getenv('SCREENER_MAX_TICKERS', '500'))
+    SCREENER_SYNC_MAX_TICKERS = int(os.getenv('SCREENER_SYNC_MAX_TICKERS', '25'))
     
     # Mail
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
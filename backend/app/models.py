@@ -2,8 +2,35 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import enum
 
+from .config import Config
+from .utils.serialization import CompressedJSON
+
 db = SQLAlchemy()
 
+# Compressed result columns (see migrate_compressed_analysis_data.py): the value is stored in
+# <name>_packed; until the migration's contract step the pre-compression JSON column <name>
+# stays mapped as <name>_json and is read for rows the backfill has not reached yet
+LEGACY_JSON_COLUMNS = Config.COMPRESSED_DATA_LEGACY_COLUMNS
+
+
+def compressed_json_property(name):
+    """<name>: reads <name>_packed, falling back to the legacy JSON column; writes <name>_packed only"""
+    packed, legacy = f'{name}_packed', f'{name}_json'
+
+    def read(self):
+        value = getattr(self, packed)
+        if value is None and LEGACY_JSON_COLUMNS:
+            value = getattr(self, legacy)
+        return value
+
+    def write(self, value):
+        setattr(self, packed, value)
+        if LEGACY_JSON_COLUMNS:
+            setattr(self, legacy, None)
+
+    return property(read, write)
+
+
 # Enums
 class ServiceType(enum.Enum):
     STOCK_ANALYSIS = 'stock_analysis'
@@ -38,6 +65,7 @@ class TaskType(enum.Enum):
     STOCK_ANALYSIS = 'stock_analysis'
     OPTION_ANALYSIS = 'option_analysis'
     ENHANCED_OPTION_ANALYSIS = 'enhanced_option_analysis'
+    STOCK_SCREENER = 'stock_screener'
 
 class TaskStatus(enum.Enum):
     PENDING = 'pending'
@@ -85,12 +113,17 @@ class Feedback(db.Model):
 
 class DailyQueryCount(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)  # indexed via composite index
     date = db.Column(db.Date, nullable=False)
     query_count = db.Column(db.Integer, default=0)
     max_queries = db.Column(db.Integer, default=5)
     reset_time = db.Column(db.DateTime, nullable=False)
 
+    __table_args__ = (
+        # 每日免费额度查询: WHERE user_id = ? AND date = ?
+        db.Index('ix_daily_query_count_user_date', 'user_id', 'date'),
+    )
+
 class PortfolioHolding(db.Model):
     __tablename__ = 'portfolio_holdings'
     
@@ -121,13 +154,20 @@ class StyleProfit(db.Model):
     __tablename__ = 'style_profits'
     
     id = db.Column(db.Integer, primary_key=True)
-    trading_date = db.Column(db.Date, nullable=False, index=True)
+    trading_date = db.Column(db.Date, nullable=False)  # indexed via ix_style_profits_date_style
     style = db.Column(db.String(20), nullable=False)
     style_investment = db.Column(db.Float, nullable=False)
     style_market_value = db.Column(db.Float, nullable=False)
     style_profit_loss = db.Column(db.Float, nullable=False)
     style_profit_loss_percent = db.Column(db.Float, nullable=False)
 
+    __table_args__ = (
+        # 按日期取各风格记录: ORDER BY trading_date DESC, style
+        db.Index('ix_style_profits_date_style', 'trading_date', 'style'),
+        # 单风格最新记录: WHERE style = ? ORDER BY trading_date DESC
+        db.Index('ix_style_profits_style_date', 'style', 'trading_date'),
+    )
+
 class PortfolioRebalance(db.Model):
     __tablename__ = 'portfolio_rebalances'
     """
@@ -203,24 +243,48 @@ class CreditLedger(db.Model):
     subscription_id = db.Column(db.Integer, db.ForeignKey('subscriptions.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # FIFO扣减 / 余额汇总: 仅索引仍有剩余额度的行，按到期时间排序
+        db.Index(
+            'ix_credit_ledger_fifo', 'user_id', 'service_type', 'expires_at', 'id',
+            postgresql_where=db.text('amount_remaining > 0'),
+            sqlite_where=db.text('amount_remaining > 0')
+        ),
+    )
+
+class CreditBalance(db.Model):
+    """额度余额 - CreditLedger 有效剩余额度的物化汇总（按用户+服务类型）"""
+    __tablename__ = 'credit_balances'
+
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), primary_key=True)
+    service_type = db.Column(db.String(50), primary_key=True)
+    balance = db.Column(db.Integer, nullable=False, default=0)
+    next_expires_at = db.Column(db.DateTime, nullable=True, index=True)  # 最早到期的有效额度，到期后需重算
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class UsageLog(db.Model):
     """使用日志 - 记录每一次消耗"""
     __tablename__ = 'usage_logs'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)  # indexed via composite index
     credit_ledger_id = db.Column(db.Integer, db.ForeignKey('credit_ledger.id'), nullable=True) # 如果使用了特定额度包
     service_type = db.Column(db.String(50), nullable=False)
     ticker = db.Column(db.String(20), nullable=True)
     amount_used = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # 使用历史分页: WHERE user_id = ? ORDER BY created_at DESC
+        db.Index('ix_usage_logs_user_created', 'user_id', 'created_at'),
+    )
+
 class StockAnalysisHistory(db.Model):
     """股票分析历史记录"""
     __tablename__ = 'stock_analysis_history'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)  # indexed via composite index
     ticker = db.Column(db.String(20), nullable=False, index=True)
     style = db.Column(db.String(20), nullable=False)
 
@@ -244,18 +308,27 @@ class StockAnalysisHistory(db.Model):
     # AI Analysis
     ai_summary = db.Column(db.Text, nullable=True)
 
-    # Store full JSON data for reference
-    full_analysis_data = db.Column(db.JSON, nullable=True)
+    # Store full JSON data for reference (compressed; see migrate_compressed_analysis_data.py)
+    full_analysis_data_packed = db.Column(CompressedJSON, nullable=True)
+    if LEGACY_JSON_COLUMNS:
+        full_analysis_data_json = db.Column('full_analysis_data', db.JSON(none_as_null=True), nullable=True)
+    full_analysis_data = compressed_json_property('full_analysis_data')
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    __table_args__ = (
+        # 历史列表分页（可按ticker过滤）: WHERE user_id = ? [AND ticker = ?] ORDER BY created_at DESC
+        db.Index('ix_stock_analysis_history_user_created', 'user_id', 'created_at'),
+        db.Index('ix_stock_analysis_history_user_ticker_created', 'user_id', 'ticker', 'created_at'),
+    )
+
 
 class OptionsAnalysisHistory(db.Model):
     """期权分析历史记录"""
     __tablename__ = 'options_analysis_history'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)  # indexed via composite index
     symbol = db.Column(db.String(20), nullable=False, index=True)
     option_identifier = db.Column(db.String(100), nullable=True)  # For enhanced analysis
     expiry_date = db.Column(db.String(20), nullable=True)
@@ -276,18 +349,27 @@ class OptionsAnalysisHistory(db.Model):
     # AI Summary for options
     ai_summary = db.Column(db.Text, nullable=True)
 
-    # Store full JSON data for reference
-    full_analysis_data = db.Column(db.JSON, nullable=True)
+    # Store full JSON data for reference (compressed; see migrate_compressed_analysis_data.py)
+    full_analysis_data_packed = db.Column(CompressedJSON, nullable=True)
+    if LEGACY_JSON_COLUMNS:
+        full_analysis_data_json = db.Column('full_analysis_data', db.JSON(none_as_null=True), nullable=True)
+    full_analysis_data = compressed_json_property('full_analysis_data')
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    __table_args__ = (
+        # 历史列表分页（可按symbol过滤）: WHERE user_id = ? [AND symbol = ?] ORDER BY created_at DESC
+        db.Index('ix_options_analysis_history_user_created', 'user_id', 'created_at'),
+        db.Index('ix_options_analysis_history_user_symbol_created', 'user_id', 'symbol', 'created_at'),
+    )
+
 
 class AnalysisTask(db.Model):
     """异步分析任务队列"""
     __tablename__ = 'analysis_tasks'
 
     id = db.Column(db.String(36), primary_key=True)  # UUID for task ID
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)  # indexed via composite index
 
     # Task details
     task_type = db.Column(db.String(50), nullable=False, index=True)  # stock_analysis, option_analysis, etc.
@@ -302,7 +384,12 @@ class AnalysisTask(db.Model):
     current_step = db.Column(db.Text, nullable=True)  # Changed from String(500) to Text to support longer error messages
 
     # Results
-    result_data = db.Column(db.JSON, nullable=True)  # Complete analysis result
+    # Complete analysis result; completed tasks leave it empty and reference the
+    # history record (related_history_id) that stores the same result
+    result_data_packed = db.Column(CompressedJSON, nullable=True)
+    if LEGACY_JSON_COLUMNS:
+        result_data_json = db.Column('result_data', db.JSON(none_as_null=True), nullable=True)
+    result_data = compressed_json_property('result_data')
     error_message = db.Column(db.Text, nullable=True)
 
     # Timing
@@ -314,8 +401,27 @@ class AnalysisTask(db.Model):
     related_history_id = db.Column(db.Integer, nullable=True)  # Link to StockAnalysisHistory/OptionsAnalysisHistory
     related_history_type = db.Column(db.String(50), nullable=True)  # 'stock' or 'options'
 
-    def to_dict(self):
-        """Convert to dictionary for API responses"""
+    __table_args__ = (
+        # 用户任务列表（可按status过滤）: WHERE user_id = ? [AND status = ?] ORDER BY created_at DESC
+        db.Index('ix_analysis_tasks_user_created', 'user_id', 'created_at'),
+        db.Index('ix_analysis_tasks_user_status_created', 'user_id', 'status', 'created_at'),
+    )
+
+    def get_result_data(self):
+        """result_data, or the full_analysis_data of the related history record"""
+        if self.result_data is not None or not self.related_history_id:
+            return self.result_data
+        model = {'stock': StockAnalysisHistory, 'options': OptionsAnalysisHistory}.get(self.related_history_type)
+        if model is None:
+            return None
+        columns = [model.full_analysis_data_packed]
+        if LEGACY_JSON_COLUMNS:
+            columns.append(model.full_analysis_data_json)
+        row = db.session.query(*columns).filter(model.id == self.related_history_id).first()
+        return next((value for value in row if value is not None), None) if row else None
+
+    def to_dict(self, include_result=True):
+        """Convert to dictionary for API responses (include_result=False skips loading the result blob)"""
         return {
             'id': self.id,
             'user_id': self.user_id,  # Fixed: Added missing user_id field
@@ -324,7 +430,7 @@ class AnalysisTask(db.Model):
             'progress_percent': self.progress_percent,
             'current_step': self.current_step,
             'input_params': self.input_params,
-            'result_data': self.result_data,
+            'result_data': self.get_result_data() if include_result else None,
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'started_at': self.started_at.isoformat() if self.started_at else None,
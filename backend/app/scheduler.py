@@ -5,13 +5,17 @@ This module handles the daily calculation and storage of portfolio profit/loss d
 Based on the original app.py calculate_daily_profit_loss() function.
 """
 
+import fcntl
 import logging
+import os
+import time
 import yfinance as yf
 import requests
 from datetime import datetime, date
 from apscheduler.schedulers.background import BackgroundScheduler
 from .models import db, PortfolioHolding, DailyProfitLoss, StyleProfit
 from .utils.serialization import convert_numpy_types
+from .utils.metrics import record_upstream_error
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +46,7 @@ def get_exchange_rates():
         logger.info(f"Updated exchange rates: {exchange_rates_cache}")
 
     except Exception as e:
+        record_upstream_error('exchange_rate')
         logger.error(f"Failed to fetch exchange rates: {e}")
         # Use fallback rates if API fails
         exchange_rates_cache = {
@@ -76,9 +81,40 @@ def get_current_stock_price(ticker):
             return None
 
     except Exception as e:
+        record_upstream_error('yfinance')
         logger.error(f"Error fetching price for {ticker}: {e}")
         return None
 
+def get_current_stock_prices(tickers):
+    """
+    Current prices for many tickers: US tickers from batched Tiger quotes,
+    HK/A-share tickers and anything Tiger did not price via yfinance.
+    Returns {ticker: price}; tickers without a price are left out.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    prices = {}
+
+    us_tickers = [t for t in tickers if '.' not in t]
+    if us_tickers:
+        try:
+            from .services.tiger_client import get_client_manager
+            client = get_client_manager()
+            if client.ensure_initialized():
+                for ticker, quote in client.get_stock_quotes(us_tickers).items():
+                    price = quote.get('latest_price')
+                    if price is not None and price == price and price > 0:
+                        prices[ticker] = float(price)
+        except Exception as e:
+            record_upstream_error('tiger')
+            logger.warning(f"Batched Tiger quotes failed, falling back to yfinance: {e}")
+
+    for ticker in tickers:
+        if ticker not in prices:
+            price = get_current_stock_price(ticker)
+            if price is not None:
+                prices[ticker] = price
+    return prices
+
 def convert_to_usd(amount, currency, rates):
     """Convert amount to USD using exchange rates"""
     if currency == 'USD':
@@ -131,10 +167,12 @@ def calculate_daily_profit_loss():
 
         logger.info(f"Processing {len(holdings)} holdings...")
 
+        # Get current prices for all holdings at once
+        current_prices = get_current_stock_prices(holding.ticker for holding in holdings)
+
         for holding in holdings:
             try:
-                # Get current price
-                current_price = get_current_stock_price(holding.ticker)
+                current_price = current_prices.get(holding.ticker)
 
                 if current_price is None:
                     logger.warning(f"Skipping {holding.ticker} - no price data")
@@ -204,7 +242,7 @@ def calculate_daily_profit_loss():
                            f"Market Value: ${calc['market_value']:,.2f}, "
                            f"P/L: {style_profit_loss_percent:.2f}%")
 
-        # Commit all changes
+        # Commit all changes (also invalidates the cached public portfolio responses, see api/portfolio.py)
         db.session.commit()
         logger.info(f"Daily profit/loss calculation completed successfully for {today}")
 
@@ -237,6 +275,87 @@ def init_scheduler(app):
             replace_existing=True
         )
 
+        # Flush batched last_login updates from the auth layer
+        from .utils.auth import flush_last_login_updates
+        scheduler.add_job(
+            func=lambda: run_with_app_context(app, flush_last_login_updates),
+            trigger='interval',
+            seconds=app.config.get('AUTH_LAST_LOGIN_FLUSH_SECONDS', 60),
+            id='flush_last_login',
+            name='Flush Last Login Updates',
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1
+        )
+
+        # Credit balances: refresh rows whose credits expired, and nightly ledger reconciliation
+        from .services.payment_service import PaymentService
+        scheduler.add_job(
+            func=lambda: run_with_app_context(app, PaymentService.sweep_expired_balances),
+            trigger='interval',
+            minutes=15,
+            id='credit_balance_expiry_sweep',
+            name='Credit Balance Expiry Sweep',
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1
+        )
+        scheduler.add_job(
+            func=lambda: run_exclusive(app, 'credit_balance_reconciliation', PaymentService.reconcile_credit_balances),
+            trigger='cron',
+            hour=3,
+            minute=30,
+            id='credit_balance_reconciliation',
+            name='Credit Balance Reconciliation',
+            replace_existing=True
+        )
+
+        # Market-level sentiment inputs (VIX, macro, Polymarket, event calendars) shared by all analyses
+        from .services.market_context import refresh_market_context
+        scheduler.add_job(
+            func=refresh_market_context,
+            trigger='interval',
+            seconds=app.config.get('MARKET_CONTEXT_REFRESH_SECONDS', 300),
+            next_run_time=datetime.now(),  # warm up immediately on startup
+            id='market_context_refresh',
+            name='Market Context Refresh',
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1
+        )
+
+        # Pre-open cache warm-up of popular tickers (US / HK), plus first-trading-hour cache hit rate report
+        if app.config.get('PREWARM_ENABLED', True):
+            from functools import partial
+            from .services.prewarm import MARKETS, market_schedule, run_prewarm, \
+                start_hit_rate_window, finish_hit_rate_window
+            lead_minutes = app.config.get('PREWARM_LEAD_MINUTES', 5)
+            refresh_minutes = app.config.get('PREWARM_REFRESH_MINUTES', 8)
+            for market, spec in MARKETS.items():
+                times = market_schedule(market, lead_minutes, refresh_minutes)
+                jobs = [
+                    (f'prewarm_{i}', 'Cache Warm-up', partial(run_with_app_context, app, partial(run_prewarm, market)), at)
+                    for i, at in enumerate(times['prewarm'])
+                ] + [
+                    ('window_start', 'Cache Hit Rate Window Start', partial(start_hit_rate_window, market),
+                     times['window_start']),
+                    ('window_end', 'Cache Hit Rate Report', partial(finish_hit_rate_window, market), times['window_end']),
+                ]
+                for key, name, func, (hour, minute) in jobs:
+                    scheduler.add_job(
+                        func=func,
+                        trigger='cron',
+                        day_of_week='mon-fri',
+                        hour=hour,
+                        minute=minute,
+                        timezone=spec['timezone'],
+                        id=f'{key}_{market.lower()}',
+                        name=f'{name} ({market})',
+                        replace_existing=True,
+                        coalesce=True,
+                        max_instances=1
+                    )
+
         scheduler.start()
         logger.info("Scheduler initialized successfully - Daily P/L calculation will run at 6:12 PM")
 
@@ -248,6 +367,37 @@ def run_with_app_context(app, func):
     with app.app_context():
         func()
 
+def run_exclusive(app, job_id, func, min_interval=600):
+    """
+    Run func in the app context in only one process: every gunicorn worker starts its own
+    scheduler, so the same cron job fires once per worker. The first worker to take the
+    job's lock file runs it; a run started by another worker less than min_interval
+    seconds ago counts as this run.
+    """
+    lock_dir = app.config.get('SCHEDULER_LOCK_DIR')
+    if not lock_dir:
+        return run_with_app_context(app, func)
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f'{job_id}.lock'), 'a+') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"Job {job_id} is running in another worker, skipped")
+            return
+        f.seek(0)
+        try:
+            last_started = float(f.read().strip() or 0)
+        except ValueError:
+            last_started = 0
+        if time.time() - last_started < min_interval:
+            logger.info(f"Job {job_id} already ran in another worker, skipped")
+            return
+        f.seek(0)
+        f.truncate()
+        f.write(str(time.time()))
+        f.flush()
+        run_with_app_context(app, func)
+
 def shutdown_scheduler():
     """Shutdown the scheduler"""
     global scheduler
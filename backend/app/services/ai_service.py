@@ -1,5 +1,4 @@
 import os
-import time
 from dotenv import load_dotenv
 
 # 尝试导入 google.generativeai，如果失败则设置为 None
@@ -12,7 +11,9 @@ except ImportError:
 load_dotenv()
 
 # 导入ATR止损计算函数
-from .analysis_engine import calculate_atr_stop_loss
+from .analysis_engine import calculate_atr_stop_loss, get_fed_meeting_dates, get_cpi_release_dates, get_options_expiration_dates
+from .event_calendar import get_event_calendar, CHINA
+from ..utils.metrics import span, record_upstream_error
 
 
 # 配置 Gemini
@@ -215,6 +216,7 @@ def get_fallback_analysis(ticker, style, data, risk_result):
     return analysis
 
 
+@span('get_gemini_analysis')
 def get_gemini_analysis(ticker, style, data, risk_result):
     """
     发送数据给 Gemini 进行定性分析
@@ -416,35 +418,33 @@ def get_gemini_analysis(ticker, style, data, risk_result):
             elif 7 <= days_until_lockup < 14:
                 prompt += f"  - **⚠️ 中危提醒**: 解禁临近，可能面临抛压，建议提前规划\n"
     
+    # 事件日期来自当天的事件日历索引（与宏观数据、市场预警共用）
     # 添加美联储利率决议
-    fed_meetings = macro_data.get('fed_meetings', [])
+    fed_meetings = get_fed_meeting_dates()
     if fed_meetings and len(fed_meetings) > 0:
         meetings_text = ', '.join([m['date'] + ' (' + str(m['days_until']) + '天后' + ('，含点阵图' if m.get('has_dot_plot') else '') + ')' for m in fed_meetings])
         prompt += f"- **美联储利率决议**: {meetings_text}\n"
     
     # 添加美国CPI数据发布
-    cpi_releases = macro_data.get('cpi_releases', [])
-    us_cpi = [c for c in cpi_releases if c.get('country') == 'US']
-    if us_cpi and len(us_cpi) > 0:
-        cpi_text = ', '.join([c['date'] + ' (' + str(c['days_until']) + '天后，发布' + c['data_month'] + '数据)' for c in us_cpi])
+    cpi_releases = get_cpi_release_dates()
+    if cpi_releases and len(cpi_releases) > 0:
+        cpi_text = ', '.join([c['date'] + ' (' + str(c['days_until']) + '天后，发布' + c['data_month'] + '数据)' for c in cpi_releases])
         prompt += f"- **美国CPI数据发布**: {cpi_text}\n"
     
     # 添加中国经济事件
-    china_events = macro_data.get('china_events', [])
-    if china_events and len(china_events) > 0:
-        # 只显示未来30天内的重要事件
-        upcoming_china_events = [e for e in china_events if e.get('days_until', 999) <= 30]
-        if upcoming_china_events:
-            events_text = ', '.join([
-                e['type'] + ': ' + e['date'] + ' (' + str(e['days_until']) + '天后' + 
-                (', ' + e.get('data_month', '') if e.get('data_month') else '') +
-                (', ' + e.get('quarter', '') if e.get('quarter') else '') + ')'
-                for e in upcoming_china_events[:5]  # 只显示前5个
-            ])
-            prompt += f"- **中国经济事件**: {events_text}\n"
+    # 只显示未来30天内的重要事件
+    upcoming_china_events = get_event_calendar().events_within(CHINA, 30, limit=5)  # 只显示前5个
+    if upcoming_china_events:
+        events_text = ', '.join([
+            e['type'] + ': ' + e['date'] + ' (' + str(e['days_until']) + '天后' + 
+            (', ' + e.get('data_month', '') if e.get('data_month') else '') +
+            (', ' + e.get('quarter', '') if e.get('quarter') else '') + ')'
+            for e in upcoming_china_events
+        ])
+        prompt += f"- **中国经济事件**: {events_text}\n"
     
     # 添加期权到期日
-    options_expirations = macro_data.get('options_expirations', [])
+    options_expirations = get_options_expiration_dates()
     if options_expirations and len(options_expirations) > 0:
         exp_text = ', '.join([exp['date'] + ' (' + str(exp['days_until']) + '天后，' + exp.get('type', '月度到期日') + (', 四重到期日' if exp.get('is_quadruple_witching') else '') + ')' for exp in options_expirations])
         prompt += f"- **期权到期日（交割日）**: {exp_text}\n"
@@ -840,12 +840,11 @@ def get_gemini_analysis(ticker, style, data, risk_result):
         #     if 'generateContent' in model.supported_generation_methods:
         #         print(f"- {model.name} (支持 generateContent)")
         model = genai.GenerativeModel('models/gemini-2.5-flash')
-        start_time = time.time()
-        response = model.generate_content(prompt)
-        elapsed = time.time() - start_time
-        print(f"[Gemini] generate_content 耗时: {elapsed:.2f}s")
+        with span('gemini_generate_content'):
+            response = model.generate_content(prompt)
         return response.text
     except Exception as e:
+        record_upstream_error('gemini')
         print(f"Gemini API 连接失败: {str(e)}")
         print("使用备用分析功能...")
         return get_fallback_analysis(ticker, style, data, risk_result)
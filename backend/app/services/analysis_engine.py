@@ -3,7 +3,8 @@ import numpy as np
 import yfinance as yf
 import requests
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+import copy
+import os
 import time
 import logging
 
@@ -14,7 +15,19 @@ except ImportError:
     # 如果导入失败，定义一个占位符
     YFRateLimitError = type('YFRateLimitError', (Exception,), {})
 
-# 导入配置参数
+# 事件日历索引（美联储/CPI/中国经济事件/期权到期日）
+try:
+    from .event_calendar import get_event_calendar, FED, US_CPI, CHINA, OPTIONS_EXPIRATION
+except ImportError:
+    from event_calendar import get_event_calendar, FED, US_CPI, CHINA, OPTIONS_EXPIRATION
+
+try:
+    from ..utils.cache import TTLCache
+    from ..utils.metrics import span, record_upstream_error
+except ImportError:
+    from utils.cache import TTLCache
+    from utils.metrics import span, record_upstream_error
+
 # 导入配置参数
 try:
     from ..constants import *
@@ -550,7 +563,34 @@ def get_ticker_price(ticker, max_retries=3, retry_delay=2):
     return None
 
 
-def get_market_data(ticker, onlyHistoryData=False, startDate=None, max_retries=3, retry_delay=2, use_backup=True):
+# 完整行情数据（info + 一年历史 + 衍生指标）的进程内缓存，开盘前由预热任务写入热门股票
+MARKET_DATA_CACHE_TTL = int(os.getenv('MARKET_DATA_CACHE_TTL', '900'))
+market_data_cache = TTLCache(maxsize=int(os.getenv('MARKET_DATA_CACHE_SIZE', '500')), ttl=MARKET_DATA_CACHE_TTL,
+                             name='market_data')
+
+
+@span('get_market_data')
+def get_market_data(ticker, onlyHistoryData=False, startDate=None, max_retries=3, retry_delay=2,
+                    use_backup=True, refresh=False):
+    """
+    获取股票市场数据（带缓存）
+    只缓存完整数据（onlyHistoryData=False 且未指定 startDate）；调用方会修改返回的字典，因此读写都使用深拷贝
+    refresh=True 时跳过缓存读取，重新获取并刷新缓存（预热任务使用）
+    """
+    cacheable = not onlyHistoryData and not startDate
+    key = normalize_ticker(ticker)
+    if cacheable and not refresh:
+        cached = market_data_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+    data = _fetch_market_data(ticker, onlyHistoryData, startDate, max_retries, retry_delay, use_backup)
+    if cacheable and data and data.get('price'):
+        market_data_cache.set(key, copy.deepcopy(data))
+    return data
+
+
+def _fetch_market_data(ticker, onlyHistoryData=False, startDate=None, max_retries=3, retry_delay=2, use_backup=True):
     """
     获取股票市场数据
     优先使用 Yahoo Finance，失败时自动切换到 Alpha Vantage（如果可用）
@@ -1002,6 +1042,8 @@ def get_market_data(ticker, onlyHistoryData=False, startDate=None, max_retries=3
     
     # 如果 Yahoo Finance 失败，尝试使用备用数据源
     backup_error_detail = None
+    if yf_failed:
+        record_upstream_error('yfinance')
     if yf_failed and use_backup:
         try:
             from alpha_vantage_data import get_market_data_from_av, is_av_available
@@ -1094,40 +1136,7 @@ def get_fed_meeting_dates():
     获取美联储利率决议日期
     返回未来3个月内的FOMC会议日期
     """
-    # 2025年FOMC会议日期（根据美联储官方日程）
-    fed_meetings_2025 = [
-        datetime(2025, 1, 28),  # 1月28-29日
-        datetime(2025, 3, 18),  # 3月18-19日（含点阵图）
-        datetime(2025, 5, 6),   # 5月6-7日
-        datetime(2025, 6, 17),  # 6月17-18日（含点阵图）
-        datetime(2025, 7, 29),  # 7月29-30日
-        datetime(2025, 9, 16),  # 9月16-17日（含点阵图）
-        datetime(2025, 10, 28), # 10月28-29日
-        datetime(2025, 12, 9), # 12月9-10日（含点阵图）
-    ]
-    
-    # 2026年部分日期（如果需要）
-    fed_meetings_2026 = [
-        datetime(2026, 1, 28),
-        datetime(2026, 3, 18),
-    ]
-    
-    all_meetings = fed_meetings_2025 + fed_meetings_2026
-    today = datetime.now().date()
-    
-    # 筛选未来90天内的会议
-    upcoming_meetings = []
-    for meeting_date in all_meetings:
-        meeting_date_only = meeting_date.date()
-        days_until = (meeting_date_only - today).days
-        if 0 <= days_until <= 90:  # 未来90天内
-            upcoming_meetings.append({
-                'date': meeting_date_only.strftime('%Y-%m-%d'),
-                'days_until': int(days_until),
-                'has_dot_plot': bool(meeting_date.month in [3, 6, 9, 12])  # 季度会议含点阵图
-            })
-    
-    return sorted(upcoming_meetings, key=lambda x: x['days_until'])[:3]  # 返回最近3个
+    return get_event_calendar().events_within(FED, 90, limit=3)  # 返回最近3个
 
 
 def get_cpi_release_dates():
@@ -1135,30 +1144,7 @@ def get_cpi_release_dates():
     获取美国CPI发布日期
     CPI通常在每月中旬（10-15日）发布前一个月的数据
     """
-    today = datetime.now().date()
-    cpi_dates = []
-    
-    # 计算未来3个月的CPI发布日期
-    for i in range(1, 4):
-        # 下个月的数据在这个月发布
-        target_month = today + relativedelta(months=i)
-        # CPI通常在每月10-15日之间发布，我们假设是12日
-        cpi_date = datetime(target_month.year, target_month.month, 12).date()
-        
-        # 如果12日是周末，调整到下一个工作日
-        while cpi_date.weekday() >= 5:  # 周六或周日
-            cpi_date += timedelta(days=1)
-        
-        days_until = (cpi_date - today).days
-        if days_until >= 0:
-            cpi_dates.append({
-                'date': cpi_date.strftime('%Y-%m-%d'),
-                'days_until': int(days_until),
-                'data_month': (target_month - relativedelta(months=1)).strftime('%Y年%m月'),
-                'country': 'US'
-            })
-    
-    return cpi_dates[:3]  # 返回最近3个
+    return get_event_calendar().upcoming(US_CPI, 3)  # 返回最近3个
 
 
 def get_china_economic_events():
@@ -1166,89 +1152,7 @@ def get_china_economic_events():
     获取中国重要经济事件日期
     包括：央行货币政策会议、CPI/PPI发布、GDP发布、PMI发布
     """
-    today = datetime.now().date()
-    events = []
-    
-    # 1. 中国央行货币政策会议（通常每季度一次，1/4/7/10月）
-    current_year = today.year
-    pboc_meetings = [
-        datetime(current_year, 1, 20).date(),  # 通常在一月下旬
-        datetime(current_year, 4, 20).date(),  # 通常在四月中旬
-        datetime(current_year, 7, 20).date(),  # 通常在七月中旬
-        datetime(current_year, 10, 20).date(), # 通常在十月中旬
-        datetime(current_year + 1, 1, 20).date()  # 下一年
-    ]
-    
-    for meeting_date in pboc_meetings:
-        days_until = (meeting_date - today).days
-        if 0 <= days_until <= 90:
-            events.append({
-                'date': meeting_date.strftime('%Y-%m-%d'),
-                'days_until': int(days_until),
-                'type': '央行货币政策会议',
-                'country': 'CN'
-            })
-    
-    # 2. 中国CPI/PPI发布（通常在每月9-10日发布上月数据）
-    for i in range(1, 4):
-        target_month = today + relativedelta(months=i)
-        # CPI通常在每月9-10日发布
-        cpi_date = datetime(target_month.year, target_month.month, 10).date()
-        # 如果是周末，调整到下一个工作日
-        while cpi_date.weekday() >= 5:
-            cpi_date += timedelta(days=1)
-        
-        days_until = (cpi_date - today).days
-        if days_until >= 0:
-            events.append({
-                'date': cpi_date.strftime('%Y-%m-%d'),
-                'days_until': int(days_until),
-                'type': 'CPI/PPI发布',
-                'country': 'CN',
-                'data_month': (target_month - relativedelta(months=1)).strftime('%Y年%m月')
-            })
-    
-    # 3. 中国GDP发布（季度数据，通常在季后15-20日发布）
-    # Q1在4月中旬，Q2在7月中旬，Q3在10月中旬，Q4在次年1月中旬
-    gdp_releases = [
-        datetime(current_year, 4, 18).date(),   # Q1数据
-        datetime(current_year, 7, 18).date(),   # Q2数据
-        datetime(current_year, 10, 18).date(),  # Q3数据
-        datetime(current_year + 1, 1, 18).date() # Q4数据
-    ]
-    
-    for gdp_date in gdp_releases:
-        days_until = (gdp_date - today).days
-        if 0 <= days_until <= 90:
-            quarter = 'Q1' if gdp_date.month == 4 else 'Q2' if gdp_date.month == 7 else 'Q3' if gdp_date.month == 10 else 'Q4'
-            events.append({
-                'date': gdp_date.strftime('%Y-%m-%d'),
-                'days_until': int(days_until),
-                'type': 'GDP发布',
-                'country': 'CN',
-                'quarter': quarter
-            })
-    
-    # 4. 中国PMI发布（每月最后一天或次月1日发布上月数据）
-    for i in range(1, 4):
-        target_month = today + relativedelta(months=i)
-        # PMI通常在每月最后一天或次月1日发布
-        pmi_date = datetime(target_month.year, target_month.month, 1).date()
-        # 如果是周末，调整到下一个工作日
-        while pmi_date.weekday() >= 5:
-            pmi_date += timedelta(days=1)
-        
-        days_until = (pmi_date - today).days
-        if days_until >= 0:
-            events.append({
-                'date': pmi_date.strftime('%Y-%m-%d'),
-                'days_until': int(days_until),
-                'type': 'PMI发布',
-                'country': 'CN',
-                'data_month': (target_month - relativedelta(months=1)).strftime('%Y年%m月')
-            })
-    
-    return sorted(events, key=lambda x: x['days_until'])[:10]  # 返回最近10个事件
+    return get_event_calendar().events_within(CHINA, 90, limit=10)  # 返回未来90天内最近10个事件
 
 
 def get_options_expiration_dates():
@@ -1259,66 +1163,9 @@ def get_options_expiration_dates():
     - 季度期权：3月、6月、9月、12月的第三个星期五（四重到期日，Quadruple Witching）
     - 周度期权：每周五（但重要性较低，这里主要关注月度）
     
-    返回未来3个月内的期权到期日
+    返回最近3个期权到期日
     """
-    today = datetime.now().date()
-    expiration_dates = []
-    
-    # 计算未来3个月的期权到期日
-    for i in range(0, 4):  # 包括当前月
-        target_month = today + relativedelta(months=i)
-        year = target_month.year
-        month = target_month.month
-        
-        # 找到该月第一个星期五
-        first_day = datetime(year, month, 1).date()
-        # 计算到第一个星期五需要多少天（星期五是4）
-        days_to_first_friday = (4 - first_day.weekday()) % 7
-        if days_to_first_friday == 0 and first_day.weekday() != 4:
-            days_to_first_friday = 7
-        
-        first_friday = first_day + timedelta(days=days_to_first_friday)
-        
-        # 第三个星期五 = 第一个星期五 + 14天
-        third_friday = first_friday + timedelta(days=14)
-        
-        # 如果第三个星期五已经过去，计算下个月的
-        if third_friday < today and i == 0:
-            # 计算下个月的
-            next_month = today + relativedelta(months=1)
-            year = next_month.year
-            month = next_month.month
-            first_day = datetime(year, month, 1).date()
-            days_to_first_friday = (4 - first_day.weekday()) % 7
-            if days_to_first_friday == 0 and first_day.weekday() != 4:
-                days_to_first_friday = 7
-            first_friday = first_day + timedelta(days=days_to_first_friday)
-            third_friday = first_friday + timedelta(days=14)
-        
-        days_until = (third_friday - today).days
-        
-        # 只添加未来的日期
-        if days_until >= 0:
-            # 判断是否为季度到期日（四重到期日）
-            is_quadruple_witching = month in [3, 6, 9, 12]
-            
-            expiration_dates.append({
-                'date': third_friday.strftime('%Y-%m-%d'),
-                'days_until': int(days_until),
-                'month': month,
-                'is_quadruple_witching': is_quadruple_witching,
-                'type': '四重到期日（季度）' if is_quadruple_witching else '月度到期日'
-            })
-    
-    # 去重并排序
-    seen_dates = set()
-    unique_dates = []
-    for exp_date in expiration_dates:
-        if exp_date['date'] not in seen_dates:
-            seen_dates.add(exp_date['date'])
-            unique_dates.append(exp_date)
-    
-    return sorted(unique_dates, key=lambda x: x['days_until'])[:3]  # 返回最近3个
+    return get_event_calendar().upcoming(OPTIONS_EXPIRATION, 3)  # 返回最近3个
 
 
 def get_market_warnings(macro_data, options_data, data):
@@ -1328,6 +1175,7 @@ def get_market_warnings(macro_data, options_data, data):
     返回预警列表，每个预警包含：级别、类型、消息、距离天数（如果是事件）
     """
     warnings = []
+    calendar = get_event_calendar()
     
     # 1. VIX预警（提前预警，而不是等它已经很高）
     if options_data.get('vix') is not None:
@@ -1427,146 +1275,141 @@ def get_market_warnings(macro_data, options_data, data):
             })
     
     # 5. 美联储会议预警（提前提醒）
-    if macro_data.get('fed_meetings'):
-        for meeting in macro_data['fed_meetings']:
-            days_until = meeting['days_until']
-            if days_until <= 3:
-                warnings.append({
-                    'level': 'high',
-                    'type': 'event',
-                    'message': f'美联储利率决议将在{meeting["date"]}举行（{days_until}天后）{"，含点阵图" if meeting["has_dot_plot"] else ""}',
-                    'urgency': 'immediate',
-                    'event_date': meeting['date']
-                })
-            elif days_until <= 7:
-                warnings.append({
-                    'level': 'medium',
-                    'type': 'event',
-                    'message': f'美联储利率决议将在{meeting["date"]}举行（{days_until}天后）{"，含点阵图" if meeting["has_dot_plot"] else ""}，建议提前调整仓位',
-                    'urgency': 'soon',
-                    'event_date': meeting['date']
-                })
-            elif days_until <= 14:
-                warnings.append({
-                    'level': 'low',
-                    'type': 'event',
-                    'message': f'美联储利率决议将在{meeting["date"]}举行（{days_until}天后），建议关注',
-                    'urgency': 'monitor',
-                    'event_date': meeting['date']
-                })
+    for meeting in calendar.events_within(FED, 14):
+        days_until = meeting['days_until']
+        if days_until <= 3:
+            warnings.append({
+                'level': 'high',
+                'type': 'event',
+                'message': f'美联储利率决议将在{meeting["date"]}举行（{days_until}天后）{"，含点阵图" if meeting["has_dot_plot"] else ""}',
+                'urgency': 'immediate',
+                'event_date': meeting['date']
+            })
+        elif days_until <= 7:
+            warnings.append({
+                'level': 'medium',
+                'type': 'event',
+                'message': f'美联储利率决议将在{meeting["date"]}举行（{days_until}天后）{"，含点阵图" if meeting["has_dot_plot"] else ""}，建议提前调整仓位',
+                'urgency': 'soon',
+                'event_date': meeting['date']
+            })
+        elif days_until <= 14:
+            warnings.append({
+                'level': 'low',
+                'type': 'event',
+                'message': f'美联储利率决议将在{meeting["date"]}举行（{days_until}天后），建议关注',
+                'urgency': 'monitor',
+                'event_date': meeting['date']
+            })
     
     # 6. 美国CPI发布预警
-    if macro_data.get('cpi_releases'):
-        for cpi in macro_data['cpi_releases']:
-            if cpi.get('country') == 'US':  # 只处理美国CPI
-                days_until = cpi['days_until']
-                if days_until <= 3:
-                    warnings.append({
-                        'level': 'high',
-                        'type': 'event',
-                        'message': f'美国CPI数据将在{cpi["date"]}发布（{days_until}天后，{cpi["data_month"]}数据），市场波动可能加剧',
-                        'urgency': 'immediate',
-                        'event_date': cpi['date'],
-                        'country': 'US'
-                    })
-                elif days_until <= 7:
-                    warnings.append({
-                        'level': 'medium',
-                        'type': 'event',
-                        'message': f'美国CPI数据将在{cpi["date"]}发布（{days_until}天后，{cpi["data_month"]}数据），建议关注',
-                        'urgency': 'soon',
-                        'event_date': cpi['date'],
-                        'country': 'US'
-                    })
+    for cpi in calendar.events_within(US_CPI, 7):
+        days_until = cpi['days_until']
+        if days_until <= 3:
+            warnings.append({
+                'level': 'high',
+                'type': 'event',
+                'message': f'美国CPI数据将在{cpi["date"]}发布（{days_until}天后，{cpi["data_month"]}数据），市场波动可能加剧',
+                'urgency': 'immediate',
+                'event_date': cpi['date'],
+                'country': 'US'
+            })
+        elif days_until <= 7:
+            warnings.append({
+                'level': 'medium',
+                'type': 'event',
+                'message': f'美国CPI数据将在{cpi["date"]}发布（{days_until}天后，{cpi["data_month"]}数据），建议关注',
+                'urgency': 'soon',
+                'event_date': cpi['date'],
+                'country': 'US'
+            })
     
     # 6.5 中国经济事件预警
-    if macro_data.get('china_events'):
-        for event in macro_data['china_events']:
-            days_until = event['days_until']
-            event_type = event.get('type', '经济事件')
-            country = event.get('country', 'CN')
+    for event in calendar.events_within(CHINA, 7):
+        days_until = event['days_until']
+        event_type = event.get('type', '经济事件')
+        country = event.get('country', 'CN')
+        
+        if days_until <= 3:
+            message = f'中国{event_type}将在{event["date"]}举行/发布（{days_until}天后）'
+            if event.get('data_month'):
+                message += f'，{event["data_month"]}数据'
+            elif event.get('quarter'):
+                message += f'，{event["quarter"]}数据'
+            message += '，可能影响A股和港股市场'
             
-            if days_until <= 3:
-                message = f'中国{event_type}将在{event["date"]}举行/发布（{days_until}天后）'
-                if event.get('data_month'):
-                    message += f'，{event["data_month"]}数据'
-                elif event.get('quarter'):
-                    message += f'，{event["quarter"]}数据'
-                message += '，可能影响A股和港股市场'
-                
-                warnings.append({
-                    'level': 'high',
-                    'type': 'event',
-                    'message': message,
-                    'urgency': 'immediate',
-                    'event_date': event['date'],
-                    'country': country
-                })
-            elif days_until <= 7:
-                message = f'中国{event_type}将在{event["date"]}举行/发布（{days_until}天后）'
-                if event.get('data_month'):
-                    message += f'，{event["data_month"]}数据'
-                elif event.get('quarter'):
-                    message += f'，{event["quarter"]}数据'
-                message += '，建议关注'
-                
-                warnings.append({
-                    'level': 'medium',
-                    'type': 'event',
-                    'message': message,
-                    'urgency': 'soon',
-                    'event_date': event['date'],
-                    'country': country
-                })
+            warnings.append({
+                'level': 'high',
+                'type': 'event',
+                'message': message,
+                'urgency': 'immediate',
+                'event_date': event['date'],
+                'country': country
+            })
+        elif days_until <= 7:
+            message = f'中国{event_type}将在{event["date"]}举行/发布（{days_until}天后）'
+            if event.get('data_month'):
+                message += f'，{event["data_month"]}数据'
+            elif event.get('quarter'):
+                message += f'，{event["quarter"]}数据'
+            message += '，建议关注'
+            
+            warnings.append({
+                'level': 'medium',
+                'type': 'event',
+                'message': message,
+                'urgency': 'soon',
+                'event_date': event['date'],
+                'country': country
+            })
     
     # 7. 期权到期日（交割日）预警 - 市场级别风险
     # 期权到期日是市场级别的风险，会影响整个市场的波动性
-    if macro_data.get('options_expirations'):
-        for exp in macro_data['options_expirations']:
-            days_until = exp['days_until']
-            is_quadruple = exp.get('is_quadruple_witching', False)
-            
-            # 期权到期日会导致市场波动增加，这是市场级别的风险
-            if days_until <= 1:
-                # 当天或明天到期，市场波动风险最高
-                warnings.append({
-                    'level': 'high',
-                    'type': 'market',
-                    'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日，市场波动风险极高，做市商需要大量调整对冲头寸" if is_quadruple else " - 月度到期日，市场波动风险增加，做市商需要调整对冲"}',
-                    'urgency': 'immediate',
-                    'event_date': exp['date']
-                })
-            elif days_until <= 3:
-                warnings.append({
-                    'level': 'high',
-                    'type': 'market',
-                    'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日，市场波动风险高" if is_quadruple else " - 月度到期日，市场波动风险上升"}',
-                    'urgency': 'immediate',
-                    'event_date': exp['date']
-                })
-            elif days_until <= 7:
-                warnings.append({
-                    'level': 'medium',
-                    'type': 'market',
-                    'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日" if is_quadruple else " - 月度到期日"}，市场波动风险增加，建议降低仓位或保持观望',
-                    'urgency': 'soon',
-                    'event_date': exp['date']
-                })
-            elif days_until <= 14:
-                warnings.append({
-                    'level': 'low',
-                    'type': 'market',
-                    'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日" if is_quadruple else " - 月度到期日"}，市场波动风险上升，建议关注',
-                    'urgency': 'monitor',
-                    'event_date': exp['date']
-                })
+    for exp in calendar.events_within(OPTIONS_EXPIRATION, 14):
+        days_until = exp['days_until']
+        is_quadruple = exp.get('is_quadruple_witching', False)
+        
+        # 期权到期日会导致市场波动增加，这是市场级别的风险
+        if days_until <= 1:
+            # 当天或明天到期，市场波动风险最高
+            warnings.append({
+                'level': 'high',
+                'type': 'market',
+                'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日，市场波动风险极高，做市商需要大量调整对冲头寸" if is_quadruple else " - 月度到期日，市场波动风险增加，做市商需要调整对冲"}',
+                'urgency': 'immediate',
+                'event_date': exp['date']
+            })
+        elif days_until <= 3:
+            warnings.append({
+                'level': 'high',
+                'type': 'market',
+                'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日，市场波动风险高" if is_quadruple else " - 月度到期日，市场波动风险上升"}',
+                'urgency': 'immediate',
+                'event_date': exp['date']
+            })
+        elif days_until <= 7:
+            warnings.append({
+                'level': 'medium',
+                'type': 'market',
+                'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日" if is_quadruple else " - 月度到期日"}，市场波动风险增加，建议降低仓位或保持观望',
+                'urgency': 'soon',
+                'event_date': exp['date']
+            })
+        elif days_until <= 14:
+            warnings.append({
+                'level': 'low',
+                'type': 'market',
+                'message': f'期权到期日：{exp["date"]}（{days_until}天后）{" - 四重到期日" if is_quadruple else " - 月度到期日"}，市场波动风险上升，建议关注',
+                'urgency': 'monitor',
+                'event_date': exp['date']
+            })
     
     # 8. 财报日期预警（个股级别）
     if data.get('earnings_dates'):
         for earnings_date in data['earnings_dates']:
             try:
                 earnings_dt = datetime.strptime(earnings_date, '%Y-%m-%d').date()
-                today = datetime.now().date()
+                today = calendar.today
                 days_until = (earnings_dt - today).days
                 
                 if 0 <= days_until <= 3:
@@ -2006,6 +1849,7 @@ def get_polymarket_data():
                         
             except Exception as e:
                 print(f"Polymarket GraphQL API请求失败: {e}")
+                record_upstream_error('polymarket')
                 # 如果GraphQL失败，尝试使用REST API
                 try:
                     # 尝试获取市场数据（使用REST端点，如果可用）
@@ -2037,6 +1881,80 @@ def get_polymarket_data():
     return polymarket_data
 
 
+def get_vix_data():
+    """
+    获取VIX恐慌指数及其日变化
+    与个股无关，由市场上下文快照（market_context）统一刷新
+    """
+    vix_data = {
+        'vix': None,
+        'vix_change': None
+    }
+    
+    try:
+        vix_ticker = yf.Ticker('^VIX')
+        vix_hist = vix_ticker.history(period='5d', timeout=10)
+        if not vix_hist.empty and len(vix_hist) >= 2:
+            vix_current = float(vix_hist['Close'].iloc[-1])
+            vix_prev = float(vix_hist['Close'].iloc[-2])
+            vix_change = ((vix_current - vix_prev) / vix_prev) * 100
+            vix_data['vix'] = float(vix_current)  # 确保是Python float
+            vix_data['vix_change'] = float(vix_change)  # 确保是Python float
+    except Exception as e:
+        print(f"获取VIX数据失败: {e}")
+    
+    return vix_data
+
+
+def get_put_call_data(ticker):
+    """
+    获取个股最近到期期权链的Put/Call比率（持仓量）
+    仅美股有效，其他市场返回空值
+    """
+    put_call_data = {
+        'put_call_ratio': None,
+        'options_volume': None,
+        'has_options': False  # 布尔值，JSON可以序列化
+    }
+    
+    # 判断是否为美股（不包含.HK, .SS, .SZ等后缀）
+    normalized_ticker = normalize_ticker(ticker)
+    is_us_stock = '.' not in normalized_ticker or normalized_ticker.endswith(('.US', ''))
+    
+    if not is_us_stock:
+        return put_call_data
+    
+    try:
+        stock = yf.Ticker(normalized_ticker)
+        # 获取最近的到期日期
+        try:
+            expirations = stock.options
+            if expirations and len(expirations) > 0:
+                # 获取最近到期的期权链
+                nearest_exp = expirations[0]
+                opt_chain = stock.option_chain(nearest_exp)
+                
+                calls = opt_chain.calls
+                puts = opt_chain.puts
+                
+                # 计算Put/Call比率（持仓量）
+                if not calls.empty and not puts.empty:
+                    put_volume = float(puts['openInterest'].sum() if 'openInterest' in puts.columns else puts['volume'].sum())
+                    call_volume = float(calls['openInterest'].sum() if 'openInterest' in calls.columns else calls['volume'].sum())
+                    
+                    if call_volume > 0:
+                        put_call_ratio = float(put_volume / call_volume)
+                        put_call_data['put_call_ratio'] = put_call_ratio
+                        put_call_data['options_volume'] = float(put_volume + call_volume)
+                        put_call_data['has_options'] = True
+        except Exception as e:
+            print(f"获取期权链数据失败: {e}")
+    except Exception as e:
+        print(f"期权数据获取异常: {e}")
+    
+    return put_call_data
+
+
 def get_options_market_data(ticker):
     """
     获取期权市场相关数据
@@ -2053,51 +1971,10 @@ def get_options_market_data(ticker):
     
     try:
         # 1. 获取VIX（恐慌指数）- 这是最重要的市场波动率指标
-        try:
-            vix_ticker = yf.Ticker('^VIX')
-            vix_hist = vix_ticker.history(period='5d', timeout=10)
-            if not vix_hist.empty and len(vix_hist) >= 2:
-                vix_current = float(vix_hist['Close'].iloc[-1])
-                vix_prev = float(vix_hist['Close'].iloc[-2])
-                vix_change = ((vix_current - vix_prev) / vix_prev) * 100
-                options_data['vix'] = float(vix_current)  # 确保是Python float
-                options_data['vix_change'] = float(vix_change)  # 确保是Python float
-        except Exception as e:
-            print(f"获取VIX数据失败: {e}")
+        options_data.update(get_vix_data())
         
         # 2. 对于美股，尝试获取期权链数据
-        # 判断是否为美股（不包含.HK, .SS, .SZ等后缀）
-        normalized_ticker = normalize_ticker(ticker)
-        is_us_stock = '.' not in normalized_ticker or normalized_ticker.endswith(('.US', ''))
-        
-        if is_us_stock:
-            try:
-                stock = yf.Ticker(normalized_ticker)
-                # 获取最近的到期日期
-                try:
-                    expirations = stock.options
-                    if expirations and len(expirations) > 0:
-                        # 获取最近到期的期权链
-                        nearest_exp = expirations[0]
-                        opt_chain = stock.option_chain(nearest_exp)
-                        
-                        calls = opt_chain.calls
-                        puts = opt_chain.puts
-                        
-                        # 计算Put/Call比率（持仓量）
-                        if not calls.empty and not puts.empty:
-                            put_volume = float(puts['openInterest'].sum() if 'openInterest' in puts.columns else puts['volume'].sum())
-                            call_volume = float(calls['openInterest'].sum() if 'openInterest' in calls.columns else calls['volume'].sum())
-                            
-                            if call_volume > 0:
-                                put_call_ratio = float(put_volume / call_volume)
-                                options_data['put_call_ratio'] = put_call_ratio
-                                options_data['options_volume'] = float(put_volume + call_volume)
-                                options_data['has_options'] = True  # 布尔值，JSON可以序列化
-                except Exception as e:
-                    print(f"获取期权链数据失败: {e}")
-            except Exception as e:
-                print(f"期权数据获取异常: {e}")
+        options_data.update(get_put_call_data(ticker))
     except Exception as e:
         print(f"获取期权市场数据时出错: {e}")
     
@@ -2237,6 +2114,7 @@ def calculate_atr_stop_loss(buy_price, hist_data, atr_period=None, atr_multiplie
     return stop_loss_price
 
 
+@span('calculate_market_sentiment')
 def calculate_market_sentiment(data):
     """
     计算市场情绪评分 (M维度)
@@ -2285,19 +2163,16 @@ def calculate_market_sentiment(data):
         except Exception as e:
             print(f"获取中国市场情绪数据失败: {e}")
     
-    # 获取期权市场数据
-    options_data = get_options_market_data(data.get('original_symbol', data.get('symbol', '')))
-    
-    # 获取宏观经济数据
-    macro_data = get_macro_market_data()
+    # 市场级数据（VIX、宏观、Polymarket、地缘政治风险）来自全进程共享的快照，
+    # 只有Put/Call比率需要按个股获取
+    from .market_context import get_market_context
+    context = get_market_context()
     
-    # 获取Polymarket预测市场数据
-    polymarket_data = get_polymarket_data()
-    macro_data['polymarket'] = polymarket_data
+    options_data = context.options_data()
+    options_data.update(get_put_call_data(data.get('original_symbol', data.get('symbol', ''))))
     
-    # 计算地缘政治风险指数（需要期权数据）
-    if options_data:
-        macro_data['geopolitical_risk'] = calculate_geopolitical_risk(macro_data, options_data)
+    macro_data = context.macro_data()
+    polymarket_data = macro_data.get('polymarket')
     
     # 生成市场预警信息
     warnings = get_market_warnings(macro_data, options_data, data)
@@ -2599,6 +2474,50 @@ def calculate_market_sentiment(data):
     return round(sentiment_score, 1)
 
 
+# ETF / 基金识别关键词（ETF 优先）
+ETF_KEYWORDS = [
+    'etf', 'exchange traded fund', 'index fund', 'tracker',
+    'proshares', 'ultrapro', 'ultra', 'invesco', 'ishares',
+    'vanguard', 'spdr', 'ark', 'leveraged', 'inverse',
+    '3x', '2x', 'qqq', 'spy', 'dow', 'nasdaq'
+]
+FUND_KEYWORDS = ['mutual fund', 'fund', 'trust', 'reit', 'reits', 'closed-end']
+
+# 行业分类（按优先级）
+INDUSTRY_KEYWORDS = [
+    ('technology', ['technology', 'software', 'internet', 'semiconductor', 'tech']),
+    ('financial', ['financial', 'bank', 'insurance', 'finance']),
+    ('healthcare', ['healthcare', 'pharmaceutical', 'biotech', 'medical']),
+    ('energy', ['energy', 'oil', 'gas', 'petroleum']),
+    ('consumer', ['consumer', 'retail', 'consumer goods']),
+    ('real_estate', ['real estate', 'reit', 'property']),
+    ('utility', ['utility', 'utilities', 'electric']),
+]
+
+# 合理PE：行业基础PE × 成长阶段系数 × 投资风格系数
+BASE_PE = {
+    'technology': 25, 'healthcare': 22, 'financial': 12, 'energy': 15,
+    'consumer': 18, 'real_estate': 15, 'utility': 16, 'general': 18
+}
+GROWTH_STAGE_PE_FACTOR = {'high_growth': 1.3, 'growth': 1.15, 'stable': 1.0, 'declining': 0.7}
+STYLE_PE_FACTOR = {'value': 0.75, 'growth': 1.2, 'quality': 1.0, 'momentum': 1.1}
+
+# 目标价各方法权重（按行业）：PE估值, PEG估值, 增长率折现, 技术面分析
+TARGET_PRICE_METHODS = ('PE估值', 'PEG估值', '增长率折现', '技术面分析')
+METHOD_WEIGHTS = {
+    'technology': (0.25, 0.30, 0.30, 0.15),  # 科技和医疗：更重视增长率和PEG
+    'healthcare': (0.25, 0.30, 0.30, 0.15),
+    'financial': (0.50, 0.20, 0.15, 0.15),   # 金融：更重视PE
+    'energy': (0.40, 0.15, 0.20, 0.25),      # 能源和公用事业：更重视PE和技术面
+    'utility': (0.40, 0.15, 0.20, 0.25),
+}
+DEFAULT_METHOD_WEIGHTS = (0.35, 0.25, 0.25, 0.15)  # 其他行业：均衡权重
+
+# 各风格基础仓位上限（%）：个股 / ETF与基金（ETF可以稍微放宽）
+STOCK_BASE_CAPS = {'value': 10, 'growth': 15, 'quality': 20, 'momentum': 5}
+FUND_BASE_CAPS = {'value': 15, 'growth': 20, 'quality': 25, 'momentum': 8}
+
+
 def is_etf_or_fund(data):
     """
     判断是否为ETF或基金
@@ -2609,22 +2528,13 @@ def is_etf_or_fund(data):
     name = data.get('name', '').lower()
     symbol = data.get('symbol', '').lower()
     
-    # 关键词检测（扩展关键词列表）
-    etf_keywords = [
-        'etf', 'exchange traded fund', 'index fund', 'tracker',
-        'proshares', 'ultrapro', 'ultra', 'invesco', 'ishares',
-        'vanguard', 'spdr', 'ark', 'leveraged', 'inverse',
-        '3x', '2x', 'qqq', 'spy', 'dow', 'nasdaq'
-    ]
-    fund_keywords = ['mutual fund', 'fund', 'trust', 'reit', 'reits', 'closed-end']
-    
     # 检查名称和行业
     name_sector_industry = f"{name} {sector} {industry} {symbol}"
     
     # 检查ETF关键词（优先级更高）
-    if any(keyword in name_sector_industry for keyword in etf_keywords):
+    if any(keyword in name_sector_industry for keyword in ETF_KEYWORDS):
         return True, 'ETF'
-    elif any(keyword in name_sector_industry for keyword in fund_keywords):
+    elif any(keyword in name_sector_industry for keyword in FUND_KEYWORDS):
         # REIT是特殊的，也算基金类
         if 'reit' in name_sector_industry:
             return True, 'REIT'
@@ -2669,20 +2579,10 @@ def classify_company(data):
     
     # 1. 按行业分类
     industry_category = 'general'
-    if any(keyword in sector or keyword in industry for keyword in ['technology', 'software', 'internet', 'semiconductor', 'tech']):
-        industry_category = 'technology'
-    elif any(keyword in sector or keyword in industry for keyword in ['financial', 'bank', 'insurance', 'finance']):
-        industry_category = 'financial'
-    elif any(keyword in sector or keyword in industry for keyword in ['healthcare', 'pharmaceutical', 'biotech', 'medical']):
-        industry_category = 'healthcare'
-    elif any(keyword in sector or keyword in industry for keyword in ['energy', 'oil', 'gas', 'petroleum']):
-        industry_category = 'energy'
-    elif any(keyword in sector or keyword in industry for keyword in ['consumer', 'retail', 'consumer goods']):
-        industry_category = 'consumer'
-    elif any(keyword in sector or keyword in industry for keyword in ['real estate', 'reit', 'property']):
-        industry_category = 'real_estate'
-    elif any(keyword in sector or keyword in industry for keyword in ['utility', 'utilities', 'electric']):
-        industry_category = 'utility'
+    for category, keywords in INDUSTRY_KEYWORDS:
+        if any(keyword in sector or keyword in industry for keyword in keywords):
+            industry_category = category
+            break
     
     # 2. 按成长阶段分类
     growth_stage = 'mature'
@@ -2723,37 +2623,10 @@ def get_reasonable_pe_by_category(company_info, style):
     industry_category = company_info['industry_category']
     growth_stage = company_info['growth_stage']
     
-    # 基础PE（根据行业）
-    base_pe = {
-        'technology': 25,
-        'healthcare': 22,
-        'financial': 12,
-        'energy': 15,
-        'consumer': 18,
-        'real_estate': 15,
-        'utility': 16,
-        'general': 18
-    }.get(industry_category, 18)
-    
-    # 根据成长阶段调整
-    if growth_stage == 'high_growth':
-        base_pe *= 1.3  # 高成长公司可以容忍更高PE
-    elif growth_stage == 'growth':
-        base_pe *= 1.15
-    elif growth_stage == 'stable':
-        base_pe *= 1.0
-    elif growth_stage == 'declining':
-        base_pe *= 0.7  # 衰退公司PE应该更低
-    
-    # 根据投资风格调整
-    if style == 'value':
-        base_pe *= 0.75  # 价值风格要求更低PE
-    elif style == 'growth':
-        base_pe *= 1.2  # 成长风格可以容忍更高PE
-    elif style == 'quality':
-        base_pe *= 1.0  # 质量风格保持基准
-    elif style == 'momentum':
-        base_pe *= 1.1  # 趋势风格略高
+    # 基础PE（根据行业），再按成长阶段（高成长可容忍更高PE、衰退更低）和投资风格调整
+    base_pe = BASE_PE.get(industry_category, 18)
+    base_pe *= GROWTH_STAGE_PE_FACTOR.get(growth_stage, 1.0)
+    base_pe *= STYLE_PE_FACTOR.get(style, 1.0)
     
     return round(base_pe, 1)
 
@@ -2832,8 +2705,11 @@ def calculate_target_price(data, risk_result, style):
         peg = data['peg']
         growth = data['growth']
         
-        # 获取宏观经济数据以计算动态PEG阈值
-        macro_data = get_macro_market_data()
+        # 获取宏观经济数据以计算动态PEG阈值（优先复用情绪计算时存下的快照数据）
+        macro_data = data.get('macro_data')
+        if not macro_data:
+            from .market_context import get_market_context
+            macro_data = get_market_context().macro_data()
         dynamic_peg_threshold = get_dynamic_peg_threshold(macro_data)
         
         # 合理PEG（基于动态阈值调整）
@@ -2918,19 +2794,7 @@ def calculate_target_price(data, risk_result, style):
     else:
         # 根据公司类别和投资风格，给不同方法分配权重
         industry_category = company_info['industry_category']
-        
-        if industry_category in ['technology', 'healthcare']:
-            # 科技和医疗：更重视增长率和PEG
-            weights = {'PE估值': 0.25, 'PEG估值': 0.30, '增长率折现': 0.30, '技术面分析': 0.15}
-        elif industry_category == 'financial':
-            # 金融：更重视PE
-            weights = {'PE估值': 0.50, 'PEG估值': 0.20, '增长率折现': 0.15, '技术面分析': 0.15}
-        elif industry_category in ['energy', 'utility']:
-            # 能源和公用事业：更重视PE和技术面
-            weights = {'PE估值': 0.40, 'PEG估值': 0.15, '增长率折现': 0.20, '技术面分析': 0.25}
-        else:
-            # 其他行业：均衡权重
-            weights = {'PE估值': 0.35, 'PEG估值': 0.25, '增长率折现': 0.25, '技术面分析': 0.15}
+        weights = dict(zip(TARGET_PRICE_METHODS, METHOD_WEIGHTS.get(industry_category, DEFAULT_METHOD_WEIGHTS)))
         
         # 计算加权平均
         weighted_sum = 0
@@ -2994,6 +2858,46 @@ def calculate_target_price(data, risk_result, style):
     return round(target_price, 2)
 
 
+def apply_target_price_adjustment(risk_result, current_price, target_price):
+    """
+    根据目标价格和当前价格动态调整建议仓位（原地更新 risk_result）
+    返回上涨空间（小数），价格无效时返回 None
+    """
+    if not (current_price > 0 and target_price > 0):
+        return None
+    
+    # 计算上涨空间百分比
+    upside_pct = (target_price - current_price) / current_price
+    
+    # 根据上涨空间调整仓位
+    # 如果目标价低于当前价，大幅降低仓位（不建议买入）
+    if upside_pct < 0:
+        # 目标价低于当前价，仓位调整为0或极小值
+        price_adjustment = 0.0
+        risk_result['price_adjustment'] = price_adjustment
+        risk_result['suggested_position'] = 0.0
+    elif upside_pct < 0.05:  # 上涨空间 < 5%
+        price_adjustment = 0.3  # 大幅降低仓位
+    elif upside_pct < 0.10:  # 上涨空间 5-10%
+        price_adjustment = 0.6  # 适度降低仓位
+    elif upside_pct < 0.20:  # 上涨空间 10-20%
+        price_adjustment = 0.9  # 轻微降低仓位
+    elif upside_pct < 0.30:  # 上涨空间 20-30%
+        price_adjustment = 1.0  # 正常仓位
+    else:  # 上涨空间 > 30%
+        price_adjustment = 1.1  # 可以适当增加仓位（但不超过基础上限）
+        price_adjustment = min(price_adjustment, 1.2)  # 最多增加20%
+    
+    # 应用价格调整
+    base_position = risk_result.get('suggested_position', 0)
+    adjusted_position = base_position * price_adjustment
+    risk_result['price_adjustment'] = price_adjustment
+    risk_result['suggested_position'] = round(adjusted_position, 1)
+    risk_result['upside_potential_pct'] = round(upside_pct * 100, 2)
+    
+    return upside_pct
+
+
 def analyze_risk_and_position(style, data):
     """
     基于胡猛模型和五大支柱进行硬逻辑计算
@@ -3041,13 +2945,7 @@ def analyze_risk_and_position(style, data):
         
         # 3. ETF/基金不适合用PE等指标评估，使用技术面为主
         # 仓位建议：ETF可以稍微放宽，但也要控制风险
-        base_caps = {
-            'value': 15,    # ETF价值风格可以稍微高一点
-            'growth': 20,   # ETF成长风格
-            'quality': 25,  # ETF质量风格
-            'momentum': 8   # ETF趋势风格
-        }
-        max_cap = base_caps.get(style, 15)
+        max_cap = FUND_BASE_CAPS.get(style, 15)
         
         # 风险调整
         adjustment = 1.0
@@ -3203,13 +3101,7 @@ def analyze_risk_and_position(style, data):
     elif risk_score >= 2: risk_level = "中"
     
     # 基础仓位上限 (根据你的文档)
-    base_caps = {
-        'value': 10,    # 10%
-        'growth': 15,   # 15%
-        'quality': 20,  # 20%
-        'momentum': 5   # 5%
-    }
-    max_cap = base_caps.get(style, 10)
+    max_cap = STOCK_BASE_CAPS.get(style, 10)
     
     # 风险调整系数
     adjustment = 1.0
@@ -0,0 +1,199 @@
+"""
+Economic Event Calendar Index
+
+美联储议息、美国CPI、中国经济事件、期权到期日这几类日期都是按规则推算出来的，
+一天之内不会变化。这里每天只构建一次索引：每类事件一个按日期排序的数组，
+通过 bisect 查询"某类事件的下一个"和"N天内的事件"。
+
+宏观数据（get_macro_market_data）、市场预警（get_market_warnings）和 AI 提示词共用同一份索引。
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from dateutil.relativedelta import relativedelta
+
+# 事件类型
+FED = 'fed'
+US_CPI = 'us_cpi'
+CHINA = 'china'
+OPTIONS_EXPIRATION = 'options_expiration'
+
+# 索引覆盖的未来天数（所有查询窗口都远小于该值）
+HORIZON_DAYS = 400
+
+# FOMC会议日期（根据美联储官方日程）
+FED_MEETING_DATES = [
+    date(2025, 1, 28),   # 1月28-29日
+    date(2025, 3, 18),   # 3月18-19日（含点阵图）
+    date(2025, 5, 6),    # 5月6-7日
+    date(2025, 6, 17),   # 6月17-18日（含点阵图）
+    date(2025, 7, 29),   # 7月29-30日
+    date(2025, 9, 16),   # 9月16-17日（含点阵图）
+    date(2025, 10, 28),  # 10月28-29日
+    date(2025, 12, 9),   # 12月9-10日（含点阵图）
+    date(2026, 1, 28),
+    date(2026, 3, 18),
+]
+
+
+def _next_weekday(d: date) -> date:
+    """周末顺延到下一个工作日"""
+    while d.weekday() >= 5:
+        d += timedelta(days=1)
+    return d
+
+
+def _third_friday(year: int, month: int) -> date:
+    first_day = date(year, month, 1)
+    first_friday = first_day + timedelta(days=(4 - first_day.weekday()) % 7)
+    return first_friday + timedelta(days=14)
+
+
+def _months(today: date, count: int):
+    """从当月开始的连续 count 个月（year, month）"""
+    first = today.replace(day=1)
+    for i in range(count):
+        m = first + relativedelta(months=i)
+        yield m.year, m.month
+
+
+def _data_month(year: int, month: int) -> str:
+    return (date(year, month, 1) - relativedelta(months=1)).strftime('%Y年%m月')
+
+
+def _fed_events(today: date):
+    for meeting in FED_MEETING_DATES:
+        yield meeting, {
+            'has_dot_plot': bool(meeting.month in [3, 6, 9, 12])  # 季度会议含点阵图
+        }
+
+
+def _us_cpi_events(today: date, months: int):
+    # CPI通常在每月10-15日之间发布上月数据，这里假设是12日
+    for year, month in _months(today, months):
+        yield _next_weekday(date(year, month, 12)), {
+            'data_month': _data_month(year, month),
+            'country': 'US'
+        }
+
+
+def _china_events(today: date, months: int):
+    years = range(today.year, today.year + months // 12 + 2)
+
+    # 1. 央行货币政策会议（通常每季度一次，1/4/7/10月下旬）
+    for year in years:
+        for month in (1, 4, 7, 10):
+            yield date(year, month, 20), {'type': '央行货币政策会议', 'country': 'CN'}
+
+    # 2. CPI/PPI发布（每月10日左右发布上月数据）、4. PMI发布（每月1日左右）
+    for year, month in _months(today, months):
+        yield _next_weekday(date(year, month, 10)), {
+            'type': 'CPI/PPI发布',
+            'country': 'CN',
+            'data_month': _data_month(year, month)
+        }
+        yield _next_weekday(date(year, month, 1)), {
+            'type': 'PMI发布',
+            'country': 'CN',
+            'data_month': _data_month(year, month)
+        }
+
+    # 3. GDP发布（季后15-20日发布）：Q1在4月，Q2在7月，Q3在10月，Q4在次年1月
+    quarters = {4: 'Q1', 7: 'Q2', 10: 'Q3', 1: 'Q4'}
+    for year in years:
+        for month, quarter in quarters.items():
+            yield date(year, month, 18), {'type': 'GDP发布', 'country': 'CN', 'quarter': quarter}
+
+
+def _options_expiration_events(today: date, months: int):
+    # 月度期权：每月第三个星期五；3/6/9/12月为四重到期日
+    for year, month in _months(today, months):
+        is_quadruple_witching = month in [3, 6, 9, 12]
+        yield _third_friday(year, month), {
+            'month': month,
+            'is_quadruple_witching': is_quadruple_witching,
+            'type': '四重到期日（季度）' if is_quadruple_witching else '月度到期日'
+        }
+
+
+class EventCalendarIndex:
+    """某一天的事件索引：每类事件按日期排序，days_until 相对 today 计算"""
+
+    def __init__(self, today: date, events: Dict[str, List[tuple]]):
+        self.today = today
+        self._ordinals: Dict[str, List[int]] = {}
+        self._events: Dict[str, List[dict]] = {}
+
+        for kind, items in events.items():
+            items = sorted(items, key=lambda item: item[0])
+            self._ordinals[kind] = [d.toordinal() for d, _ in items]
+            self._events[kind] = [
+                {'date': d.strftime('%Y-%m-%d'), 'days_until': (d - today).days, **fields}
+                for d, fields in items
+            ]
+
+    def _slice(self, kind: str, start: int, end: int, limit: Optional[int]) -> List[dict]:
+        if limit is not None:
+            end = min(end, start + limit)
+        # 返回副本，调用方可以自由修改
+        return [dict(e) for e in self._events.get(kind, [])[start:end]]
+
+    def next_event(self, kind: str, on_or_after: Optional[date] = None) -> Optional[dict]:
+        """某类事件在指定日期（默认今天）当天或之后的第一个"""
+        ordinals = self._ordinals.get(kind, [])
+        i = bisect_left(ordinals, (on_or_after or self.today).toordinal())
+        return dict(self._events[kind][i]) if i < len(ordinals) else None
+
+    def events_within(self, kind: str, days: int, limit: Optional[int] = None) -> List[dict]:
+        """未来 days 天内（含今天）的某类事件，按日期升序"""
+        ordinals = self._ordinals.get(kind, [])
+        start = bisect_left(ordinals, self.today.toordinal())
+        end = bisect_right(ordinals, self.today.toordinal() + days)
+        return self._slice(kind, start, end, limit)
+
+    def upcoming(self, kind: str, limit: int) -> List[dict]:
+        """今天及之后最近的 limit 个某类事件"""
+        ordinals = self._ordinals.get(kind, [])
+        start = bisect_left(ordinals, self.today.toordinal())
+        return self._slice(kind, start, len(ordinals), limit)
+
+
+def build_event_calendar(today: Optional[date] = None) -> EventCalendarIndex:
+    """按规则推算各类事件日期并构建索引"""
+    today = today or datetime.now().date()
+    months = HORIZON_DAYS // 30 + 1
+    horizon_end = today + timedelta(days=HORIZON_DAYS)
+
+    events = {
+        FED: _fed_events(today),
+        US_CPI: _us_cpi_events(today, months),
+        CHINA: _china_events(today, months),
+        OPTIONS_EXPIRATION: _options_expiration_events(today, months),
+    }
+    # 只保留 [today, today + HORIZON_DAYS] 内的事件
+    return EventCalendarIndex(today, {
+        kind: [(d, fields) for d, fields in items if today <= d <= horizon_end]
+        for kind, items in events.items()
+    })
+
+
+_calendar: Optional[EventCalendarIndex] = None
+_build_lock = threading.Lock()
+
+
+def get_event_calendar(today: Optional[date] = None) -> EventCalendarIndex:
+    """当天的事件索引（跨日自动重建，同一天内复用）"""
+    global _calendar
+
+    today = today or datetime.now().date()
+    calendar = _calendar
+    if calendar is not None and calendar.today == today:
+        return calendar
+
+    with _build_lock:
+        if _calendar is None or _calendar.today != today:
+            _calendar = build_event_calendar(today)
+        return _calendar
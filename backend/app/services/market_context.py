@@ -0,0 +1,167 @@
+"""
+Market Context Snapshot Service
+
+VIX、宏观指标（美债/美元/黄金/原油）、Polymarket、事件日历和地缘政治风险
+与具体股票无关，所有用户看到的都一样。本模块在后台定时刷新这些数据，
+生成一个不可变的 MarketContextSnapshot，并通过一次引用替换原子发布。
+
+读取方（calculate_market_sentiment 等）直接读取当前快照，无需加锁，
+每次分析只需再计算个股相关的 Put/Call 比率。
+"""
+
+import copy
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# 快照超过该时长视为过期：读取时先返回旧快照，同时触发一次后台刷新
+MARKET_CONTEXT_MAX_AGE_SECONDS = Config.MARKET_CONTEXT_MAX_AGE_SECONDS
+
+
+@dataclass(frozen=True)
+class MarketContextSnapshot:
+    """某一时刻的市场级数据，发布后不再修改"""
+    _options: Dict[str, Any] = field(repr=False)
+    _macro: Dict[str, Any] = field(repr=False)
+    refreshed_at: datetime
+    created_monotonic: float
+    duration_ms: float = 0.0
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self.created_monotonic
+
+    @property
+    def vix(self) -> Optional[float]:
+        return self._options.get('vix')
+
+    @property
+    def geopolitical_risk(self) -> Optional[float]:
+        return self._macro.get('geopolitical_risk')
+
+    def options_data(self) -> Dict[str, Any]:
+        """期权市场数据（仅市场级字段），返回副本供调用方合并个股数据"""
+        return dict(self._options)
+
+    def macro_data(self) -> Dict[str, Any]:
+        """宏观数据（含 polymarket / geopolitical_risk / 事件日历），返回深拷贝"""
+        return copy.deepcopy(self._macro)
+
+
+_snapshot: Optional[MarketContextSnapshot] = None
+_refresh_lock = threading.Lock()
+
+
+def build_market_context() -> MarketContextSnapshot:
+    """拉取全部市场级数据并构建新快照（不发布）"""
+    from . import analysis_engine
+
+    started = time.monotonic()
+
+    vix_data = analysis_engine.get_vix_data()
+    options_data = {
+        'vix': vix_data.get('vix'),
+        'vix_change': vix_data.get('vix_change'),
+        'put_call_ratio': None,
+        'options_volume': None,
+        'has_options': False
+    }
+
+    macro_data = analysis_engine.get_macro_market_data()
+    macro_data['polymarket'] = analysis_engine.get_polymarket_data()
+    macro_data['geopolitical_risk'] = analysis_engine.calculate_geopolitical_risk(macro_data, options_data)
+
+    return MarketContextSnapshot(
+        _options=options_data,
+        _macro=macro_data,
+        refreshed_at=datetime.now(),
+        created_monotonic=time.monotonic(),
+        duration_ms=(time.monotonic() - started) * 1000
+    )
+
+
+def refresh_market_context() -> Optional[MarketContextSnapshot]:
+    """
+    刷新并发布市场上下文快照（供调度器调用）
+    同一时间只允许一个刷新在执行；正在刷新时直接返回当前快照
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        return _snapshot
+
+    try:
+        snapshot = build_market_context()
+        _publish(snapshot)
+        logger.info(
+            f"Market context refreshed in {snapshot.duration_ms:.0f}ms "
+            f"(VIX={snapshot.vix}, GPR={snapshot.geopolitical_risk})"
+        )
+        return snapshot
+    except Exception as e:
+        logger.error(f"Failed to refresh market context: {e}")
+        return _snapshot
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh_in_background():
+    threading.Thread(
+        target=refresh_market_context,
+        name='MarketContextRefresh',
+        daemon=True
+    ).start()
+
+
+def get_market_context(max_age_seconds: int = None) -> MarketContextSnapshot:
+    """
+    获取当前市场上下文快照
+
+    - 已有快照：直接返回（无锁）；若已过期则触发后台刷新，本次仍返回旧快照
+    - 尚无快照（进程刚启动）：同步刷新一次，并发请求等待同一次刷新结果
+    """
+    snapshot = _snapshot
+    max_age = MARKET_CONTEXT_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+
+    if snapshot is not None:
+        if snapshot.age_seconds > max_age and not _refresh_lock.locked():
+            _refresh_in_background()
+        return snapshot
+
+    with _refresh_lock:
+        if _snapshot is None:
+            try:
+                _publish(build_market_context())
+            except Exception as e:
+                logger.error(f"Failed to build initial market context: {e}")
+
+    if _snapshot is None:
+        # 数据源全部不可用时返回空快照，情绪计算会使用中性分
+        return _empty_snapshot()
+    return _snapshot
+
+
+def _publish(snapshot: Optional[MarketContextSnapshot]):
+    global _snapshot
+    _snapshot = snapshot  # 引用赋值是原子操作，读取方无需加锁
+
+
+def _empty_snapshot() -> MarketContextSnapshot:
+    return MarketContextSnapshot(
+        _options={'vix': None, 'vix_change': None, 'put_call_ratio': None,
+                  'options_volume': None, 'has_options': False},
+        _macro={key: None for key in ('treasury_10y', 'treasury_10y_change', 'dxy', 'dxy_change',
+                                      'gold', 'gold_change', 'oil', 'oil_change', 'geopolitical_risk')},
+        refreshed_at=datetime.now(),
+        created_monotonic=time.monotonic()
+    )
+
+
+def clear_market_context():
+    """丢弃当前快照（测试或手动强制刷新时使用）"""
+    _publish(None)
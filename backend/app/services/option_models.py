@@ -4,7 +4,7 @@ Ported from new_options_module/models/option_models.py
 """
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
 class OptionType(str, Enum):
@@ -182,4 +182,5 @@ class EnhancedAnalysisResponse(BaseModel):
     option_identifier: str
     vrp_result: Optional[VRPResult] = None
     risk_analysis: Optional[RiskAnalysis] = None
+    iv_surface: Optional[Dict[str, Any]] = None  # 平值IV / 偏斜 / 期限结构（有缓存的期权链时）
     available: bool  # Phase 1模块是否可用
@@ -5,9 +5,11 @@ Ported from new_options_module/option_service.py and consolidated with Flask log
 
 from datetime import datetime, timedelta
 import math
+import re
 import pandas as pd
 from typing import List, Optional, Union
 import random
+import os
 import time
 import numpy as np
 
@@ -16,6 +18,9 @@ from .tiger_client import get_client_manager
 from tigeropen.common.consts import Market
 from .option_models import OptionData, OptionChainResponse, ExpirationDate, ExpirationResponse, StockQuote, EnhancedAnalysisResponse, VRPResult as VRPResultModel, RiskAnalysis as RiskAnalysisModel
 from .option_scorer import OptionScorer
+from ..analysis.options_analysis.advanced.iv_surface import IVSurface
+from ..utils.cache import TTLCache
+from ..utils.metrics import record_upstream_error
 
 # Try importing Phase 1 modules
 try:
@@ -142,19 +147,61 @@ class MockDataGenerator:
 
 mock_generator = MockDataGenerator()
 
+# Tiger 真实数据的进程内缓存（模拟数据不缓存），开盘前由预热任务写入热门标的
+# 到期日列表一天内基本不变；期权链报价变化快，使用短 TTL
+expirations_cache = TTLCache(maxsize=500, ttl=int(os.getenv('OPTION_EXPIRATIONS_CACHE_TTL', '3600')),
+                             name='option_expirations')
+option_chain_cache = TTLCache(maxsize=1000, ttl=int(os.getenv('OPTION_CHAIN_CACHE_TTL', '600')),
+                              name='option_chain')
+# 与期权链同时写入、同时过期：(symbol, expiry_date) -> IVSurface
+iv_surface_cache = TTLCache(maxsize=1000, ttl=int(os.getenv('OPTION_CHAIN_CACHE_TTL', '600')),
+                            name='option_iv_surface')
+
+# 期权标识中的到期日与类型，如 AAPL  250117C00150000
+_OPTION_EXPIRY_PATTERN = re.compile(r'(\d{6}|\d{8})[CP]\d{8}')
+
+
+def _build_iv_surface(chain: OptionChainResponse) -> Optional[IVSurface]:
+    """由一个到期日的期权链构建波动率曲面"""
+    contracts = chain.calls + chain.puts
+    days = (datetime.strptime(chain.expiry_date, "%Y-%m-%d").date() - datetime.now().date()).days
+    return IVSurface.build(
+        chain.real_stock_price,
+        [c.strike for c in contracts],
+        np.full(len(contracts), days),
+        [c.implied_vol if c.implied_vol is not None else np.nan for c in contracts],
+        [c.put_call == 'CALL' for c in contracts],
+        [c.open_interest or 0 for c in contracts],
+    )
+
+
+def _cached_iv_surface(symbol: str, option_identifier: str) -> Optional[IVSurface]:
+    """合并该标的已缓存的各到期日曲面（期权所在到期日优先）"""
+    keys = []
+    match = _OPTION_EXPIRY_PATTERN.search(option_identifier or '')
+    if match:
+        digits = match.group(1)
+        expiry = datetime.strptime(digits, "%y%m%d" if len(digits) == 6 else "%Y%m%d")
+        keys.append((symbol, expiry.strftime("%Y-%m-%d")))
+    expirations = expirations_cache.get(symbol)
+    if expirations is not None:
+        keys.extend((symbol, e.date) for e in expirations.expirations if (symbol, e.date) not in keys)
+    return IVSurface.combine(iv_surface_cache.get(key) for key in keys)
+
 class OptionsService:
 
     @staticmethod
-    def get_expirations(symbol: str) -> ExpirationResponse:
+    def get_expirations(symbol: str, refresh: bool = False) -> ExpirationResponse:
         try:
             symbol = symbol.upper()
+            cached = None if refresh else expirations_cache.get(symbol)
+            if cached is not None:
+                return cached
+
             if not USE_MOCK_DATA:
                 try:
                     client = get_client_manager()
-                    if client.quote_client is None:
-                        client.initialize_client()
-
-                    if client.quote_client:
+                    if client.ensure_initialized():
                         market = Market.US if not symbol.endswith('.HK') else Market.HK
                         expirations_df = client.get_option_expirations(symbol, market)
                         expirations = []
@@ -164,8 +211,11 @@ class OptionsService:
                                 timestamp=int(row['timestamp']),
                                 period_tag=row['period_tag']
                             ))
-                        return ExpirationResponse(symbol=symbol, expirations=expirations)
+                        response = ExpirationResponse(symbol=symbol, expirations=expirations)
+                        expirations_cache.set(symbol, response)
+                        return response
                 except Exception as e:
+                    record_upstream_error('tiger')
                     print(f"⚠️ Tiger API failed: {e}")
 
             expirations = mock_generator.generate_expirations(symbol)
@@ -174,7 +224,12 @@ class OptionsService:
              raise e
 
     @staticmethod
-    def get_option_chain(symbol: str, expiry_date: str) -> OptionChainResponse:
+    def get_option_chain(symbol: str, expiry_date: str, quote: Optional[dict] = None,
+                         refresh: bool = False) -> OptionChainResponse:
+        """
+        quote: 已取得的标的行情（如预热时的批量行情），提供时不再单独请求
+        refresh: 跳过缓存重新获取（预热）
+        """
         try:
             symbol = symbol.upper()
             
@@ -184,13 +239,14 @@ class OptionsService:
             except ValueError:
                 raise ValueError("Invalid date format. Use YYYY-MM-DD")
 
+            cached = None if refresh else option_chain_cache.get((symbol, expiry_date))
+            if cached is not None:
+                return cached
+
             if not USE_MOCK_DATA:
                 try:
                     client = get_client_manager()
-                    if client.quote_client is None:
-                        client.initialize_client()
-
-                    if client.quote_client:
+                    if client.ensure_initialized():
                         market = Market.US if not symbol.endswith('.HK') else Market.HK
                         option_chain_df = client.get_option_chain(symbol, expiry_date, market)
                         
@@ -198,11 +254,16 @@ class OptionsService:
                         puts = []
                         real_stock_price = None
                         try:
-                            stock_data = client.get_stock_quote([symbol])
-                            if len(stock_data) > 0:
-                                real_stock_price = float(stock_data['latest_price'].iloc[0])
+                            if quote is not None:
+                                real_stock_price = float(quote['latest_price'])
+                            else:
+                                stock_data = client.get_stock_quote([symbol])
+                                if len(stock_data) > 0:
+                                    real_stock_price = float(stock_data['latest_price'].iloc[0])
                         except:
                             real_stock_price = 150.0
+                        # 与行情同一次请求返回，按日缓存
+                        margin_rate = client.get_margin_rate(symbol, market)
 
                         for _, row in option_chain_df.iterrows():
                             option_data = OptionData(
@@ -223,7 +284,6 @@ class OptionsService:
                                 vega=float(row.get('vega', 0)) if pd.notna(row.get('vega', 0)) else None
                             )
 
-                            margin_rate = client.get_margin_rate(symbol, market)
                             option_data.scores = option_scorer.score_option(option_data, real_stock_price, margin_rate)
 
                             if row['put_call'] == 'CALL':
@@ -231,7 +291,7 @@ class OptionsService:
                             else:
                                 puts.append(option_data)
 
-                        return OptionChainResponse(
+                        response = OptionChainResponse(
                             symbol=symbol,
                             expiry_date=expiry_date,
                             calls=calls,
@@ -239,13 +299,20 @@ class OptionsService:
                             data_source="real",
                             real_stock_price=real_stock_price
                         )
+                        option_chain_cache.set((symbol, expiry_date), response)
+                        try:
+                            iv_surface_cache.set((symbol, expiry_date), _build_iv_surface(response))
+                        except Exception as e:
+                            print(f"⚠️ IV surface build failed: {e}")
+                        return response
                 except Exception as e:
+                    record_upstream_error('tiger')
                     print(f"⚠️ Tiger API failed: {e}")
             
             # Mock fallback
             try:
                  client = get_client_manager()
-                 if client.quote_client:
+                 if client.ensure_initialized():
                      stock_data = client.get_stock_quote([symbol])
                      if len(stock_data) > 0:
                          real_price = float(stock_data['latest_price'].iloc[0])
@@ -264,9 +331,6 @@ class OptionsService:
             if not USE_MOCK_DATA:
                 try:
                     client = get_client_manager()
-                    if client.quote_client is None:
-                        client.initialize_client()
-                    
                     market = Market.US if not symbol.endswith('.HK') else Market.HK
                     price_history = client.get_stock_history(symbol, days=days, market=market)
                     
@@ -287,6 +351,7 @@ class OptionsService:
                             })
                         return {"symbol": symbol, "data": candlestick_data}
                 except Exception as e:
+                    record_upstream_error('tiger')
                     print(f"Tiger API failed: {e}")
             
             base_price = 150.0
@@ -318,8 +383,6 @@ class OptionsService:
             if not USE_MOCK_DATA:
                 try:
                     client = get_client_manager()
-                    if client.quote_client is None:
-                        client.initialize_client()
                     quote_df = client.get_stock_quote([symbol])
                     if len(quote_df) > 0:
                         row = quote_df.iloc[0]
@@ -353,9 +416,6 @@ class OptionsService:
             
             # 1. Price History
             client = get_client_manager()
-            if client.quote_client is None:
-                client.initialize_client()
-            
             market = Market.US if not symbol.endswith('.HK') else Market.HK
             price_history = client.get_stock_history(symbol, days=60, market=market)
             
@@ -372,9 +432,11 @@ class OptionsService:
                 if price_history[i-1] > 0:
                      returns.append(math.log(price_history[i] / price_history[i-1]))
             
+            iv_surface = _cached_iv_surface(symbol, option_identifier)
             if returns:
                 hist_vol = np.std(returns) * math.sqrt(252)
-                estimated_iv = hist_vol # Placeholder
+                # 有缓存的期权链时用曲面的 30 天平值 IV，否则以历史波动率近似
+                estimated_iv = iv_surface.atm_iv() if iv_surface else hist_vol
                 vrp_result_data = vrp_calculator.calculate_vrp_result(
                     current_iv=estimated_iv,
                     price_history=price_history
@@ -395,6 +457,7 @@ class OptionsService:
                 option_identifier=option_identifier,
                 vrp_result=vrp_result,
                 risk_analysis=None, # Requires specific option data retrieval which is separate
+                iv_surface=iv_surface.summary() if iv_surface else None,
                 available=True
             )
         except Exception as e:
@@ -5,8 +5,8 @@
 import os
 import stripe
 from datetime import datetime, timedelta
-from sqlalchemy import and_, or_, func
-from ..models import db, User, Subscription, Transaction, CreditLedger, UsageLog, DailyQueryCount, ServiceType, CreditSource, PlanTier, SubscriptionStatus, TransactionStatus
+from sqlalchemy import and_, or_, func, select, update, insert, text, case, exists, literal, tuple_
+from ..models import db, User, Subscription, Transaction, CreditLedger, CreditBalance, UsageLog, DailyQueryCount, ServiceType, CreditSource, PlanTier, SubscriptionStatus, TransactionStatus
 
 # 配置Stripe
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY', '')
@@ -256,7 +256,7 @@ class PaymentService:
     
     @classmethod
     def add_credits(cls, user_id, amount, source, service_type, days_valid=None, subscription_id=None):
-        """通用发放额度函数"""
+        """通用发放额度函数（同时维护 credit_balances，由调用方提交事务）"""
         expiry = None
         if days_valid:
             expiry = datetime.utcnow() + timedelta(days=days_valid)
@@ -271,88 +271,354 @@ class PaymentService:
             subscription_id=subscription_id
         )
         db.session.add(ledger)
+        db.session.flush()
+
+        cls._apply_balance_delta(user_id, service_type, amount, expires_at=expiry)
         return ledger
-    
+
+    @classmethod
+    def _valid_credit_filter(cls, user_id, service_type, now=None):
+        """有效额度条件：未用完且未过期"""
+        now = now or datetime.utcnow()
+        return and_(
+            CreditLedger.user_id == user_id,
+            CreditLedger.service_type == service_type,
+            CreditLedger.amount_remaining > 0,
+            or_(
+                CreditLedger.expires_at == None,
+                CreditLedger.expires_at > now
+            )
+        )
+
+    @classmethod
+    def _upsert_stmt(cls):
+        """Dialect-specific INSERT supporting ON CONFLICT, or None"""
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            return insert
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            return insert
+        return None
+
+    @classmethod
+    def _apply_balance_delta(cls, user_id, service_type, delta, expires_at=None):
+        """
+        Upsert credit_balances: existing row += delta, missing row is seeded
+        from the ledger (which already reflects the change being applied).
+
+        expires_at: expiry of newly added credits, pulls next_expires_at earlier if needed.
+        Runs inside the caller's transaction. Returns (balance, next_expires_at).
+        """
+        now = datetime.utcnow()
+        insert = cls._upsert_stmt()
+
+        if insert is None:
+            # Generic fallback
+            row = db.session.get(CreditBalance, (user_id, service_type), with_for_update=True)
+            if row is None:
+                return cls.refresh_balance(user_id, service_type, commit=False)
+            row.balance += delta
+            if expires_at and (row.next_expires_at is None or expires_at < row.next_expires_at):
+                row.next_expires_at = expires_at
+            row.updated_at = now
+            db.session.flush()
+            return row.balance, row.next_expires_at
+
+        valid = cls._valid_credit_filter(user_id, service_type, now)
+        stmt = insert(CreditBalance).values(
+            user_id=user_id,
+            service_type=service_type,
+            balance=select(
+                func.coalesce(func.sum(CreditLedger.amount_remaining), 0)
+            ).where(valid).scalar_subquery(),
+            next_expires_at=select(func.min(CreditLedger.expires_at)).where(valid).scalar_subquery(),
+            updated_at=now
+        )
+
+        set_ = {
+            'balance': CreditBalance.balance + delta,
+            'updated_at': now
+        }
+        if expires_at:
+            set_['next_expires_at'] = case(
+                (CreditBalance.next_expires_at == None, expires_at),
+                (CreditBalance.next_expires_at < expires_at, CreditBalance.next_expires_at),
+                else_=expires_at
+            )
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CreditBalance.user_id, CreditBalance.service_type],
+            set_=set_
+        ).returning(CreditBalance.balance, CreditBalance.next_expires_at)
+        return tuple(db.session.execute(stmt).one())
+
+    @classmethod
+    def refresh_balance(cls, user_id, service_type=ServiceType.STOCK_ANALYSIS.value, commit=True):
+        """
+        Recompute one credit_balances row from the ledger (balance + next expiry).
+
+        Returns (balance, next_expires_at).
+        """
+        now = datetime.utcnow()
+        total, next_expires_at = db.session.query(
+            func.coalesce(func.sum(CreditLedger.amount_remaining), 0),
+            func.min(CreditLedger.expires_at)
+        ).filter(cls._valid_credit_filter(user_id, service_type, now)).one()
+        total = int(total or 0)
+
+        row = db.session.get(CreditBalance, (user_id, service_type))
+        if row is None:
+            row = CreditBalance(user_id=user_id, service_type=service_type)
+            db.session.add(row)
+        row.balance = total
+        row.next_expires_at = next_expires_at
+        row.updated_at = now
+
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+        return total, next_expires_at
+
+    @classmethod
+    def _balance_is_stale(cls, next_expires_at, now=None):
+        """A balance is stale once any credit it includes has expired"""
+        return next_expires_at is not None and next_expires_at <= (now or datetime.utcnow())
+
+    @classmethod
+    def _sum_ledger_credits(cls, user_id, service_type, now=None):
+        """从台账汇总有效剩余额度"""
+        total = db.session.query(
+            func.sum(CreditLedger.amount_remaining)
+        ).filter(cls._valid_credit_filter(user_id, service_type, now)).scalar()
+        return int(total) if total else 0
+
     @classmethod
     def check_and_deduct_credits(cls, user_id, service_type=ServiceType.STOCK_ANALYSIS.value, amount=1, ticker=None):
         """检查并扣减额度（FIFO）
 
         Note: Subscription credits are stored as 'stock_analysis' type but can be used for all services.
         We first check daily free quota for the specific service, then check stock_analysis credits (universal).
-        """
-        # 1. 检查每日免费额度 (specific to service type)
-        if cls.check_daily_free_quota(user_id, service_type):
-            usage_log = UsageLog(
-                user_id=user_id,
-                service_type=service_type,
-                amount_used=amount,
-                ticker=ticker
-            )
-            db.session.add(usage_log)
-            db.session.commit()
 
-            # 添加调试日志
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Created usage log - User: {user_id}, Service: {service_type}, Ticker: {ticker}, Amount: {amount}, ID: {usage_log.id}")
+        Daily free quota consumption, FIFO ledger decrement, usage log insert and
+        credit_balances maintenance happen in a single transaction. On PostgreSQL
+        this is one data-modifying CTE statement.
+
+        Returns:
+            (success, message, remaining_credits)
+        """
+        import logging
+        logger = logging.getLogger(__name__)
 
-            return True, "使用每日免费额度", cls.get_total_credits(user_id, ServiceType.STOCK_ANALYSIS.value)
-        
-        # 2. 查找有效额度 - 使用stock_analysis类型 (universal credits from subscription)
         # Subscription credits are added as stock_analysis but can be used for any service
         credit_service_type = ServiceType.STOCK_ANALYSIS.value
-        
-        query = CreditLedger.query.filter(
-            and_(
-                CreditLedger.user_id == user_id,
-                CreditLedger.service_type == credit_service_type,
-                CreditLedger.amount_remaining > 0,
-                or_(
-                    CreditLedger.expires_at == None,
-                    CreditLedger.expires_at > datetime.utcnow()
-                )
-            )
-        ).order_by(
-            CreditLedger.expires_at.asc().nullslast()
-        )
-        
-        try:
-             # SQLALchemy 2.0+ 
-             valid_credits = query.with_for_update().first()
-        except:
-             valid_credits = query.first()
-        
-        if not valid_credits:
-            total = cls.get_total_credits(user_id, credit_service_type)
-            return False, "额度不足，请充值或明天再来", total
-        
-        # 3. 扣减
+
         try:
-            valid_credits.amount_remaining -= amount
-            if valid_credits.amount_remaining < 0:
-                valid_credits.amount_remaining = 0
+            if db.engine.dialect.name == 'postgresql':
+                used_free, ledger_id, log_id, balance = cls._deduct_credits_postgres(
+                    user_id, service_type, credit_service_type, amount, ticker
+                )
+            else:
+                used_free, ledger_id, log_id, balance = cls._deduct_credits_generic(
+                    user_id, service_type, credit_service_type, amount, ticker
+                )
 
-            usage_log = UsageLog(
-                user_id=user_id,
-                credit_ledger_id=valid_credits.id,
-                service_type=service_type,  # Log the actual service used
-                amount_used=amount,
-                ticker=ticker
-            )
-            db.session.add(usage_log)
-            db.session.commit()
+            if not used_free and not ledger_id:
+                db.session.rollback()
+                # No valid ledger row exists, so the spendable balance is 0
+                return False, "额度不足，请充值或明天再来", 0
 
-            # 添加调试日志
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Created usage log (paid credits) - User: {user_id}, Service: {service_type}, Ticker: {ticker}, Amount: {amount}, ID: {usage_log.id}")
+            if balance is None or cls._balance_is_stale(balance[1]):
+                # Balance row missing or includes expired credits - rebuild from the ledger
+                balance = cls.refresh_balance(user_id, credit_service_type, commit=False)
+            remaining = balance[0]
+
+            db.session.commit()
 
-            remaining = cls.get_total_credits(user_id, credit_service_type)
-            return True, "扣减成功", remaining
-            
         except Exception as e:
             db.session.rollback()
             return False, f"扣减失败: {str(e)}", 0
+
+        if used_free:
+            logger.info(f"Created usage log - User: {user_id}, Service: {service_type}, Ticker: {ticker}, Amount: {amount}, ID: {log_id}")
+            return True, "使用每日免费额度", remaining
+
+        logger.info(f"Created usage log (paid credits) - User: {user_id}, Service: {service_type}, Ticker: {ticker}, Amount: {amount}, ID: {log_id}")
+        return True, "扣减成功", remaining
+
+    @classmethod
+    def _deduct_credits_postgres(cls, user_id, service_type, credit_service_type, amount, ticker):
+        """单条CTE语句完成：免费额度计数 / FIFO台账扣减 / 使用日志 / 余额维护"""
+        now = datetime.utcnow()
+        today = datetime.now().date()
+        reset_time = datetime.combine(today + timedelta(days=1), datetime.min.time())
+
+        row = db.session.execute(text("""
+            WITH daily AS (
+                SELECT id, query_count
+                FROM daily_query_count
+                WHERE user_id = :user_id AND date = :today
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE
+            ),
+            free_upd AS (
+                UPDATE daily_query_count d
+                SET query_count = d.query_count + 1
+                FROM daily
+                WHERE d.id = daily.id AND daily.query_count < :free_quota
+                RETURNING d.id
+            ),
+            free_ins AS (
+                INSERT INTO daily_query_count (user_id, date, query_count, max_queries, reset_time)
+                SELECT :user_id, :today, 1, :free_quota, :reset_time
+                WHERE :free_quota > 0 AND NOT EXISTS (SELECT 1 FROM daily)
+                RETURNING id
+            ),
+            free AS (
+                SELECT id FROM free_upd
+                UNION ALL
+                SELECT id FROM free_ins
+            ),
+            target AS (
+                SELECT id, amount_remaining
+                FROM credit_ledger
+                WHERE user_id = :user_id
+                  AND service_type = :credit_service_type
+                  AND amount_remaining > 0
+                  AND (expires_at IS NULL OR expires_at > :now)
+                  AND NOT EXISTS (SELECT 1 FROM free)
+                ORDER BY expires_at ASC NULLS LAST, id
+                LIMIT 1
+                FOR UPDATE
+            ),
+            ledger AS (
+                UPDATE credit_ledger c
+                SET amount_remaining = GREATEST(c.amount_remaining - :amount, 0)
+                FROM target
+                WHERE c.id = target.id
+                RETURNING c.id, target.amount_remaining - c.amount_remaining AS deducted
+            ),
+            usage_log AS (
+                INSERT INTO usage_logs (user_id, credit_ledger_id, service_type, ticker, amount_used, created_at)
+                SELECT :user_id, (SELECT id FROM ledger), :service_type, :ticker, :amount, :now
+                WHERE EXISTS (SELECT 1 FROM free) OR EXISTS (SELECT 1 FROM ledger)
+                RETURNING id
+            ),
+            bal AS (
+                UPDATE credit_balances b
+                SET balance = b.balance - ledger.deducted, updated_at = :now
+                FROM ledger
+                WHERE b.user_id = :user_id AND b.service_type = :credit_service_type
+                RETURNING b.balance, b.next_expires_at
+            ),
+            current_balance AS (
+                SELECT balance, next_expires_at FROM bal
+                UNION ALL
+                SELECT balance, next_expires_at FROM credit_balances
+                WHERE user_id = :user_id AND service_type = :credit_service_type
+                  AND NOT EXISTS (SELECT 1 FROM ledger)
+            )
+            SELECT
+                EXISTS (SELECT 1 FROM free) AS used_free,
+                (SELECT id FROM ledger) AS ledger_id,
+                (SELECT id FROM usage_log) AS log_id,
+                EXISTS (SELECT 1 FROM current_balance) AS has_balance,
+                (SELECT balance FROM current_balance) AS balance,
+                (SELECT next_expires_at FROM current_balance) AS next_expires_at
+        """), {
+            'user_id': user_id,
+            'service_type': service_type,
+            'credit_service_type': credit_service_type,
+            'amount': amount,
+            'ticker': ticker,
+            'today': today,
+            'now': now,
+            'reset_time': reset_time,
+            'free_quota': cls.DAILY_FREE_QUOTA.get(service_type, 0),
+        }).one()
+
+        balance = (row.balance, row.next_expires_at) if row.has_balance else None
+        return row.used_free, row.ledger_id, row.log_id, balance
+
+    @classmethod
+    def _deduct_credits_generic(cls, user_id, service_type, credit_service_type, amount, ticker):
+        """非PostgreSQL（SQLite等）：同一事务内的条件UPDATE序列，仅在最后提交一次"""
+        now = datetime.utcnow()
+        today = datetime.now().date()
+        free_quota = cls.DAILY_FREE_QUOTA.get(service_type, 0)
+        used_free = False
+        ledger_id = None
+        balance = None
+
+        # 1. 每日免费额度 - 条件自增，避免"先查后改"的竞争
+        if free_quota > 0:
+            daily_id = db.session.query(DailyQueryCount.id).filter_by(
+                user_id=user_id,
+                date=today
+            ).order_by(DailyQueryCount.id).limit(1).scalar()
+
+            if daily_id is None:
+                db.session.add(DailyQueryCount(
+                    user_id=user_id,
+                    date=today,
+                    query_count=1,
+                    max_queries=free_quota,
+                    reset_time=datetime.combine(today + timedelta(days=1), datetime.min.time())
+                ))
+                used_free = True
+            else:
+                result = db.session.execute(
+                    update(DailyQueryCount)
+                    .where(DailyQueryCount.id == daily_id, DailyQueryCount.query_count < free_quota)
+                    .values(query_count=DailyQueryCount.query_count + 1)
+                )
+                used_free = result.rowcount == 1
+
+        # 2. FIFO 扣减付费额度
+        if not used_free:
+            target = db.session.query(
+                CreditLedger.id, CreditLedger.amount_remaining
+            ).filter(
+                cls._valid_credit_filter(user_id, credit_service_type, now)
+            ).order_by(
+                CreditLedger.expires_at.asc().nullslast(), CreditLedger.id
+            ).with_for_update().first()
+
+            if not target:
+                return False, None, None, None
+
+            deducted = min(amount, target.amount_remaining)
+            result = db.session.execute(
+                update(CreditLedger)
+                .where(CreditLedger.id == target.id, CreditLedger.amount_remaining >= deducted)
+                .values(amount_remaining=CreditLedger.amount_remaining - deducted)
+            )
+            if result.rowcount != 1:
+                # Row changed underneath us
+                return False, None, None, None
+
+            ledger_id = target.id
+            balance = cls._apply_balance_delta(user_id, credit_service_type, -deducted)
+        else:
+            row = db.session.get(CreditBalance, (user_id, credit_service_type))
+            balance = (row.balance, row.next_expires_at) if row else None
+
+        # 3. 使用日志
+        usage_log = UsageLog(
+            user_id=user_id,
+            credit_ledger_id=ledger_id,
+            service_type=service_type,
+            amount_used=amount,
+            ticker=ticker,
+            created_at=now
+        )
+        db.session.add(usage_log)
+        db.session.flush()
+
+        return used_free, ledger_id, usage_log.id, balance
             
     @classmethod
     def check_daily_free_quota(cls, user_id, service_type):
@@ -374,22 +640,144 @@ class PaymentService:
 
     @classmethod
     def get_total_credits(cls, user_id, service_type=ServiceType.STOCK_ANALYSIS.value):
-        """获取总额度"""
-        total = db.session.query(
-            func.sum(CreditLedger.amount_remaining)
+        """获取总额度（读取 credit_balances 物化余额，主键查询）"""
+        row = db.session.get(CreditBalance, (user_id, service_type))
+        if row is not None and not cls._balance_is_stale(row.next_expires_at):
+            return row.balance
+
+        # Missing or has expired credits since last maintenance - rebuild from the ledger
+        try:
+            balance, _ = cls.refresh_balance(user_id, service_type)
+            return balance
+        except Exception:
+            db.session.rollback()
+            return cls._sum_ledger_credits(user_id, service_type)
+
+    @classmethod
+    def sweep_expired_balances(cls, batch_size=500):
+        """
+        过期扫描：重算所有 next_expires_at 已到期的余额行
+
+        Returns:
+            Number of balance rows refreshed
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+
+        stale = db.session.query(
+            CreditBalance.user_id, CreditBalance.service_type
         ).filter(
-            and_(
-                CreditLedger.user_id == user_id,
-                CreditLedger.service_type == service_type,
-                CreditLedger.amount_remaining > 0,
-                or_(
-                    CreditLedger.expires_at == None,
-                    CreditLedger.expires_at > datetime.utcnow()
+            CreditBalance.next_expires_at <= datetime.utcnow()
+        ).limit(batch_size).all()
+
+        for user_id, service_type in stale:
+            cls.refresh_balance(user_id, service_type, commit=False)
+        db.session.commit()
+
+        if stale:
+            logger.info(f"Refreshed {len(stale)} credit balances with expired credits")
+        return len(stale)
+
+    @classmethod
+    def reconcile_credit_balances(cls, batch_size=500):
+        """
+        对账：用台账聚合结果校正所有 credit_balances 行
+
+        按主键顺序逐批锁定余额行（SELECT ... FOR UPDATE），再在同一事务内用台账重算并校正。
+        并发扣减会更新同一余额行：先提交的扣减在重算时可见，未提交的扣减等本批提交后
+        在校正值上继续扣减，不会丢失。台账有额度但缺少余额行的键用 INSERT ... ON CONFLICT
+        DO NOTHING 补齐（与扣减时的 upsert 竞争也不会冲突）。
+
+        Returns:
+            Number of rows corrected (missing, drifted or orphaned)
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        now = datetime.utcnow()
+        key = tuple_(CreditBalance.user_id, CreditBalance.service_type)
+
+        valid = and_(
+            CreditLedger.user_id == CreditBalance.user_id,
+            CreditLedger.service_type == CreditBalance.service_type,
+            CreditLedger.amount_remaining > 0,
+            or_(
+                CreditLedger.expires_at == None,
+                CreditLedger.expires_at > now
+            )
+        )
+        expected_balance = select(
+            func.coalesce(func.sum(CreditLedger.amount_remaining), 0)
+        ).where(valid).scalar_subquery()
+        expected_expiry = select(func.min(CreditLedger.expires_at)).where(valid).scalar_subquery()
+        drift = or_(
+            CreditBalance.balance != expected_balance,
+            CreditBalance.next_expires_at.is_distinct_from(expected_expiry)
+        )
+
+        corrected = 0
+        last_key = None
+        while True:
+            query = db.session.query(CreditBalance.user_id, CreditBalance.service_type)
+            if last_key is not None:
+                query = query.filter(key > last_key)
+            keys = [tuple(k) for k in query.order_by(
+                CreditBalance.user_id, CreditBalance.service_type
+            ).limit(batch_size).with_for_update().all()]
+            if not keys:
+                break
+            last_key = keys[-1]
+
+            drifted = db.session.query(
+                CreditBalance.user_id, CreditBalance.service_type, CreditBalance.balance, expected_balance
+            ).filter(key.in_(keys), drift).all()
+            for user_id, service_type, stored, balance in drifted:
+                if stored != balance:
+                    logger.warning(f"Credit balance drift for {(user_id, service_type)}: "
+                                   f"stored={stored}, ledger={balance}")
+            if drifted:
+                db.session.execute(
+                    update(CreditBalance).where(
+                        key.in_([(user_id, service_type) for user_id, service_type, _, _ in drifted])
+                    ).values(
+                        balance=expected_balance,
+                        next_expires_at=expected_expiry,
+                        updated_at=now
+                    ).execution_options(synchronize_session=False)
                 )
+                corrected += len(drifted)
+            db.session.commit()
+
+        missing = select(
+            CreditLedger.user_id,
+            CreditLedger.service_type,
+            func.sum(CreditLedger.amount_remaining),
+            func.min(CreditLedger.expires_at),
+            literal(now)
+        ).where(
+            CreditLedger.amount_remaining > 0,
+            or_(
+                CreditLedger.expires_at == None,
+                CreditLedger.expires_at > now
+            ),
+            ~exists().where(
+                CreditBalance.user_id == CreditLedger.user_id,
+                CreditBalance.service_type == CreditLedger.service_type
             )
-        ).scalar()
-        
-        return int(total) if total else 0
+        ).group_by(CreditLedger.user_id, CreditLedger.service_type)
+
+        columns = ['user_id', 'service_type', 'balance', 'next_expires_at', 'updated_at']
+        upsert = cls._upsert_stmt()
+        if upsert is None:
+            stmt = insert(CreditBalance).from_select(columns, missing)
+        else:
+            stmt = upsert(CreditBalance).from_select(columns, missing).on_conflict_do_nothing(
+                index_elements=[CreditBalance.user_id, CreditBalance.service_type]
+            )
+        corrected += max(db.session.execute(stmt).rowcount, 0)
+        db.session.commit()
+
+        logger.info(f"Credit balance reconciliation completed: {corrected} rows corrected")
+        return corrected
     
     @classmethod
     def get_user_subscription_info(cls, user_id):
@@ -0,0 +1,386 @@
+"""
+Market-Open Cache Pre-warming
+
+每个交易日开盘前（美股 / 港股），根据最近的 StockAnalysisHistory 与 UsageLog 统计
+各投资风格最常被分析的股票和最常被查询的期权标的，提前把以下数据写入进程内缓存：
+- 行情数据（analysis_engine.market_data_cache）
+- 量化分析结果（api.stock.quant_analysis_cache，按 ticker + style；仅在该缓存开启时）
+- 期权到期日与最近几个到期日的期权链（options_service 的缓存）
+
+开盘后（开盘 1 分钟起，每 PREWARM_REFRESH_MINUTES 分钟）在第一个小时内重新预热，
+预热数据不会在窗口内过期，也不会一直停留在盘前价格。
+
+每个 gunicorn worker 都有自己的调度器和进程内缓存：同一次预热只由先拿到锁文件的
+worker 请求上游，其余 worker 等待它完成后把它的缓存快照载入自己的缓存。
+
+开盘后第一个小时统计各缓存的命中率，用于评估预热效果。
+"""
+
+import fcntl
+import logging
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+
+from ..models import db, StockAnalysisHistory, UsageLog, ServiceType
+from . import analysis_engine
+
+logger = logging.getLogger(__name__)
+
+STYLES = ['quality', 'value', 'growth', 'momentum']
+
+# 开盘时间（当地时间）；A股与港股同一时区、同一开盘时间，一起归入 HK
+MARKETS = {
+    'US': {'timezone': 'America/New_York', 'open': (9, 30)},
+    'HK': {'timezone': 'Asia/Hong_Kong', 'open': (9, 30)},
+}
+ASIA_SUFFIXES = ('.HK', '.SS', '.SZ')
+
+# 开盘后统计命中率的时长（分钟）
+HIT_RATE_WINDOW_MINUTES = 60
+# 开盘后第一次重新预热的时间（分钟），取得开盘价
+REWARM_DELAY_MINUTES = 1
+# 各 worker 的调度器触发同一次预热的时间差上限（秒）：此时间内写入的快照视为本次预热的结果
+SNAPSHOT_SHARE_SECONDS = 60
+
+
+def ticker_market(ticker: str) -> str:
+    return 'HK' if analysis_engine.normalize_ticker(ticker).upper().endswith(ASIA_SUFFIXES) else 'US'
+
+
+def market_schedule(market: str, lead_minutes: int, refresh_minutes: int) -> Dict[str, object]:
+    """
+    预热时间列表（盘前一次 + 开盘后第一个小时内每 refresh_minutes 分钟一次）和
+    命中率统计开始/结束的 (hour, minute)，均为该市场当地时间
+    """
+    open_hour, open_minute = MARKETS[market]['open']
+    market_open = datetime.combine(date.today(), datetime.min.time()).replace(hour=open_hour, minute=open_minute)
+
+    def hm(dt):
+        return dt.hour, dt.minute
+
+    offsets = [-lead_minutes] + list(range(REWARM_DELAY_MINUTES, HIT_RATE_WINDOW_MINUTES, max(1, refresh_minutes)))
+    return {
+        'prewarm': [hm(market_open + timedelta(minutes=offset)) for offset in offsets],
+        'window_start': hm(market_open),
+        'window_end': hm(market_open + timedelta(minutes=HIT_RATE_WINDOW_MINUTES)),
+    }
+
+
+def get_popular_tickers(market: str, top_n: int, lookback_days: int) -> dict:
+    """
+    最近 lookback_days 天内某市场的热门标的
+
+    返回:
+        {'styles': {style: [ticker, ...]}, 'options': [symbol, ...]}
+    每个风格先按该风格的分析次数排序，再按股票分析的总使用次数排序；
+    历史记录不足 top_n 时用总使用次数最高的股票补足
+    """
+    since = datetime.utcnow() - timedelta(days=lookback_days)
+
+    history_rows = db.session.query(
+        StockAnalysisHistory.style, StockAnalysisHistory.ticker, func.count(StockAnalysisHistory.id)
+    ).filter(
+        StockAnalysisHistory.created_at >= since
+    ).group_by(StockAnalysisHistory.style, StockAnalysisHistory.ticker).all()
+
+    usage_rows = db.session.query(
+        UsageLog.service_type, UsageLog.ticker, func.count(UsageLog.id)
+    ).filter(
+        UsageLog.created_at >= since,
+        UsageLog.ticker.isnot(None)
+    ).group_by(UsageLog.service_type, UsageLog.ticker).all()
+
+    style_counts = {style: {} for style in STYLES}
+    for style, ticker, count in history_rows:
+        style = (style or '').lower()
+        ticker = (ticker or '').strip().upper()
+        if style in style_counts and ticker and ticker_market(ticker) == market:
+            style_counts[style][ticker] = style_counts[style].get(ticker, 0) + count
+
+    stock_usage, option_usage = {}, {}
+    for service_type, ticker, count in usage_rows:
+        ticker = (ticker or '').strip().upper()
+        if not ticker or ticker_market(ticker) != market:
+            continue
+        if service_type == ServiceType.STOCK_ANALYSIS.value:
+            stock_usage[ticker] = stock_usage.get(ticker, 0) + count
+        elif service_type == ServiceType.OPTION_ANALYSIS.value:
+            option_usage[ticker] = option_usage.get(ticker, 0) + count
+
+    styles = {}
+    for style, counts in style_counts.items():
+        candidates = set(counts) | set(stock_usage)
+        ranked = sorted(candidates, key=lambda t: (-counts.get(t, 0), -stock_usage.get(t, 0), t))
+        styles[style] = ranked[:top_n]
+
+    options = sorted(option_usage, key=lambda t: (-option_usage[t], t))[:top_n]
+    return {'styles': styles, 'options': options}
+
+
+def _warm_stock(ticker: str, styles: List[str]) -> bool:
+    """刷新行情缓存，再计算该股票在各风格下的量化分析（量化分析缓存开启时）"""
+    from ..api.stock import QUANT_ANALYSIS_CACHE_ENABLED, get_quant_analysis
+
+    data = analysis_engine.get_market_data(ticker, refresh=True)
+    if not QUANT_ANALYSIS_CACHE_ENABLED:
+        return bool(data and data.get('price'))
+    ok = True
+    for style in styles:
+        result = get_quant_analysis(ticker, style, refresh=True)
+        ok = ok and 'error' not in result
+    return ok
+
+
+def _warm_option_chains(symbol: str, expiries: int, quote: Optional[dict] = None) -> int:
+    """预取到期日列表和最近 expiries 个到期日的期权链；返回写入的期权链数"""
+    from .options_service import OptionsService
+
+    today = date.today().strftime('%Y-%m-%d')
+    response = OptionsService.get_expirations(symbol, refresh=True)
+    dates = sorted(e.date for e in response.expirations if e.date >= today)[:expiries]
+
+    warmed = 0
+    for expiry_date in dates:
+        chain = OptionsService.get_option_chain(symbol, expiry_date, quote=quote, refresh=True)
+        if chain.data_source == 'real':  # 模拟数据不会写入缓存
+            warmed += 1
+    return warmed
+
+
+def _prefetch_quotes(symbols: List[str]) -> Dict[str, dict]:
+    """
+    批量取所有期权标的的行情（同时写入按日缓存的保证金比例），
+    行情直接传给各期权链的预热，不依赖秒级的行情缓存
+    """
+    try:
+        from .tiger_client import get_client_manager
+        return get_client_manager().get_stock_quotes([s.upper() for s in symbols])
+    except Exception as e:
+        logger.warning(f"Batched quote prefetch failed: {e}")
+        return {}
+
+
+def _tiger_available() -> bool:
+    try:
+        from .tiger_client import get_client_manager
+        return get_client_manager().ensure_initialized()
+    except Exception as e:
+        logger.warning(f"Tiger client unavailable, skipping option chain pre-warm: {e}")
+        return False
+
+
+def run_prewarm(market: str) -> Optional[dict]:
+    """
+    调度入口（每个 worker 都会触发，在 app context 中运行）
+
+    先拿到 SCHEDULER_LOCK_DIR 下该市场锁文件的 worker 执行预热并写出缓存快照；
+    其余 worker 阻塞等待，随后载入该快照，而不是各自再请求一遍上游
+    """
+    lock_dir = current_app.config.get('SCHEDULER_LOCK_DIR')
+    if not lock_dir:
+        return prewarm_market(market)
+    os.makedirs(lock_dir, exist_ok=True)
+    started = time.time()
+    snapshot_path = os.path.join(lock_dir, f'prewarm_{market.lower()}.pkl')
+
+    with open(os.path.join(lock_dir, f'prewarm_{market.lower()}.lock'), 'a+') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            shared = os.stat(snapshot_path).st_mtime >= started - SNAPSHOT_SHARE_SECONDS
+        except OSError:
+            shared = False
+        if shared:
+            return _load_snapshot(snapshot_path, market)
+        summary = prewarm_market(market)
+        _save_snapshot(snapshot_path, summary)
+        return summary
+
+
+def _save_snapshot(path: str, summary: dict):
+    caches = {name: cache.items() for name, cache in _shared_caches().items()}
+    try:
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump({'summary': summary, 'caches': caches}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+    except Exception as e:
+        logger.warning(f"Could not write prewarm snapshot {path}: {e}")
+
+
+def _load_snapshot(path: str, market: str) -> Optional[dict]:
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Could not read prewarm snapshot {path}: {e}")
+        return None
+
+    now = time.time()
+    caches = _shared_caches()
+    loaded = 0
+    for name, entries in snapshot['caches'].items():
+        cache = caches.get(name)
+        if cache is None:
+            continue
+        for key, value, expires_at in entries:
+            if expires_at > now:
+                cache.set(key, value, ttl=expires_at - now)
+                loaded += 1
+    _last_prewarm[market] = snapshot['summary']
+    logger.info(f"Prewarm ({market}): loaded {loaded} cache entries warmed by another worker")
+    return snapshot['summary']
+
+
+def prewarm_market(market: str, top_n: Optional[int] = None, lookback_days: Optional[int] = None) -> dict:
+    """
+    预热某市场的热门标的（在 app context 中运行）
+
+    返回预热汇总：标的数、成功/失败列表、耗时
+    """
+    config = current_app.config
+    top_n = top_n or config.get('PREWARM_TOP_N', 20)
+    lookback_days = lookback_days or config.get('PREWARM_LOOKBACK_DAYS', 7)
+    workers = config.get('PREWARM_WORKERS', 4)
+    expiries = config.get('PREWARM_OPTION_EXPIRIES', 2)
+
+    started = time.perf_counter()
+    popular = get_popular_tickers(market, top_n, lookback_days)
+    # 查询结束后释放连接，预热线程不访问数据库
+    db.session.remove()
+
+    styles_by_ticker: Dict[str, List[str]] = {}
+    for style, tickers in popular['styles'].items():
+        for ticker in tickers:
+            styles_by_ticker.setdefault(ticker, []).append(style)
+
+    option_symbols = popular['options'] if _tiger_available() else []
+    quotes = _prefetch_quotes(option_symbols) if option_symbols else {}
+
+    failed = []
+    option_chains = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='Prewarm') as pool:
+        stock_futures = {pool.submit(_warm_stock, t, s): t for t, s in styles_by_ticker.items()}
+        option_futures = {pool.submit(_warm_option_chains, s, expiries, quotes.get(s.upper())): s
+                          for s in option_symbols}
+
+        for future, ticker in stock_futures.items():
+            try:
+                if not future.result():
+                    failed.append(ticker)
+            except Exception as e:
+                logger.warning(f"Prewarm ({market}) failed for {ticker}: {e}")
+                failed.append(ticker)
+
+        for future, symbol in option_futures.items():
+            try:
+                option_chains += future.result()
+            except Exception as e:
+                logger.warning(f"Prewarm ({market}) option chains failed for {symbol}: {e}")
+                failed.append(f"{symbol} (options)")
+
+    summary = {
+        'market': market,
+        'tickers': len(styles_by_ticker),
+        'quant_analyses': sum(len(s) for s in styles_by_ticker.values()),
+        'option_symbols': len(option_symbols),
+        'option_chains': option_chains,
+        'failed': failed,
+        'seconds': round(time.perf_counter() - started, 1),
+        'finished_at': datetime.now().isoformat(),
+    }
+    _last_prewarm[market] = summary
+    logger.info(
+        f"Prewarm ({market}): {summary['tickers']} tickers / {summary['quant_analyses']} quant analyses, "
+        f"{option_chains} option chains for {len(option_symbols)} symbols in {summary['seconds']}s, "
+        f"{len(failed)} failed"
+    )
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# 开盘后命中率统计
+# ---------------------------------------------------------------------------
+
+_windows: Dict[str, dict] = {}        # market -> 开盘时各缓存的计数快照
+_reports: Dict[str, dict] = {}        # market -> 最近一次开盘首小时的命中率报告
+_last_prewarm: Dict[str, dict] = {}   # market -> 最近一次预热汇总
+
+
+def _shared_caches() -> dict:
+    """预热写入、在 worker 之间共享的缓存"""
+    from .options_service import iv_surface_cache
+    return {**_tracked_caches(), 'option_iv_surface': iv_surface_cache}
+
+
+def _tracked_caches() -> dict:
+    from .options_service import expirations_cache, option_chain_cache
+    from ..api.stock import quant_analysis_cache
+
+    return {
+        'market_data': analysis_engine.market_data_cache,
+        'quant_analysis': quant_analysis_cache,
+        'option_expirations': expirations_cache,
+        'option_chain': option_chain_cache,
+    }
+
+
+def start_hit_rate_window(market: str):
+    """开盘时记录各缓存的命中/未命中计数"""
+    _windows[market] = {
+        'started_at': datetime.now(),
+        'baseline': {name: cache.stats() for name, cache in _tracked_caches().items()},
+    }
+
+
+def finish_hit_rate_window(market: str) -> Optional[dict]:
+    """开盘一小时后计算窗口内的命中率，写日志并保存报告"""
+    window = _windows.pop(market, None)
+    if window is None:
+        return None
+
+    caches = {}
+    total_hits = total_misses = 0
+    for name, cache in _tracked_caches().items():
+        stats = cache.stats()
+        base = window['baseline'].get(name, {'hits': 0, 'misses': 0})
+        hits = stats['hits'] - base['hits']
+        misses = stats['misses'] - base['misses']
+        total_hits += hits
+        total_misses += misses
+        caches[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+    total = total_hits + total_misses
+    report = {
+        'market': market,
+        'window_start': window['started_at'].isoformat(),
+        'window_end': datetime.now().isoformat(),
+        'hit_rate': round(total_hits / total, 4) if total else None,
+        'caches': caches,
+        'prewarm': _last_prewarm.get(market),
+    }
+    _reports[market] = report
+
+    logger.info(
+        f"Cache hit rate ({market}, first trading hour): "
+        + ', '.join(f"{name}={c['hits']}/{c['hits'] + c['misses']}" for name, c in caches.items())
+    )
+    return report
+
+
+def get_prewarm_report() -> dict:
+    """最近一次预热汇总、开盘首小时命中率报告，以及各缓存当前的累计统计"""
+    return {
+        'reports': dict(_reports),
+        'prewarm': dict(_last_prewarm),
+        'caches': {name: cache.stats() for name, cache in _tracked_caches().items()},
+    }
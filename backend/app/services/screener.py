@@ -0,0 +1,334 @@
+"""
+Quant-only Stock Screener
+
+对一个股票列表（自选股 / 候选池）批量打分，不调用 Gemini：
+- 历史行情按块（chunk）批量下载（yf.download），公司信息并发获取，两者同时进行
+- 风险评分、目标价格和仓位调整由 vectorized_scoring 对整批股票列式计算
+  （与 analyze_risk_and_position / calculate_target_price 逐条一致），
+  calculate_atr_stop_loss 与 ev_model.calculate_ev_model 逐只计算
+- 返回按 EV 排序的结果表，以及吞吐量（tickers/second）
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from . import analysis_engine, ev_model, vectorized_scoring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50      # 每次 yf.download 的股票数
+DEFAULT_INFO_WORKERS = 16    # 并发获取 info 的线程数
+INFO_RETRY_DELAY = 2         # 遇到速率限制时的等待（秒）
+
+
+def _chunks(items: List[str], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def download_history(tickers: List[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, pd.DataFrame]:
+    """
+    按块批量下载一年日线行情
+    yf.download 内部的多线程下载共享全局状态，因此块与块之间串行，块内由 yfinance 并发
+    """
+    histories = {}
+    for chunk in _chunks(tickers, chunk_size):
+        try:
+            df = yf.download(
+                chunk,
+                period='1y',
+                group_by='ticker',
+                threads=min(len(chunk), 10),
+                progress=False,
+                timeout=30
+            )
+        except Exception as e:
+            logger.warning(f"Screener history download failed for chunk {chunk[0]}..{chunk[-1]}: {e}")
+            continue
+
+        if df is None or df.empty:
+            continue
+
+        for ticker in chunk:
+            try:
+                if isinstance(df.columns, pd.MultiIndex):
+                    if ticker not in df.columns.get_level_values(0):
+                        continue
+                    hist = df[ticker]
+                else:
+                    hist = df
+                hist = hist.dropna(how='all')
+                if not hist.empty:
+                    histories[ticker] = hist
+            except Exception as e:
+                logger.debug(f"Screener: no history for {ticker}: {e}")
+
+    return histories
+
+
+def _fetch_info(ticker: str) -> dict:
+    for attempt in range(2):
+        try:
+            return yf.Ticker(ticker).info or {}
+        except Exception as e:
+            error_msg = str(e)
+            is_rate_limit = (isinstance(e, analysis_engine.YFRateLimitError) or
+                             "Too Many Requests" in error_msg or
+                             "Rate limited" in error_msg)
+            if is_rate_limit and attempt == 0:
+                time.sleep(INFO_RETRY_DELAY)
+                continue
+            logger.debug(f"Screener: info fetch failed for {ticker}: {e}")
+            return {}
+    return {}
+
+
+def build_screener_data(ticker: str, info: dict, hist: pd.DataFrame) -> Optional[dict]:
+    """
+    由 info + 历史行情构造与 get_market_data 相同字段的数据字典
+    （不包含新闻、业务描述等只在 AI 报告中使用的字段）
+    """
+    current_price = (info.get('currentPrice') or
+                     info.get('regularMarketPrice') or
+                     info.get('previousClose') or 0)
+    if not current_price and hist is not None and not hist.empty:
+        current_price = hist['Close'].dropna().iloc[-1]
+    if not current_price:
+        return None
+    current_price = float(current_price)
+
+    has_hist = hist is not None and not hist.empty
+    ma50 = hist['Close'].rolling(window=50).mean().iloc[-1] if has_hist and len(hist) >= 50 else current_price
+    ma200 = hist['Close'].rolling(window=200).mean().iloc[-1] if has_hist and len(hist) >= 200 else current_price
+
+    def _num(*keys):
+        for key in keys:
+            try:
+                value = info.get(key)
+                if value:
+                    return float(value)
+            except (ValueError, TypeError):
+                pass
+        return 0.0
+
+    volume_anomaly = None
+    if has_hist and 'Volume' in hist.columns and len(hist) >= 30:
+        recent_volume_avg = hist['Volume'].tail(5).mean()
+        historical_volume_avg = hist['Volume'].tail(30).mean()
+        if historical_volume_avg > 0:
+            volume_ratio = recent_volume_avg / historical_volume_avg
+            volume_anomaly = {
+                'ratio': float(volume_ratio),
+                'is_anomaly': bool(volume_ratio > 2.0 or volume_ratio < 0.3),
+                'recent_avg': float(recent_volume_avg),
+                'historical_avg': float(historical_volume_avg)
+            }
+
+    week52_high = info.get('fiftyTwoWeekHigh') or (hist['High'].max() if has_hist else current_price)
+    week52_low = info.get('fiftyTwoWeekLow') or (hist['Low'].min() if has_hist else current_price)
+    if week52_high < current_price:
+        week52_high = current_price * 1.2
+    if week52_low > current_price:
+        week52_low = current_price * 0.8
+
+    beta = None
+    atr_value = None
+    if has_hist and len(hist) >= 15:
+        atr_value = analysis_engine.calculate_atr(hist, period=14)
+        beta = _num('beta') or None
+
+    company_name = info.get('longName') or info.get('shortName') or ticker
+    sector = info.get('sector') or 'Unknown'
+    industry = info.get('industry') or 'Unknown'
+    if sector == 'Unknown' or industry == 'Unknown':
+        inferred_sector, inferred_industry = analysis_engine.infer_industry_from_name(company_name, ticker)
+        sector = inferred_sector or sector
+        industry = inferred_industry or industry
+
+    data = {
+        'symbol': ticker,
+        'original_symbol': ticker,
+        'name': company_name,
+        'sector': sector,
+        'industry': industry,
+        'price': current_price,
+        'week52_high': float(week52_high),
+        'week52_low': float(week52_low),
+        'pe': _num('trailingPE', 'forwardPE'),
+        'forward_pe': _num('forwardPE'),
+        'peg': _num('pegRatio'),
+        'growth': _num('revenueGrowth'),
+        'margin': _num('profitMargins'),
+        'ma50': float(ma50),
+        'ma200': float(ma200),
+        'market_cap': _num('marketCap', 'totalAssets'),
+        'history_prices': [float(p) for p in hist['Close'].dropna().tolist()] if has_hist else [current_price],
+        'volume_anomaly': volume_anomaly,
+        'earnings_dates': [],
+        'lockup_data': analysis_engine.get_ipo_lockup_data(info, ticker),
+        'atr': atr_value,
+        'beta': beta,
+    }
+
+    is_fund, fund_type = analysis_engine.is_etf_or_fund(data)
+    data['is_etf_or_fund'] = is_fund
+    data['fund_type'] = fund_type if is_fund else None
+    return data
+
+
+def score_tickers(records: List[dict], histories: Dict[str, pd.DataFrame], style: str,
+                  macro_data: dict) -> List[Optional[dict]]:
+    """一批股票的量化打分（风险/目标价/止损/EV），不含 AI 分析；与 records 一一对应"""
+    if not records:
+        return []
+    frame = vectorized_scoring.records_to_frame(records)
+    scored = vectorized_scoring.score_universe(frame, style, macro_data, with_flags=True)
+
+    rows = []
+    for data, risk in zip(records, scored.to_dict('records')):
+        ticker = data['symbol']
+        try:
+            rows.append(_score_row(data, risk, histories.get(ticker), style))
+        except Exception as e:
+            logger.warning(f"Screener scoring failed for {ticker}: {e}")
+            rows.append(None)
+    return rows
+
+
+def _score_row(data: dict, risk: dict, hist: Optional[pd.DataFrame], style: str) -> dict:
+    """在列式风险/目标价结果上补充 ATR 止损与 EV"""
+    target_price = float(risk['target_price'])
+    data['target_price'] = target_price
+    price = data['price']
+    upside_pct = (target_price - price) / price if price > 0 and target_price > 0 else None
+    risk_result = {
+        'score': risk['score'],
+        'level': risk['level'],
+        'flags': risk['flags'],
+        'suggested_position': risk['suggested_position'],
+        'price_adjustment': risk['price_adjustment'],
+    }
+
+    if hist is not None and len(hist) >= 15:
+        stop_loss_price = analysis_engine.calculate_atr_stop_loss(
+            buy_price=price,
+            hist_data=hist.tail(31),  # 与单股分析一致：约1个月数据
+            atr_period=14,
+            atr_multiplier=2.5,
+            min_stop_loss_pct=0.05,
+            beta=data.get('beta')
+        )
+    else:
+        stop_loss_price = price * 0.85
+
+    ev_result = ev_model.calculate_ev_model(data, risk_result, style)
+    recommendation = ev_result.get('recommendation', {})
+
+    return {
+        'ticker': data['symbol'],
+        'name': data['name'],
+        'sector': data['sector'],
+        'price': round(price, 2),
+        'target_price': target_price,
+        'upside_pct': round(upside_pct * 100, 2) if upside_pct is not None else None,
+        'stop_loss_price': round(float(stop_loss_price), 2),
+        'risk_score': risk_result['score'],
+        'risk_level': risk_result['level'],
+        'risk_flags': risk_result['flags'],
+        'suggested_position': risk_result['suggested_position'],
+        'ev_weighted_pct': round(float(ev_result.get('ev_weighted_pct', 0.0)), 2),
+        'ev_score': ev_result.get('ev_score'),
+        'recommendation': recommendation.get('action'),
+        'confidence': recommendation.get('confidence'),
+        'is_etf_or_fund': data['is_etf_or_fund'],
+    }
+
+
+def run_screener(tickers: List[str], style: str = 'quality',
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 info_workers: int = DEFAULT_INFO_WORKERS) -> dict:
+    """
+    批量量化筛选
+
+    返回:
+        {
+            'style', 'requested', 'scored', 'failed': [...],
+            'results': [...按 EV 降序、风险升序排列],
+            'timings': {'fetch_seconds', 'score_seconds', 'total_seconds'},
+            'tickers_per_second'
+        }
+    """
+    started = time.perf_counter()
+
+    normalized = []
+    seen = set()
+    for ticker in tickers:
+        symbol = analysis_engine.normalize_ticker(str(ticker).strip().upper())
+        if symbol and symbol not in seen:
+            seen.add(symbol)
+            normalized.append(symbol)
+
+    # 行情批量下载与 info 并发获取同时进行
+    with ThreadPoolExecutor(max_workers=info_workers + 1, thread_name_prefix='Screener') as pool:
+        history_future = pool.submit(download_history, normalized, chunk_size)
+        info_futures = {ticker: pool.submit(_fetch_info, ticker) for ticker in normalized}
+        histories = history_future.result()
+        infos = {ticker: future.result() for ticker, future in info_futures.items()}
+    fetched = time.perf_counter()
+
+    from .market_context import get_market_context
+    macro_data = get_market_context().macro_data()
+
+    records = []
+    failed = []
+    for ticker in normalized:
+        try:
+            data = build_screener_data(ticker, infos.get(ticker, {}), histories.get(ticker))
+        except Exception as e:
+            logger.warning(f"Screener data build failed for {ticker}: {e}")
+            data = None
+        if data is None:
+            failed.append(ticker)
+        else:
+            records.append(data)
+
+    results = []
+    for data, row in zip(records, score_tickers(records, histories, style, macro_data)):
+        if row is None:
+            failed.append(data['symbol'])
+        else:
+            results.append(row)
+
+    results.sort(key=lambda r: (-r['ev_weighted_pct'], r['risk_score'] if r['risk_score'] is not None else 10))
+    for rank, row in enumerate(results, start=1):
+        row['rank'] = rank
+
+    finished = time.perf_counter()
+    total_seconds = finished - started
+    tickers_per_second = len(normalized) / total_seconds if total_seconds > 0 else 0.0
+
+    logger.info(
+        f"Screener ({style}): {len(results)}/{len(normalized)} tickers scored in {total_seconds:.1f}s "
+        f"({tickers_per_second:.1f} tickers/s, fetch {fetched - started:.1f}s)"
+    )
+
+    return {
+        'style': style,
+        'requested': len(normalized),
+        'scored': len(results),
+        'failed': failed,
+        'results': results,
+        'timings': {
+            'fetch_seconds': round(fetched - started, 3),
+            'score_seconds': round(finished - fetched, 3),
+            'total_seconds': round(total_seconds, 3),
+        },
+        'tickers_per_second': round(tickers_per_second, 2),
+        'generated_at': datetime.now().isoformat(),
+    }
@@ -13,7 +13,7 @@ from datetime import datetime
 from queue import Queue, Empty
 from typing import Optional, Dict, Any
 from ..models import db, AnalysisTask, TaskType, TaskStatus, StockAnalysisHistory, OptionsAnalysisHistory
-from ..utils.serialization import convert_numpy_types
+from ..utils.metrics import span, register_gauge, STAGE_LATENCY
 
 logger = logging.getLogger(__name__)
 
@@ -98,7 +98,8 @@ class TaskQueue:
                 'task_type': task_type,
                 'input_params': input_params,
                 'priority': priority,
-                'created_at': datetime.utcnow()
+                'created_at': datetime.utcnow(),
+                'enqueued_at': time.perf_counter()
             })
 
             logger.info(f"Task {task_id} created for user {user_id}: {task_type}")
@@ -131,7 +132,8 @@ class TaskQueue:
                 query = query.filter_by(status=status)
 
             tasks = query.order_by(AnalysisTask.created_at.desc()).limit(limit).all()
-            return [task.to_dict() for task in tasks]
+            # 列表不返回结果（完整结果通过 /tasks/<id>/result 获取）
+            return [task.to_dict(include_result=False) for task in tasks]
 
         except Exception as e:
             logger.error(f"Failed to get user tasks for {user_id}: {e}")
@@ -151,6 +153,8 @@ class TaskQueue:
                     continue
 
                 task_id = task_data['task_id']
+                STAGE_LATENCY.observe(time.perf_counter() - task_data.get('enqueued_at', time.perf_counter()),
+                                      stage='task_queue_wait', outcome='ok')
 
                 try:
                     # Mark task as processing
@@ -160,12 +164,15 @@ class TaskQueue:
                     logger.info(f"Worker {worker_name} processing task {task_id}")
 
                     # Process the task based on type
-                    if task_data['task_type'] == TaskType.STOCK_ANALYSIS.value:
-                        self._process_stock_analysis(task_data)
-                    elif task_data['task_type'] in [TaskType.OPTION_ANALYSIS.value, TaskType.ENHANCED_OPTION_ANALYSIS.value]:
-                        self._process_options_analysis(task_data)
-                    else:
-                        raise ValueError(f"Unknown task type: {task_data['task_type']}")
+                    with span(f"task_{task_data['task_type']}"):
+                        if task_data['task_type'] == TaskType.STOCK_ANALYSIS.value:
+                            self._process_stock_analysis(task_data)
+                        elif task_data['task_type'] in [TaskType.OPTION_ANALYSIS.value, TaskType.ENHANCED_OPTION_ANALYSIS.value]:
+                            self._process_options_analysis(task_data)
+                        elif task_data['task_type'] == TaskType.STOCK_SCREENER.value:
+                            self._process_screener(task_data)
+                        else:
+                            raise ValueError(f"Unknown task type: {task_data['task_type']}")
 
                     logger.info(f"Worker {worker_name} completed task {task_id}")
 
@@ -295,7 +302,7 @@ class TaskQueue:
                         recommendation_action=analysis_result.get('recommendation_action'),
                         recommendation_confidence=analysis_result.get('recommendation_confidence'),
                         ai_summary=analysis_result.get('ai_summary'),
-                        full_analysis_data=convert_numpy_types(analysis_result)
+                        full_analysis_data=analysis_result
                     )
 
                     session.add(history_record)
@@ -304,9 +311,8 @@ class TaskQueue:
                     # Store the history ID before committing
                     history_id = history_record.id
 
-                    # Update task with results
+                    # Update task with results (stored once, in the history record)
                     task = session.query(AnalysisTask).get(task_id)
-                    task.result_data = convert_numpy_types(analysis_result)
                     task.related_history_id = history_id
                     task.related_history_type = 'stock'
 
@@ -396,7 +402,7 @@ class TaskQueue:
                         vrp_analysis=analysis_result.get('vrp_analysis'),
                         risk_analysis=analysis_result.get('risk_analysis'),
                         ai_summary=analysis_result.get('ai_summary'),
-                        full_analysis_data=convert_numpy_types(analysis_result)
+                        full_analysis_data=analysis_result
                     )
 
                     session.add(history_record)
@@ -405,9 +411,8 @@ class TaskQueue:
                     # Store the history ID before committing
                     history_id = history_record.id
 
-                    # Update task with results
+                    # Update task with results (stored once, in the history record)
                     task = session.query(AnalysisTask).get(task_id)
-                    task.result_data = convert_numpy_types(analysis_result)
                     task.related_history_id = history_id
                     task.related_history_type = 'options'
 
@@ -427,6 +432,37 @@ class TaskQueue:
             logger.error(f"Options analysis failed for {symbol}: {e}")
             raise
 
+    def _process_screener(self, task_data: Dict[str, Any]):
+        """Process quant-only screener task (result stored on the task, no history record)"""
+        task_id = task_data['task_id']
+        params = task_data['input_params']
+
+        tickers = params.get('tickers') or []
+        style = params.get('style', 'quality')
+
+        logger.info(f"Processing screener for {len(tickers)} tickers ({style})")
+
+        self._update_task_status(task_id, TaskStatus.PROCESSING.value, 10, f"Screening {len(tickers)} tickers...")
+
+        from .screener import run_screener
+        result = run_screener(tickers, style)
+
+        self._update_task_status(task_id, TaskStatus.PROCESSING.value, 90, "Saving screener results...")
+
+        with self.app.app_context():
+            try:
+                task = AnalysisTask.query.get(task_id)
+                task.result_data = result
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to save screener result: {e}")
+                raise
+
+        self._update_task_status(task_id, TaskStatus.COMPLETED.value, 100, "Screener completed successfully")
+
+        logger.info(f"Screener completed: {result.get('scored')}/{len(tickers)} tickers scored")
+
 # Global task queue instance
 task_queue = None
 
@@ -435,6 +471,10 @@ def init_task_queue(app=None):
     global task_queue
     task_queue = TaskQueue(max_workers=3, app=app)
     task_queue.start()
+    register_gauge('task_queue_depth', 'Tasks waiting in the async task queue',
+                   lambda: task_queue.task_queue.qsize())
+    register_gauge('task_queue_processing', 'Tasks currently being processed by workers',
+                   lambda: len(task_queue.processing_tasks))
     logger.info("Global task queue initialized")
 
 def shutdown_task_queue():
@@ -0,0 +1,3 @@
+"""
+services 层测试
+"""
@@ -0,0 +1,159 @@
+"""
+PaymentService：额度扣减（免费额度 / FIFO 台账 / 余额行在同一事务）；
+对账：逐批锁定余额行后按台账校正漂移 / 孤立行，补齐缺失行
+"""
+
+import os
+import re
+import sys
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.models import db, User, CreditLedger, CreditBalance, DailyQueryCount, UsageLog  # noqa: E402
+from app.services.payment_service import PaymentService  # noqa: E402
+
+
+class CreditTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.expiry = datetime.utcnow() + timedelta(days=30)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_ledger(self, user_id, remaining, expires_at=None):
+        if db.session.get(User, user_id) is None:
+            db.session.add(User(id=user_id, email=f'{user_id}@example.com'))
+        db.session.add(CreditLedger(user_id=user_id, service_type='stock_analysis', source='top_up',
+                                    amount_initial=remaining, amount_remaining=remaining, expires_at=expires_at))
+
+    def add_balance(self, user_id, balance, next_expires_at=None):
+        db.session.add(CreditBalance(user_id=user_id, service_type='stock_analysis',
+                                     balance=balance, next_expires_at=next_expires_at))
+
+    def balances(self):
+        return {row.user_id: (row.balance, row.next_expires_at) for row in CreditBalance.query}
+
+
+class TestCheckAndDeductCredits(CreditTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_ledger('u1', 1, self.expiry)           # 先到期的先扣
+        self.add_ledger('u1', 5)
+        self.add_ledger('u1', 9, datetime.utcnow() - timedelta(days=1))   # 已过期，跳过
+        self.add_balance('u1', 6, self.expiry)
+        db.session.commit()
+
+    def ledger(self):
+        return [row.amount_remaining for row in CreditLedger.query.order_by(CreditLedger.id)]
+
+    def deduct(self, service_type='deep_report'):
+        return PaymentService.check_and_deduct_credits('u1', service_type, ticker='NVDA')
+
+    def test_deducts_ledger_and_balance(self):
+        self.assertEqual(self.deduct(), (True, "扣减成功", 5))
+        self.assertEqual(self.ledger(), [0, 5, 9])
+        self.assertEqual(self.balances(), {'u1': (5, self.expiry)})   # 到期后由 get_total_credits 重算
+        self.assertEqual(self.deduct(), (True, "扣减成功", 4))
+        self.assertEqual(self.ledger(), [0, 4, 9])
+        self.assertEqual([(log.credit_ledger_id, log.service_type, log.ticker) for log in UsageLog.query],
+                         [(1, 'deep_report', 'NVDA'), (2, 'deep_report', 'NVDA')])
+
+    def test_insufficient_credits_change_nothing(self):
+        self.add_ledger('u2', 3, datetime.utcnow() - timedelta(days=1))   # 只有已过期的额度
+        self.add_balance('u2', 0)
+        db.session.commit()
+        result = PaymentService.check_and_deduct_credits('u2', 'deep_report')
+        self.assertEqual(result, (False, "额度不足，请充值或明天再来", 0))
+        self.assertEqual(self.ledger(), [1, 5, 9, 3])
+        self.assertEqual(self.balances(), {'u1': (6, self.expiry), 'u2': (0, None)})
+        self.assertEqual(UsageLog.query.count(), 0)
+
+    def test_free_quota_before_paid_credits(self):
+        quota = PaymentService.DAILY_FREE_QUOTA['stock_analysis']
+        for _ in range(quota):
+            self.assertEqual(self.deduct('stock_analysis'), (True, "使用每日免费额度", 6))
+        self.assertEqual(self.ledger(), [1, 5, 9])
+        self.assertEqual(DailyQueryCount.query.one().query_count, quota)
+
+        self.assertEqual(self.deduct('stock_analysis'), (True, "扣减成功", 5))
+        self.assertEqual(self.ledger(), [0, 5, 9])
+        self.assertEqual([log.credit_ledger_id for log in UsageLog.query], [None] * quota + [1])
+
+    def test_postgres_statement_matches_generic_path(self):
+        # 通用路径（SQLite）实际执行的 FIFO 查询
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self.deduct()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        generic = ' '.join(next(s for s in statements if s.startswith('SELECT credit_ledger.id')).split())
+        self.assertIn('credit_ledger.amount_remaining > ?', generic)
+        self.assertIn('credit_ledger.expires_at IS NULL OR credit_ledger.expires_at > ?', generic)
+        self.assertIn('ORDER BY credit_ledger.expires_at ASC NULLS LAST, credit_ledger.id', generic)
+
+        # PostgreSQL 单条 CTE：同样的有效额度条件与 FIFO 顺序，先免费额度后台账
+        row = SimpleNamespace(used_free=False, ledger_id=1, log_id=7, has_balance=True,
+                              balance=5, next_expires_at=None)
+        with mock.patch.object(db.session, 'execute') as execute:
+            execute.return_value.one.return_value = row
+            result = PaymentService._deduct_credits_postgres('u1', 'deep_report', 'stock_analysis', 1, 'NVDA')
+        self.assertEqual(result, (False, 1, 7, (5, None)))
+        statement, params = execute.call_args.args
+        sql = ' '.join(str(statement).split())
+        self.assertEqual(re.findall(r'(\w+) AS \(', sql),
+                         ['daily', 'free_upd', 'free_ins', 'free', 'target', 'ledger', 'usage_log', 'bal',
+                          'current_balance'])
+        self.assertIn('AND amount_remaining > 0 AND (expires_at IS NULL OR expires_at > :now) '
+                      'AND NOT EXISTS (SELECT 1 FROM free) ORDER BY expires_at ASC NULLS LAST, id LIMIT 1 FOR UPDATE',
+                      sql)
+        self.assertIn('WHERE d.id = daily.id AND daily.query_count < :free_quota', sql)
+        self.assertEqual((params['free_quota'], params['credit_service_type'], params['amount']),
+                         (0, 'stock_analysis', 1))
+
+
+class TestReconcileCreditBalances(CreditTestCase):
+
+    def test_corrects_drifted_orphaned_and_missing_rows(self):
+        self.add_ledger('ok', 5)
+        self.add_balance('ok', 5)
+        self.add_ledger('drift', 3)
+        self.add_ledger('drift', 4, self.expiry)
+        self.add_balance('drift', 9)
+        self.add_ledger('orphan', 2, datetime.utcnow() - timedelta(days=1))   # 已过期
+        self.add_balance('orphan', 2)
+        self.add_ledger('missing', 6)
+        db.session.commit()
+
+        # 批大小 1：逐批锁定、按主键续读
+        self.assertEqual(PaymentService.reconcile_credit_balances(batch_size=1), 3)
+        self.assertEqual(self.balances(), {
+            'ok': (5, None),
+            'drift': (7, self.expiry),
+            'orphan': (0, None),
+            'missing': (6, None),
+        })
+        self.assertEqual(PaymentService.reconcile_credit_balances(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+TigerClientManager：一次性初始化、客户端池、行情 / 保证金比例缓存、批量行情与历史数据
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest import mock
+
+import pandas as pd
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.services import options_service, tiger_client  # noqa: E402
+from app.services.tiger_client import TigerClientManager  # noqa: E402
+
+
+class FakeQuoteClient:
+    def __init__(self):
+        self.calls = Counter()
+        self.requested = []
+
+    def get_stock_briefs(self, symbols, **kwargs):
+        self.calls['get_stock_briefs'] += 1
+        self.requested.append(list(symbols))
+        return pd.DataFrame([{'symbol': s, 'latest_price': 100.0, 'margin_rate': 0.3} for s in symbols])
+
+    def get_bars(self, symbols, period=None, end_time=-1, limit=251):
+        self.calls['get_bars'] += 1
+        self.requested.append(list(symbols))
+        return pd.DataFrame([{'symbol': s, 'time': t, 'close': 100.0 + t} for s in symbols
+                             for t in range(limit, 0, -1) if s != 'NEW'])
+
+    def get_option_chain(self, symbol, expiry, market=None, return_greek_value=True):
+        self.calls['get_option_chain'] += 1
+        return pd.DataFrame([
+            {'identifier': f'{symbol} 250117{pc[0]}{int(k * 1000):08d}', 'symbol': symbol, 'strike': k,
+             'put_call': pc, 'bid_price': 1.0, 'ask_price': 1.2, 'latest_price': 1.1, 'volume': 10,
+             'open_interest': 100, 'implied_vol': 0.3, 'delta': 0.4, 'gamma': 0.01, 'theta': -0.02, 'vega': 0.1}
+            for pc in ('CALL', 'PUT') for k in (90.0, 100.0, 110.0)
+        ])
+
+
+def manager_with(*clients):
+    manager = TigerClientManager(pool_size=len(clients))
+    manager.quote_client = clients[0]
+    manager._pool = queue.LifoQueue()
+    for client in clients:
+        manager._pool.put(client)
+    return manager
+
+
+class TestTigerClientManager(unittest.TestCase):
+
+    def setUp(self):
+        tiger_client.clear_caches()
+        self.addCleanup(tiger_client.clear_caches)
+
+    def test_initializes_once(self):
+        manager = TigerClientManager()
+        attempts = []
+
+        def initialize():
+            attempts.append(1)
+            return False
+
+        with mock.patch.object(manager, 'initialize_client', initialize):
+            threads = [threading.Thread(target=manager.ensure_initialized) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            # 失败后在重试间隔内不再尝试
+            self.assertFalse(manager.ensure_initialized())
+        self.assertEqual(len(attempts), 1)
+        with self.assertRaises(Exception):
+            manager.get_option_chain('AAPL', '2025-01-17')
+
+    def test_batched_quotes_and_margin_rate(self):
+        client = FakeQuoteClient()
+        manager = manager_with(client)
+        manager.get_stock_quote(['AAPL'])
+        quotes = manager.get_stock_quote(['MSFT', 'AAPL', 'NVDA'])
+
+        self.assertEqual(quotes['symbol'].tolist(), ['MSFT', 'AAPL', 'NVDA'])
+        self.assertEqual(client.requested, [['AAPL'], ['MSFT', 'NVDA']])   # 只请求缺失的代码
+        # 保证金比例取自已缓存的行情
+        self.assertEqual(manager.get_margin_rate('MSFT'), 0.3)
+        self.assertEqual(manager.get_margin_rate('MSFT'), 0.3)
+        self.assertEqual(client.calls['get_stock_briefs'], 2)
+
+    def test_batches_chunked_and_keyed_by_symbol(self):
+        clients = [FakeQuoteClient(), FakeQuoteClient()]
+        manager = manager_with(*clients)
+        symbols = ['A', 'B', 'C', 'D', 'E']
+        with mock.patch.object(tiger_client, 'QUOTE_BATCH_SIZE', 2), \
+                mock.patch.object(tiger_client, 'BARS_BATCH_SIZE', 4):
+            quotes = manager.get_stock_quotes(symbols)
+            histories = manager.get_stock_histories(symbols + ['NEW'], days=40)
+
+        self.assertEqual(sorted(quotes), symbols)
+        self.assertEqual(quotes['C']['latest_price'], 100.0)
+        self.assertEqual(sorted(histories), symbols + ['NEW'])
+        self.assertIsNone(histories['NEW'])                     # 无数据
+        self.assertEqual(histories['A'][:2], [101.0, 102.0])   # 按时间升序
+        self.assertEqual(len(histories['E']), 40)
+        # 3 个行情批次 + 2 个历史数据批次，客户端全部归还
+        requested = clients[0].requested + clients[1].requested
+        self.assertEqual(sorted(len(chunk) for chunk in requested), [1, 2, 2, 2, 4])
+        self.assertEqual(manager._pool.qsize(), 2)
+        self.assertEqual(manager.get_stock_history('A', days=40), histories['A'])
+
+    def test_quotes_matched_by_normalized_symbol(self):
+        client = FakeQuoteClient()
+        # 返回顺序不同、港股代码格式不同、缺少一个代码
+        client.get_stock_briefs = lambda symbols, **kwargs: pd.DataFrame([
+            {'symbol': 'msft', 'latest_price': 400.0, 'margin_rate': 0.25},
+            {'symbol': '700.HK', 'latest_price': 380.0, 'margin_rate': 0.5},
+        ])
+        manager = manager_with(client)
+        quotes = manager.get_stock_quotes(['00700', 'MSFT', 'ZZZZ'])
+
+        self.assertEqual(sorted(quotes), ['00700', 'MSFT'])
+        self.assertEqual(quotes['00700']['latest_price'], 380.0)
+        # 保证金比例随批量行情写入按日缓存
+        self.assertEqual(tiger_client.margin_rate_cache.get('MSFT'), 0.25)
+        self.assertEqual(tiger_client.margin_rate_cache.get('00700'), 0.5)
+
+    def test_histories_matched_by_normalized_symbol(self):
+        client = FakeQuoteClient()
+        client.get_bars = lambda symbols, limit=251, **kwargs: pd.DataFrame([
+            {'symbol': returned, 'time': t, 'close': close + t}
+            for returned, close in (('msft', 400.0), ('700.HK', 380.0), ('OTHER', 1.0))
+            for t in range(limit)
+        ])
+        manager = manager_with(client)
+        histories = manager.get_stock_histories(['00700', 'MSFT', 'ZZZZ'], days=40)
+
+        self.assertEqual(sorted(histories), ['00700', 'MSFT', 'ZZZZ'])   # 只保留请求的代码
+        self.assertEqual(histories['00700'][0], 380.0)
+        self.assertEqual(len(histories['MSFT']), 40)
+        self.assertIsNone(histories['ZZZZ'])
+
+    def test_rate_limiter(self):
+        limiter = tiger_client.RateLimiter(2, period=0.2)
+        started = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+    def test_pool_serves_concurrent_requests(self):
+        clients = [FakeQuoteClient(), FakeQuoteClient()]
+        manager = manager_with(*clients)
+        with manager._client() as first, manager._client() as second:
+            self.assertIsNot(first, second)
+        self.assertEqual(manager._pool.qsize(), 2)
+
+    def test_option_chain_traffic(self):
+        client = FakeQuoteClient()
+        manager = manager_with(client)
+        options_service.option_chain_cache.clear()
+        self.addCleanup(options_service.option_chain_cache.clear)
+
+        with mock.patch.object(tiger_client, 'client_manager', manager):
+            response = options_service.OptionsService.get_option_chain('AAPL', '2025-01-17')
+        self.assertEqual(response.data_source, 'real')
+        self.assertEqual(len(response.calls) + len(response.puts), 6)
+        # 一次期权链请求 + 一次行情请求（保证金比例不再逐行查询）
+        self.assertEqual(client.calls, Counter({'get_option_chain': 1, 'get_stock_briefs': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
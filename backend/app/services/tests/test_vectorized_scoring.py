@@ -0,0 +1,90 @@
+"""
+列式风险评分 / 目标价格交叉校验
+在一个覆盖各分支（ETF/REIT、亏损、PE分位点、财报、解禁、流动性、各行业）的
+固定股票池上，逐行对比 vectorized_scoring 与 analysis_engine 标量函数的结果
+"""
+
+import copy
+import os
+import sys
+import unittest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.join(backend_dir, 'benchmarks', 'suite'))
+
+from app.services import analysis_engine  # noqa: E402
+from app.services.vectorized_scoring import (  # noqa: E402
+    records_to_frame, classify_universe, analyze_risk_and_position_batch, calculate_target_price_batch, score_universe
+)
+from synthetic import build_universe, MACRO_DATA  # noqa: E402
+
+STYLES = ['quality', 'value', 'growth', 'momentum']
+
+
+class TestVectorizedScoring(unittest.TestCase):
+    """列式实现与标量实现逐行一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.records = build_universe()
+        cls.frame = records_to_frame(cls.records)
+
+    def scalar(self, style):
+        results = []
+        for record in self.records:
+            data = copy.deepcopy(record)
+            data['macro_data'] = MACRO_DATA
+            risk = analysis_engine.analyze_risk_and_position(style, data)
+            base_position = risk['suggested_position']
+            target = analysis_engine.calculate_target_price(data, risk, style)
+            adjusted = copy.deepcopy(risk)
+            analysis_engine.apply_target_price_adjustment(adjusted, data['price'], target)
+            results.append((risk, base_position, target, adjusted))
+        return results
+
+    def test_fund_classification_matches_scalar(self):
+        # 关键词跨越名称与代码之间的空格（"... index" + "fund"）也要与标量版本一致
+        records = [
+            {'name': 'Global', 'sector': 'Financial', 'industry': 'Index', 'symbol': 'FUND'},
+            {'name': 'Acme Mutual', 'sector': 'Financial', 'industry': 'Banks', 'symbol': 'FUNDX'},
+            {'name': 'Acme', 'sector': 'Tech', 'industry': 'Software', 'symbol': 'ARKK'},
+            {'name': 'Realty', 'sector': 'Real Estate', 'industry': 'REIT', 'symbol': 'O'},
+            {'name': 'Hooli', 'sector': 'Unknown', 'industry': 'Unknown', 'symbol': '510300.XSHG'},
+        ] + self.records
+        classification = classify_universe(records_to_frame(records))
+        for i, record in enumerate(records):
+            with self.subTest(row=i):
+                is_fund, fund_type = analysis_engine.is_etf_or_fund(record)
+                self.assertEqual(classification['is_etf_or_fund'].iloc[i], is_fund)
+                self.assertEqual(classification['fund_type'].iloc[i], fund_type)
+
+    def test_risk_and_position_match_scalar(self):
+        for style in STYLES:
+            batch = analyze_risk_and_position_batch(self.frame, style)
+            for i, (risk, base_position, _, _) in enumerate(self.scalar(style)):
+                with self.subTest(style=style, row=i):
+                    self.assertAlmostEqual(batch['score'].iloc[i], risk['score'])
+                    self.assertEqual(batch['level'].iloc[i], risk['level'])
+                    self.assertAlmostEqual(batch['suggested_position'].iloc[i], base_position)
+                    self.assertEqual(batch['flags'].iloc[i], risk['flags'])
+
+    def test_target_price_match_scalar(self):
+        for style in STYLES:
+            risk = analyze_risk_and_position_batch(self.frame, style, with_flags=False)
+            batch = calculate_target_price_batch(self.frame, risk, style, MACRO_DATA)
+            for i, (_, _, target, _) in enumerate(self.scalar(style)):
+                with self.subTest(style=style, row=i):
+                    self.assertAlmostEqual(batch['target_price'].iloc[i], target)
+
+    def test_score_universe_applies_price_adjustment(self):
+        for style in STYLES:
+            batch = score_universe(self.frame, style, MACRO_DATA)
+            for i, (_, _, _, adjusted) in enumerate(self.scalar(style)):
+                with self.subTest(style=style, row=i):
+                    self.assertAlmostEqual(batch['suggested_position'].iloc[i], adjusted['suggested_position'])
+                    self.assertAlmostEqual(batch['price_adjustment'].iloc[i], adjusted.get('price_adjustment', 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
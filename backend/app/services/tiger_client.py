@@ -4,23 +4,115 @@ Ported from new_options_module/tiger_client.py
 """
 
 import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional
 import pandas as pd
 from tigeropen.common.consts import Language, Market, BarPeriod
 from tigeropen.tiger_open_config import TigerOpenClientConfig
 from tigeropen.quote.quote_client import QuoteClient
 
+from ..config import Config
+from ..utils.cache import TTLCache
+
+POOL_SIZE = Config.TIGER_QUOTE_POOL_SIZE
+POOL_TIMEOUT = Config.TIGER_QUOTE_POOL_TIMEOUT
+INIT_RETRY_SECONDS = Config.TIGER_INIT_RETRY_SECONDS
+
+# 单次请求的代码数上限，以及各批量接口每分钟的请求数上限
+QUOTE_BATCH_SIZE = Config.TIGER_QUOTE_BATCH_SIZE
+BARS_BATCH_SIZE = Config.TIGER_BARS_BATCH_SIZE
+RATE_LIMITS = {
+    'get_stock_briefs': Config.TIGER_BRIEFS_PER_MINUTE,
+    'get_bars': Config.TIGER_BARS_PER_MINUTE,
+}
+
+# 行情快照短时缓存；保证金比例按日变化
+quote_cache = TTLCache(maxsize=2000, ttl=Config.TIGER_QUOTE_CACHE_TTL, name='tiger_quotes')
+margin_rate_cache = TTLCache(maxsize=2000, ttl=Config.TIGER_MARGIN_CACHE_TTL, name='tiger_margin_rates')
+
+
+class RateLimiter:
+    """Sliding-window limiter: at most `limit` acquire() calls per `period` seconds"""
+
+    def __init__(self, limit, period=60.0):
+        self.limit = limit
+        self.period = period
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sent and self._sent[0] <= now - self.period:
+                    self._sent.popleft()
+                if len(self._sent) < self.limit:
+                    self._sent.append(now)
+                    return
+                wait = self._sent[0] + self.period - now
+            time.sleep(wait)
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), max(1, size))]
+
+
+def _normalize_symbol(symbol) -> str:
+    """行情代码的比较键：忽略大小写、空白、.HK 后缀和港股代码的前导零（700.HK / 00700）"""
+    symbol = str(symbol or '').strip().upper()
+    if symbol.endswith('.HK'):
+        symbol = symbol[:-3]
+    return (symbol.lstrip('0') or symbol) if symbol.isdigit() else symbol
+
+
+def _margin_rate_from_quote(row) -> Optional[float]:
+    """从行情快照中取保证金比例（百分数换算为小数）"""
+    margin_rate = row.get('margin_rate')
+    if margin_rate is not None:
+        if pd.notna(margin_rate) and margin_rate > 0:
+            return float(margin_rate)
+        return None
+    margin_req = row.get('margin_requirement')
+    if margin_req is not None and pd.notna(margin_req):
+        if margin_req > 1:
+            return float(margin_req) / 100.0
+        return float(margin_req)
+    return None
+
+
 class TigerClientManager:
-    """Manages Tiger Open API client configuration and provides quote services"""
+    """
+    Manages Tiger Open API client configuration and provides quote services
+
+    - initialized lazily and at most once (retried after INIT_RETRY_SECONDS on failure)
+    - requests borrow a QuoteClient from a small pool, so concurrent requests
+      do not share one client
+    - stock quotes are cached per symbol for a few seconds; margin rates come
+      from the same quote and are cached for a day
+    - multi-symbol quotes / histories are split into chunks of the per-request
+      symbol limit, fetched concurrently (at most pool_size at a time) and
+      throttled per API by RATE_LIMITS
+    """
 
-    def __init__(self, props_path=None):
+    def __init__(self, props_path=None, pool_size=POOL_SIZE):
         self.props_path = props_path
+        self.pool_size = max(1, pool_size)
         self.client_config = None
         self.quote_client = None
+        self._pool = None
+        self._init_lock = threading.Lock()
+        self._init_failed_at = None
+        self._limiters = {api: RateLimiter(limit) for api, limit in RATE_LIMITS.items()}
+        self._batch_pool = None
 
     def initialize_client(self):
-        """Initialize Tiger client configuration and quote client"""
+        """Initialize Tiger client configuration and quote client pool"""
         try:
             # Use environment variables if available or fallback to local files
             # For now, we assume the user has the properties file at previous location or in refactor dir
@@ -33,6 +125,8 @@ class TigerClientManager:
                  os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tiger_openapi_config.properties'),
                  os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tiger_openapi_config.properties'),
             ]
+            if self.props_path:
+                candidate_paths.insert(0, self.props_path)
             
             config_file_path = None
             for path in candidate_paths:
@@ -49,98 +143,212 @@ class TigerClientManager:
 
             print(f"✅ Client config initialized - Tiger ID: {self.client_config.tiger_id}")
 
-            # Initialize QuoteClient
+            # Initialize QuoteClient pool; only the first client grabs the quote permission
             self.quote_client = QuoteClient(self.client_config)
+            pool = queue.LifoQueue()
+            pool.put(self.quote_client)
+            for _ in range(self.pool_size - 1):
+                pool.put(QuoteClient(self.client_config, is_grab_permission=False))
+            self._pool = pool
 
-            print("✅ Quote Client initialized successfully")
+            print(f"✅ Quote Client initialized successfully (pool size {self.pool_size})")
             return True
 
         except Exception as e:
             print(f"❌ Failed to initialize client: {str(e)}")
             return False
 
-    def get_option_expirations(self, symbol, market=Market.US):
-        if not self.quote_client:
+    def ensure_initialized(self) -> bool:
+        """Initialize once (thread-safe); returns whether a quote client is available"""
+        if self.quote_client is not None:
+            return True
+        with self._init_lock:
+            if self.quote_client is not None:
+                return True
+            if self._init_failed_at is not None and \
+                    datetime.now() - self._init_failed_at < timedelta(seconds=INIT_RETRY_SECONDS):
+                return False
+            if self.initialize_client() and self.quote_client is not None:
+                self._init_failed_at = None
+                return True
+            self._init_failed_at = datetime.now()
+            return False
+
+    @contextmanager
+    def _client(self, api=None):
+        """Borrow a quote client from the pool for one request (throttled when api has a rate limit)"""
+        if not self.ensure_initialized():
             raise Exception("Quote client not initialized")
-        return self.quote_client.get_option_expirations(symbols=[symbol], market=market)
+        limiter = self._limiters.get(api)
+        if limiter is not None:
+            limiter.acquire()
+        pool = self._pool
+        if pool is None:
+            yield self.quote_client
+            return
+        try:
+            client = pool.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise Exception("No Tiger quote client available")
+        try:
+            yield client
+        finally:
+            pool.put(client)
+
+    def _map_chunks(self, fn, chunks):
+        """fn(chunk) for every chunk, concurrently when there is more than one; results in order"""
+        if len(chunks) <= 1:
+            return [fn(chunk) for chunk in chunks]
+        with self._init_lock:
+            if self._batch_pool is None:
+                self._batch_pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='TigerBatch')
+        return list(self._batch_pool.map(fn, chunks))
+
+    def get_option_expirations(self, symbol, market=Market.US):
+        with self._client() as client:
+            return client.get_option_expirations(symbols=[symbol], market=market)
 
     def get_option_chain(self, symbol, expiry, market=Market.US):
-        if not self.quote_client:
-            raise Exception("Quote client not initialized")
-        
-        return self.quote_client.get_option_chain(
-            symbol=symbol,
-            expiry=expiry,
-            market=market,
-            return_greek_value=True
-        )
+        with self._client() as client:
+            return client.get_option_chain(
+                symbol=symbol,
+                expiry=expiry,
+                market=market,
+                return_greek_value=True
+            )
 
     def get_stock_quote(self, symbols):
-        if not self.quote_client:
-            raise Exception("Quote client not initialized")
-        return self.quote_client.get_stock_briefs(symbols)
-    
+        """Stock briefs for symbols as a DataFrame (one row per symbol found, in request order)"""
+        quotes = self.get_stock_quotes(symbols)
+        return pd.DataFrame([quotes[symbol] for symbol in dict.fromkeys(symbols) if symbol in quotes])
+
+    def get_stock_quotes(self, symbols) -> Dict[str, dict]:
+        """
+        Stock briefs keyed by symbol (symbols without a quote are left out).
+        Symbols without a fresh cached quote are fetched in batched requests;
+        raises only when every batch failed.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        quotes = {}
+        missing = []
+        for symbol in symbols:
+            row = quote_cache.get(symbol)
+            if row is None:
+                missing.append(symbol)
+            else:
+                quotes[symbol] = row
+        if not missing:
+            return quotes
+
+        chunks = _chunks(missing, QUOTE_BATCH_SIZE)
+        errors = []
+
+        def fetch(chunk):
+            try:
+                return self._fetch_quotes(chunk)
+            except Exception as e:
+                print(f"⚠️ Could not fetch quotes for {len(chunk)} symbols: {str(e)}")
+                errors.append(e)
+                return {}
+
+        for fetched in self._map_chunks(fetch, chunks):
+            quotes.update(fetched)
+        if len(errors) == len(chunks):
+            raise errors[0]
+        return quotes
+
+    def _fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        with self._client('get_stock_briefs') as client:
+            briefs = client.get_stock_briefs(symbols)
+        if briefs is None or briefs.empty:
+            return {}
+        requested = {_normalize_symbol(symbol): symbol for symbol in symbols}
+        keyed = {}
+        for row in briefs.to_dict('records'):
+            symbol = requested.get(_normalize_symbol(row.get('symbol')))
+            if symbol is None:
+                continue
+            keyed[symbol] = row
+            quote_cache.set(symbol, row)
+            # 保证金比例随行情一同返回，批量取行情时顺带写入按日缓存
+            margin_rate = _margin_rate_from_quote(row)
+            if margin_rate is not None:
+                margin_rate_cache.set(symbol, margin_rate)
+        return keyed
+
     def get_margin_rate(self, symbol: str, market=Market.US) -> Optional[float]:
-        if not self.quote_client:
+        """Margin rate from the (cached) stock quote; cached per symbol for a day"""
+        if not self.ensure_initialized():
             return None
-        
+
+        def load():
+            quote = self.get_stock_quote([symbol])
+            if quote.empty:
+                raise LookupError(f"no quote for {symbol}")
+            return _margin_rate_from_quote(quote.iloc[0])
+
         try:
-            stock_data = self.quote_client.get_stock_briefs([symbol])
-            
-            if stock_data is not None and not stock_data.empty:
-                if 'margin_rate' in stock_data.columns:
-                    margin_rate = stock_data['margin_rate'].iloc[0]
-                    if pd.notna(margin_rate) and margin_rate > 0:
-                        return float(margin_rate)
-                elif 'margin_requirement' in stock_data.columns:
-                    margin_req = stock_data['margin_requirement'].iloc[0]
-                    if pd.notna(margin_req):
-                        if margin_req > 1:
-                            return float(margin_req) / 100.0
-                        return float(margin_req)
-            return None
-            
+            return margin_rate_cache.get_or_load(symbol, load)
         except Exception as e:
             print(f"⚠️ Could not fetch margin rate for {symbol}: {str(e)}")
             return None
     
     def get_stock_history(self, symbol: str, days: int = 60, market: Market = Market.US) -> Optional[List[float]]:
-        if not self.quote_client:
+        return self.get_stock_histories([symbol], days=days, market=market).get(symbol)
+
+    def get_stock_histories(self, symbols, days: int = 60,
+                            market: Market = Market.US) -> Dict[str, Optional[List[float]]]:
+        """
+        Daily closes (oldest first) keyed by symbol, fetched in batched requests.
+        None for symbols with fewer than 30 valid closes or whose batch failed.
+        """
+        if not self.ensure_initialized():
             raise Exception("Quote client not initialized")
-        
-        try:
-            days = max(30, days)
-            end_time = int(datetime.now().timestamp() * 1000)
-            limit = min(days, 200)
-            
-            bars = self.quote_client.get_bars(
-                symbols=[symbol],
-                period=BarPeriod.DAY,
-                end_time=end_time,
-                limit=limit,
-                market=market
-            )
-            
-            if bars is None or bars.empty:
-                return None
-            
-            if 'close' in bars.columns and 'time' in bars.columns:
-                bars_sorted = bars.sort_values('time')
-                prices = bars_sorted['close'].tolist()
-                prices = [p for p in prices if pd.notna(p) and p > 0]
-                
-                if len(prices) < 30:
-                    return None
-                
-                return prices
-            else:
-                return None
-        except Exception as e:
-            print(f"❌ Error fetching price history for {symbol}: {str(e)}")
-            return None
 
-# Global client manager instance
+        symbols = list(dict.fromkeys(symbols))
+        days = max(30, days)
+        limit = min(days, 200)
+        end_time = int(datetime.now().timestamp() * 1000)
+
+        def fetch(chunk):
+            try:
+                # 行情代码本身区分市场，get_bars 不接受 market 参数
+                with self._client('get_bars') as client:
+                    bars = client.get_bars(
+                        symbols=chunk,
+                        period=BarPeriod.DAY,
+                        end_time=end_time,
+                        limit=limit
+                    )
+            except Exception as e:
+                print(f"❌ Error fetching price history for {', '.join(chunk)}: {str(e)}")
+                return {}
+            if bars is None or bars.empty or 'close' not in bars.columns or 'time' not in bars.columns:
+                return {}
+            if 'symbol' not in bars.columns:
+                bars = bars.assign(symbol=chunk[0]) if len(chunk) == 1 else bars.iloc[0:0]
+            requested = {_normalize_symbol(symbol): symbol for symbol in chunk}
+            histories = {}
+            for returned, group in bars.sort_values('time').groupby('symbol', sort=False):
+                symbol = requested.get(_normalize_symbol(returned))
+                if symbol is None:
+                    continue
+                prices = [p for p in group['close'].tolist() if pd.notna(p) and p > 0]
+                histories[symbol] = prices if len(prices) >= 30 else None
+            return histories
+
+        histories = dict.fromkeys(symbols)
+        for fetched in self._map_chunks(fetch, _chunks(symbols, BARS_BATCH_SIZE)):
+            histories.update(fetched)
+        return histories
+
+# Global client manager instance (shared by all requests and workers)
 client_manager = TigerClientManager()
 
 def get_client_manager():
     return client_manager
+
+
+def clear_caches():
+    quote_cache.clear()
+    margin_rate_cache.clear()
@@ -0,0 +1,472 @@
+"""
+Vectorized (columnar) Risk & Target Price Scoring
+
+analysis_engine.analyze_risk_and_position / calculate_target_price 的列式版本：
+输入一个 DataFrame（每行一只股票，列名与 get_market_data 返回的字段一致），
+用 NumPy 布尔掩码一次性计算所有行的风险评分、风险标签、建议仓位和目标价格。
+
+逻辑与标量函数逐条对应（见 tests/test_vectorized_scoring.py 的交叉校验），
+适用于全市场/候选池打分；单只股票的完整分析仍使用标量函数。
+
+必需列: price, pe, growth, margin, ma50, ma200, week52_high, week52_low
+可选列: forward_pe, peg, market_cap, pe_percentile, is_liquid, liquidity_warning,
+        earnings_date (最近一个财报日 'YYYY-MM-DD'), days_until_lockup, lockup_expiry_date,
+        sector, industry, name, symbol
+"""
+
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .analysis_engine import (
+    get_dynamic_peg_threshold, GROWTH_DISCOUNT_FACTOR, ETF_KEYWORDS, FUND_KEYWORDS, INDUSTRY_KEYWORDS,
+    BASE_PE, GROWTH_STAGE_PE_FACTOR, STYLE_PE_FACTOR, METHOD_WEIGHTS, DEFAULT_METHOD_WEIGHTS,
+    STOCK_BASE_CAPS, FUND_BASE_CAPS,
+)
+
+NUMERIC_DEFAULTS = {
+    'price': 0.0, 'pe': 0.0, 'forward_pe': 0.0, 'peg': 0.0, 'growth': 0.0, 'margin': 0.0,
+    'ma50': 0.0, 'ma200': 0.0, 'week52_high': 0.0, 'week52_low': 0.0, 'market_cap': 0.0,
+}
+TEXT_COLUMNS = ['sector', 'industry', 'name', 'symbol']
+
+
+def _round(values, ndigits: int) -> np.ndarray:
+    """
+    与 Python round 结果一致的舍入：np.round 先乘 10^n 再取整，在 x.x5 这类边界上
+    会与标量函数相差一个最小单位，因此只对接近 .5 的元素改用 Python round
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def _contains_any(text: pd.Series, keywords: Iterable[str]) -> np.ndarray:
+    pattern = '|'.join(re.escape(k) for k in keywords)
+    return text.str.contains(pattern, regex=True).to_numpy()
+
+
+def _map_unique(text: pd.Series, fn) -> np.ndarray:
+    """名称/行业等文本重复度高：只对唯一值计算，再按编码展开"""
+    codes, uniques = pd.factorize(text)
+    return np.asarray(fn(pd.Series(uniques, dtype=object)))[codes]
+
+
+def _symbol_candidates(symbol: pd.Series, keyword_lists: List[List[str]]) -> np.ndarray:
+    """
+    代码本身可能参与关键词匹配的行：代码包含关键词，或包含多词关键词空格后的部分
+    （关键词跨越 prefix 与 symbol 之间的分隔空格）。代码各不相同，只扫描一遍
+    """
+    parts = [kw for keywords in keyword_lists for kw in keywords]
+    parts += [kw[i + 1:] for kw in parts for i, ch in enumerate(kw) if ch == ' ']
+    return np.flatnonzero(_contains_any(symbol, parts))
+
+
+def _keyword_hits(prefix: pd.Series, symbol: pd.Series, keywords: List[str],
+                  candidates: np.ndarray) -> np.ndarray:
+    """
+    等价于在 prefix + ' ' + symbol 上做关键词匹配
+    prefix 按唯一值匹配；candidates 中的行在拼接后的字符串上复核
+    """
+    hits = _map_unique(prefix, lambda u: _contains_any(u, keywords))
+    if len(candidates):
+        combined = prefix.iloc[candidates] + ' ' + symbol.iloc[candidates]
+        hits[candidates] |= _contains_any(combined, keywords)
+    return hits
+
+
+def records_to_frame(records: List[dict]) -> pd.DataFrame:
+    """把 get_market_data 风格的数据字典列表转换为列式输入"""
+    rows = []
+    for data in records:
+        lockup = data.get('lockup_data') or {}
+        earnings_dates = data.get('earnings_dates') or []
+        rows.append({
+            **{col: data.get(col) for col in list(NUMERIC_DEFAULTS) + TEXT_COLUMNS},
+            'pe_percentile': data.get('pe_percentile'),
+            'is_liquid': data.get('is_liquid', True),
+            'liquidity_warning': data.get('liquidity_warning'),
+            'earnings_date': earnings_dates[0] if earnings_dates else None,
+            'days_until_lockup': lockup.get('days_until_lockup'),
+            'lockup_expiry_date': lockup.get('lockup_expiry_date'),
+        })
+    return pd.DataFrame(rows)
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    if df.attrs.get('scoring_prepared'):
+        return df
+    df = df.copy()
+    for col, default in NUMERIC_DEFAULTS.items():
+        if col not in df:
+            df[col] = default
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(default).astype(float)
+    for col in TEXT_COLUMNS:
+        if col not in df:
+            df[col] = ''
+        df[col] = df[col].fillna('').astype(str)
+    for col in ('pe_percentile', 'days_until_lockup'):
+        df[col] = pd.to_numeric(df[col], errors='coerce') if col in df else np.nan
+    df['is_liquid'] = df['is_liquid'].fillna(True).astype(bool) if 'is_liquid' in df else True
+    df.attrs['scoring_prepared'] = True
+    return df
+
+
+def classify_universe(df: pd.DataFrame) -> pd.DataFrame:
+    """is_etf_or_fund + classify_company 的列式版本"""
+    df = _prepare(df)
+
+    sector = df['sector'].str.lower()
+    industry = df['industry'].str.lower()
+    name = df['name'].str.lower()
+    symbol = df['symbol'].str.lower()
+    # 与 is_etf_or_fund 一致，在 "name sector industry symbol" 上匹配关键词
+    prefix = name + ' ' + sector + ' ' + industry
+    candidates = _symbol_candidates(symbol, [ETF_KEYWORDS, FUND_KEYWORDS])
+
+    is_etf = _keyword_hits(prefix, symbol, ETF_KEYWORDS, candidates)
+    fund_kw = _keyword_hits(prefix, symbol, FUND_KEYWORDS, candidates)
+    is_fund_kw = ~is_etf & fund_kw
+    # FUND_KEYWORDS 含 'reit'，命中基金关键词的行再判断是否为 REIT
+    is_reit = is_fund_kw & _keyword_hits(prefix, symbol, ['reit'], candidates)
+    rest = ~is_etf & ~is_fund_kw
+    etf_suffix = rest & symbol.str.endswith(('.x', '.xshg', '.xsz')).to_numpy()
+    rest &= ~etf_suffix
+    etf_by_name = (rest
+                   & sector.isin(['unknown', '']).to_numpy()
+                   & industry.isin(['unknown', '']).to_numpy()
+                   & _map_unique(name, lambda u: _contains_any(u, ['ultra', 'pro', 'leveraged', 'inverse'])))
+
+    is_fund = is_etf | is_fund_kw | etf_suffix | etf_by_name
+    fund_type = np.select(
+        [is_etf | etf_suffix | etf_by_name, is_reit, is_fund_kw],
+        ['ETF', 'REIT', 'Fund'],
+        default='Stock'
+    )
+
+    industry_category = _map_unique(sector + ' ' + industry, lambda u: np.select(
+        [_contains_any(u, keywords) for _, keywords in INDUSTRY_KEYWORDS],
+        [category for category, _ in INDUSTRY_KEYWORDS],
+        default='general'
+    ))
+
+    growth = df['growth'].to_numpy()
+    growth_stage = np.select(
+        [growth > 0.2, growth > 0.1, growth > 0],
+        ['high_growth', 'growth', 'stable'],
+        default='declining'
+    )
+
+    market_cap = df['market_cap'].to_numpy()
+    market_cap_category = np.select(
+        [market_cap > 100e9, market_cap > 10e9, market_cap > 0],
+        ['large_cap', 'mid_cap', 'small_cap'],
+        default='mid_cap'
+    )
+
+    return pd.DataFrame({
+        'is_etf_or_fund': is_fund,
+        'fund_type': fund_type,
+        'industry_category': np.where(is_fund, 'fund', industry_category),
+        'growth_stage': np.where(is_fund, 'fund', growth_stage),
+        'market_cap_category': np.where(is_fund, 'fund', market_cap_category),
+    }, index=df.index)
+
+
+class _Flags:
+    """按掩码收集风险标签；只有命中的行才会生成字符串"""
+
+    def __init__(self, n: int):
+        self.rows = [[] for _ in range(n)]
+
+    def add(self, mask: np.ndarray, message):
+        for i in np.flatnonzero(mask):
+            self.rows[i].append(message(i) if callable(message) else message)
+
+
+def _risk_level(score: np.ndarray, thresholds) -> np.ndarray:
+    high, medium, low = thresholds
+    return np.select(
+        [score >= high, score >= medium, score >= low],
+        ['极高 (建议观望)', '高', '中'],
+        default='低'
+    )
+
+
+def analyze_risk_and_position_batch(df: pd.DataFrame, style: str, classification: pd.DataFrame = None,
+                                    today=None, with_flags: bool = True) -> pd.DataFrame:
+    """
+    analyze_risk_and_position 的列式版本
+
+    返回列: score, level, suggested_position, price_adjustment, is_etf_or_fund, fund_type,
+            liquidity_rejected, flags（with_flags=False 时不生成）
+    """
+    df = _prepare(df)
+    if classification is None:
+        classification = classify_universe(df)
+    n = len(df)
+    today = today or datetime.now().date()
+
+    price = df['price'].to_numpy()
+    pe = df['pe'].to_numpy()
+    growth = df['growth'].to_numpy()
+    margin = df['margin'].to_numpy()
+    ma50 = df['ma50'].to_numpy()
+    ma200 = df['ma200'].to_numpy()
+    high = df['week52_high'].to_numpy()
+    low = df['week52_low'].to_numpy()
+    market_cap = df['market_cap'].to_numpy()
+    pe_pct = df['pe_percentile'].to_numpy(dtype=float)
+    lockup_days = df['days_until_lockup'].to_numpy(dtype=float)
+
+    is_liquid = df['is_liquid'].to_numpy()
+    is_fund = classification['is_etf_or_fund'].to_numpy() & is_liquid
+    is_stock = ~classification['is_etf_or_fund'].to_numpy() & is_liquid
+    fund_type = classification['fund_type'].to_numpy()
+
+    flags = _Flags(n) if with_flags else None
+    score = np.zeros(n)
+
+    def add(mask, points, message=None):
+        nonlocal score
+        score = score + np.where(mask, points, 0.0)
+        if flags is not None and message is not None:
+            flags.add(mask, message)
+
+    # --- 流动性硬性门槛 ---
+    if flags is not None:
+        warnings = df['liquidity_warning'] if 'liquidity_warning' in df else pd.Series([None] * n)
+        flags.add(~is_liquid, lambda i: warnings.iloc[i] or '流动性不足，日均成交额低于最低要求')
+
+    # --- ETF/基金 ---
+    has_range = (high != 0) & (low != 0) & (high > low)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fund_position = np.where(has_range, (price - low) / np.where(has_range, high - low, 1.0), 0.5)
+    add(is_fund & (fund_position > 0.8), 2,
+        lambda i: f"{fund_type[i]}: 价格位于52周高位（{fund_position[i]*100:.1f}%），追高风险")
+    add(is_fund & (fund_position > 0.6) & ~(fund_position > 0.8), 1,
+        lambda i: f"{fund_type[i]}: 价格偏高（{fund_position[i]*100:.1f}%）")
+    add(is_fund & (price < ma200), 1.5, lambda i: f"{fund_type[i]}: 价格跌破200日均线，长期趋势转弱")
+    add(is_fund & ~(price < ma200) & (price < ma50), 0.5)
+
+    # --- 个股: G=B+M 模型 ---
+    has_pct = ~np.isnan(pe_pct)
+    pe_pos = is_stock & (pe > 0)
+    add(pe_pos & has_pct & (pe_pct > 90), 3,
+        lambda i: f"M: 估值过热 (PE分位点{pe_pct[i]:.1f}%，处于历史高位)")
+    add(pe_pos & has_pct & (pe_pct > 80) & ~(pe_pct > 90), 2,
+        lambda i: f"M: 估值偏高 (PE分位点{pe_pct[i]:.1f}%)")
+    add(pe_pos & ~has_pct & (pe > 60) & (growth < 0.3), 3, "M: 估值过高且增长不匹配 (PE>60)")
+    add(pe_pos & ~has_pct & (pe > 40) & ~((pe > 60) & (growth < 0.3)), 1)
+
+    pe_zero = is_stock & (pe == 0)
+    loss_growing = (growth > 0.15) & (market_cap > 1e9)
+    loss_weak = ~loss_growing & ((growth < 0) | ((market_cap > 0) & (market_cap < 1e8)))
+    add(pe_zero & loss_growing, 1, "M: PE为0（亏损），但营收增长良好，可能处于成长期")
+    add(pe_zero & loss_weak, 2, "M: PE为0（亏损），且基本面较弱")
+    add(pe_zero & ~loss_growing & ~loss_weak, 1.5, "M: PE为0（亏损），需关注盈利转正时间")
+
+    add(is_stock & (growth < 0), 3, "B: 营收负增长 (衰退迹象)")
+    add(is_stock & (margin < 0.05), 1, "B: 利润率极低 (<5%)")
+
+    # 财报日风险（最近一个财报日）
+    if 'earnings_date' in df:
+        earnings = pd.to_datetime(df['earnings_date'], format='%Y-%m-%d', errors='coerce')
+        earnings_days = ((earnings - pd.Timestamp(today)).dt.days).to_numpy(dtype=float)
+        earnings_str = df['earnings_date'].to_numpy()
+        add(is_stock & (earnings_days >= 0) & (earnings_days < 7), 1,
+            lambda i: f"财报日风险: 财报将在{earnings_str[i]}发布（{int(earnings_days[i])}天后），波动率风险极高，建议财报前3天避险")
+        add(is_stock & (earnings_days >= 7) & (earnings_days <= 14), 0.5,
+            lambda i: f"财报日风险: 财报将在{earnings_str[i]}发布（{int(earnings_days[i])}天后），建议提前规划")
+
+    # 解禁期风险
+    lockup_dates = df['lockup_expiry_date'].to_numpy() if 'lockup_expiry_date' in df else np.full(n, None)
+    add(is_stock & (lockup_days >= 0) & (lockup_days < 7), 2.5,
+        lambda i: f"解禁期风险: 解禁将在{lockup_dates[i] or '未知日期'}到来（{int(lockup_days[i])}天后），抛压风险极高，可能面临巨大抛压")
+    add(is_stock & (lockup_days >= 7) & (lockup_days <= 14), 1.5,
+        lambda i: f"解禁期风险: 解禁将在{lockup_dates[i] or '未知日期'}到来（{int(lockup_days[i])}天后），可能面临抛压")
+
+    add(is_stock & (price < ma200), 2, "技术: 价格跌破200日均线 (熊市趋势)")
+
+    # 风格红线
+    if style == 'value':
+        add(is_stock & (pe > 25), 2, "风格不符: 价值股 PE > 25")
+        add(is_stock & (pe == 0), 1.5, "风格不符: 价值风格不适合亏损公司（PE=0）")
+    if style == 'growth':
+        add(is_stock & (growth < 0.15), 2, "风格不符: 成长股增速 < 15%")
+
+    # --- 仓位 ---
+    stock_adjustment = np.select([score >= 6, score >= 4, score >= 2], [0.0, 0.4, 0.7], default=1.0)
+    fund_adjustment = np.select([score >= 4, score >= 3, score >= 2, score >= 1], [0.0, 0.5, 0.7, 0.85], default=1.0)
+    position = np.where(
+        is_fund,
+        FUND_BASE_CAPS.get(style, 15) * fund_adjustment,
+        STOCK_BASE_CAPS.get(style, 10) * stock_adjustment
+    )
+
+    result = pd.DataFrame({
+        'score': np.where(is_liquid, score, 10),
+        'level': np.where(
+            is_liquid,
+            np.where(is_fund, _risk_level(score, (4, 3, 2)), _risk_level(score, (6, 4, 2))),
+            '极高 (流动性不足，禁止交易)'
+        ),
+        'suggested_position': np.where(is_liquid, _round(position, 1), 0.0),
+        'price_adjustment': 1.0,
+        'is_etf_or_fund': classification['is_etf_or_fund'].to_numpy(),
+        'fund_type': np.where(classification['is_etf_or_fund'].to_numpy(), fund_type, None),
+        'liquidity_rejected': ~is_liquid,
+    }, index=df.index)
+    if flags is not None:
+        result['flags'] = flags.rows
+    return result
+
+
+def calculate_target_price_batch(df: pd.DataFrame, risk: pd.DataFrame, style: str,
+                                 macro_data: Optional[dict] = None,
+                                 classification: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    calculate_target_price 的列式版本
+
+    返回列: target_price, reasonable_pe, original_target_price（未触发下限修正时为 NaN）
+    """
+    df = _prepare(df)
+    if classification is None:
+        classification = classify_universe(df)
+
+    price = df['price'].to_numpy()
+    pe = df['pe'].to_numpy()
+    peg = df['peg'].to_numpy()
+    growth = df['growth'].to_numpy()
+    margin = df['margin'].to_numpy()
+    is_fund = classification['is_etf_or_fund'].to_numpy()
+    category = classification['industry_category'].to_numpy()
+    stage = classification['growth_stage'].to_numpy()
+
+    # 合理PE（get_reasonable_pe_by_category）
+    base_pe = pd.Series(category).map(BASE_PE).fillna(18).to_numpy(dtype=float)
+    stage_factor = pd.Series(stage).map(GROWTH_STAGE_PE_FACTOR).fillna(1.0).to_numpy(dtype=float)
+    reasonable_pe = _round(base_pe * stage_factor * STYLE_PE_FACTOR.get(style, 1.0), 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 方法1: PE估值
+        has_pe = pe > 0
+        pe_ratio = reasonable_pe / np.where(has_pe, pe, 1.0)
+        pe_price = np.select(
+            [pe > reasonable_pe * 1.5, pe < reasonable_pe * 0.7],
+            [price * pe_ratio, price * pe_ratio * 0.9],
+            default=price * pe_ratio * 0.95
+        )
+
+        # 方法2: PEG估值
+        peg_threshold = get_dynamic_peg_threshold(macro_data)
+        reasonable_peg = np.select(
+            [stage == 'high_growth', stage == 'declining'],
+            [peg_threshold * 1.2, peg_threshold * 0.8],
+            default=peg_threshold
+        )
+        has_peg = (peg > 0) & (growth > 0) & (peg < reasonable_peg)
+        peg_price = price * np.minimum(reasonable_peg / np.where(has_peg, peg, 1.0), 1.5)
+
+        # 方法3: 增长率折现
+        has_growth = growth > 0
+        growth_multiplier = np.select(
+            [stage == 'high_growth', stage == 'growth', stage == 'stable'],
+            [1 + growth * GROWTH_DISCOUNT_FACTOR, 1 + growth * (GROWTH_DISCOUNT_FACTOR * 0.67), 1 + growth * 0.2],
+            default=1.0
+        )
+        growth_multiplier = np.where(margin > 0.15, growth_multiplier * 1.1, growth_multiplier)
+        growth_price = price * growth_multiplier
+
+        # 方法4: 技术面（缺失值回退为当前价格）
+        high = np.where(df['week52_high'].to_numpy() != 0, df['week52_high'].to_numpy(), price)
+        low = np.where(df['week52_low'].to_numpy() != 0, df['week52_low'].to_numpy(), price)
+        ma50 = np.where(df['ma50'].to_numpy() != 0, df['ma50'].to_numpy(), price)
+        ma200 = np.where(df['ma200'].to_numpy() != 0, df['ma200'].to_numpy(), price)
+        has_range = (high != 0) & (low != 0) & (high > low)
+        position = np.where(has_range, np.clip((price - low) / np.where(has_range, high - low, 1.0), 0, 1), 0.5)
+        bullish = (price > ma50) & (ma50 > ma200)
+        tech_price = np.select(
+            [position < 0.3, position < 0.7],
+            [np.where(bullish, high, (high + low) / 2), np.where(bullish, high, price * 1.15)],
+            default=price * 1.1
+        )
+
+    # 加权平均（与标量版本相同的累加顺序）
+    codes, categories = pd.factorize(category)
+    weights = np.array([METHOD_WEIGHTS.get(c, DEFAULT_METHOD_WEIGHTS) for c in categories], dtype=float).reshape(-1, 4)[codes]
+    weighted_sum = np.zeros(len(df))
+    total_weight = np.zeros(len(df))
+    for k, (present, method_price) in enumerate([
+        (has_pe, pe_price), (has_peg, peg_price), (has_growth, growth_price), (np.ones(len(df), bool), tech_price)
+    ]):
+        weighted_sum = weighted_sum + np.where(present, method_price * weights[:, k], 0.0)
+        total_weight = total_weight + np.where(present, weights[:, k], 0.0)
+    avg_price = weighted_sum / total_weight
+
+    risk_score = risk['score'].to_numpy(dtype=float)
+    risk_adjustment = np.select([risk_score >= 6, risk_score >= 4, risk_score >= 2], [0.85, 0.95, 1.0], default=1.05)
+    style_adjustment = {'value': 0.95, 'growth': 1.05, 'momentum': 1.08}.get(style, 1.0)
+    target = avg_price * risk_adjustment * style_adjustment
+    target = np.maximum(price * 0.8, np.minimum(target, price * 2.5))
+    overvalued = target < price * 0.95
+    original_target = np.where(overvalued, target, np.nan)
+    target = np.where(overvalued, price * 0.95, target)
+
+    # ETF/基金：技术面估值（52周区间与均线，缺失值不回退）
+    raw_high = df['week52_high'].to_numpy()
+    raw_low = df['week52_low'].to_numpy()
+    fund_bullish = (price > df['ma50'].to_numpy()) & (df['ma50'].to_numpy() > df['ma200'].to_numpy())
+    fund_target = np.where(fund_bullish, np.minimum(raw_high, price * 1.1), (raw_high + raw_low) / 2)
+
+    zero_position = risk['suggested_position'].to_numpy(dtype=float) == 0
+    target = np.select(
+        [price <= 0, zero_position, is_fund],
+        [0.0, price, fund_target],
+        default=target
+    )
+    valued = (price > 0) & ~zero_position & ~is_fund
+
+    return pd.DataFrame({
+        'target_price': _round(target, 2),
+        'reasonable_pe': np.where(valued, reasonable_pe, np.nan),
+        'original_target_price': np.where(valued, original_target, np.nan),
+    }, index=df.index)
+
+
+def score_universe(df: pd.DataFrame, style: str, macro_data: Optional[dict] = None,
+                   today=None, with_flags: bool = False) -> pd.DataFrame:
+    """
+    全量打分：风险评分 + 目标价格 + 基于上涨空间的仓位调整
+    （等价于对每行依次调用 analyze_risk_and_position、calculate_target_price、apply_target_price_adjustment）
+    """
+    df = _prepare(df)
+    classification = classify_universe(df)
+    risk = analyze_risk_and_position_batch(df, style, classification, today=today, with_flags=with_flags)
+    target = calculate_target_price_batch(df, risk, style, macro_data, classification)
+
+    price = df['price'].to_numpy()
+    target_price = target['target_price'].to_numpy()
+    valid = (price > 0) & (target_price > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upside = np.where(valid, (target_price - price) / np.where(valid, price, 1.0), np.nan)
+    price_adjustment = np.select(
+        [upside < 0, upside < 0.05, upside < 0.10, upside < 0.20, upside < 0.30],
+        [0.0, 0.3, 0.6, 0.9, 1.0],
+        default=1.1
+    )
+    price_adjustment = np.where(valid, price_adjustment, risk['price_adjustment'].to_numpy())
+    base_position = risk['suggested_position'].to_numpy()
+
+    result = pd.concat([classification.drop(columns=['is_etf_or_fund', 'fund_type']), risk, target], axis=1)
+    result['price_adjustment'] = price_adjustment
+    result['suggested_position'] = np.where(valid, _round(base_position * price_adjustment, 1), base_position)
+    result['upside_potential_pct'] = _round(upside * 100, 2)
+    return result
@@ -1,17 +1,22 @@
 import os
 import logging
+import threading
 import time
+from types import SimpleNamespace
 from functools import wraps
+
+import jwt
 from flask import request, jsonify, g
 from supabase import create_client, Client
 from ..config import Config
+from .cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 # Token cache to avoid repeated Supabase calls
-# Format: {token: {'user_data': user_obj, 'expires_at': timestamp}}
-token_cache = {}
-CACHE_DURATION = 300  # 5 minutes in seconds
+# Bounded LRU with per-token TTL, shared by require_auth and check_quota
+CACHE_DURATION = Config.AUTH_TOKEN_CACHE_TTL  # seconds
+token_cache = TTLCache(maxsize=Config.AUTH_TOKEN_CACHE_SIZE, ttl=CACHE_DURATION, name='auth_token')
 
 # Initialize Supabase Client
 supabase: Client = None
@@ -24,144 +29,302 @@ if Config.SUPABASE_URL and Config.SUPABASE_KEY:
 else:
     logger.warning("Supabase credentials missing in config")
 
-def clean_expired_tokens():
-    """Remove expired tokens from cache"""
-    current_time = time.time()
-    expired_tokens = [token for token, data in token_cache.items()
-                     if data['expires_at'] < current_time]
+# JWKS client for asymmetric Supabase signing keys (keys are cached by PyJWKClient)
+_jwks_client = None
+if Config.AUTH_LOCAL_JWT_VERIFY and Config.SUPABASE_URL:
+    try:
+        _jwks_client = jwt.PyJWKClient(
+            f"{Config.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json",
+            cache_keys=True,
+            lifespan=3600
+        )
+    except Exception as e:
+        logger.warning(f"JWKS client initialization failed: {e}")
 
-    for token in expired_tokens:
-        del token_cache[token]
+SUPABASE_JWT_AUDIENCE = 'authenticated'
 
-    if expired_tokens:
-        logger.debug(f"Cleaned {len(expired_tokens)} expired tokens from cache")
+# Users known to exist in the local `user` table (skips the per-request lookup)
+_known_users = TTLCache(maxsize=100000, ttl=24 * 3600, name='known_users')
 
-def get_cached_user(token):
-    """Get user data from cache if valid"""
-    if token not in token_cache:
-        return None
+# Write-behind buffer for last_login: {user_id: datetime}
+_pending_last_login = {}
+_pending_last_login_lock = threading.Lock()
 
-    cached_data = token_cache[token]
 
-    # Check if token is expired
-    if time.time() > cached_data['expires_at']:
-        del token_cache[token]
-        return None
+class TokenExpiredError(Exception):
+    """Token signature is valid but the token has expired"""
 
-    return cached_data['user_data']
 
-def cache_user_token(token, user_data):
-    """Cache user data for a token"""
-    # Clean expired tokens periodically (every 50th call)
-    if len(token_cache) % 50 == 0:
-        clean_expired_tokens()
+def clean_expired_tokens():
+    """Remove expired tokens from cache"""
+    removed = token_cache.purge_expired()
+    if removed:
+        logger.debug(f"Cleaned {removed} expired tokens from cache")
 
-    expires_at = time.time() + CACHE_DURATION
-    token_cache[token] = {
-        'user_data': user_data,
-        'expires_at': expires_at
-    }
+def get_cached_user(token):
+    """Get user data from cache if valid"""
+    return token_cache.get(token)
 
+def cache_user_token(token, user_data, ttl=None):
+    """Cache user data for a token"""
+    token_cache.set(token, user_data, ttl=ttl)
     logger.debug(f"Cached token for user {user_data.id if hasattr(user_data, 'id') else 'unknown'}")
 
 def invalidate_token_cache(token=None):
     """Invalidate cache for a specific token or all tokens"""
     if token:
-        if token in token_cache:
-            del token_cache[token]
-            logger.debug("Invalidated specific token from cache")
+        token_cache.pop(token)
+        logger.debug("Invalidated specific token from cache")
     else:
         token_cache.clear()
         logger.debug("Cleared entire token cache")
 
-def require_auth(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        if not supabase:
-             return jsonify({'error': 'Supabase client not initialized'}), 500
+def verify_token_locally(token):
+    """
+    Verify a Supabase access token without a network round-trip.
 
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            return jsonify({'error': 'Missing Authorization header'}), 401
+    Uses SUPABASE_JWT_SECRET for HS256 tokens and the project JWKS for
+    asymmetric (RS256/ES256) tokens.
 
+    Returns:
+        (user, expires_at) on success, or (None, None) if the token cannot be
+        verified locally (caller should fall back to supabase.auth.get_user)
+
+    Raises:
+        TokenExpiredError: signature is valid but the token has expired
+    """
+    if not Config.AUTH_LOCAL_JWT_VERIFY:
+        return None, None
+
+    try:
+        alg = jwt.get_unverified_header(token).get('alg')
+        if alg == 'HS256':
+            if not Config.SUPABASE_JWT_SECRET:
+                return None, None
+            key = Config.SUPABASE_JWT_SECRET
+        elif alg in ('RS256', 'ES256') and _jwks_client:
+            key = _jwks_client.get_signing_key_from_jwt(token).key
+        else:
+            return None, None
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=SUPABASE_JWT_AUDIENCE,
+            options={'require': ['exp', 'sub']}
+        )
+    except jwt.ExpiredSignatureError:
+        raise TokenExpiredError()
+    except Exception as e:
+        # Bad signature, unknown kid, JWKS unavailable... let Supabase decide
+        logger.debug(f"Local JWT verification unavailable, falling back to Supabase: {e}")
+        return None, None
+
+    user = SimpleNamespace(id=claims['sub'], email=claims.get('email'))
+    return user, claims['exp']
+
+def _fetch_user_from_supabase(token):
+    """
+    Verify token via supabase.auth.get_user with retry.
+
+    Returns:
+        (user, None) on success, (None, error_response) on failure
+    """
+    max_retries = 2
+    retry_delay = 0.5
+    user_response = None
+
+    for attempt in range(max_retries + 1):
         try:
-            # Format: "Bearer <token>"
-            if len(auth_header.split(' ')) < 2:
-                return jsonify({'error': 'Invalid Authorization header format'}), 401
-
-            token = auth_header.split(' ')[1]
-
-            # Try to get user from cache first
-            cached_user = get_cached_user(token)
-            if cached_user:
-                # Use cached user data
-                user = cached_user
-                logger.debug(f"Using cached user data for {user.id if hasattr(user, 'id') else 'unknown'}")
+            user_response = supabase.auth.get_user(token)
+            break  # Success, exit retry loop
+        except Exception as e:
+            if attempt < max_retries:
+                logger.warning(f"Supabase auth attempt {attempt + 1} failed, retrying: {e}")
+                time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
             else:
-                # Cache miss - verify token using Supabase Auth
-                logger.debug("Cache miss - fetching user from Supabase")
-                
-                # Add timeout and retry for Supabase auth calls
-                import time
-                max_retries = 2
-                retry_delay = 0.5
-                user_response = None
-                
-                for attempt in range(max_retries + 1):
-                    try:
-                        user_response = supabase.auth.get_user(token)
-                        break  # Success, exit retry loop
-                    except Exception as e:
-                        if attempt < max_retries:
-                            logger.warning(f"Supabase auth attempt {attempt + 1} failed, retrying: {e}")
-                            time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-                        else:
-                            logger.error(f"Supabase auth failed after {max_retries + 1} attempts: {e}")
-                            # Check if it's a network/SSL error
-                            error_str = str(e).lower()
-                            if 'ssl' in error_str or 'timeout' in error_str or 'connection' in error_str:
-                                return jsonify({
-                                    'error': 'Authentication service temporarily unavailable. Please try again.',
-                                    'details': 'Network connection error during authentication'
-                                }), 503  # Service Unavailable
-                            else:
-                                return jsonify({'error': 'Invalid token'}), 401
-
-                if not user_response or not user_response.user:
-                    return jsonify({'error': 'Invalid token'}), 401
-
-                user = user_response.user
-                # Cache the user data
-                cache_user_token(token, user)
-
-            # Store user info in flask global (g)
-            g.user_id = user.id
-            if hasattr(user, 'email'):
-                g.user_email = user.email
+                logger.error(f"Supabase auth failed after {max_retries + 1} attempts: {e}")
+                # Check if it's a network/SSL error
+                error_str = str(e).lower()
+                if 'ssl' in error_str or 'timeout' in error_str or 'connection' in error_str:
+                    return None, (jsonify({
+                        'error': 'Authentication service temporarily unavailable. Please try again.',
+                        'details': 'Network connection error during authentication'
+                    }), 503)  # Service Unavailable
+                return None, (jsonify({'error': 'Invalid token'}), 401)
 
-            # Ensure user exists in local database
-            from ..models import db, User
-            existing_user = User.query.filter_by(id=user.id).first()
-            if not existing_user:
-                # Create user record if it doesn't exist
-                new_user = User(
-                    id=user.id,
-                    email=user.email if hasattr(user, 'email') else f"{user.id}@unknown.com"
-                )
-                db.session.add(new_user)
+    if not user_response or not user_response.user:
+        return None, (jsonify({'error': 'Invalid token'}), 401)
+
+    return user_response.user, None
+
+def authenticate_request():
+    """
+    Resolve the Supabase user for the current request.
+
+    Order: token cache -> local JWT verification -> supabase.auth.get_user.
+    On success sets g.user_id / g.user_email.
+
+    Returns:
+        (user, from_cache, None) on success, (None, False, error_response) on failure
+    """
+    if not supabase:
+        return None, False, (jsonify({'error': 'Supabase client not initialized'}), 500)
+
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None, False, (jsonify({'error': 'Missing Authorization header'}), 401)
+
+    # Format: "Bearer <token>"
+    parts = auth_header.split(' ')
+    if len(parts) < 2:
+        return None, False, (jsonify({'error': 'Invalid Authorization header format'}), 401)
+    token = parts[1]
+
+    user = get_cached_user(token)
+    from_cache = user is not None
+
+    if from_cache:
+        logger.debug(f"Using cached user data for {user.id if hasattr(user, 'id') else 'unknown'}")
+    else:
+        try:
+            user, expires_at = verify_token_locally(token)
+        except TokenExpiredError:
+            return None, False, (jsonify({'error': 'Invalid token'}), 401)
+
+        if user:
+            # Never cache beyond the token's own expiry
+            cache_user_token(token, user, ttl=min(CACHE_DURATION, max(0, expires_at - time.time())))
+        else:
+            # Cache miss - verify token using Supabase Auth
+            logger.debug("Cache miss - fetching user from Supabase")
+            user, error = _fetch_user_from_supabase(token)
+            if error:
+                return None, False, error
+            cache_user_token(token, user)
+
+    # Store user info in flask global (g)
+    g.user_id = user.id
+    if getattr(user, 'email', None):
+        g.user_email = user.email
+
+    return user, from_cache, None
+
+def sync_local_user(user):
+    """
+    Ensure the Supabase user exists in the local database.
+
+    Users already seen by this process skip the DB lookup entirely; last_login
+    is recorded in memory and written by flush_last_login_updates().
+    """
+    if user.id not in _known_users:
+        from ..models import db, User
+        from sqlalchemy.exc import IntegrityError
+
+        if not db.session.query(User.id).filter_by(id=user.id).first():
+            # Create user record if it doesn't exist
+            new_user = User(
+                id=user.id,
+                email=getattr(user, 'email', None) or f"{user.id}@unknown.com"
+            )
+            db.session.add(new_user)
+            try:
                 db.session.commit()
                 logger.info(f"Created new user record for {user.id}")
+            except IntegrityError:
+                # Created concurrently by another request
+                db.session.rollback()
+
+        _known_users.set(user.id, True)
+
+    record_last_login(user.id)
+
+def record_last_login(user_id, when=None):
+    """Queue a last_login update for the next batched flush"""
+    from datetime import datetime
+    with _pending_last_login_lock:
+        _pending_last_login[user_id] = when or datetime.utcnow()
+
+def forget_known_user(user_id=None):
+    """Drop a user (or all users) from the known-user set"""
+    if user_id:
+        _known_users.pop(user_id)
+    else:
+        _known_users.clear()
+
+def flush_last_login_updates(batch_size=500):
+    """
+    Write queued last_login timestamps in batched UPDATE statements.
+
+    PostgreSQL: UPDATE ... FROM (VALUES ...) - one statement per batch.
+    Other dialects: executemany of a single-row UPDATE.
+
+    Returns:
+        Number of users updated
+    """
+    from ..models import db, User
+    from sqlalchemy import text
+
+    with _pending_last_login_lock:
+        if not _pending_last_login:
+            return 0
+        pending = list(_pending_last_login.items())
+        _pending_last_login.clear()
+
+    table = db.engine.dialect.identifier_preparer.quote(User.__table__.name)
+    is_postgres = db.engine.dialect.name == 'postgresql'
+
+    try:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            if is_postgres:
+                values = ', '.join(
+                    f'(:id{i}, CAST(:ts{i} AS TIMESTAMP))' for i in range(len(batch))
+                )
+                params = {}
+                for i, (user_id, ts) in enumerate(batch):
+                    params[f'id{i}'] = user_id
+                    params[f'ts{i}'] = ts
+                db.session.execute(text(
+                    f'UPDATE {table} AS u SET last_login = v.last_login '
+                    f'FROM (VALUES {values}) AS v(id, last_login) '
+                    f'WHERE u.id = v.id'
+                ), params)
             else:
-                # Update last login (only if not from cache to avoid frequent DB updates)
-                if not cached_user:
-                    from datetime import datetime
-                    existing_user.last_login = datetime.utcnow()
-                    db.session.commit()
-            
+                db.session.execute(
+                    text(f'UPDATE {table} SET last_login = :ts WHERE id = :id'),
+                    [{'id': user_id, 'ts': ts} for user_id, ts in batch]
+                )
+        db.session.commit()
+        logger.debug(f"Flushed last_login for {len(pending)} users")
+        return len(pending)
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to flush last_login updates: {e}")
+        # Re-queue, keeping any newer timestamps recorded meanwhile
+        with _pending_last_login_lock:
+            for user_id, ts in pending:
+                if user_id not in _pending_last_login or _pending_last_login[user_id] < ts:
+                    _pending_last_login[user_id] = ts
+        return 0
+
+def require_auth(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            user, from_cache, error = authenticate_request()
+            if error:
+                return error
+
+            # Ensure user exists in local database
+            sync_local_user(user)
+
         except Exception as e:
             logger.error(f"Auth error: {e}")
             return jsonify({'error': 'Unauthorized'}), 401
-            
+
         return f(*args, **kwargs)
     return decorated
 
@@ -0,0 +1,218 @@
+"""
+In-process cache utilities.
+
+TTLCache is a lock-protected, size-bounded LRU cache with per-entry expiry.
+It is safe to share between Flask request threads and TaskQueue workers.
+Caches created with a name are listed by registered_caches() (exported on /metrics).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+_registry = {}  # name -> TTLCache
+
+REFRESH_WORKERS = Config.CACHE_REFRESH_WORKERS
+_refresh_pool = None
+_refresh_pool_lock = threading.Lock()
+
+
+def _refresh_executor():
+    """Shared background pool for stale-while-revalidate refreshes (created on first use)"""
+    global _refresh_pool
+    with _refresh_pool_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='CacheRefresh')
+        return _refresh_pool
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL.
+
+    - get() moves the entry to the most-recently-used position
+    - set() evicts the least-recently-used entry once maxsize is exceeded
+    - expired entries are dropped lazily on access and on every set()
+      (only from the LRU end, so set() stays O(1) amortized)
+    - with stale_ttl > 0, get_or_load() keeps serving an expired entry for up to
+      stale_ttl more seconds while one background refresh replaces it
+      (stale-while-revalidate); get() only ever returns fresh entries
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, name=None, stale_ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._loading = {}          # key -> lock held by the thread loading a missing key
+        self._refreshing = set()    # keys with a background refresh in flight
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        if name:
+            _registry[name] = self
+
+    def get(self, key, default=None):
+        """Return cached value, or default if missing/expired"""
+        now = time.time()
+        with self._lock:
+            value = self._fresh(key, now)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def get_or_load(self, key, loader, ttl=None, cache_if=None):
+        """
+        Return the cached value, calling loader() to fill it when missing.
+
+        - fresh entry: returned as is
+        - expired within stale_ttl: the stale value is returned immediately and
+          loader() runs once in the background to replace it
+        - missing: loader() runs in the calling thread; concurrent callers for the
+          same key wait for that one load instead of calling loader() themselves
+
+        cache_if(value) -> bool decides whether a loaded value is stored
+        (e.g. skip error results); a failed background refresh keeps the stale value.
+        """
+        now = time.time()
+        with self._lock:
+            value = self._fresh(key, now)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                # _fresh() already dropped entries past the stale window
+                self.stale_hits += 1
+                refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            else:
+                self.misses += 1
+                key_lock = self._loading.setdefault(key, threading.Lock())
+
+        if entry is not _MISSING:
+            if refresh:
+                _refresh_executor().submit(self._refresh, key, loader, ttl, cache_if)
+            return entry[0]
+
+        with key_lock:
+            try:
+                with self._lock:
+                    value = self._fresh(key, time.time())
+                if value is not _MISSING:
+                    return value  # loaded by the thread we waited for
+                value = loader()
+                if cache_if is None or cache_if(value):
+                    self.set(key, value, ttl)
+                return value
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is key_lock:
+                        del self._loading[key]
+
+    def set(self, key, value, ttl=None):
+        """Store value; ttl overrides the cache default for this entry"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self._evict(now)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """(key, value, expires_at) for every fresh entry, e.g. to hand warmed entries to another process"""
+        now = time.time()
+        with self._lock:
+            return [(k, v, exp) for k, (v, exp) in self._data.items() if exp > now]
+
+    def purge_expired(self):
+        """Drop every entry past its TTL (and stale window); returns number removed"""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, exp) in self._data.items() if exp + self.stale_ttl <= now]
+            for k in expired:
+                del self._data[k]
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / total) if total else 0.0,
+                'stale_hits': self.stale_hits,
+                'refreshes': self.refreshes,
+            }
+
+    def _fresh(self, key, now):
+        # Caller holds the lock. Fresh value (moved to MRU) or _MISSING;
+        # drops the entry once it is past the stale window.
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _refresh(self, key, loader, ttl, cache_if):
+        try:
+            value = loader()
+            if cache_if is None or cache_if(value):
+                self.set(key, value, ttl)
+                with self._lock:
+                    self.refreshes += 1
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {self.name or 'cache'}[{key!r}]: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _evict(self, now):
+        # Caller holds the lock
+        while self._data:
+            oldest_key, (_, expires_at) = next(iter(self._data.items()))
+            if len(self._data) > self.maxsize or expires_at + self.stale_ttl <= now:
+                del self._data[oldest_key]
+            else:
+                break
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def registered_caches():
+    """name -> TTLCache for every cache created with a name"""
+    return dict(_registry)
@@ -1,9 +1,9 @@
 from functools import wraps
-from flask import jsonify, g, request
+from flask import jsonify, request
 from ..services.payment_service import PaymentService
 from ..models import ServiceType
 from werkzeug.exceptions import Unauthorized
-from .auth import supabase
+from .auth import authenticate_request, sync_local_user
 import logging
 import time
 
@@ -71,73 +71,16 @@ def check_quota(service_type=ServiceType.STOCK_ANALYSIS.value, amount=1):
         @wraps(f)
         def wrapper(*args, **kwargs):
 
-            # 1. 首先验证token（与require_auth相同逻辑）
-            if not supabase:
-                return jsonify({'error': 'Supabase client not initialized'}), 500
-
-            auth_header = request.headers.get('Authorization')
-            if not auth_header:
-                return jsonify({'error': 'Missing Authorization header'}), 401
-
+            # 1. 首先验证token（与require_auth共享token缓存和本地JWT校验）
             try:
-                if len(auth_header.split(' ')) < 2:
-                    return jsonify({'error': 'Invalid Authorization header format'}), 401
-
-                token = auth_header.split(' ')[1]
-
-                # Add timeout and retry for Supabase auth calls
-                import time
-                max_retries = 2
-                retry_delay = 0.5
-                user_response = None
-                
-                for attempt in range(max_retries + 1):
-                    try:
-                        user_response = supabase.auth.get_user(token)
-                        break  # Success, exit retry loop
-                    except Exception as e:
-                        if attempt < max_retries:
-                            logger.warning(f"Supabase auth attempt {attempt + 1} failed, retrying: {e}")
-                            time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-                        else:
-                            logger.error(f"Supabase auth failed after {max_retries + 1} attempts: {e}")
-                            # Check if it's a network/SSL error
-                            error_str = str(e).lower()
-                            if 'ssl' in error_str or 'timeout' in error_str or 'connection' in error_str:
-                                return jsonify({
-                                    'error': 'Authentication service temporarily unavailable. Please try again.',
-                                    'details': 'Network connection error during authentication'
-                                }), 503  # Service Unavailable
-                            else:
-                                return jsonify({'error': 'Authentication failed'}), 401
-                
-                if not user_response or not user_response.user:
-                    return jsonify({'error': 'Invalid token'}), 401
-                
-                # Store user info in flask global
-                user_id = user_response.user.id
-                g.user_id = user_id
-                if hasattr(user_response.user, 'email'):
-                    g.user_email = user_response.user.email
+                user, from_cache, error = authenticate_request()
+                if error:
+                    return error
+                user_id = user.id
 
                 # Ensure user exists in local database
-                from ..models import db, User
-                existing_user = User.query.filter_by(id=user_id).first()
-                if not existing_user:
-                    # Create user record if it doesn't exist
-                    new_user = User(
-                        id=user_id,
-                        email=user_response.user.email if hasattr(user_response.user, 'email') else f"{user_id}@unknown.com"
-                    )
-                    db.session.add(new_user)
-                    db.session.commit()
-                    logger.info(f"Created new user record for {user_id}")
-                else:
-                    # Update last login
-                    from datetime import datetime
-                    existing_user.last_login = datetime.utcnow()
-                    db.session.commit()
-                    
+                sync_local_user(user)
+
             except Exception as e:
                 logger.error(f"Auth error in check_quota: {e}")
                 return jsonify({'error': 'Unauthorized'}), 401
@@ -158,7 +101,7 @@ def check_quota(service_type=ServiceType.STOCK_ANALYSIS.value, amount=1):
             except Exception:
                 pass  # 如果提取失败，忽略错误，ticker保持为None
 
-            # 检查并扣减额度
+            # 检查并扣减额度（免费额度计数、台账扣减、使用日志在同一事务内完成）
             success, message, remaining = PaymentService.check_and_deduct_credits(
                 user_id=user_id,
                 service_type=service_type,
@@ -173,53 +116,6 @@ def check_quota(service_type=ServiceType.STOCK_ANALYSIS.value, amount=1):
                     'code': 'INSUFFICIENT_CREDITS'
                 }), 402
             
-            # 如果使用免费额度，需要更新DailyQueryCount
-            # 这里逻辑稍微有点重复，PaymentService内部已经判断了。
-            # 但是decorators.py原逻辑有更新daily_count的操作。
-            # Wait, PaymentService.check_and_deduct_credits ALREADY updates UsageLog/DailyQueryCount?
-            # Looking at my PaymentService code:
-            # 1. Checks check_daily_free_quota
-            # 2. If true, logs UsageLog. But DOES IT UPDATE DailyQueryCount? 
-            # In `check_daily_free_quota` it just checks.
-            # In `check_and_deduct_credits`:
-            #   if self.check_daily_free_quota(...):
-            #       usage_log = ...
-            #       return True ...
-            # It seems the legacy `payment_service.py` DID NOT update `DailyQueryCount` inside `check_and_deduct_credits`?
-            # Let's check the legacy decorators.py.
-            # Legacy decorators.py updates DailyQueryCount IF '免费' is in message.
-            # My `PaymentService` code (generated above) DOES NOT update `DailyQueryCount` inside `check_and_deduct_credits`.
-            # So I MUST do it here OR update PaymentService to do it.
-            # Updating PaymentService is better encapsulation.
-            
-            # I will implement the update logic here for now to match legacy behavior, 
-            # OR I should have put it in PaymentService.
-            # Let's put it here to be safe, filtering by message content is hacky but matches legacy.
-            
-            if '免费' in message or 'free' in message.lower():
-                 from datetime import datetime, timedelta
-                 from ..models import db, DailyQueryCount
-                 today = datetime.now().date()
-                 daily_count = DailyQueryCount.query.filter_by(
-                     user_id=user_id,
-                     date=today
-                 ).first()
-                 
-                 if not daily_count:
-                     # Calculate reset time (next day midnight)
-                     tomorrow = datetime.combine(today + timedelta(days=1), datetime.min.time())
-                     daily_count = DailyQueryCount(
-                         user_id=user_id,
-                         date=today,
-                         query_count=1,
-                         max_queries=PaymentService.DAILY_FREE_QUOTA.get(service_type, 0),
-                         reset_time=tomorrow
-                     )
-                     db.session.add(daily_count)
-                 else:
-                     daily_count.query_count += 1
-                 db.session.commit()
-
             response = f(*args, **kwargs)
             
             # Inject credit info into response if JSON
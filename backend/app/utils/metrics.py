@@ -0,0 +1,261 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+- request latency histograms per endpoint (Flask before/teardown hooks)
+- stage spans: `with span('get_market_data'):` or `@span('calculate_market_sentiment')`
+- DB commit latency (SQLAlchemy session events)
+- upstream error counters (yfinance / tiger / gemini / polymarket / exchange_rate)
+- cache hit ratios for every named TTLCache, plus registered gauges (task queue depth)
+
+Metrics live in this process only: with several gunicorn workers each worker
+exposes its own /metrics (scrape them individually or run a single worker).
+"""
+import threading
+import time
+from contextlib import ContextDecorator
+
+PREFIX = 'alphagbm'
+
+# 秒；覆盖缓存命中（毫秒级）到 Gemini 报告生成（数十秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = f"{PREFIX}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = f"{PREFIX}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels):
+        """{'count', 'sum'} of one series (tests / admin views)"""
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return {'count': series[-1], 'sum': series[-2]} if series else {'count': 0, 'sum': 0.0}
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            labels = _format_labels(self.labelnames, key)
+            inf = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Flask request latency by endpoint',
+                            ('method', 'endpoint', 'status'))
+STAGE_LATENCY = Histogram('stage_duration_seconds', 'Duration of instrumented pipeline stages',
+                          ('stage', 'outcome'))
+UPSTREAM_ERRORS = Counter('upstream_errors_total', 'Failed calls to external data sources', ('upstream',))
+
+_gauges = {}  # name -> (documentation, callable returning a number)
+
+
+class span(ContextDecorator):
+    """
+    记录一个阶段的耗时（异常时 outcome="error"）
+
+        with span('gemini_generate_content') as s:
+            ...
+        print(s.elapsed)
+
+        @span('calculate_market_sentiment')
+        def calculate_market_sentiment(data): ...
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.elapsed = None
+        self._local = threading.local()
+
+    def __enter__(self):
+        # 作为装饰器时同一个实例会被多个线程 / 递归调用共享，起始时间放在线程本地的栈里
+        stack = getattr(self._local, 'starts', None)
+        if stack is None:
+            stack = self._local.starts = []
+        stack.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._local.starts.pop()
+        STAGE_LATENCY.observe(self.elapsed, stage=self.stage, outcome='error' if exc_type else 'ok')
+        return False
+
+
+def record_upstream_error(upstream):
+    UPSTREAM_ERRORS.inc(upstream=upstream)
+
+
+def register_gauge(name, documentation, fn):
+    """注册一个在抓取时求值的 gauge（如任务队列深度）"""
+    _gauges[f"{PREFIX}_{name}"] = (documentation, fn)
+
+
+def _collect_caches():
+    from .cache import registered_caches
+
+    caches = sorted(registered_caches().items())
+    metrics = [
+        ('cache_hits_total', 'counter', 'Cache hits', 'hits'),
+        ('cache_misses_total', 'counter', 'Cache misses', 'misses'),
+        ('cache_hit_ratio', 'gauge', 'Lifetime cache hit ratio', 'hit_ratio'),
+        ('cache_entries', 'gauge', 'Entries currently cached', 'size'),
+    ]
+    stats = {name: cache.stats() for name, cache in caches}
+    lines = []
+    for suffix, kind, documentation, field in metrics:
+        metric = f"{PREFIX}_{suffix}"
+        lines += [f"# HELP {metric} {documentation}", f"# TYPE {metric} {kind}"]
+        for name, _ in caches:
+            lines.append(f'{metric}{{cache="{_escape(name)}"}} {_format_value(stats[name][field])}')
+    return lines
+
+
+def _collect_gauges():
+    lines = []
+    for name, (documentation, fn) in sorted(_gauges.items()):
+        try:
+            value = fn()
+        except Exception:
+            continue
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+    return lines
+
+
+def render_metrics():
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in (REQUEST_LATENCY, STAGE_LATENCY, UPSTREAM_ERRORS):
+        lines += metric.collect()
+    lines += _collect_caches()
+    lines += _collect_gauges()
+    return '\n'.join(lines) + '\n'
+
+
+# ---------------------------------------------------------------------------
+# Flask / SQLAlchemy integration
+# ---------------------------------------------------------------------------
+
+def _instrument_db_commits():
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if event.contains(Session, 'before_commit', _before_commit):
+        return
+    event.listen(Session, 'before_commit', _before_commit)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+
+
+def _before_commit(session):
+    session.info['_commit_started'] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop('_commit_started', None)
+    if started is not None:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage='db_commit', outcome='ok')
+
+
+def _after_rollback(session):
+    # 提交失败时 after_commit 不会触发，回滚时记为错误
+    started = session.info.pop('_commit_started', None)
+    if started is not None:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage='db_commit', outcome='error')
+
+
+def init_app(app):
+    """注册请求计时钩子、DB 提交计时和 /metrics 端点"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _remember_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _observe_request(exc):
+        started = g.pop('_metrics_started', None)
+        if started is None or request.endpoint == 'metrics':
+            return
+        # 使用路由模板而不是原始路径，避免 ticker 等参数造成标签爆炸
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = 500 if exc is not None else g.pop('_metrics_status', 500)
+        REQUEST_LATENCY.observe(time.perf_counter() - started,
+                                method=request.method, endpoint=endpoint, status=status)
+
+    @app.route('/metrics', endpoint='metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    _instrument_db_commits()
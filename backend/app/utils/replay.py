@@ -0,0 +1,414 @@
+"""
+Record / replay of external data sources.
+
+Captures the responses of yfinance, the shared Tiger quote client, plain HTTP
+calls made through ``requests`` (Polymarket, exchange rates) and Gemini into a
+cassette directory, then serves them back deterministically so the full
+analysis path can be benchmarked on a machine with no network.
+
+    from app.utils.replay import recording, replaying
+
+    with recording('benchmarks/recordings/nvda'):
+        get_stock_analysis_data('NVDA', 'growth')
+
+    with replaying('benchmarks/recordings/nvda', latency='recorded'):
+        get_stock_analysis_data('NVDA', 'growth')
+
+A whole server process can be switched with REPLAY_MODE=record|replay,
+REPLAY_DIR and REPLAY_LATENCY (see Config).
+
+Every patched entry point is wrapped in a proxy; each attribute read and call
+made through it is keyed by its access path, e.g.
+``yfinance:Ticker('NVDA').history(period='1y')``. Data values (DataFrames,
+dicts, lists, scalars) are pickled, anything else becomes a nested proxy, and
+exceptions are recorded and re-raised. ``timeout``/``headers`` arguments are
+not part of the key (and headers, which may carry API keys, are never stored).
+
+Latency injected on replay, per network operation (an entry whose recording
+took longer than NETWORK_THRESHOLD_SECONDS):
+    None / 0                  no delay
+    'recorded'                the duration measured while recording
+    1.5                       a fixed 1.5s
+    'yfinance=0.3,gemini=8'   fixed per channel, other channels no delay
+``latency_scale`` multiplies all delays.
+
+Cassettes are gzip-compressed pickles: only load recordings you made yourself.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('yfinance', 'tiger', 'http', 'gemini')
+# Gemini prompts embed the current date and market snapshot, so an exact-prompt miss
+# falls back to the recorded responses of the same call site, in recording order
+SEQUENCE_FALLBACK_CHANNELS = {'gemini'}
+IGNORED_KWARGS = {'timeout', 'headers', 'proxies', 'verify'}
+NETWORK_THRESHOLD_SECONDS = 0.002
+
+CASSETTE_FILE = 'cassette.pkl.gz'
+INDEX_FILE = 'index.json'
+
+DATA_TYPES = (pd.DataFrame, pd.Series, pd.Index, np.ndarray, np.generic,
+              dict, list, tuple, set, frozenset, str, bytes, int, float, bool, type(None),
+              datetime, date, timedelta, Decimal)
+
+_MISSING = object()
+
+
+class ReplayMiss(LookupError):
+    """No recording for this access path"""
+
+
+class ReplayAttributeMiss(ReplayMiss, AttributeError):
+    """Attribute read with no recording (AttributeError so hasattr() keeps working)"""
+
+
+def _describe(value):
+    """Stable, address-free description of an argument for use in keys"""
+    if isinstance(value, str):
+        if len(value) <= 200:
+            return repr(value)
+        return f"<str len={len(value)} sha1={hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]}>"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(map(_describe, value)) if isinstance(value, (set, frozenset)) else map(_describe, value)
+        return '[' + ', '.join(items) + ']'
+    if isinstance(value, dict):
+        return '{' + ', '.join(f"{_describe(k)}: {_describe(v)}" for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))) + '}'
+    return repr(value)
+
+
+def _call_key(args, kwargs):
+    parts = [_describe(a) for a in args]
+    parts += [f"{k}={_describe(v)}" for k, v in sorted(kwargs.items()) if k not in IGNORED_KWARGS]
+    return ', '.join(parts)
+
+
+def parse_latency(spec):
+    """REPLAY_LATENCY string -> None | 'recorded' | float | {channel: float}"""
+    if spec is None or isinstance(spec, (int, float, dict)):
+        return spec or None
+    spec = str(spec).strip()
+    if not spec or spec == '0':
+        return None
+    if spec == 'recorded':
+        return spec
+    if '=' in spec:
+        return {channel.strip(): float(seconds) for channel, seconds in
+                (part.split('=', 1) for part in spec.split(',') if part.strip())}
+    return float(spec)
+
+
+def _pickle_error(e):
+    try:
+        payload = pickle.dumps(e)
+        pickle.loads(payload)
+        return payload
+    except Exception:
+        return pickle.dumps(RuntimeError(f"{type(e).__name__}: {e}"))
+
+
+class _Proxy:
+    """Stands in for a recorded object; attribute reads and calls go through the cassette"""
+    __slots__ = ('_cassette', '_channel', '_path', '_target')
+
+    def __init__(self, cassette, channel, path, target=_MISSING):
+        object.__setattr__(self, '_cassette', cassette)
+        object.__setattr__(self, '_channel', channel)
+        object.__setattr__(self, '_path', path)
+        object.__setattr__(self, '_target', target)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self._cassette._attr(self._channel, f"{self._path}.{name}", self._target, name)
+
+    def __call__(self, *args, **kwargs):
+        return self._cassette._call(self._channel, self._path, self._target, args, kwargs)
+
+    def __repr__(self):
+        return f"<replay {self._channel}:{self._path}>"
+
+
+class Cassette:
+    """Recorded entries of one recording session, keyed by channel and access path"""
+
+    def __init__(self, directory, mode, latency=None, latency_scale=1.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.latency = parse_latency(latency)
+        self.latency_scale = latency_scale
+        self._entries = {}      # 'channel:path' -> (kind, payload, duration)
+        self._sequences = {}    # 'channel:call site' -> [path, ...] in recording order
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._stats = {channel: {'operations': 0, 'misses': 0, 'delay_seconds': 0.0} for channel in CHANNELS}
+
+        if os.path.exists(os.path.join(directory, CASSETTE_FILE)):
+            self.load()
+        elif mode == 'replay':
+            raise FileNotFoundError(f"No recording in {directory}")
+
+    # ----- storage -----
+
+    def load(self):
+        with gzip.open(os.path.join(self.directory, CASSETTE_FILE), 'rb') as f:
+            data = pickle.load(f)
+        self._entries = data['entries']
+        self._sequences = data['sequences']
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            data = {'version': 1, 'entries': dict(self._entries),
+                    'sequences': {k: list(v) for k, v in self._sequences.items()}}
+        with gzip.open(os.path.join(self.directory, CASSETTE_FILE), 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        index = [{'key': key, 'kind': kind, 'duration_ms': round(duration * 1000, 1)}
+                 for key, (kind, _, duration) in sorted(data['entries'].items())]
+        with open(os.path.join(self.directory, INDEX_FILE), 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+
+    def has_channel(self, channel):
+        prefix = f"{channel}:"
+        return any(key.startswith(prefix) for key in self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {channel: dict(s) for channel, s in self._stats.items()}
+
+    # ----- recording -----
+
+    def _store(self, channel, path, kind, payload, duration, call_site=None):
+        key = f"{channel}:{path}"
+        with self._lock:
+            self._stats[channel]['operations'] += 1
+            if key in self._entries:
+                return  # keep the first response for a given path
+            self._entries[key] = (kind, payload, duration)
+            if call_site is not None:
+                self._sequences.setdefault(f"{channel}:{call_site}", []).append(path)
+
+    def _wrap(self, channel, path, value, duration, call_site=None):
+        if callable(value) and not isinstance(value, DATA_TYPES):
+            self._store(channel, path, 'callable', b'', duration, call_site)
+            return _Proxy(self, channel, path, value)
+        if isinstance(value, DATA_TYPES):
+            try:
+                self._store(channel, path, 'value', pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                            duration, call_site)
+                return value
+            except Exception as e:
+                logger.debug(f"Replay: {channel}:{path} is not picklable, recording as object: {e}")
+        self._store(channel, path, 'object', b'', duration, call_site)
+        return _Proxy(self, channel, path, value)
+
+    # ----- replay -----
+
+    def _lookup(self, channel, path, call_site=None, attribute=False):
+        key = f"{channel}:{path}"
+        entry = self._entries.get(key)
+        if entry is not None:
+            return path, entry
+
+        if channel in SEQUENCE_FALLBACK_CHANNELS and call_site is not None:
+            sequence_key = f"{channel}:{call_site}"
+            sequence = self._sequences.get(sequence_key)
+            if sequence:
+                with self._lock:
+                    cursor = self._cursors.get(sequence_key, 0)
+                    self._cursors[sequence_key] = cursor + 1
+                fallback = sequence[cursor % len(sequence)]
+                return fallback, self._entries[f"{channel}:{fallback}"]
+
+        with self._lock:
+            self._stats[channel]['misses'] += 1
+        logger.warning(f"Replay miss: {key}")
+        raise (ReplayAttributeMiss if attribute else ReplayMiss)(key)
+
+    def _delay(self, channel, duration):
+        if not self.latency or duration < NETWORK_THRESHOLD_SECONDS:
+            return
+        if self.latency == 'recorded':
+            seconds = duration
+        elif isinstance(self.latency, dict):
+            seconds = self.latency.get(channel, 0.0)
+        else:
+            seconds = self.latency
+        seconds *= self.latency_scale
+        if seconds > 0:
+            time.sleep(seconds)
+            with self._lock:
+                self._stats[channel]['delay_seconds'] += seconds
+
+    def _unwrap(self, channel, path, entry):
+        kind, payload, duration = entry
+        with self._lock:
+            self._stats[channel]['operations'] += 1
+        self._delay(channel, duration)
+        if kind == 'value':
+            return pickle.loads(payload)  # fresh copy per read, callers may mutate it
+        if kind == 'error':
+            raise pickle.loads(payload)
+        return _Proxy(self, channel, path)
+
+    # ----- proxy hooks -----
+
+    def _attr(self, channel, path, target, name):
+        if self.mode == 'replay':
+            path, entry = self._lookup(channel, path, attribute=True)
+            return self._unwrap(channel, path, entry)
+
+        started = time.perf_counter()
+        try:
+            value = getattr(target, name)
+        except Exception as e:
+            self._store(channel, path, 'error', _pickle_error(e), time.perf_counter() - started)
+            raise
+        return self._wrap(channel, path, value, time.perf_counter() - started)
+
+    def _call(self, channel, path, target, args, kwargs):
+        call_path = f"{path}({_call_key(args, kwargs)})"
+        if self.mode == 'replay':
+            call_path, entry = self._lookup(channel, call_path, call_site=path)
+            return self._unwrap(channel, call_path, entry)
+
+        started = time.perf_counter()
+        try:
+            value = target(*args, **kwargs)
+        except Exception as e:
+            self._store(channel, call_path, 'error', _pickle_error(e), time.perf_counter() - started, path)
+            raise
+        return self._wrap(channel, call_path, value, time.perf_counter() - started, call_site=path)
+
+
+# ---------------------------------------------------------------------------
+# Patching
+# ---------------------------------------------------------------------------
+
+_active = None
+_patches = []
+
+
+def _patch(obj, attr, value):
+    original = obj.__dict__.get(attr, _MISSING)  # _MISSING: inherited (e.g. a method), delete on restore
+    _patches.append((obj, attr, original))
+    setattr(obj, attr, value)
+
+
+def install(mode, directory, latency=None, latency_scale=1.0):
+    """Patch the external data entry points; returns the active Cassette"""
+    global _active
+    if _active is not None:
+        uninstall()
+
+    cassette = Cassette(directory, mode, latency, latency_scale)
+    record = mode == 'record'
+
+    import requests
+    import yfinance
+    _patch(yfinance, 'Ticker', _Proxy(cassette, 'yfinance', 'Ticker', yfinance.Ticker if record else _MISSING))
+    _patch(yfinance, 'download', _Proxy(cassette, 'yfinance', 'download', yfinance.download if record else _MISSING))
+    _patch(requests, 'get', _Proxy(cassette, 'http', 'get', requests.get if record else _MISSING))
+    _patch(requests, 'post', _Proxy(cassette, 'http', 'post', requests.post if record else _MISSING))
+
+    # Tiger: the shared quote client of TigerClientManager
+    try:
+        from ..services.tiger_client import get_client_manager
+        manager = get_client_manager()
+        if record:
+            if manager.ensure_initialized():
+                _patch(manager, 'quote_client', _Proxy(cassette, 'tiger', 'quote_client', manager.quote_client))
+        else:
+            has_tiger = cassette.has_channel('tiger')
+            _patch(manager, 'quote_client', _Proxy(cassette, 'tiger', 'quote_client') if has_tiger else None)
+            _patch(manager, 'initialize_client', lambda: has_tiger)
+        _patch(manager, '_pool', None)  # every request goes through the (proxied) primary client
+        _patch(manager, '_init_failed_at', None)
+    except ImportError:
+        pass
+
+    # Gemini: ai_service.genai (None when the recording ran without Gemini -> fallback analysis)
+    try:
+        from ..services import ai_service
+        if record:
+            if ai_service.genai is not None and ai_service.api_key:
+                _patch(ai_service, 'genai', _Proxy(cassette, 'gemini', 'genai', ai_service.genai))
+        elif cassette.has_channel('gemini'):
+            _patch(ai_service, 'genai', _Proxy(cassette, 'gemini', 'genai'))
+            _patch(ai_service, 'api_key', ai_service.api_key or 'replay')
+        else:
+            _patch(ai_service, 'genai', None)
+    except ImportError:
+        pass
+
+    _active = cassette
+    logger.info(f"Replay layer installed: mode={mode}, dir={directory}, latency={cassette.latency}")
+    return cassette
+
+
+def uninstall():
+    """Restore the original entry points (and save the cassette when recording)"""
+    global _active
+    while _patches:
+        obj, attr, original = _patches.pop()
+        if original is _MISSING:
+            obj.__dict__.pop(attr, None)
+        else:
+            setattr(obj, attr, original)
+
+    cassette, _active = _active, None
+    if cassette is not None and cassette.mode == 'record':
+        cassette.save()
+    return cassette
+
+
+def active_cassette():
+    return _active
+
+
+def install_from_config(config):
+    """Install from REPLAY_MODE / REPLAY_DIR / REPLAY_LATENCY (server processes)"""
+    mode = (config.get('REPLAY_MODE') or '').lower()
+    if mode not in ('record', 'replay'):
+        logger.warning(f"Ignoring unknown REPLAY_MODE={mode!r}")
+        return None
+    cassette = install(mode, config['REPLAY_DIR'], config.get('REPLAY_LATENCY'),
+                       config.get('REPLAY_LATENCY_SCALE', 1.0))
+    if mode == 'record':
+        atexit.register(uninstall)
+    return cassette
+
+
+@contextmanager
+def recording(directory):
+    cassette = install('record', directory)
+    try:
+        yield cassette
+    finally:
+        uninstall()
+
+
+@contextmanager
+def replaying(directory, latency=None, latency_scale=1.0):
+    cassette = install('replay', directory, latency, latency_scale)
+    try:
+        yield cassette
+    finally:
+        uninstall()
@@ -0,0 +1,175 @@
+"""
+Precomputed JSON responses with strong ETags.
+
+ResponseCache stores the encoded body (serialization.dumps) and its ETag per key,
+so a cached GET costs neither a database query nor re-serialization, and a client
+that sends the matching If-None-Match gets 304 Not Modified without a body.
+
+The ETag is a hash of the body bytes: identical content has the same ETag in every
+worker process and across restarts. With a directory, bodies are also written to
+disk so a restarted worker serves them without rebuilding; invalidate() touches a
+generation file there, which drops the in-memory copies of every process sharing
+the directory on their next lookup. Without a directory, invalidation stays inside
+the calling process.
+
+memo(key, loader) keeps intermediate Python objects (e.g. a database snapshot that
+several responses are built from) under the same invalidation as the bodies.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from flask import Response, request
+
+from .cache import TTLCache
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+GENERATION_FILE = '.generation'
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+def _cached(body):
+    return CachedResponse(body=body, etag=hashlib.sha256(body).hexdigest()[:32])
+
+
+class ResponseCache:
+    """
+    - respond(key, builder): serve the cached body for key, building it with
+      builder() -> (payload, status) on a miss; only cache_if(payload, status)
+      results (status 200 by default) are stored
+    - ttl bounds how long an entry is served without invalidate()
+      (per key via respond(..., ttl=...))
+    - memo(key, loader): in-memory object cache dropped together with the bodies
+    """
+
+    def __init__(self, name, ttl=3600, maxsize=256, directory=None):
+        self.name = name
+        self.directory = directory
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl, name=name)
+        self._objects = TTLCache(maxsize=maxsize, ttl=ttl, name=f'{name}_objects')
+        self._generation = self._read_generation()
+        self._version = 0  # bumped by every invalidation
+        self._lock = threading.Lock()
+
+    def respond(self, key, builder, ttl=None, cache_if=None):
+        cached = self.get(key, ttl)
+        if cached is None:
+            version = self._version
+            payload, status = builder()
+            body = dumps(payload)
+            if not (cache_if(payload, status) if cache_if else status == 200):
+                return Response(body, status=status, mimetype='application/json')
+            cached = _cached(body)
+            # 构建期间被 invalidate()（本进程或共享目录的其他进程）的结果不写入缓存
+            if self._unchanged_since(version):
+                self.put(key, cached, ttl)
+
+        response = Response(cached.body, mimetype='application/json')
+        response.set_etag(cached.etag)
+        # 每次都向服务端验证，ETag 未变时返回 304
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def get(self, key, ttl=None):
+        self._check_generation()
+        cached = self._memory.get(key)
+        if cached is None and self.directory:
+            cached = self._load(key, self._memory.ttl if ttl is None else ttl)
+        return cached
+
+    def put(self, key, cached, ttl=None):
+        self._memory.set(key, cached, ttl)
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(key), 'wb') as f:
+                    f.write(cached.body)
+            except OSError as e:
+                logger.warning(f"Could not write {self.name} cache file: {e}")
+
+    def memo(self, key, loader, ttl=None):
+        self._check_generation()
+        value = self._objects.get(key)
+        if value is None:
+            version = self._version
+            value = loader()
+            if self._unchanged_since(version):
+                self._objects.set(key, value, ttl)
+        return value
+
+    def invalidate(self):
+        """Drop every entry (in this process, and on disk for every process sharing the directory)"""
+        with self._lock:
+            self._version += 1
+        self._memory.clear()
+        self._objects.clear()
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for filename in os.listdir(self.directory):
+                if filename.endswith('.json'):
+                    os.remove(os.path.join(self.directory, filename))
+            with open(os.path.join(self.directory, GENERATION_FILE), 'w') as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            logger.warning(f"Could not invalidate {self.name} cache files: {e}")
+        with self._lock:
+            self._generation = self._read_generation()
+
+    def stats(self):
+        return self._memory.stats()
+
+    def _load(self, key, ttl):
+        # 内存条目缺失时（如进程重启后）读取磁盘上仍在 ttl 内的响应
+        path = self._path(key)
+        try:
+            remaining = ttl - (time.time() - os.stat(path).st_mtime)
+            if remaining <= 0:
+                return None
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        cached = _cached(body)
+        self._memory.set(key, cached, remaining)
+        return cached
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(repr(key).encode()).hexdigest()[:32] + '.json')
+
+    def _read_generation(self):
+        if not self.directory:
+            return None
+        try:
+            return os.stat(os.path.join(self.directory, GENERATION_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _unchanged_since(self, version):
+        # 重新读取共享目录的 generation：其他进程的 invalidate() 同样使 _version 递增
+        self._check_generation()
+        return version == self._version
+
+    def _check_generation(self):
+        # 其他进程（如调仓脚本）invalidate() 后丢弃本进程的内存副本
+        if not self.directory:
+            return
+        generation = self._read_generation()
+        with self._lock:
+            if generation == self._generation:
+                return
+            self._generation = generation
+            self._version += 1
+        self._memory.clear()
+        self._objects.clear()
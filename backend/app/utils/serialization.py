@@ -1,8 +1,242 @@
 """
-Data serialization utilities for converting numpy types to Python native types.
-This prevents PostgreSQL schema errors when storing JSON data containing numpy objects.
+JSON serialization for analysis results.
+
+dumps()/loads() use orjson when it is installed (plain json otherwise) with a
+default hook for NumPy and pandas values, so results can be encoded directly
+instead of first being rebuilt by convert_numpy_types():
+- Flask responses: OrjsonProvider (installed as app.json in create_app)
+- JSON columns: engine_json_options() as SQLAlchemy json_serializer/json_deserializer
+- large result blobs: CompressedJSON column type (zstd when installed, zlib otherwise)
+
+NaN/Inf are written as null (valid JSON for both PostgreSQL and browsers).
 """
+import dataclasses
+import json
+import math
+import zlib
+from collections.abc import Sequence
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
 import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Values the encoder does not handle natively"""
+    if isinstance(obj, np.generic):
+        # np.float64 / np.int64 / np.bool_ / np.datetime64 标量（非连续数组中的元素等）
+        return _finite(obj.item())
+    if isinstance(obj, np.ndarray):
+        return [_finite(v) for v in obj.tolist()]
+    if isinstance(obj, pd.Timestamp):
+        return None if pd.isna(obj) else obj.isoformat()
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient='records')
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return [_finite(v) for v in obj.tolist()]
+    if isinstance(obj, (set, frozenset, Sequence)):
+        # 其余序列类型（如按需生成元素的 OptionContracts）
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _strip_non_finite(obj):
+    # 仅用于没有 orjson 时：json 模块会输出 NaN/Infinity（非法 JSON）
+    if isinstance(obj, float):
+        return _finite(obj)
+    if isinstance(obj, dict):
+        return {k: _strip_non_finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_strip_non_finite(v) for v in obj]
+    return obj
+
+
+def _key(key):
+    if isinstance(key, (str, int, float, bool)) or key is None:
+        return key
+    if isinstance(key, np.generic):
+        return key.item()
+    if isinstance(key, (datetime, date, time)):
+        return key.isoformat()
+    return str(key)
+
+
+def _normalize_keys(obj):
+    # 少见情况：以 pd.Timestamp 等为键的字典（如 DataFrame.to_dict() 的结果）
+    if isinstance(obj, dict):
+        return {_key(k): _normalize_keys(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalize_keys(v) for v in obj]
+    return obj
+
+
+def dumps(obj, default=_default, option=0) -> bytes:
+    """Encode to UTF-8 JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=_OPTIONS | option)
+        except TypeError as e:
+            if 'Dict key' not in str(e):
+                raise
+            return orjson.dumps(_normalize_keys(obj), default=default, option=_OPTIONS | option)
+    obj = _normalize_keys(obj)
+    text = json.dumps(obj, default=default, ensure_ascii=False, allow_nan=True, separators=(',', ':'))
+    if 'NaN' in text or 'Infinity' in text:
+        text = json.dumps(_strip_non_finite(json.loads(text)), ensure_ascii=False, separators=(',', ':'))
+    return text.encode('utf-8')
+
+
+def dumps_str(obj) -> str:
+    return dumps(obj).decode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def to_jsonable(obj):
+    """Plain Python structure (dict/list/str/float/int/bool/None) equivalent to the JSON encoding"""
+    return loads(dumps(obj))
+
+
+def engine_json_options() -> dict:
+    """SQLAlchemy create_engine options: encode JSON columns with dumps()"""
+    return {'json_serializer': dumps_str, 'json_deserializer': loads}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider using dumps(); keeps Flask's conventions
+    (sorted keys, HTTP-date datetimes, __html__ objects)
+    """
+
+    def default(self, obj):
+        if obj is pd.NaT:
+            return None
+        # 与 Flask 默认实现一致：date/datetime -> HTTP date，Decimal -> str，__html__
+        if isinstance(obj, (date, Decimal)) or hasattr(obj, '__html__'):
+            return DefaultJSONProvider.default(obj)
+        return _default(obj)
+
+    def _encode(self, obj):
+        if orjson is None:
+            return dumps(obj, default=self.default)
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # indent / 自定义参数：交给标准实现
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(obj)
+        return self._app.response_class(self._encode(obj) + b'\n', mimetype=self.mimetype)
+
+
+# ---------------------------------------------------------------------------
+# Compressed JSON columns
+# ---------------------------------------------------------------------------
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ZSTD_LEVEL = 6
+ZLIB_LEVEL = 6
+
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def compress_json(obj) -> bytes:
+    """dumps() + zstd (zlib if zstandard is not installed)"""
+    data = dumps(obj)
+    if zstandard is not None:
+        return _zstd_compressor.compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_json(data):
+    """
+    Inverse of compress_json(); the codec is detected from the frame header,
+    so rows written with either codec (or uncompressed JSON text from before
+    the migration) can be read
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if isinstance(data, str):
+        return loads(data)
+    if data[:4] == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed column data requires the 'zstandard' package")
+        return loads(_zstd_decompressor.decompress(data))
+    if data[:1] == b'\x78':  # zlib 头；JSON 文本不会以 'x' 开头
+        return loads(zlib.decompress(data))
+    return loads(data)
+
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON value stored as a compressed binary blob (bytea / BLOB)
+
+    Used for the large analysis result columns (option chains, price history,
+    AI report), which are only ever read back whole.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_json(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_json(value)
 
 
 def convert_numpy_types(obj):
@@ -10,6 +244,9 @@ def convert_numpy_types(obj):
     Recursively convert numpy data types to Python native types for JSON serialization.
     This prevents PostgreSQL schema errors when storing JSON data.
 
+    Kept for scalar conversions and existing callers; for whole results prefer
+    dumps() / to_jsonable(), which do the same in a single native pass.
+
     Args:
         obj: Any object that may contain numpy types
 
@@ -46,4 +283,4 @@ def safe_json_serialize(data):
     Returns:
         JSON-serializable data structure
     """
-    return convert_numpy_types(data)
\ No newline at end of file
+    return convert_numpy_types(data)
@@ -0,0 +1,121 @@
+"""
+本地 JWT 校验（verify_token_locally）与 require_auth / check_quota 共享的 token 缓存
+"""
+
+import os
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+import jwt  # noqa: E402
+from flask import Flask, jsonify  # noqa: E402
+
+from app.utils import auth, decorators  # noqa: E402
+from app.utils.auth import TokenExpiredError, verify_token_locally  # noqa: E402
+
+SECRET = 'unit-test-jwt-secret-with-enough-length'
+
+
+def make_token(secret=SECRET, algorithm='HS256', **claims):
+    payload = {'sub': 'user-1', 'email': 'user@example.com', 'aud': 'authenticated',
+               'exp': int(time.time()) + 600}
+    payload.update(claims)
+    return jwt.encode(payload, secret, algorithm=algorithm)
+
+
+class LocalVerifyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('AUTH_LOCAL_JWT_VERIFY', True), ('SUPABASE_JWT_SECRET', SECRET)):
+            patcher = mock.patch.object(auth.Config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        auth.invalidate_token_cache()
+        self.addCleanup(auth.invalidate_token_cache)
+
+
+class TestVerifyTokenLocally(LocalVerifyTestCase):
+
+    def test_hs256(self):
+        token = make_token()
+        user, expires_at = verify_token_locally(token)
+        self.assertEqual((user.id, user.email), ('user-1', 'user@example.com'))
+        self.assertEqual(expires_at, jwt.decode(token, options={'verify_signature': False})['exp'])
+
+    def test_expired(self):
+        with self.assertRaises(TokenExpiredError):
+            verify_token_locally(make_token(exp=int(time.time()) - 60))
+
+    def test_falls_back_to_supabase(self):
+        # 签名不符、未知算法、缺少 sub 时交给 supabase.auth.get_user 判定
+        self.assertEqual(verify_token_locally(make_token(secret='another-secret-with-enough-length')), (None, None))
+        self.assertEqual(verify_token_locally(make_token(algorithm='HS512')), (None, None))
+        self.assertEqual(verify_token_locally(make_token(sub=None)), (None, None))
+        with mock.patch.object(auth.Config, 'SUPABASE_JWT_SECRET', None):
+            self.assertEqual(verify_token_locally(make_token()), (None, None))
+        with mock.patch.object(auth.Config, 'AUTH_LOCAL_JWT_VERIFY', False):
+            self.assertEqual(verify_token_locally(make_token()), (None, None))
+
+    def test_wrong_audience_rejected(self):
+        self.assertEqual(verify_token_locally(make_token(aud='anon')), (None, None))
+        self.assertEqual(verify_token_locally(make_token(aud=None)), (None, None))
+
+
+class TestCheckQuotaTokenCache(LocalVerifyTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.supabase = mock.Mock()
+        self.supabase.auth.get_user.return_value = SimpleNamespace(user=SimpleNamespace(id='user-2', email=None))
+        self.deduct = mock.Mock(return_value=(True, 'ok', 9))
+        for target, name, value in ((auth, 'supabase', self.supabase),
+                                    (decorators, 'sync_local_user', mock.Mock()),
+                                    (decorators.PaymentService, 'check_and_deduct_credits', self.deduct)):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.app = Flask(__name__)
+
+        @self.app.route('/analyze', methods=['POST'])
+        @decorators.check_quota()
+        def analyze():
+            return jsonify({'success': True})
+
+        self.client = self.app.test_client()
+
+    def post(self, token):
+        return self.client.post('/analyze', headers={'Authorization': f'Bearer {token}'})
+
+    def test_cached_token_skips_supabase(self):
+        auth.cache_user_token('opaque-token', SimpleNamespace(id='user-3', email=None))
+        self.assertEqual(self.post('opaque-token').status_code, 200)
+        self.supabase.auth.get_user.assert_not_called()
+        self.assertEqual(self.deduct.call_args.kwargs['user_id'], 'user-3')
+
+    def test_local_verification_fills_cache(self):
+        token = make_token()
+        self.assertEqual(self.post(token).status_code, 200)
+        self.assertEqual(auth.get_cached_user(token).id, 'user-1')
+        self.supabase.auth.get_user.assert_not_called()
+
+    def test_supabase_result_cached(self):
+        token = make_token(secret='another-secret-with-enough-length')
+        self.assertEqual(self.post(token).status_code, 200)
+        self.assertEqual(self.post(token).status_code, 200)
+        self.supabase.auth.get_user.assert_called_once_with(token)
+        self.assertEqual(self.deduct.call_args.kwargs['user_id'], 'user-2')
+
+    def test_expired_token_rejected(self):
+        self.assertEqual(self.post(make_token(exp=int(time.time()) - 60)).status_code, 401)
+        self.supabase.auth.get_user.assert_not_called()
+        self.deduct.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
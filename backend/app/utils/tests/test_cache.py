@@ -0,0 +1,130 @@
+"""
+TTLCache：LRU / TTL、stale-while-revalidate、并发加载合并
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.utils import cache as cache_module  # noqa: E402
+from app.utils.cache import TTLCache  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(cache_module.time, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lru_and_ttl(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)            # 淘汰最久未使用的 b
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+
+        self.clock.now += 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 1)
+
+    def test_get_or_load_single_flight(self):
+        cache = TTLCache(ttl=10)
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'success': True}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('k', loader)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_cache_if(self):
+        cache = TTLCache(ttl=10)
+        self.assertEqual(cache.get_or_load('k', lambda: {'success': False}, cache_if=lambda r: r['success']),
+                         {'success': False})
+        self.assertNotIn('k', cache)
+
+    def test_stale_while_revalidate(self):
+        cache = TTLCache(ttl=10, stale_ttl=30)
+        cache.set('k', 'old')
+        self.clock.now += 15                 # 过期，但仍在 stale 窗口内
+
+        refreshed = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            refreshed.wait(5)
+            return 'new'
+
+        # 立即返回旧值，后台只刷新一次
+        self.assertEqual(cache.get_or_load('k', loader), 'old')
+        self.assertEqual(cache.get_or_load('k', loader), 'old')
+        self.assertIsNone(cache.get('k'))    # get() 不返回过期数据
+        refreshed.set()
+        self._wait_for(lambda: cache.stats()['refreshes'] == 1)
+        self.assertEqual(cache.get_or_load('k', loader), 'new')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['stale_hits'], 2)
+
+        # 超过 stale 窗口：同步加载
+        self.clock.now += 50
+        self.assertEqual(cache.get_or_load('k', lambda: 'sync'), 'sync')
+
+    def test_failed_refresh_keeps_stale_value(self):
+        cache = TTLCache(ttl=10, stale_ttl=30)
+        cache.set('k', {'success': True, 'v': 1})
+        self.clock.now += 15
+        done = threading.Event()
+
+        def failing():
+            done.set()
+            raise RuntimeError('upstream down')
+
+        self.assertEqual(cache.get_or_load('k', failing)['v'], 1)
+        done.wait(5)
+        self._wait_for(lambda: not cache._refreshing)
+        self.assertEqual(cache.get_or_load('k', lambda: {'success': False}, cache_if=lambda r: r['success'])['v'], 1)
+
+    @staticmethod
+    def _wait_for(condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
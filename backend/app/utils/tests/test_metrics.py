@@ -0,0 +1,84 @@
+"""
+指标层：请求计时钩子、阶段计时、缓存命中率与 /metrics 文本格式
+"""
+
+import os
+import sys
+import unittest
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+from flask import Flask  # noqa: E402
+
+from app.utils import metrics  # noqa: E402
+from app.utils.cache import TTLCache  # noqa: E402
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        metrics.init_app(self.app)
+
+        @self.app.route('/api/stock/<ticker>')
+        def stock(ticker):
+            return {'ticker': ticker}
+
+        @self.app.route('/boom')
+        def boom():
+            raise RuntimeError('boom')
+
+        self.client = self.app.test_client()
+
+    def test_request_latency_uses_route_template(self):
+        before = metrics.REQUEST_LATENCY.snapshot(method='GET', endpoint='/api/stock/<ticker>', status=200)['count']
+        self.client.get('/api/stock/NVDA')
+        self.client.get('/api/stock/AAPL')
+        after = metrics.REQUEST_LATENCY.snapshot(method='GET', endpoint='/api/stock/<ticker>', status=200)['count']
+        self.assertEqual(after - before, 2)
+
+        self.app.config['PROPAGATE_EXCEPTIONS'] = False
+        self.client.get('/boom')
+        self.assertEqual(metrics.REQUEST_LATENCY.snapshot(method='GET', endpoint='/boom', status=500)['count'], 1)
+
+    def test_span_records_outcome(self):
+        with metrics.span('unit_ok') as timer:
+            pass
+        self.assertIsNotNone(timer.elapsed)
+
+        @metrics.span('unit_error')
+        def fail():
+            raise ValueError('x')
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(metrics.STAGE_LATENCY.snapshot(stage='unit_ok', outcome='ok')['count'], 1)
+        self.assertEqual(metrics.STAGE_LATENCY.snapshot(stage='unit_error', outcome='error')['count'], 1)
+
+    def test_metrics_endpoint(self):
+        cache = TTLCache(maxsize=10, ttl=60, name='unit_cache')
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        metrics.record_upstream_error('unit_upstream')
+        metrics.register_gauge('unit_queue_depth', 'Unit test gauge', lambda: 3)
+        with metrics.span('unit_stage'):
+            pass
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+
+        self.assertIn('# TYPE alphagbm_stage_duration_seconds histogram', body)
+        self.assertIn('alphagbm_stage_duration_seconds_bucket{stage="unit_stage",outcome="ok",le="+Inf"} 1', body)
+        self.assertIn('alphagbm_upstream_errors_total{upstream="unit_upstream"} 1', body)
+        self.assertIn('alphagbm_cache_hit_ratio{cache="unit_cache"} 0.5', body)
+        self.assertIn('alphagbm_unit_queue_depth 3', body)
+        # /metrics 自身不计入请求延迟
+        self.assertNotIn('endpoint="/metrics"', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+录制 / 回放层：录制后回放相同调用、回放未命中、延迟注入（使用替身 requests.get / yfinance.Ticker）
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+import requests
+import yfinance
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+from app.utils import replay  # noqa: E402
+
+UPSTREAM_SECONDS = 0.02   # 替身的“网络”耗时，超过 NETWORK_THRESHOLD_SECONDS
+
+
+class FakeTicker:
+    calls = 0
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.info = {'symbol': symbol, 'currentPrice': 101.5}
+
+    def history(self, period='1mo'):
+        FakeTicker.calls += 1
+        time.sleep(UPSTREAM_SECONDS)
+        return pd.DataFrame({'Close': [100.0, 101.0, 101.5]}, index=pd.date_range('2026-01-05', periods=3))
+
+
+class FakeResponse:
+    def __init__(self, url, params):
+        self.url = url
+        self.params = params
+
+    def json(self):
+        return {'url': self.url, 'params': self.params}
+
+
+def fake_get(url, params=None, **kwargs):
+    if 'down' in url:
+        raise requests.ConnectionError('upstream down')
+    return FakeResponse(url, params)
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        for patcher in (mock.patch.object(yfinance, 'Ticker', FakeTicker),
+                        mock.patch.object(requests, 'get', fake_get)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(replay.uninstall)
+        FakeTicker.calls = 0
+
+        with replay.recording(self.directory):
+            self.history = yfinance.Ticker('NVDA').history(period='1y')
+            self.info = yfinance.Ticker('NVDA').info
+            self.body = requests.get('https://api.example.com/rates', params={'base': 'USD'}, timeout=5).json()
+            with self.assertRaises(requests.ConnectionError):
+                requests.get('https://down.example.com')
+        self.assertEqual(FakeTicker.calls, 1)
+
+    def test_record_then_replay(self):
+        self.assertIs(yfinance.Ticker, FakeTicker)   # uninstall 恢复原入口
+        self.assertTrue(os.path.exists(os.path.join(self.directory, replay.CASSETTE_FILE)))
+
+        with replay.replaying(self.directory) as cassette:
+            pd.testing.assert_frame_equal(yfinance.Ticker('NVDA').history(period='1y'), self.history)
+            self.assertEqual(yfinance.Ticker('NVDA').info, self.info)
+            # timeout / headers 不参与匹配
+            body = requests.get('https://api.example.com/rates', params={'base': 'USD'},
+                                headers={'Authorization': 'secret'}).json()
+            self.assertEqual(body, self.body)
+            # 录制到的异常原样抛出
+            with self.assertRaises(requests.ConnectionError):
+                requests.get('https://down.example.com')
+
+        self.assertEqual(FakeTicker.calls, 1)       # 回放不访问上游
+        self.assertEqual(cassette.stats()['yfinance']['misses'], 0)
+
+    def test_replay_miss(self):
+        with replay.replaying(self.directory) as cassette:
+            with self.assertRaises(replay.ReplayMiss):
+                yfinance.Ticker('AAPL').history(period='1y')
+            with self.assertRaises(replay.ReplayMiss):
+                yfinance.Ticker('NVDA').history(period='5d')
+            self.assertFalse(hasattr(yfinance.Ticker('NVDA'), 'fast_info'))
+        self.assertEqual(cassette.stats()['yfinance']['misses'], 3)
+
+        with self.assertRaises(FileNotFoundError):
+            replay.install('replay', os.path.join(self.directory, 'missing'))
+
+    def test_latency_injection(self):
+        def timed_history(**kwargs):
+            with replay.replaying(self.directory, **kwargs) as cassette:
+                ticker = yfinance.Ticker('NVDA')        # 本地操作，不注入延迟
+                started = time.perf_counter()
+                ticker.history(period='1y')
+                return time.perf_counter() - started, cassette.stats()['yfinance']['delay_seconds']
+
+        elapsed, delay = timed_history()
+        self.assertEqual(delay, 0.0)
+        self.assertLess(elapsed, UPSTREAM_SECONDS)
+
+        elapsed, delay = timed_history(latency='recorded')
+        self.assertGreaterEqual(delay, UPSTREAM_SECONDS)
+        self.assertGreaterEqual(elapsed, delay)
+
+        elapsed, delay = timed_history(latency='yfinance=0.05,gemini=8', latency_scale=2)
+        self.assertAlmostEqual(delay, 0.1)
+        self.assertGreaterEqual(elapsed, 0.1)
+
+        self.assertEqual(replay.parse_latency('http=0.3, yfinance=1'), {'http': 0.3, 'yfinance': 1.0})
+        self.assertIsNone(replay.parse_latency('0'))
+        self.assertEqual(replay.parse_latency('1.5'), 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+ResponseCache：预序列化响应、强 ETag / 304、失效（含跨进程的磁盘缓存）与公开组合接口
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+from unittest import mock  # noqa: E402
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+
+from app.utils.response_cache import ResponseCache  # noqa: E402
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.cache = ResponseCache('unit_responses')
+        self.calls = []
+        self.status = 200
+
+        @self.app.route('/data')
+        def data():
+            return self.cache.respond('data', self.build)
+
+        self.client = self.app.test_client()
+
+    def build(self):
+        self.calls.append(1)
+        return {'value': len(self.calls)}, self.status
+
+    def test_etag_and_not_modified(self):
+        first = self.client.get('/data')
+        etag = first.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertEqual(first.get_json(), {'value': 1})
+        self.assertEqual(first.headers['Cache-Control'], 'no-cache')
+
+        revalidated = self.client.get('/data', headers={'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b'')
+        self.assertEqual(self.client.get('/data').get_json(), {'value': 1})
+        self.assertEqual(len(self.calls), 1)
+
+        self.cache.invalidate()
+        changed = self.client.get('/data', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+    def test_errors_not_cached(self):
+        self.status = 500
+        self.assertEqual(self.client.get('/data').status_code, 500)
+        self.status = 200
+        self.assertEqual(self.client.get('/data').get_json(), {'value': 2})
+
+    def test_shared_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker = ResponseCache('unit_disk_a', directory=directory)
+            other = ResponseCache('unit_disk_b', directory=directory)
+            with self.app.test_request_context('/data'):
+                worker.respond('data', self.build)
+            # 另一进程（或重启后）直接读磁盘上的响应，ETag 相同
+            self.assertEqual(other.get('data'), worker.get('data'))
+
+            worker.memo('snapshot', lambda: 'old')
+            other.invalidate()
+            self.assertIsNone(worker.get('data'))
+            self.assertEqual(worker.memo('snapshot', lambda: 'new'), 'new')   # 对象缓存一同失效
+            self.assertEqual(os.listdir(directory), ['.generation'])
+
+    def test_invalidated_by_other_process_while_building(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker = ResponseCache('unit_race_a', directory=directory)
+            other = ResponseCache('unit_race_b', directory=directory)
+
+            def build():
+                other.invalidate()          # 如调仓脚本在构建期间提交
+                return self.build()
+
+            with self.app.test_request_context('/data'):
+                self.assertEqual(worker.respond('data', build).get_json(), {'value': 1})
+            # 构建前的结果既不留在内存，也不写入共享目录
+            self.assertEqual(os.listdir(directory), ['.generation'])
+            self.assertIsNone(worker.get('data'))
+            self.assertIsNone(other.get('data'))
+
+            self.assertEqual(worker.memo('snapshot', lambda: other.invalidate() or 'old'), 'old')
+            self.assertEqual(worker.memo('snapshot', lambda: 'new'), 'new')
+
+
+class TestPortfolioResponses(unittest.TestCase):
+
+    def setUp(self):
+        from app.api import portfolio
+        from app.models import db, DailyProfitLoss, PortfolioHolding
+
+        self.portfolio = portfolio
+        self.db, self.DailyProfitLoss, self.PortfolioHolding = db, DailyProfitLoss, PortfolioHolding
+        # 模块级缓存的目录默认在源码树内（Config.PORTFOLIO_CACHE_DIR），测试改用临时目录
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(portfolio, 'portfolio_cache',
+                                    ResponseCache('unit_portfolio_responses', directory=tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.app.register_blueprint(portfolio.portfolio_bp)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        portfolio.invalidate_portfolio_cache()
+        self.client = self.app.test_client()
+
+        self.queries = []
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def tearDown(self):
+        event.remove(self.db.engine, 'before_cursor_execute', self._count)
+        self.db.session.remove()
+        self.db.drop_all()
+        self.context.pop()
+
+    def _count(self, *args):
+        self.queries.append(1)
+
+    def add_day(self, trading_date, percent):
+        self.db.session.add(self.DailyProfitLoss(
+            trading_date=trading_date, total_actual_investment=100.0, total_market_value=100.0 + percent,
+            total_profit_loss=percent, total_profit_loss_percent=percent))
+        self.db.session.commit()
+
+    def test_daily_stats_cached_until_commit(self):
+        self.add_day(date(2026, 1, 5), 1.0)
+        first = self.client.get('/api/portfolio/daily-stats')
+        self.assertEqual(first.get_json()['data']['total_profit_loss_percent'], 1.0)
+
+        self.queries.clear()
+        cached = self.client.get('/api/portfolio/daily-stats', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.queries, [])      # 命中缓存时不查询数据库
+
+        # 写入新的每日收益后失效
+        self.add_day(date(2026, 1, 6), 2.0)
+        updated = self.client.get('/api/portfolio/daily-stats', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(updated.status_code, 200)
+        self.assertEqual(updated.get_json()['data']['total_profit_loss_percent'], 2.0)
+
+    def test_rolled_back_changes_keep_cache(self):
+        self.client.get('/api/portfolio/rebalance-history')
+        self.db.session.add(self.DailyProfitLoss(
+            trading_date=date(2026, 1, 7), total_actual_investment=1.0, total_market_value=1.0,
+            total_profit_loss=0.0, total_profit_loss_percent=0.0))
+        self.db.session.flush()
+        self.db.session.rollback()
+
+        self.queries.clear()
+        self.assertEqual(self.client.get('/api/portfolio/rebalance-history').get_json(), {'success': True, 'data': []})
+        self.assertEqual(self.queries, [])
+
+    def test_holdings_snapshot_invalidated_by_other_process(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker = ResponseCache('unit_portfolio_worker', directory=directory)
+            script = ResponseCache('unit_portfolio_script', directory=directory)   # 如调仓脚本 / 其他 worker
+            with mock.patch.object(self.portfolio, 'portfolio_cache', worker):
+                self.db.session.add(self.PortfolioHolding(
+                    ticker='AAPL', name='Apple', shares=10, buy_price=150.0, style='Quality', currency='USD'))
+                self.db.session.commit()
+                self.assertEqual([h['ticker'] for h in self.portfolio._holdings_snapshot()['holdings']], ['AAPL'])
+
+                # 其他进程写入数据库（本进程的 session 监听器看不到）并失效共享目录
+                self.db.session.execute(text(
+                    "INSERT INTO portfolio_holdings (ticker, name, shares, buy_price, style, currency) "
+                    "VALUES ('MSFT', 'Microsoft', 5, 300.0, 'Value', 'USD')"))
+                self.db.session.commit()
+                self.assertEqual(len(self.portfolio._holdings_snapshot()['holdings']), 1)
+                script.invalidate()
+                self.assertEqual(sorted(h['ticker'] for h in self.portfolio._holdings_snapshot()['holdings']),
+                                 ['AAPL', 'MSFT'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+序列化：NumPy/pandas 值编码、Flask provider、压缩 JSON 列
+"""
+
+import json
+import os
+import sys
+import unittest
+import zlib
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.insert(0, backend_dir)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from flask import Flask  # noqa: E402
+from sqlalchemy import Column, Integer, create_engine, text  # noqa: E402
+from sqlalchemy.orm import Session, declarative_base  # noqa: E402
+
+from app.utils import serialization  # noqa: E402
+from app.utils.serialization import CompressedJSON, OrjsonProvider, compress_json, decompress_json  # noqa: E402
+
+RESULT = {
+    'ticker': 'NVDA',
+    'price': np.float64(123.45),
+    'volume': np.int64(1000),
+    'flags': np.array([True, False]),
+    'history': pd.Series([1.0, float('nan')]),
+    'when': pd.Timestamp('2024-01-02'),
+    'ratio': float('inf'),
+    'summary': '看涨',
+}
+
+EXPECTED = {
+    'ticker': 'NVDA',
+    'price': 123.45,
+    'volume': 1000,
+    'flags': [True, False],
+    'history': [1.0, None],
+    'when': '2024-01-02T00:00:00',
+    'ratio': None,
+    'summary': '看涨',
+}
+
+
+class TestSerialization(unittest.TestCase):
+
+    def test_to_jsonable(self):
+        self.assertEqual(serialization.to_jsonable(RESULT), EXPECTED)
+
+    def test_timestamp_keys(self):
+        data = {pd.Timestamp('2024-01-02'): 1.0}
+        self.assertEqual(serialization.to_jsonable(data), {'2024-01-02T00:00:00': 1.0})
+
+    def test_provider_response(self):
+        app = Flask(__name__)
+        app.json = OrjsonProvider(app)
+        with app.test_request_context():
+            response = app.json.response(RESULT)
+        # 与 Flask 默认 provider 一致：datetime 输出为 HTTP 日期
+        self.assertEqual(json.loads(response.get_data()), {**EXPECTED, 'when': 'Tue, 02 Jan 2024 00:00:00 GMT'})
+
+    def test_compressed_roundtrip(self):
+        data = compress_json(RESULT)
+        self.assertLess(len(data), len(serialization.dumps(RESULT)) + 32)
+        self.assertEqual(decompress_json(data), EXPECTED)
+        self.assertEqual(decompress_json(memoryview(data)), EXPECTED)
+
+    def test_decompress_legacy_values(self):
+        # 迁移前的 JSON 文本与 zlib 数据（未安装 zstandard 时写入）都能读取
+        text = json.dumps(EXPECTED, ensure_ascii=False)
+        self.assertEqual(decompress_json(text), EXPECTED)
+        self.assertEqual(decompress_json(text.encode('utf-8')), EXPECTED)
+        self.assertEqual(decompress_json(zlib.compress(text.encode('utf-8'))), EXPECTED)
+
+    def test_compressed_column(self):
+        Base = declarative_base()
+
+        class Row(Base):
+            __tablename__ = 'rows'
+            id = Column(Integer, primary_key=True)
+            data = Column(CompressedJSON, nullable=True)
+
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all([Row(id=1, data=RESULT), Row(id=2, data=None)])
+            session.commit()
+            session.expire_all()
+            self.assertEqual(session.get(Row, 1).data, EXPECTED)
+            self.assertIsNone(session.get(Row, 2).data)
+
+
+class TestCompressedResultColumns(unittest.TestCase):
+    """迁移期间的结果列：读压缩列，未回填的行回退到旧 JSON 列"""
+
+    def setUp(self):
+        from app.models import db, AnalysisTask, StockAnalysisHistory
+        self.db, self.AnalysisTask, self.StockAnalysisHistory = db, AnalysisTask, StockAnalysisHistory
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        self.db.session.remove()
+        self.db.drop_all()
+        self.context.pop()
+
+    def test_legacy_fallback(self):
+        db = self.db
+        # 旧版本写入的行：只有 JSON 列
+        db.session.execute(text(
+            "INSERT INTO stock_analysis_history (id, user_id, ticker, style, full_analysis_data) "
+            "VALUES (1, 'u1', 'NVDA', 'growth', :data)"), {'data': json.dumps({'score': 1})})
+        db.session.add(self.StockAnalysisHistory(id=2, user_id='u1', ticker='AAPL', style='growth',
+                                                 full_analysis_data={'score': 2}))
+        db.session.add(self.AnalysisTask(id='t1', user_id='u1', task_type='stock_analysis', status='completed',
+                                         input_params={}, related_history_id=1, related_history_type='stock'))
+        db.session.commit()
+        db.session.expire_all()
+
+        self.assertEqual(db.session.get(self.StockAnalysisHistory, 1).full_analysis_data, {'score': 1})
+        self.assertEqual(db.session.get(self.AnalysisTask, 't1').to_dict()['result_data'], {'score': 1})
+        # 新写入只进压缩列
+        row = db.session.execute(text("SELECT full_analysis_data, full_analysis_data_packed "
+                                      "FROM stock_analysis_history WHERE id = 2")).one()
+        self.assertIsNone(row[0])
+        self.assertEqual(decompress_json(row[1]), {'score': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+End-to-end stock analysis benchmark on recorded external data
+
+Record once (needs network and API keys), then replay anywhere:
+  --record DIR   run the analysis against the live sources and save every
+                 yfinance / Tiger / HTTP / Gemini response into DIR
+  --replay DIR   serve the same responses from DIR (no network), optionally
+                 with injected latency, and report p50/p95 per ticker
+
+Caches (market data, quant analysis, option chains, market context) are
+cleared before every run unless --warm is given, so each run measures the
+full path.
+
+Usage:
+    python benchmarks/e2e_analysis.py --record benchmarks/recordings/default --tickers NVDA,AAPL,0700.HK
+    python benchmarks/e2e_analysis.py --replay benchmarks/recordings/default --repeat 10
+    python benchmarks/e2e_analysis.py --replay benchmarks/recordings/default --latency recorded
+    python benchmarks/e2e_analysis.py --replay benchmarks/recordings/default --latency yfinance=0.3,gemini=8
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import replay  # noqa: E402
+
+
+def clear_caches():
+    from app.api import stock
+    from app.services import analysis_engine, options_service
+    from app.services.market_context import clear_market_context
+
+    analysis_engine.market_data_cache.clear()
+    stock.quant_analysis_cache.clear()
+    options_service.expirations_cache.clear()
+    options_service.option_chain_cache.clear()
+    clear_market_context()
+
+
+def run_once(ticker, style, options):
+    from app.api.stock import get_stock_analysis_data
+    from app.services.options_service import OptionsService
+
+    result = get_stock_analysis_data(ticker, style)
+    ok = 'error' not in result
+    if options:
+        expirations = OptionsService.get_expirations(ticker).expirations
+        if expirations:
+            OptionsService.get_option_chain(ticker, expirations[0].date)
+    return ok
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--record', metavar='DIR', help='record live responses into DIR')
+    mode.add_argument('--replay', metavar='DIR', help='replay responses from DIR')
+    parser.add_argument('--tickers', default='NVDA,AAPL,0700.HK', help='comma-separated tickers')
+    parser.add_argument('--style', default='growth', choices=['quality', 'value', 'growth', 'momentum'])
+    parser.add_argument('--options', action='store_true', help='also fetch expirations + nearest option chain')
+    parser.add_argument('--latency', default=None,
+                        help="replay latency: 'recorded', seconds, or 'yfinance=0.3,gemini=8'")
+    parser.add_argument('--latency-scale', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per ticker in replay mode')
+    parser.add_argument('--warm', action='store_true', help='keep caches between runs')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    tickers = [t.strip().upper() for t in args.tickers.split(',') if t.strip()]
+
+    from app import create_app
+    app = create_app()
+
+    if args.record:
+        repeat = 1
+        cassette = replay.install('record', args.record)
+    else:
+        repeat = args.repeat
+        cassette = replay.install('replay', args.replay, args.latency, args.latency_scale)
+
+    timings = {ticker: [] for ticker in tickers}
+    failures = {ticker: 0 for ticker in tickers}
+    try:
+        with app.app_context():
+            for _ in range(repeat):
+                for ticker in tickers:
+                    if not args.warm:
+                        clear_caches()
+                    start = time.perf_counter()
+                    try:
+                        ok = run_once(ticker, args.style, args.options)
+                    except replay.ReplayMiss as e:
+                        print(f"  {ticker}: replay miss {e}")
+                        ok = False
+                    timings[ticker].append(time.perf_counter() - start)
+                    if not ok:
+                        failures[ticker] += 1
+    finally:
+        replay.uninstall()
+
+    label = f"record -> {args.record}" if args.record else f"replay <- {args.replay} (latency={args.latency})"
+    print(f"\n{label}, style={args.style}, runs per ticker={repeat}, caches={'warm' if args.warm else 'cold'}\n")
+    print(f"{'ticker':<12}{'p50 s':>10}{'p95 s':>10}{'mean s':>10}{'failed':>8}")
+    all_samples = []
+    for ticker in tickers:
+        samples = timings[ticker]
+        all_samples.extend(samples)
+        print(f"{ticker:<12}{percentile(samples, 50):>10.3f}{percentile(samples, 95):>10.3f}"
+              f"{statistics.mean(samples):>10.3f}{failures[ticker]:>8}")
+    if all_samples:
+        print(f"{'all':<12}{percentile(all_samples, 50):>10.3f}{percentile(all_samples, 95):>10.3f}"
+              f"{statistics.mean(all_samples):>10.3f}{sum(failures.values()):>8}")
+
+    print(f"\n{'channel':<12}{'operations':>12}{'misses':>8}{'delay s':>10}")
+    for channel, stats in cassette.stats().items():
+        print(f"{channel:<12}{stats['operations']:>12}{stats['misses']:>8}{stats['delay_seconds']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
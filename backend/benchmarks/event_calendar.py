@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Event calendar / market warning benchmark
+
+Measures the cost of producing the event lists and market warnings for one
+analysis, twice:
+  - rebuild: event calendar rebuilt from the date rules on every call
+             (what every macro fetch used to do)
+  - indexed: daily calendar index reused, bisect lookups only
+
+No network access: macro and options inputs are fixed sample values.
+
+Usage:
+    python benchmarks/event_calendar.py
+    python benchmarks/event_calendar.py --repeat 20000 --date 2026-03-16
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import analysis_engine, event_calendar  # noqa: E402
+
+OPTIONS_DATA = {'vix': 21.5, 'vix_change': 6.2, 'put_call_ratio': 1.25}
+MACRO_DATA = {'treasury_10y': 4.6, 'treasury_10y_change': 0.05, 'gold_change': 1.8, 'geopolitical_risk': 6.1}
+STOCK_DATA = {'earnings_dates': [], 'volume_anomaly': {'is_anomaly': True, 'ratio': 2.4}}
+
+
+def event_lists():
+    return {
+        'fed_meetings': analysis_engine.get_fed_meeting_dates(),
+        'cpi_releases': analysis_engine.get_cpi_release_dates(),
+        'china_events': analysis_engine.get_china_economic_events(),
+        'options_expirations': analysis_engine.get_options_expiration_dates(),
+    }
+
+
+def one_analysis():
+    macro_data = dict(MACRO_DATA, **event_lists())
+    return analysis_engine.get_market_warnings(macro_data, OPTIONS_DATA, STOCK_DATA)
+
+
+def measure(repeat, rebuild):
+    samples = []
+    for _ in range(repeat):
+        if rebuild:
+            event_calendar._calendar = None  # force the calendar to be rebuilt like the old code path
+        start = time.perf_counter()
+        one_analysis()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        'p50': statistics.median(samples),
+        'p95': samples[int(len(samples) * 0.95) - 1],
+        'mean': statistics.fmean(samples),
+    }
+
+
+def measure_lookups(calendar, repeat):
+    kinds = [event_calendar.FED, event_calendar.US_CPI, event_calendar.CHINA, event_calendar.OPTIONS_EXPIRATION]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kind in kinds:
+            calendar.next_event(kind)
+            calendar.events_within(kind, 14)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(kinds) * 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5000, help='analyses per mode')
+    parser.add_argument('--date', help='pretend today is YYYY-MM-DD (default: today)')
+    args = parser.parse_args()
+
+    if args.date:
+        today = datetime.strptime(args.date, '%Y-%m-%d').date()
+        original = event_calendar.get_event_calendar
+        event_calendar.get_event_calendar = lambda today_=None: original(today)
+        analysis_engine.get_event_calendar = event_calendar.get_event_calendar
+    else:
+        today = date.today()
+
+    start = time.perf_counter()
+    calendar = event_calendar.build_event_calendar(today)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    warnings = one_analysis()
+    print(f"Date: {today}  warnings per analysis: {len(warnings)}")
+    print(f"Calendar build: {build_ms:.2f} ms "
+          f"({sum(len(v) for v in calendar._events.values())} events indexed)")
+    print(f"Indexed lookup (next_event / events_within): {measure_lookups(calendar, args.repeat):.2f} us\n")
+
+    results = {
+        'rebuild': measure(args.repeat, rebuild=True),
+        'indexed': measure(args.repeat, rebuild=False),
+    }
+
+    print(f"{'mode':<10}{'p50 us':>12}{'p95 us':>12}{'mean us':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['p50']:>12.1f}{r['p95']:>12.1f}{r['mean']:>12.1f}")
+    speedup = results['rebuild']['mean'] / results['indexed']['mean']
+    print(f"\nSpeedup (mean): {speedup:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
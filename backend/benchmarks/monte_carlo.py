@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Win-probability benchmark: closed-form per contract vs Monte Carlo per underlying
+
+Evaluates the same random chain (all four strategies) three ways:
+  - closed form: risk_return_profile.calculate_risk_return_profiles, N(d1)
+                 over each side, once per strategy (full profile columns)
+  - gbm:         MonteCarloEngine(model='gbm'): one simulation, all contracts
+                 of all strategies in one pass
+  - bootstrap:   MonteCarloEngine(model='bootstrap') on a synthetic price history
+
+Simulation time is included in the Monte Carlo figures. Throughput is reported
+per 1,000 contracts (one contract = one strategy evaluation). No network access.
+
+Usage:
+    python benchmarks/monte_carlo.py
+    python benchmarks/monte_carlo.py --contracts 20000 --paths 50000 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analysis.options_analysis.advanced.monte_carlo import MonteCarloEngine  # noqa: E402
+from app.analysis.options_analysis.scoring import risk_return_profile  # noqa: E402
+
+SPOT = 100.0
+
+
+def build_chain(n, seed):
+    """n 个看涨 + n 个看跌合约，期限 1-180 天"""
+    rng = np.random.default_rng(seed)
+    chain = {}
+    for side in ('calls', 'puts'):
+        strike = rng.uniform(60, 140, n).round(1)
+        mid = rng.uniform(0.2, 15, n)
+        chain[side] = [
+            {'strike': k, 'bid': m * 0.97, 'ask': m * 1.03, 'implied_volatility': iv, 'days_to_expiry': int(d)}
+            for k, m, iv, d in zip(strike.tolist(), mid.tolist(), rng.uniform(0.1, 0.9, n).tolist(),
+                                   rng.integers(1, 181, n).tolist())
+        ]
+    return chain
+
+
+def price_history(seed, days=250):
+    rng = np.random.default_rng(seed)
+    close = SPOT * np.exp(np.cumsum(rng.standard_t(4, days) * 0.012))
+    return {'Close': dict(enumerate(close.tolist()))}
+
+
+def run_closed_form(chain):
+    stock_data = {'current_price': SPOT}
+    for strategy, side in (('sell_put', 'puts'), ('buy_put', 'puts'), ('sell_call', 'calls'), ('buy_call', 'calls')):
+        risk_return_profile.calculate_risk_return_profiles(chain[side], stock_data, strategy)
+
+
+def run_monte_carlo(engine, stock_data, chain):
+    return engine.simulate(stock_data).chain_win_probabilities(chain)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contracts', type=int, default=5000, help='contracts per side')
+    parser.add_argument('--paths', type=int, default=20000, help='Monte Carlo paths')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per mode (median is reported)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    chain = build_chain(args.contracts, args.seed)
+    stock_data = {'current_price': SPOT, 'history': price_history(args.seed)}
+    evaluations = 4 * args.contracts   # 每侧两个策略
+
+    modes = [('closed form', lambda: run_closed_form(chain))]
+    for model in ('gbm', 'bootstrap'):
+        engine = MonteCarloEngine(n_paths=args.paths, seed=args.seed, model=model)
+        modes.append((f'monte carlo ({model})', lambda engine=engine: run_monte_carlo(engine, stock_data, chain)))
+
+    print(f"Chain: {args.contracts} calls + {args.contracts} puts, 4 strategies "
+          f"({evaluations} evaluations), {args.paths} paths, median of {args.repeat}\n")
+    print(f"{'mode':<26}{'seconds':>10}{'ms / 1k contracts':>20}{'contracts/s':>14}")
+    for mode, fn in modes:
+        seconds = timed(fn, args.repeat)
+        print(f"{mode:<26}{seconds:>10.3f}{seconds / evaluations * 1e6:>20.2f}{evaluations / seconds:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Result serialization benchmark: convert_numpy_types + json vs serialization.dumps
+
+Builds a typical stock analysis response (get_stock_analysis_data) and an
+options chain analysis result (get_options_analysis_data, as stored by the
+task queue) from the synthetic data sources of the benchmark suite, then
+times and measures allocations (tracemalloc peak) for:
+  - column write:  what TaskQueue did per task (convert_numpy_types + json.dumps,
+                   twice: history row and task row) vs dumps() twice
+  - response:      Flask's default provider on the converted result vs OrjsonProvider
+
+No network access.
+
+Usage:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --repeat 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks', 'suite'))
+
+import pytest  # noqa: E402
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import synthetic  # noqa: E402
+from app.utils import serialization  # noqa: E402
+from app.utils.serialization import OrjsonProvider, convert_numpy_types  # noqa: E402
+
+
+def build_results():
+    from app.api.options import get_options_analysis_data
+    from app.api.stock import get_stock_analysis_data
+
+    with pytest.MonkeyPatch.context() as mp:
+        synthetic.install(mp)
+        stock = get_stock_analysis_data('NVDA', 'growth')
+        options = get_options_analysis_data('NVDA', expiry_date=synthetic.expiry_dates()[1])
+    return {'stock': stock, 'options': options}
+
+
+def measure(fn, repeat):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='runs per case (median is reported)')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        results = build_results()
+    finally:
+        sys.stdout = stdout
+
+    app = Flask('bench')
+    default_provider = DefaultJSONProvider(app)
+    orjson_provider = OrjsonProvider(app)
+
+    print(f"encoder: {'orjson ' + serialization.orjson.__version__ if serialization.orjson else 'json (orjson not installed)'}")
+    print(f"{'result':<9}{'case':<16}{'KB':>8}{'legacy ms':>12}{'new ms':>10}{'speedup':>9}"
+          f"{'legacy peak KB':>16}{'new peak KB':>13}")
+
+    for name, result in results.items():
+        size_kb = len(serialization.dumps(result)) / 1024
+        cases = {
+            'column write': (
+                lambda: [json.dumps(convert_numpy_types(result)) for _ in range(2)],
+                lambda: [serialization.dumps_str(result) for _ in range(2)],
+            ),
+            'response': (
+                lambda: default_provider.dumps(convert_numpy_types(result), separators=(',', ':')),
+                lambda: orjson_provider._encode(result),
+            ),
+        }
+        for case, (legacy, new) in cases.items():
+            legacy_s, legacy_peak = measure(legacy, args.repeat)
+            new_s, new_peak = measure(new, args.repeat)
+            print(f"{name:<9}{case:<16}{size_kb:>8.0f}{legacy_s * 1e3:>12.2f}{new_s * 1e3:>10.2f}"
+                  f"{legacy_s / new_s:>8.1f}x{legacy_peak / 1024:>16.0f}{new_peak / 1024:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Options pipeline: chain analysis engine, option chain service, per-contract scoring
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import synthetic
+from app.analysis.options_analysis.advanced.iv_surface import IVSurface
+from app.analysis.options_analysis.advanced.monte_carlo import MonteCarloEngine
+from app.analysis.options_analysis.core.data_fetcher import OptionContracts, OptionsDataFetcher
+from app.analysis.options_analysis.core.engine import OptionsAnalysisEngine
+from app.analysis.options_analysis.scoring.risk_return_profile import calculate_risk_return_profiles
+from app.services import options_service
+from app.services.option_scorer import OptionScorer
+from app.services.options_service import OptionsService
+
+SYMBOL = 'NVDA'
+
+
+def _nearest_expiry(symbol):
+    return OptionsService.get_expirations(symbol).expirations[0].date
+
+
+@pytest.mark.parametrize('strategy', ['all', 'sell_put'])
+def test_analyze_options_chain(benchmark, strategy):
+    # 每轮清空 OptionsDataFetcher 的进程内共享缓存，走完整的获取 + 分析路径
+    def setup():
+        engine = OptionsAnalysisEngine()
+        engine.data_fetcher.clear_cache()
+        return (engine, SYMBOL, strategy), {}
+
+    result = benchmark.pedantic(lambda engine, symbol, strategy: engine.analyze_options_chain(symbol, strategy),
+                                setup=setup, rounds=5)
+    assert result['success']
+
+
+def test_analyze_all_strategies_large_chain(benchmark):
+    # strategy='all' 的计分部分：40 个到期日 x 41 个行权价（每侧 1640 个合约）
+    engine = OptionsAnalysisEngine()
+    options_data = synthetic.engine_options_chain(SYMBOL, expiry_count=40)
+    stock_data = engine.data_fetcher.get_underlying_stock_data(SYMBOL)
+
+    results = benchmark(engine._analyze_all_strategies, options_data, stock_data, {})
+    assert all(result['success'] for result in results.values())
+
+
+@pytest.mark.parametrize('strategy', ['sell_put', 'buy_call'])
+def test_risk_return_profiles_large_chain(benchmark, strategy):
+    # 整侧期权（1640 个合约）的风格标签；摘要只为前 10 个生成
+    engine = OptionsAnalysisEngine()
+    options = synthetic.engine_options_chain(SYMBOL, expiry_count=40)['puts' if strategy == 'sell_put' else 'calls']
+    stock_data = engine.data_fetcher.get_underlying_stock_data(SYMBOL)
+
+    def profile_chain():
+        profiles = calculate_risk_return_profiles(options, stock_data, strategy, {'vrp_level': 'high'})
+        return [profiles.to_dict(i) for i in range(10)]
+
+    result = benchmark(profile_chain)
+    assert len(result) == 10
+
+
+def test_fill_greeks_large_chain(benchmark):
+    # yfinance 形式（无希腊值）的 40 个到期日期权链：反解隐含波动率 + 希腊值，两侧共 3280 个合约
+    chain = synthetic.engine_options_chain(SYMBOL, expiry_count=40)
+    frames = {side: pd.DataFrame(chain[side]).assign(delta=None) for side in ('calls', 'puts')}
+    fetcher = OptionsDataFetcher()
+
+    def fill():
+        options_data = {'current_price': synthetic.base_price(SYMBOL),
+                        **{side: OptionContracts(frame) for side, frame in frames.items()}}
+        return fetcher._fill_greeks(options_data)
+
+    result = benchmark(fill)
+    assert result['calls'].frame['gamma'].notna().all()
+
+
+def test_iv_surface_large_chain(benchmark):
+    # 40 个到期日期权链构建波动率曲面 + VRP / 增强分析所用的查询
+    chain = synthetic.engine_options_chain(SYMBOL, expiry_count=40)
+    frames = {side: pd.DataFrame(chain[side]) for side in ('calls', 'puts')}
+
+    def build_and_query():
+        surface = IVSurface.from_frames(synthetic.base_price(SYMBOL), frames['calls'], frames['puts'])
+        return surface, surface.summary(), surface.atm_iv(45)
+
+    surface, summary, _ = benchmark(build_and_query)
+    assert summary['expiry_count'] == len(surface.days) > 1
+
+
+@pytest.mark.parametrize('model', ['gbm', 'bootstrap'])
+def test_monte_carlo_win_probabilities_large_chain(benchmark, model):
+    # 每个标的模拟一次（20000 条路径），评估 40 个到期日期权链四个策略的胜率（2 x 3280 个合约）
+    engine = OptionsAnalysisEngine()
+    options_data = synthetic.engine_options_chain(SYMBOL, expiry_count=40)
+    stock_data = engine.data_fetcher.get_underlying_stock_data(SYMBOL)
+
+    def simulate_chain():
+        simulation = MonteCarloEngine(model=model).simulate(stock_data)
+        return simulation.chain_win_probabilities(options_data)
+
+    result = benchmark(simulate_chain)
+    assert np.isfinite(result['sell_put']).any()
+
+
+def test_yfinance_options_data(benchmark):
+    # Tiger 不可用时的 yfinance 备用路径：多到期日下载 + 汇总指标
+    fetcher = OptionsDataFetcher()
+
+    def fetch():
+        return fetcher._enrich_options_data(fetcher._get_yfinance_options_data('SPY'))
+
+    result = benchmark(fetch)
+    assert result['success'] and result['analytics']['total_options_count'] > 0
+
+
+def test_get_option_chain(benchmark):
+    expiry = _nearest_expiry(SYMBOL)
+
+    result = benchmark.pedantic(OptionsService.get_option_chain, args=(SYMBOL, expiry),
+                                setup=options_service.option_chain_cache.clear, rounds=5)
+    assert result.calls and result.puts
+
+
+def test_score_option(benchmark):
+    chain = OptionsService.get_option_chain(SYMBOL, _nearest_expiry(SYMBOL))
+    contracts = chain.calls + chain.puts
+    stock_price = chain.real_stock_price or 100.0
+    scorer = OptionScorer()
+
+    def score_chain():
+        return [scorer.score_option(option, stock_price, 0.25) for option in contracts]
+
+    scores = benchmark(score_chain)
+    assert len(scores) == len(contracts)
@@ -0,0 +1,44 @@
+"""
+Public portfolio endpoints: cold build vs precomputed response / 304 revalidation
+"""
+
+import pytest
+
+from app.api import portfolio
+from app.models import db, DailyProfitLoss, PortfolioHolding, StyleProfit
+
+from bench_scheduler import HOLDINGS
+
+ENDPOINTS = ['/api/portfolio/holdings', '/api/portfolio/daily-stats',
+             '/api/portfolio/profit-loss/history?days=30', '/api/portfolio/rebalance-history']
+
+
+@pytest.fixture
+def client(bench_app):
+    if 'portfolio' not in bench_app.blueprints:
+        bench_app.register_blueprint(portfolio.portfolio_bp)
+    rows = [PortfolioHolding(ticker=ticker, name=ticker, shares=100 + i * 10, buy_price=50.0 + i * 7,
+                             style=style, currency=currency)
+            for i, (ticker, style, currency) in enumerate(HOLDINGS)]
+    db.session.add_all(rows)
+    db.session.commit()
+    yield bench_app.test_client()
+    for model in (PortfolioHolding, DailyProfitLoss, StyleProfit):
+        model.query.delete()
+    db.session.commit()
+
+
+def _get_all(client, etags=None):
+    for url in ENDPOINTS:
+        headers = {'If-None-Match': etags[url]} if etags else {}
+        response = client.get(url, headers=headers)
+        assert response.status_code == (304 if etags else 200)
+
+
+def test_portfolio_endpoints_cold(benchmark, client):
+    benchmark.pedantic(_get_all, args=(client,), setup=portfolio.invalidate_portfolio_cache, rounds=5)
+
+
+def test_portfolio_endpoints_not_modified(benchmark, client):
+    etags = {url: client.get(url).headers['ETag'] for url in ENDPOINTS}
+    benchmark(_get_all, client, etags)
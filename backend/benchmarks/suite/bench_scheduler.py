@@ -0,0 +1,40 @@
+"""
+Daily portfolio profit/loss calculation (temporary SQLite database)
+"""
+
+import pytest
+
+from app import scheduler
+from app.models import db, DailyProfitLoss, PortfolioHolding, StyleProfit
+
+HOLDINGS = [
+    ('NVDA', 'growth', 'USD'), ('AAPL', 'quality', 'USD'), ('MSFT', 'quality', 'USD'), ('TSLA', 'momentum', 'USD'),
+    ('META', 'growth', 'USD'), ('AMZN', 'growth', 'USD'), ('GOOGL', 'value', 'USD'), ('JPM', 'value', 'USD'),
+    ('0700.HK', 'value', 'HKD'), ('9988.HK', 'value', 'HKD'), ('3690.HK', 'momentum', 'HKD'),
+    ('600519.SS', 'quality', 'CNY'),
+]
+
+
+@pytest.fixture
+def holdings(bench_app):
+    rows = [PortfolioHolding(ticker=ticker, name=ticker, shares=100 + i * 10, buy_price=50.0 + i * 7,
+                             style=style, currency=currency)
+            for i, (ticker, style, currency) in enumerate(HOLDINGS)]
+    db.session.add_all(rows)
+    db.session.commit()
+    yield rows
+    for model in (PortfolioHolding, DailyProfitLoss, StyleProfit):
+        model.query.delete()
+    db.session.commit()
+
+
+def _reset_today():
+    DailyProfitLoss.query.delete()
+    StyleProfit.query.delete()
+    db.session.commit()
+    scheduler.cache_timestamp = None  # 每轮重新获取汇率
+
+
+def test_calculate_daily_profit_loss(benchmark, holdings):
+    benchmark.pedantic(scheduler.calculate_daily_profit_loss, setup=_reset_today, rounds=5)
+    assert DailyProfitLoss.query.count() == 1
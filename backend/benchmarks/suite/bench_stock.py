@@ -0,0 +1,41 @@
+"""
+Stock analysis pipeline: full analysis, EV model, result serialization
+"""
+
+import pytest
+
+from app.api.stock import get_quant_analysis, get_stock_analysis_data
+from app.services import ev_model
+from app.utils.serialization import convert_numpy_types, dumps
+from conftest import clear_caches
+
+CASES = [('NVDA', 'growth'), ('AAPL', 'quality'), ('0700.HK', 'value')]
+
+
+@pytest.mark.parametrize('ticker,style', CASES)
+def test_get_stock_analysis_data(benchmark, ticker, style):
+    result = benchmark.pedantic(get_stock_analysis_data, args=(ticker, style), setup=clear_caches, rounds=5)
+    assert 'error' not in result
+
+
+@pytest.mark.parametrize('ticker,style', CASES)
+def test_calculate_ev_model(benchmark, ticker, style):
+    quant = get_quant_analysis(ticker, style)
+    assert 'error' not in quant
+
+    result = benchmark(ev_model.calculate_ev_model, quant['data'], quant['risk'], style)
+    assert 'ev_weighted_pct' in result
+
+
+def test_convert_numpy_types(benchmark):
+    responses = [get_stock_analysis_data(ticker, style) for ticker, style in CASES]
+
+    result = benchmark(convert_numpy_types, responses)
+    assert len(result) == len(CASES)
+
+
+def test_dumps(benchmark):
+    responses = [get_stock_analysis_data(ticker, style) for ticker, style in CASES]
+
+    result = benchmark(dumps, responses)
+    assert result.startswith(b'[')
@@ -0,0 +1,327 @@
+"""
+Offline benchmark suite (pytest-benchmark style)
+
+The suite is only collected when this directory is passed to pytest, so the
+regular `python -m pytest` run is unaffected:
+
+    python -m pytest benchmarks/suite                          # run + compare with stored baselines
+    python -m pytest benchmarks/suite --benchmark-save         # (re)write the baselines
+    python -m pytest benchmarks/suite --benchmark-threshold 0.1 --benchmark-fail-on-regression
+    python -m pytest benchmarks/suite --record-dir benchmarks/recordings/suite   # live sources, needs network
+    python -m pytest benchmarks/suite --replay-dir benchmarks/recordings/suite
+    python -m pytest benchmarks/suite -k options --benchmark-report /tmp/bench.json
+
+External data comes from app/utils/replay.py cassettes (--replay-dir, made
+once with --record-dir) or, by default, from the deterministic synthetic
+sources in synthetic.py. Baselines
+are stored per data source in benchmarks/suite/baselines/<source>.json and are
+machine-specific: re-save them on the hardware you compare on.
+
+The `benchmark` fixture follows the pytest-benchmark API
+(`benchmark(fn, *args, **kwargs)` and `benchmark.pedantic(...)`), so the
+files keep working if that plugin is installed and this fixture is dropped.
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pytest
+
+SUITE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(SUITE_DIR, 'baselines')
+sys.path.insert(0, os.path.dirname(os.path.dirname(SUITE_DIR)))
+sys.path.insert(0, SUITE_DIR)
+
+import synthetic  # noqa: E402
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark', 'offline benchmark suite')
+    group.addoption('--benchmark-save', action='store_true',
+                    help='write the measured medians as the new baselines')
+    group.addoption('--benchmark-threshold', type=float, default=0.25,
+                    help='relative median slowdown reported as a regression (default 0.25 = 25%%)')
+    group.addoption('--benchmark-fail-on-regression', action='store_true',
+                    help='exit non-zero when any benchmark regresses past the threshold')
+    group.addoption('--benchmark-min-rounds', type=int, default=5)
+    group.addoption('--benchmark-max-time', type=float, default=1.0,
+                    help='target seconds per benchmark for auto-calibrated runs')
+    group.addoption('--benchmark-report', metavar='PATH', help='also write the comparison as JSON')
+    group.addoption('--record-dir', metavar='DIR', help='use the live sources and record them into DIR')
+    group.addoption('--replay-dir', metavar='DIR', help='replay recorded external data instead of synthetic data')
+
+
+def _suite_requested(config):
+    for arg in config.args:
+        path = os.path.abspath(os.path.join(config.invocation_params.dir, str(arg).split('::')[0]))
+        if path == SUITE_DIR or path.startswith(SUITE_DIR + os.sep):
+            return True
+    return False
+
+
+def pytest_collect_file(file_path, parent):
+    # 只有显式运行本目录（或其中的文件）时才收集 bench_*.py，常规测试运行不受影响
+    # 直接指定的文件由 pytest 自己收集
+    if file_path.name.startswith('bench_') and file_path.suffix == '.py' and _suite_requested(parent.config) \
+            and not parent.session.isinitpath(file_path):
+        return pytest.Module.from_parent(parent, path=file_path)
+
+
+def _source_name(config):
+    if config.getoption('--record-dir'):
+        return 'live'
+    replay_dir = config.getoption('--replay-dir')
+    return f"replay-{os.path.basename(os.path.normpath(replay_dir))}" if replay_dir else 'synthetic'
+
+
+# ---------------------------------------------------------------------------
+# benchmark fixture
+# ---------------------------------------------------------------------------
+
+class BenchmarkFixture:
+    MIN_ROUND_SECONDS = 0.005   # 自动校准时每轮的最短耗时（过快的函数每轮执行多次）
+    MAX_ROUNDS = 200
+
+    def __init__(self, name, min_rounds, max_time):
+        self.name = name
+        self.min_rounds = min_rounds
+        self.max_time = max_time
+        self.stats = None
+
+    def __call__(self, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        first = max(time.perf_counter() - start, 1e-9)
+
+        iterations = max(1, int(self.MIN_ROUND_SECONDS / first))
+        rounds = int(self.max_time / (first * iterations))
+        rounds = max(self.min_rounds, min(self.MAX_ROUNDS, rounds))
+
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = fn(*args, **kwargs)
+            samples.append((time.perf_counter() - start) / iterations)
+        self._record(samples, iterations)
+        return result
+
+    def pedantic(self, target, args=(), kwargs=None, setup=None, rounds=None, iterations=1, warmup_rounds=0):
+        """setup 在每轮前执行（不计时），可返回 (args, kwargs) 覆盖参数"""
+        kwargs = kwargs or {}
+        rounds = rounds or self.min_rounds
+
+        def prepare():
+            if setup is None:
+                return args, kwargs
+            prepared = setup()
+            return prepared if prepared is not None else (args, kwargs)
+
+        result = None
+        for _ in range(warmup_rounds):
+            call_args, call_kwargs = prepare()
+            target(*call_args, **call_kwargs)
+
+        samples = []
+        for _ in range(rounds):
+            call_args, call_kwargs = prepare()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = target(*call_args, **call_kwargs)
+            samples.append((time.perf_counter() - start) / iterations)
+        self._record(samples, iterations)
+        return result
+
+    def _record(self, samples, iterations):
+        self.stats = {
+            'min': min(samples),
+            'max': max(samples),
+            'mean': statistics.mean(samples),
+            'median': statistics.median(samples),
+            'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            'rounds': len(samples),
+            'iterations': iterations,
+        }
+
+
+@pytest.fixture
+def benchmark(request):
+    config = request.config
+    fixture = BenchmarkFixture(request.node.nodeid.split('/')[-1],
+                               config.getoption('--benchmark-min-rounds'),
+                               config.getoption('--benchmark-max-time'))
+    yield fixture
+    if fixture.stats is not None:
+        config._benchmark_results[fixture.name] = fixture.stats
+
+
+# ---------------------------------------------------------------------------
+# data sources / app
+# ---------------------------------------------------------------------------
+
+def clear_caches():
+    """清空进程内缓存，使每轮都走完整路径"""
+    from app.analysis.options_analysis.core import data_fetcher
+    from app.api import stock
+    from app.services import analysis_engine, options_service, tiger_client
+    from app.services.market_context import clear_market_context
+
+    data_fetcher.clear_caches()
+    analysis_engine.market_data_cache.clear()
+    stock.quant_analysis_cache.clear()
+    options_service.expirations_cache.clear()
+    options_service.option_chain_cache.clear()
+    tiger_client.clear_caches()
+    clear_market_context()
+
+
+@pytest.fixture(autouse=True)
+def offline_sources(request, monkeypatch):
+    clear_caches()
+    record_dir = request.config.getoption('--record-dir')
+    replay_dir = request.config.getoption('--replay-dir')
+    if record_dir or replay_dir:
+        from app.utils import replay
+        # 录制时同一目录跨测试累积（install 会先加载已有的录制）
+        replay.install('record' if record_dir else 'replay', record_dir or replay_dir)
+        try:
+            yield
+        finally:
+            replay.uninstall()
+    else:
+        synthetic.install(monkeypatch)
+        yield
+    clear_caches()
+
+
+@pytest.fixture(scope='session')
+def bench_app():
+    """最小 Flask 应用 + 临时 SQLite 数据库（不启动调度器与任务队列）"""
+    from flask import Flask
+    from app.models import db
+
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='alphag_bench_')
+    os.close(fd)
+    flask_app = Flask('benchmarks')
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(path)
+
+
+# ---------------------------------------------------------------------------
+# baselines / regression report
+# ---------------------------------------------------------------------------
+
+def pytest_configure(config):
+    config._benchmark_results = {}
+    config._benchmark_rows = []
+
+
+def _baseline_path(config):
+    return os.path.join(BASELINE_DIR, f"{_source_name(config)}.json")
+
+
+def _load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('benchmarks', {})
+
+
+def _save_baselines(path, results):
+    benchmarks = _load_baselines(path)
+    for name, stats in results.items():
+        benchmarks[name] = {key: stats[key] for key in ('median', 'min', 'mean', 'rounds')}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'processor': platform.processor() or platform.machine()},
+            'benchmarks': dict(sorted(benchmarks.items())),
+        }, f, indent=1)
+
+
+def _format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.3f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+def _compare(config):
+    results = config._benchmark_results
+    baselines = _load_baselines(_baseline_path(config))
+    threshold = config.getoption('--benchmark-threshold')
+
+    rows = []
+    for name, stats in sorted(results.items()):
+        baseline = baselines.get(name)
+        change = stats['median'] / baseline['median'] - 1 if baseline and baseline['median'] > 0 else None
+        if change is None:
+            status = 'new'
+        elif change > threshold:
+            status = 'REGRESSION'
+        elif change < -threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append({'name': name, **stats, 'baseline_median': baseline['median'] if baseline else None,
+                     'change': change, 'status': status})
+    return rows
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if not getattr(config, '_benchmark_results', None):
+        return
+
+    config._benchmark_rows = _compare(config)
+    if config.getoption('--benchmark-save'):
+        _save_baselines(_baseline_path(config), config._benchmark_results)
+
+    report_path = config.getoption('--benchmark-report')
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({'source': _source_name(config), 'threshold': config.getoption('--benchmark-threshold'),
+                       'benchmarks': config._benchmark_rows}, f, indent=1)
+
+    regressions = [r for r in config._benchmark_rows if r['status'] == 'REGRESSION']
+    if regressions and config.getoption('--benchmark-fail-on-regression') and exitstatus == 0:
+        session.exitstatus = 1
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    rows = getattr(config, '_benchmark_rows', None)
+    if not rows:
+        return
+
+    threshold = config.getoption('--benchmark-threshold')
+    tr = terminalreporter
+    tr.section(f"benchmarks ({_source_name(config)}, threshold {threshold:.0%})")
+    width = max(len(r['name']) for r in rows)
+    tr.write_line(f"{'name':<{width}}  {'median':>10}  {'min':>10}  {'rounds':>6}  {'baseline':>10}  {'change':>8}  status")
+    for r in rows:
+        baseline = _format_seconds(r['baseline_median']) if r['baseline_median'] is not None else '-'
+        change = f"{r['change']:+.1%}" if r['change'] is not None else '-'
+        tr.write_line(f"{r['name']:<{width}}  {_format_seconds(r['median']):>10}  {_format_seconds(r['min']):>10}  "
+                      f"{r['rounds']:>6}  {baseline:>10}  {change:>8}  {r['status']}",
+                      red=r['status'] == 'REGRESSION', green=r['status'] == 'faster')
+
+    regressions = [r['name'] for r in rows if r['status'] == 'REGRESSION']
+    if regressions:
+        tr.write_line(f"{len(regressions)} regression(s) over {threshold:.0%}", red=True)
+    if config.getoption('--benchmark-save'):
+        tr.write_line(f"Baselines saved to {os.path.relpath(_baseline_path(config))}")
@@ -0,0 +1,359 @@
+"""
+Deterministic synthetic market data for the offline benchmark suite
+
+Stands in for the external sources when no recording is given:
+  - SyntheticTicker / synthetic_download replace yfinance.Ticker / yfinance.download
+  - SyntheticQuoteClient replaces the Tiger QuoteClient (expirations, chains, briefs, bars)
+  - requests.get / requests.post fail immediately (Polymarket and exchange-rate
+    lookups take their fallback paths), Gemini is disabled (fallback report)
+
+Every value is derived from the symbol, so repeated runs see identical data.
+
+build_universe() is a seeded screening universe in get_market_data format, shared by the
+vectorized scoring cross-check tests and benchmarks/vectorized_scoring.py.
+"""
+
+import math
+import zlib
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+
+# 指数 / 期货的价格水平（宏观数据、VIX）
+INDEX_LEVELS = {
+    '^TNX': 4.2, 'DX-Y.NYB': 104.0, '^DXY': 104.0, 'GC=F': 2350.0, 'CL=F': 78.0,
+    '^VIX': 16.0, '^GSPC': 5200.0, '^IXIC': 16400.0, '^HSI': 17500.0,
+}
+SECTORS = [
+    ('Technology', 'Semiconductors'), ('Technology', 'Software—Infrastructure'),
+    ('Consumer Cyclical', 'Internet Retail'), ('Healthcare', 'Biotechnology'),
+    ('Financial Services', 'Banks—Diversified'), ('Energy', 'Oil & Gas Integrated'),
+    ('Communication Services', 'Internet Content & Information'), ('Industrials', 'Aerospace & Defense'),
+]
+EXPIRY_COUNT = 8
+STRIKES_PER_SIDE = 20
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts', 'underlying'])
+
+
+def _rng(symbol, salt=''):
+    return np.random.default_rng(zlib.crc32(f"{symbol}{salt}".encode()))
+
+
+def base_price(symbol):
+    if symbol in INDEX_LEVELS:
+        return INDEX_LEVELS[symbol]
+    return float(20 + zlib.crc32(symbol.encode()) % 480)
+
+
+def _business_days(end, count):
+    return pd.bdate_range(end=end, periods=count)
+
+
+def price_history(symbol, days=252):
+    """几何布朗运动日线 OHLCV，最后一根收盘价等于 base_price"""
+    rng = _rng(symbol, 'hist')
+    sigma = 0.012 if symbol in INDEX_LEVELS else 0.022
+    returns = rng.normal(0.0004, sigma, days)
+    close = base_price(symbol) * np.exp(np.cumsum(returns) - returns.sum())
+    open_ = close * (1 + rng.normal(0, sigma / 3, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, sigma / 2, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, sigma / 2, days)))
+    volume = rng.integers(2_000_000, 40_000_000, days)
+    index = _business_days(pd.Timestamp(date.today()), days)
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume,
+                         'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+
+
+def _period_days(period=None, start=None):
+    if start is not None:
+        start = pd.Timestamp(start)
+        return max(2, len(pd.bdate_range(start=start, end=pd.Timestamp(date.today()))))
+    return {'1d': 1, '5d': 5, '1mo': 22, '3mo': 63, '6mo': 126, '1y': 252, '2y': 504, '5y': 1260}.get(period or '1mo', 22)
+
+
+def company_info(symbol):
+    rng = _rng(symbol, 'info')
+    price = base_price(symbol)
+    hist = price_history(symbol)
+    sector, industry = SECTORS[zlib.crc32(symbol.encode()) % len(SECTORS)]
+    pe = float(rng.uniform(8, 60))
+    return {
+        'symbol': symbol,
+        'longName': f"{symbol} Holdings Inc.",
+        'shortName': symbol,
+        'sector': sector,
+        'industry': industry,
+        'currency': 'HKD' if symbol.endswith('.HK') else 'USD',
+        'currentPrice': price,
+        'regularMarketPrice': price,
+        'previousClose': float(hist['Close'].iloc[-2]),
+        'regularMarketPreviousClose': float(hist['Close'].iloc[-2]),
+        'regularMarketVolume': int(hist['Volume'].iloc[-1]),
+        'fiftyTwoWeekHigh': float(hist['High'].max()),
+        'fiftyTwoWeekLow': float(hist['Low'].min()),
+        'trailingPE': pe,
+        'forwardPE': pe * float(rng.uniform(0.6, 1.0)),
+        'pegRatio': float(rng.uniform(0.5, 3.0)),
+        'revenueGrowth': float(rng.uniform(-0.1, 0.6)),
+        'earningsGrowth': float(rng.uniform(-0.2, 0.8)),
+        'profitMargins': float(rng.uniform(-0.05, 0.45)),
+        'marketCap': float(price * rng.uniform(2e8, 8e9)),
+        'beta': float(rng.uniform(0.6, 2.2)),
+        'dividendYield': float(rng.uniform(0, 0.03)),
+        'longBusinessSummary': f"{symbol} designs and sells products in the {industry} industry.",
+    }
+
+
+def expiry_dates(count=EXPIRY_COUNT):
+    """未来 count 个周五（YYYY-MM-DD）"""
+    day = date.today() + timedelta(days=1)
+    day += timedelta(days=(4 - day.weekday()) % 7)
+    return [(day + timedelta(weeks=i)).strftime('%Y-%m-%d') for i in range(count)]
+
+
+def _bs_price(spot, strike, t, vol, is_call, r=0.04):
+    d1 = (math.log(spot / strike) + (r + vol * vol / 2) * t) / (vol * math.sqrt(t))
+    d2 = d1 - vol * math.sqrt(t)
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))  # noqa: E731
+    pdf = math.exp(-d1 * d1 / 2) / math.sqrt(2 * math.pi)
+    if is_call:
+        price = spot * cdf(d1) - strike * math.exp(-r * t) * cdf(d2)
+        delta = cdf(d1)
+        theta = (-spot * pdf * vol / (2 * math.sqrt(t)) - r * strike * math.exp(-r * t) * cdf(d2)) / 365
+    else:
+        price = strike * math.exp(-r * t) * cdf(-d2) - spot * cdf(-d1)
+        delta = cdf(d1) - 1
+        theta = (-spot * pdf * vol / (2 * math.sqrt(t)) + r * strike * math.exp(-r * t) * cdf(-d2)) / 365
+    gamma = pdf / (spot * vol * math.sqrt(t))
+    vega = spot * pdf * math.sqrt(t) / 100
+    return max(price, 0.01), delta, gamma, theta, vega
+
+
+def option_rows(symbol, expiry):
+    """某到期日的期权链（calls + puts），Black-Scholes 定价加微笑形状的 IV"""
+    spot = base_price(symbol)
+    rng = _rng(symbol, expiry)
+    t = max((datetime.strptime(expiry, '%Y-%m-%d').date() - date.today()).days, 1) / 365
+    step = max(round(spot * 0.025, 0), 0.5)
+    rows = []
+    for i in range(-STRIKES_PER_SIDE, STRIKES_PER_SIDE + 1):
+        strike = round(spot + i * step, 2)
+        if strike <= 0:
+            continue
+        moneyness = math.log(strike / spot)
+        vol = 0.30 + 0.8 * moneyness * moneyness - 0.1 * moneyness + float(rng.normal(0, 0.01))
+        for is_call in (True, False):
+            price, delta, gamma, theta, vega = _bs_price(spot, strike, t, vol, is_call)
+            spread = max(0.01, price * 0.04)
+            rows.append({
+                'strike': strike, 'is_call': is_call, 'bid': round(price - spread / 2, 2),
+                'ask': round(price + spread / 2, 2), 'last': round(price, 2),
+                'volume': int(rng.integers(0, 5000)), 'open_interest': int(rng.integers(5, 20000)),
+                'iv': vol, 'delta': delta, 'gamma': gamma, 'theta': theta, 'vega': vega,
+            })
+    return rows
+
+
+def engine_options_chain(symbol, expiry_count=EXPIRY_COUNT):
+    """OptionsAnalysisEngine 计分器使用的期权链格式（calls / puts 合约字典列表）"""
+    today = date.today()
+    chain = {'success': True, 'symbol': symbol, 'calls': [], 'puts': []}
+    for expiry in expiry_dates(expiry_count):
+        days = (datetime.strptime(expiry, '%Y-%m-%d').date() - today).days
+        for row in option_rows(symbol, expiry):
+            side = 'calls' if row['is_call'] else 'puts'
+            chain[side].append({
+                'symbol': f"{symbol}_{expiry}_{row['strike']}_{side[0].upper()}",
+                'strike': row['strike'], 'expiry': expiry, 'days_to_expiry': days,
+                'bid': row['bid'], 'ask': row['ask'], 'volume': row['volume'],
+                'open_interest': row['open_interest'], 'implied_volatility': row['iv'], 'delta': row['delta'],
+            })
+    return chain
+
+
+class SyntheticTicker:
+    """yfinance.Ticker 替身：info / history / options / option_chain / fast_info"""
+
+    def __init__(self, ticker, *args, **kwargs):
+        self.ticker = ticker.upper()
+
+    @property
+    def info(self):
+        return company_info(self.ticker)
+
+    @property
+    def fast_info(self):
+        return {'last_price': base_price(self.ticker), 'lastPrice': base_price(self.ticker)}
+
+    def history(self, period=None, start=None, end=None, interval='1d', **kwargs):
+        return price_history(self.ticker).tail(_period_days(period, start)).copy()
+
+    @property
+    def options(self):
+        if self.ticker in INDEX_LEVELS or self.ticker.endswith(('.HK', '.SS', '.SZ')):
+            return ()
+        return tuple(expiry_dates())
+
+    def option_chain(self, expiry=None, **kwargs):
+        expiry = expiry or expiry_dates()[0]
+        rows = option_rows(self.ticker, expiry)
+
+        def frame(is_call):
+            side = [r for r in rows if r['is_call'] == is_call]
+            return pd.DataFrame({
+                'contractSymbol': [f"{self.ticker}{expiry.replace('-', '')[2:]}{'C' if is_call else 'P'}{int(r['strike'] * 1000):08d}"
+                                   for r in side],
+                'strike': [r['strike'] for r in side],
+                'lastPrice': [r['last'] for r in side],
+                'bid': [r['bid'] for r in side],
+                'ask': [r['ask'] for r in side],
+                'volume': [float(r['volume']) for r in side],
+                'openInterest': [r['open_interest'] for r in side],
+                'impliedVolatility': [r['iv'] for r in side],
+                'inTheMoney': [(r['strike'] < base_price(self.ticker)) == is_call for r in side],
+            })
+
+        return OptionChain(frame(True), frame(False), {'regularMarketPrice': base_price(self.ticker)})
+
+    calendar = None
+    news = []
+    earnings_dates = None
+    dividends = pd.Series(dtype=float)
+    splits = pd.Series(dtype=float)
+
+
+def synthetic_download(tickers, period='1y', start=None, group_by='column', **kwargs):
+    if isinstance(tickers, str):
+        tickers = tickers.replace(',', ' ').split()
+    frames = {t: SyntheticTicker(t).history(period=period, start=start)[['Open', 'High', 'Low', 'Close', 'Volume']]
+              for t in tickers}
+    if len(frames) == 1 and group_by != 'ticker':
+        return next(iter(frames.values()))
+    return pd.concat(frames, axis=1)
+
+
+class SyntheticQuoteClient:
+    """Tiger QuoteClient 替身（TigerClientManager 使用到的方法）"""
+
+    def get_option_expirations(self, symbols, market=None):
+        rows = []
+        for symbol in symbols:
+            for expiry in expiry_dates():
+                ts = int(datetime.strptime(expiry, '%Y-%m-%d').timestamp() * 1000)
+                rows.append({'symbol': symbol, 'date': expiry, 'timestamp': ts, 'period_tag': 'w'})
+        return pd.DataFrame(rows)
+
+    def get_option_chain(self, symbol, expiry, market=None, return_greek_value=True, **kwargs):
+        rows = []
+        for r in option_rows(symbol, expiry):
+            put_call = 'CALL' if r['is_call'] else 'PUT'
+            rows.append({
+                'identifier': f"{symbol}  {expiry.replace('-', '')[2:]}{put_call[0]}{int(r['strike'] * 1000):08d}",
+                'symbol': symbol, 'expiry': expiry, 'strike': r['strike'], 'put_call': put_call,
+                'bid_price': r['bid'], 'ask_price': r['ask'], 'latest_price': r['last'],
+                'volume': r['volume'], 'open_interest': r['open_interest'], 'implied_vol': r['iv'],
+                'delta': r['delta'], 'gamma': r['gamma'], 'theta': r['theta'], 'vega': r['vega'],
+            })
+        return pd.DataFrame(rows)
+
+    def get_stock_briefs(self, symbols, **kwargs):
+        return pd.DataFrame([{'symbol': s, 'latest_price': base_price(s), 'pre_close': base_price(s) * 0.99,
+                              'margin_rate': 0.25} for s in symbols])
+
+    def get_bars(self, symbols, period=None, end_time=None, limit=200, market=None, **kwargs):
+        frames = []
+        for symbol in symbols:
+            hist = price_history(symbol).tail(limit)
+            frames.append(pd.DataFrame({'symbol': symbol, 'time': hist.index.astype('int64') // 10 ** 6,
+                                        'open': hist['Open'].values, 'high': hist['High'].values,
+                                        'low': hist['Low'].values, 'close': hist['Close'].values,
+                                        'volume': hist['Volume'].values}))
+        return pd.concat(frames, ignore_index=True)
+
+
+def _offline(*args, **kwargs):
+    raise requests.ConnectionError('offline benchmark: network disabled')
+
+
+def install(monkeypatch):
+    """在 monkeypatch 作用域内把所有外部数据源替换为合成数据"""
+    import yfinance
+
+    from app.services import ai_service
+    from app.services.tiger_client import get_client_manager
+
+    monkeypatch.setattr(yfinance, 'Ticker', SyntheticTicker)
+    monkeypatch.setattr(yfinance, 'download', synthetic_download)
+    monkeypatch.setattr(requests, 'get', _offline)
+    monkeypatch.setattr(requests, 'post', _offline)
+    monkeypatch.setattr(ai_service, 'genai', None)
+
+    manager = get_client_manager()
+    monkeypatch.setattr(manager, 'quote_client', SyntheticQuoteClient())
+    monkeypatch.setattr(manager, 'initialize_client', lambda: True)
+    monkeypatch.setattr(manager, '_pool', None)
+
+
+# 打分用的宏观数据（10年期美债收益率）
+MACRO_DATA = {'treasury_10y': 4.3}
+
+UNIVERSE_SECTORS = [
+    ('Technology', 'Software—Infrastructure'), ('Financial Services', 'Banks—Diversified'),
+    ('Healthcare', 'Biotechnology'), ('Energy', 'Oil & Gas Integrated'),
+    ('Consumer Cyclical', 'Internet Retail'), ('Real Estate', 'REIT—Retail'),
+    ('Utilities', 'Utilities—Regulated Electric'), ('Industrials', 'Aerospace & Defense'),
+    ('Unknown', 'Unknown'), ('', ''),
+]
+UNIVERSE_NAMES = ['Acme Corp', 'Globex Holdings', 'SPDR S&P 500 ETF Trust', 'Realty Income Corp',
+                  'ProShares UltraPro QQQ', 'Initech Ltd', 'Umbrella Pharma', 'Hooli Inc']
+
+
+def build_universe(n=600, seed=7):
+    """
+    随机但可复现的股票池（get_market_data 格式），刻意覆盖边界值（ETF/REIT、亏损、PE分位点、
+    财报、解禁、流动性、各行业）；用于列式打分的交叉校验和基准测试
+    """
+    rng = np.random.default_rng(seed)
+    today = datetime.now().date()
+    records = []
+    for i in range(n):
+        sector, industry = UNIVERSE_SECTORS[rng.integers(len(UNIVERSE_SECTORS))]
+        price = float(rng.choice([0.0, rng.uniform(1, 500), rng.uniform(1, 500), rng.uniform(1, 500)]))
+        low = price * float(rng.uniform(0.5, 1.0)) if rng.random() > 0.05 else 0.0
+        high = price * float(rng.uniform(1.0, 1.8)) if rng.random() > 0.05 else 0.0
+        record = {
+            'symbol': f'T{i}' if rng.random() > 0.02 else f'T{i}.XSHG',
+            'name': UNIVERSE_NAMES[rng.integers(len(UNIVERSE_NAMES))],
+            'sector': sector,
+            'industry': industry,
+            'price': price,
+            'pe': float(rng.choice([0.0, -5.0, rng.uniform(3, 120), rng.uniform(3, 40), 25.0])),
+            'forward_pe': float(rng.uniform(0, 50)),
+            'peg': float(rng.choice([0.0, rng.uniform(0.2, 4)])),
+            'growth': float(rng.choice([0.0, rng.uniform(-0.3, 0.8), 0.15, 0.2, 0.1])),
+            'margin': float(rng.choice([rng.uniform(-0.2, 0.5), 0.05, 0.15])),
+            'ma50': price * float(rng.uniform(0.8, 1.2)) if rng.random() > 0.05 else 0.0,
+            'ma200': price * float(rng.uniform(0.8, 1.2)),
+            'week52_high': high,
+            'week52_low': low,
+            'market_cap': float(rng.choice([0.0, 5e7, 5e8, 5e9, 5e10, 5e11])),
+            'earnings_dates': [],
+            'lockup_data': {},
+        }
+        if rng.random() < 0.3:
+            record['pe_percentile'] = float(rng.uniform(0, 100))
+        if rng.random() < 0.3:
+            record['earnings_dates'] = [(today + timedelta(days=int(rng.integers(-3, 20)))).strftime('%Y-%m-%d')]
+        if rng.random() < 0.2:
+            days = int(rng.integers(-10, 20))
+            record['lockup_data'] = {'days_until_lockup': days,
+                                     'lockup_expiry_date': (today + timedelta(days=days)).strftime('%Y-%m-%d')}
+        if rng.random() < 0.05:
+            record['is_liquid'] = False
+            record['liquidity_warning'] = '日均成交额不足'
+        records.append(record)
+    return records
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Risk / target price scoring benchmark: scalar loop vs columnar batch
+
+Scores the same synthetic universe (build_universe from benchmarks/suite/synthetic.py,
+also used by the cross-check tests) twice:
+  - scalar: analyze_risk_and_position + calculate_target_price +
+            apply_target_price_adjustment, one dict per ticker
+  - batch:  vectorized_scoring.score_universe over one DataFrame
+            (DataFrame construction from the records is timed separately)
+
+No network access.
+
+Usage:
+    python benchmarks/vectorized_scoring.py
+    python benchmarks/vectorized_scoring.py --tickers 5000 --style growth --repeat 5
+"""
+
+import argparse
+import copy
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'suite'))
+
+from app.services import analysis_engine  # noqa: E402
+from app.services.vectorized_scoring import records_to_frame, score_universe  # noqa: E402
+from synthetic import build_universe, MACRO_DATA  # noqa: E402
+
+
+def run_scalar(records, style):
+    for record in records:
+        data = copy.copy(record)
+        data['macro_data'] = MACRO_DATA
+        risk = analysis_engine.analyze_risk_and_position(style, data)
+        target = analysis_engine.calculate_target_price(data, risk, style)
+        analysis_engine.apply_target_price_adjustment(risk, data['price'], target)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=2000, help='universe size')
+    parser.add_argument('--style', default='quality', choices=['quality', 'value', 'growth', 'momentum'])
+    parser.add_argument('--repeat', type=int, default=3, help='runs per mode (median is reported)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    # 标量函数的 print/日志不计入对比
+    logging.disable(logging.CRITICAL)
+    devnull = open(os.devnull, 'w')
+
+    records = build_universe(n=args.tickers, seed=args.seed)
+
+    stdout = sys.stdout
+    sys.stdout = devnull
+    try:
+        scalar_s = timed(lambda: run_scalar(records, args.style), args.repeat)
+    finally:
+        sys.stdout = stdout
+
+    frame_s = timed(lambda: records_to_frame(records), args.repeat)
+    frame = records_to_frame(records)
+    batch_s = timed(lambda: score_universe(frame, args.style, MACRO_DATA), args.repeat)
+
+    print(f"Universe: {args.tickers} tickers, style={args.style}, median of {args.repeat}\n")
+    print(f"{'mode':<22}{'seconds':>10}{'tickers/s':>14}")
+    for mode, seconds in [('scalar loop', scalar_s),
+                          ('batch (frame ready)', batch_s),
+                          ('batch + frame build', batch_s + frame_s)]:
+        print(f"{mode:<22}{seconds:>10.3f}{args.tickers / seconds:>14.0f}")
+    print(f"\nSpeedup: {scalar_s / batch_s:.1f}x (scoring only), "
+          f"{scalar_s / (batch_s + frame_s):.1f}x (including frame build)")
+
+
+if __name__ == '__main__':
+    main()
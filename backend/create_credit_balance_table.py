@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Materialized Credit Balances
+Creates the credit_balances table and backfills it from credit_ledger.
+
+Usage:
+    python create_credit_balance_table.py
+"""
+
+from datetime import datetime
+from app import create_app
+from app.models import db
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+
+def create_credit_balance_table():
+    """Create credit_balances and backfill from the ledger"""
+
+    # Load environment variables
+    load_dotenv()
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("=" * 60)
+            print("Credit Balance Migration")
+            print("=" * 60)
+            print(f"Database URL: {app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')}")
+
+            # Only creates tables that don't exist yet
+            db.create_all()
+            print("\n✅ credit_balances table ready")
+
+            # Tables created before next_expires_at existed
+            columns = [col['name'] for col in db.inspect(db.engine).get_columns('credit_balances')]
+            if 'next_expires_at' not in columns:
+                print("Adding credit_balances.next_expires_at column...")
+                db.session.execute(text("ALTER TABLE credit_balances ADD COLUMN next_expires_at TIMESTAMP"))
+                db.session.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_credit_balances_next_expires_at "
+                    "ON credit_balances (next_expires_at)"
+                ))
+                db.session.commit()
+
+            # Backfill: one row per (user_id, service_type) with valid remaining credits
+            print("\nBackfilling balances from credit_ledger...")
+            db.session.execute(text("DELETE FROM credit_balances"))
+            result = db.session.execute(text("""
+                INSERT INTO credit_balances (user_id, service_type, balance, next_expires_at, updated_at)
+                SELECT user_id, service_type, COALESCE(SUM(amount_remaining), 0), MIN(expires_at), :now
+                FROM credit_ledger
+                WHERE amount_remaining > 0
+                  AND (expires_at IS NULL OR expires_at > :now)
+                GROUP BY user_id, service_type
+            """), {'now': datetime.utcnow()})
+            db.session.commit()
+            print(f"✅ Backfilled {result.rowcount} balance rows")
+
+            print("\n" + "=" * 60)
+            print("Migration completed successfully!")
+            print("=" * 60)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    return True
+
+
+if __name__ == "__main__":
+    if not create_credit_balance_table():
+        exit(1)
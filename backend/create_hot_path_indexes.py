@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Hot Query Path Indexes
+Creates the composite / partial indexes declared in app/models.py and audits
+single-column indexes that became redundant (a prefix of a composite index).
+
+Usage:
+    python create_hot_path_indexes.py                    # create missing indexes, report redundant ones
+    python create_hot_path_indexes.py --drop-redundant   # also drop redundant single-column indexes
+"""
+
+import sys
+from app import create_app
+from app.models import db
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+HOT_PATH_TABLES = [
+    'daily_query_count',
+    'credit_ledger',
+    'usage_logs',
+    'analysis_tasks',
+    'stock_analysis_history',
+    'options_analysis_history',
+    'style_profits',
+]
+
+
+def composite_indexes():
+    """Multi-column indexes declared on the hot path tables"""
+    for table_name in HOT_PATH_TABLES:
+        table = db.metadata.tables[table_name]
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if len(index.expressions) > 1:
+                yield table, index
+
+
+def create_indexes(conn):
+    """Create missing composite indexes (CONCURRENTLY on PostgreSQL)"""
+    is_postgres = conn.dialect.name == 'postgresql'
+    inspector = db.inspect(conn)
+    created = 0
+
+    for table, index in composite_indexes():
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        if index.name in existing:
+            print(f"   = {index.name} (exists)")
+            continue
+
+        ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+        if is_postgres:
+            # Avoid locking writes on large production tables
+            ddl = ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)
+        conn.execute(text(ddl))
+        created += 1
+        print(f"   + {index.name}")
+
+    return created
+
+
+def find_redundant_indexes(conn):
+    """Single-column indexes whose column leads a composite index on the same table"""
+    inspector = db.inspect(conn)
+    redundant = []
+
+    for table_name in HOT_PATH_TABLES:
+        indexes = inspector.get_indexes(table_name)
+        composite_leads = {
+            ix['column_names'][0] for ix in indexes
+            if len(ix['column_names']) > 1 and not ix.get('dialect_options', {}).get('postgresql_where')
+            and not ix.get('dialect_options', {}).get('sqlite_where')
+        }
+        for ix in indexes:
+            if len(ix['column_names']) == 1 and not ix.get('unique') and ix['column_names'][0] in composite_leads:
+                redundant.append((table_name, ix['name'], ix['column_names'][0]))
+
+    return redundant
+
+
+def create_hot_path_indexes(drop_redundant=False):
+    """Create composite indexes and audit redundant ones"""
+
+    # Load environment variables
+    load_dotenv()
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("=" * 60)
+            print("Hot Query Path Index Migration")
+            print("=" * 60)
+            print(f"Database URL: {app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')}")
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                print("\nCreating composite indexes:")
+                created = create_indexes(conn)
+                print(f"\n✅ {created} indexes created")
+
+                print("\nIndex audit - redundant single-column indexes:")
+                redundant = find_redundant_indexes(conn)
+                if not redundant:
+                    print("   (none)")
+                for table_name, index_name, column in redundant:
+                    if drop_redundant:
+                        conn.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+                        print(f"   - dropped {index_name} on {table_name}({column})")
+                    else:
+                        print(f"   ? {index_name} on {table_name}({column}) - rerun with --drop-redundant to remove")
+
+            print("\n" + "=" * 60)
+            print("Migration completed successfully!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    return True
+
+
+if __name__ == "__main__":
+    if not create_hot_path_indexes(drop_redundant='--drop-redundant' in sys.argv):
+        exit(1)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Database Migration Script for Compressed Analysis Result Columns
+Moves the large JSON result columns into CompressedJSON blobs (see
+app/utils/serialization.py) and removes the duplicated task results:
+
+  - stock_analysis_history.full_analysis_data
+  - options_analysis_history.full_analysis_data
+  - analysis_tasks.result_data
+
+The compressed value lives in a new binary <column>_packed column. The models
+(app/models.py) read <column>_packed and fall back to the JSON <column> while
+COMPRESSED_DATA_LEGACY_COLUMNS is true, and write <column>_packed only.
+
+Steps (expand / contract; each one can be re-run):
+  expand    add the nullable <column>_packed columns. The release still
+            serving does not map them, so this is safe at any time.
+            -> then roll out the release with the CompressedJSON models
+  backfill  compress every JSON value into <column>_packed and clear the JSON
+            value, in committed batches. Run once the new release serves
+            everywhere (rows written by old processes during the rollout are
+            picked up too); readers see either column at every point.
+            -> then set COMPRESSED_DATA_LEGACY_COLUMNS=false and roll it out
+  contract  in one transaction holding the table locks: compress any JSON
+            value still left, clear analysis_tasks.result_data for completed
+            tasks whose related history record holds the result (it is read
+            from the history record), and drop the JSON columns. Refuses to
+            run while COMPRESSED_DATA_LEGACY_COLUMNS is true here, since the
+            serving release would still select the dropped columns.
+
+Usage:
+    python migrate_compressed_analysis_data.py expand
+    python migrate_compressed_analysis_data.py backfill [--batch-size 200]
+    python migrate_compressed_analysis_data.py contract
+    python migrate_compressed_analysis_data.py backfill --dry-run   # report sizes and estimated savings only
+"""
+
+import argparse
+from app import create_app
+from app.config import Config
+from app.models import db
+from app.utils.serialization import compress_json, loads
+from dotenv import load_dotenv
+from sqlalchemy import LargeBinary, bindparam, text
+
+COMPRESSED_COLUMNS = [
+    ('stock_analysis_history', 'full_analysis_data'),
+    ('options_analysis_history', 'full_analysis_data'),
+    ('analysis_tasks', 'result_data'),
+]
+
+HISTORY_TABLES = {
+    'stock': 'stock_analysis_history',
+    'options': 'options_analysis_history',
+}
+
+STEPS = ('expand', 'backfill', 'contract')
+
+
+def column_names(conn, table_name):
+    return {c['name'] for c in db.inspect(conn).get_columns(table_name)}
+
+
+def expand(conn, table_name, column, dry_run):
+    """Add the nullable <column>_packed column"""
+    packed = f"{column}_packed"
+    if packed in column_names(conn, table_name):
+        print(f"   = {table_name}.{packed} (exists)")
+        return
+    if not dry_run:
+        column_ddl = LargeBinary().compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {packed} {column_ddl}"))
+        conn.commit()
+    print(f"   {'~' if dry_run else '+'} {table_name}.{packed}")
+
+
+def backfill(conn, table_name, column, batch_size, dry_run):
+    """Compress the JSON values into <column>_packed in committed batches"""
+    columns = column_names(conn, table_name)
+    if column not in columns:
+        print(f"   = {table_name}.{column} (contracted)")
+        return 0, 0
+    if f"{column}_packed" not in columns:
+        raise RuntimeError(f"{table_name}.{column}_packed is missing; run the expand step first")
+
+    if dry_run:
+        raw_bytes = packed_bytes = rows = 0
+        result = conn.execution_options(stream_results=True).execute(
+            text(f"SELECT CAST({column} AS TEXT) FROM {table_name} WHERE {column} IS NOT NULL"))
+        for (value,) in result:
+            raw_bytes += len(value.encode('utf-8'))
+            packed_bytes += len(compress_json(loads(value)))
+            rows += 1
+        print(f"   ~ {table_name}.{column}: {rows} rows, {raw_bytes / 1e6:.1f} MB JSON -> "
+              f"{packed_bytes / 1e6:.1f} MB compressed")
+        return raw_bytes, packed_bytes
+
+    raw_bytes, packed_bytes, rows = pack_rows(conn, table_name, column, batch_size, commit=True)
+    print(f"   + {table_name}.{column}: {rows} rows, {raw_bytes / 1e6:.1f} MB -> {packed_bytes / 1e6:.1f} MB")
+    return raw_bytes, packed_bytes
+
+
+def pack_rows(conn, table_name, column, batch_size, commit):
+    """Move every JSON value into <column>_packed (compressed); commit after each batch if commit"""
+    packed = f"{column}_packed"
+    # 新版本写入时清空 JSON 列，所以 JSON 列中仍有的值总是较新的
+    update = text(f"UPDATE {table_name} SET {packed} = :data, {column} = NULL "
+                  f"WHERE id = :id").bindparams(bindparam('data', type_=LargeBinary))
+    raw_bytes = packed_bytes = rows = 0
+    last_id = None
+    while True:
+        # 按主键分批（analysis_tasks 的主键是 UUID 字符串，同样可以排序）
+        where = f"{column} IS NOT NULL" + (" AND id > :last_id" if last_id is not None else "")
+        batch = conn.execute(text(f"SELECT id, CAST({column} AS TEXT) FROM {table_name} WHERE {where} "
+                                  f"ORDER BY id LIMIT :limit"),
+                             {'last_id': last_id, 'limit': batch_size}).fetchall()
+        if not batch:
+            break
+        params = []
+        for row_id, value in batch:
+            result = loads(value)
+            data = compress_json(result) if result is not None else None  # JSON null
+            raw_bytes += len(value.encode('utf-8'))
+            packed_bytes += len(data or b'')
+            params.append({'id': row_id, 'data': data})
+        conn.execute(update, params)
+        if commit:
+            conn.commit()
+        rows += len(batch)
+        last_id = batch[-1][0]
+        if commit:
+            print(f"   . {table_name}.{column}: {rows} rows")
+    return raw_bytes, packed_bytes, rows
+
+
+def dedupe_task_results(conn, dry_run):
+    """Clear analysis_tasks.result_data where the related history record holds the same result"""
+    cleared = 0
+    for history_type, history_table in HISTORY_TABLES.items():
+        condition = f"""
+            result_data_packed IS NOT NULL
+            AND status = 'completed'
+            AND related_history_type = :history_type
+            AND EXISTS (SELECT 1 FROM {history_table} h
+                        WHERE h.id = analysis_tasks.related_history_id
+                        AND h.full_analysis_data_packed IS NOT NULL)
+        """
+        if dry_run:
+            count = conn.execute(text(f"SELECT COUNT(*) FROM analysis_tasks WHERE {condition}"),
+                                 {'history_type': history_type}).scalar()
+        else:
+            count = conn.execute(text(f"UPDATE analysis_tasks SET result_data_packed = NULL WHERE {condition}"),
+                                 {'history_type': history_type}).rowcount
+        cleared += count
+        print(f"   {'~' if dry_run else '-'} {count} {history_type} task results {'to clear' if dry_run else 'cleared'}")
+    return cleared
+
+
+def contract(conn, batch_size, dry_run):
+    """Pack what is left, deduplicate task results and drop the JSON columns, in one transaction"""
+    legacy = [(table_name, column) for table_name, column in COMPRESSED_COLUMNS
+              if column in column_names(conn, table_name)]
+    if dry_run:
+        for table_name, column in legacy:
+            count = conn.execute(text(f"SELECT COUNT(*) FROM {table_name} WHERE {column} IS NOT NULL")).scalar()
+            print(f"   ~ {table_name}.{column}: {count} rows not backfilled, column to drop")
+        dedupe_task_results(conn, dry_run)
+        return
+
+    try:
+        for table_name, column in legacy:
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text(f"LOCK TABLE {table_name} IN ACCESS EXCLUSIVE MODE"))
+            # 旧版本进程在 backfill 之后写入的值
+            rows = pack_rows(conn, table_name, column, batch_size, commit=False)[2]
+            print(f"   + {table_name}.{column}: {rows} rows packed in the final batch")
+        dedupe_task_results(conn, dry_run)
+        for table_name, column in legacy:
+            conn.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {column}"))
+            print(f"   - {table_name}.{column} dropped")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def migrate_compressed_analysis_data(step, batch_size=500, dry_run=False):
+    """Run one step of the compressed result column migration"""
+
+    # Load environment variables
+    load_dotenv()
+
+    if step == 'contract' and Config.COMPRESSED_DATA_LEGACY_COLUMNS and not dry_run:
+        print("❌ COMPRESSED_DATA_LEGACY_COLUMNS is true: roll out COMPRESSED_DATA_LEGACY_COLUMNS=false "
+              "(and set it here) before dropping the JSON columns")
+        return False
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("=" * 60)
+            print(f"Compressed Analysis Data Migration: {step}" + (" (dry run)" if dry_run else ""))
+            print("=" * 60)
+            print(f"Database URL: {app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')}")
+
+            with db.engine.connect() as conn:
+                if step == 'expand':
+                    for table_name, column in COMPRESSED_COLUMNS:
+                        expand(conn, table_name, column, dry_run)
+
+                elif step == 'backfill':
+                    total_raw = total_packed = 0
+                    for table_name, column in COMPRESSED_COLUMNS:
+                        raw_bytes, packed_bytes = backfill(conn, table_name, column, batch_size, dry_run)
+                        total_raw += raw_bytes
+                        total_packed += packed_bytes
+                    if total_raw:
+                        print(f"\n✅ {total_raw / 1e6:.1f} MB -> {total_packed / 1e6:.1f} MB "
+                              f"({1 - total_packed / total_raw:.0%} smaller)")
+
+                else:
+                    contract(conn, batch_size, dry_run)
+
+            if step != 'expand' and not dry_run and db.engine.dialect.name == 'postgresql':
+                print("\nRun VACUUM (FULL) on the three tables to return the freed space to the OS.")
+
+            print("\n" + "=" * 60)
+            print("Migration step completed successfully!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compress analysis result columns')
+    parser.add_argument('step', choices=STEPS, help='expand, backfill or contract (see the module docstring)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help='report without changing the database')
+    args = parser.parse_args()
+    if not migrate_compressed_analysis_data(args.step, batch_size=args.batch_size, dry_run=args.dry_run):
+        exit(1)